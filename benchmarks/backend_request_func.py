@@ -1,10 +1,11 @@
+import asyncio
 import json
 import os
 import sys
 import time
 import traceback
 from dataclasses import dataclass, field
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Union
 
 import aiohttp
 import huggingface_hub.constants
@@ -24,6 +25,12 @@ class RequestFuncInput:
     model: str
     best_of: int = 1
     use_beam_search: bool = False
+    # The LoRA adapter to serve the request with, as named by the server.
+    lora_name: Optional[str] = None
+    stream: bool = True
+    # The previous turns of a multi-turn session, for chat backends. Other
+    # backends get the whole conversation in the prompt.
+    messages: List[Dict[str, str]] = field(default_factory=list)
 
 
 @dataclass
@@ -36,6 +43,19 @@ class RequestFuncOutput:
         default_factory=list)  # List of inter-token latencies
     prompt_len: int = 0
     error: str = ""
+    # False if the response was not streamed, the TTFT is then the latency.
+    streamed: bool = True
+
+
+@dataclass
+class MockBackendConfig:
+    """The modeled latencies of the mock backend, in seconds."""
+    ttft: float = 0.05
+    prefill_per_token: float = 0.0
+    itl: float = 0.01
+
+
+MOCK_BACKEND_CONFIG = MockBackendConfig()
 
 
 async def async_request_tgi(
@@ -47,6 +67,8 @@ async def async_request_tgi(
 
     async with aiohttp.ClientSession(timeout=AIOHTTP_TIMEOUT) as session:
         assert not request_func_input.use_beam_search
+        assert request_func_input.stream
+        assert request_func_input.lora_name is None
         params = {
             "best_of": request_func_input.best_of,
             "max_new_tokens": request_func_input.output_len,
@@ -119,6 +141,8 @@ async def async_request_trt_llm(
     async with aiohttp.ClientSession(timeout=AIOHTTP_TIMEOUT) as session:
         assert not request_func_input.use_beam_search
         assert request_func_input.best_of == 1
+        assert request_func_input.stream
+        assert request_func_input.lora_name is None
         payload = {
             "accumulate_tokens": True,
             "text_input": request_func_input.prompt,
@@ -182,6 +206,7 @@ async def async_request_deepspeed_mii(
     async with aiohttp.ClientSession(timeout=AIOHTTP_TIMEOUT) as session:
         assert request_func_input.best_of == 1
         assert not request_func_input.use_beam_search
+        assert request_func_input.lora_name is None
 
         payload = {
             "prompt": request_func_input.prompt,
@@ -231,12 +256,12 @@ async def async_request_openai_completions(
     async with aiohttp.ClientSession(timeout=AIOHTTP_TIMEOUT) as session:
         assert not request_func_input.use_beam_search
         payload = {
-            "model": request_func_input.model,
+            "model": request_func_input.lora_name or request_func_input.model,
             "prompt": request_func_input.prompt,
             "temperature": 0.0,
             "best_of": request_func_input.best_of,
             "max_tokens": request_func_input.output_len,
-            "stream": True,
+            "stream": request_func_input.stream,
         }
         headers = {
             "Authorization": f"Bearer {os.environ.get('OPENAI_API_KEY')}"
@@ -252,7 +277,15 @@ async def async_request_openai_completions(
         try:
             async with session.post(url=api_url, json=payload,
                                     headers=headers) as response:
-                if response.status == 200:
+                if response.status == 200 and not request_func_input.stream:
+                    data = await response.json()
+                    output.latency = time.perf_counter() - st
+                    # The first token is received with the last one.
+                    output.ttft = output.latency
+                    output.streamed = False
+                    output.generated_text = data["choices"][0]["text"]
+                    output.success = True
+                elif response.status == 200:
                     async for chunk_bytes in response.content:
                         chunk_bytes = chunk_bytes.strip()
                         if not chunk_bytes:
@@ -311,16 +344,21 @@ async def async_request_openai_chat_completions(
     async with aiohttp.ClientSession(timeout=AIOHTTP_TIMEOUT) as session:
         assert not request_func_input.use_beam_search
         payload = {
-            "model": request_func_input.model,
-            "messages": [
+            "model":
+            request_func_input.lora_name or request_func_input.model,
+            "messages":
+            request_func_input.messages + [
                 {
                     "role": "user",
                     "content": request_func_input.prompt,
                 },
             ],
-            "temperature": 0.0,
-            "max_tokens": request_func_input.output_len,
-            "stream": True,
+            "temperature":
+            0.0,
+            "max_tokens":
+            request_func_input.output_len,
+            "stream":
+            request_func_input.stream,
         }
         headers = {
             "Content-Type": "application/json",
@@ -337,7 +375,16 @@ async def async_request_openai_chat_completions(
         try:
             async with session.post(url=api_url, json=payload,
                                     headers=headers) as response:
-                if response.status == 200:
+                if response.status == 200 and not request_func_input.stream:
+                    data = await response.json()
+                    output.latency = time.perf_counter() - st
+                    # The first token is received with the last one.
+                    output.ttft = output.latency
+                    output.streamed = False
+                    output.generated_text = (
+                        data["choices"][0]["message"]["content"])
+                    output.success = True
+                elif response.status == 200:
                     async for chunk_bytes in response.content:
                         chunk_bytes = chunk_bytes.strip()
                         if not chunk_bytes:
@@ -383,6 +430,40 @@ async def async_request_openai_chat_completions(
     return output
 
 
+async def async_request_mock(
+    request_func_input: RequestFuncInput,
+    pbar: Optional[tqdm] = None,
+) -> RequestFuncOutput:
+    """Answer the request locally after the latencies of
+    `MOCK_BACKEND_CONFIG`, without a server, to test the benchmark harness.
+    Each generated token is the word " x"."""
+    config = MOCK_BACKEND_CONFIG
+    output = RequestFuncOutput()
+    output.prompt_len = request_func_input.prompt_len
+
+    st = time.perf_counter()
+    await asyncio.sleep(config.ttft + config.prefill_per_token *
+                        request_func_input.prompt_len)
+    output.ttft = time.perf_counter() - st
+    most_recent_timestamp = st + output.ttft
+    for _ in range(request_func_input.output_len - 1):
+        await asyncio.sleep(config.itl)
+        timestamp = time.perf_counter()
+        if request_func_input.stream:
+            output.itl.append(timestamp - most_recent_timestamp)
+        most_recent_timestamp = timestamp
+    output.latency = most_recent_timestamp - st
+    if not request_func_input.stream:
+        output.ttft = output.latency
+        output.streamed = False
+    output.generated_text = " x" * request_func_input.output_len
+    output.success = True
+
+    if pbar:
+        pbar.update(1)
+    return output
+
+
 # Since vllm must support Python 3.8, we can't use str.removeprefix(prefix)
 # introduced in Python 3.9
 def remove_prefix(text: str, prefix: str) -> str:
@@ -424,4 +505,5 @@ ASYNC_REQUEST_FUNCS = {
     "openai-chat": async_request_openai_chat_completions,
     "tensorrt-llm": async_request_trt_llm,
     "scalellm": async_request_openai_completions,
+    "mock": async_request_mock,
 }
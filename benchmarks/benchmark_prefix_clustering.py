@@ -0,0 +1,99 @@
+"""Benchmark the prefix cache hit rate of offline generation with and without
+`LLM.generate(..., cluster_by_prefix=True)`.
+
+The prompts are few-shot prompts: each starts with one of `--num-prefixes`
+shared prefixes, followed by a unique question, and the prompts of different
+prefixes are interleaved. With a KV cache too small to hold all the prefixes,
+the input order evicts a prefix before the next prompt using it is
+scheduled, while clustering runs the prompts of a prefix together.
+
+The model is replaced by `MockExecutor`, so only the tokenizer and the config
+of `--model` are loaded, and the hit rate is that of the scheduler's block
+manager, as on a GPU with `--num-gpu-blocks` blocks.
+"""
+import random
+import time
+from typing import List
+
+from vllm import LLM, SamplingParams
+from vllm.executor.mock_executor import MockExecutor, MockExecutorConfig
+from vllm.inputs import TokensPrompt
+from vllm.utils import Device, FlexibleArgumentParser
+
+
+def make_prompts(args, vocab_size: int) -> List[TokensPrompt]:
+    rng = random.Random(args.seed)
+
+    def random_tokens(num_tokens: int) -> List[int]:
+        return [rng.randrange(100, vocab_size) for _ in range(num_tokens)]
+
+    prefixes = [
+        random_tokens(args.prefix_len) for _ in range(args.num_prefixes)
+    ]
+    # Round robin over the prefixes.
+    return [
+        TokensPrompt(prompt_token_ids=prefixes[i % args.num_prefixes] +
+                     random_tokens(args.suffix_len))
+        for i in range(args.num_prompts)
+    ]
+
+
+def run(args, cluster_by_prefix: bool) -> None:
+    mock_config = MockExecutorConfig(step_latency_s=args.step_latency,
+                                     num_gpu_blocks=args.num_gpu_blocks)
+    llm = LLM(
+        model=args.model,
+        max_num_seqs=args.max_num_seqs,
+        enable_prefix_caching=True,
+        use_v2_block_manager=args.use_v2_block_manager,
+        distributed_executor_backend=MockExecutor.with_config(mock_config))
+    prompts = make_prompts(args,
+                           llm.llm_engine.get_model_config().get_vocab_size())
+    sampling_params = SamplingParams(temperature=0,
+                                     ignore_eos=True,
+                                     max_tokens=args.output_len)
+
+    start_time = time.perf_counter()
+    llm.generate(prompts,
+                 sampling_params,
+                 use_tqdm=False,
+                 cluster_by_prefix=cluster_by_prefix)
+    elapsed_time = time.perf_counter() - start_time
+
+    hit_rate = llm.llm_engine.scheduler[0].get_prefix_cache_hit_rate(
+        Device.GPU)
+    print(f"cluster_by_prefix={cluster_by_prefix}: "
+          f"prefix cache hit rate {hit_rate * 100:.1f}%, "
+          f"{llm.llm_engine.model_executor.num_steps} steps, "
+          f"{elapsed_time:.2f} s")
+
+
+def main(args):
+    run(args, cluster_by_prefix=False)
+    run(args, cluster_by_prefix=True)
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark the prefix cache hit rate with and without '
+        'clustering the prompts by prefix.')
+    parser.add_argument('--model', type=str, default='facebook/opt-125m')
+    parser.add_argument('--num-prompts', type=int, default=512)
+    parser.add_argument('--num-prefixes', type=int, default=16)
+    parser.add_argument('--prefix-len', type=int, default=512)
+    parser.add_argument('--suffix-len', type=int, default=32)
+    parser.add_argument('--output-len', type=int, default=16)
+    parser.add_argument('--max-num-seqs', type=int, default=4)
+    parser.add_argument('--num-gpu-blocks',
+                        type=int,
+                        default=256,
+                        help='Number of KV cache blocks, fewer than needed '
+                        'to cache all the prefixes.')
+    parser.add_argument('--step-latency',
+                        type=float,
+                        default=0.0,
+                        help='Modeled latency of a step, in seconds.')
+    parser.add_argument('--use-v2-block-manager', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    main(args)
@@ -21,6 +21,16 @@ On the client side, run:
     when using tgi backend, add
         --endpoint /generate_stream
     to the end of the command above.
+
+A recorded trace can be replayed with its arrival times instead, with
+`--dataset-name trace --dataset-path <path to trace>`, see
+`load_trace_requests` for its format. Multi-turn sessions sharing prefixes are
+generated with `--dataset-name sessions`. Requests of the same session are
+sent one after the other, each with the previous turns of the conversation.
+
+`--goodput ttft:<ms> tpot:<ms>` reports the rate of requests meeting the
+given service level objectives. `--backend mock` answers requests locally
+with modeled latencies, to try the harness without a server.
 """
 import argparse
 import asyncio
@@ -31,11 +41,12 @@ import time
 import warnings
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+from typing import (Any, AsyncGenerator, Dict, Hashable, List, Optional, Tuple,
+                    Union)
 
 import numpy as np
-from backend_request_func import (ASYNC_REQUEST_FUNCS, RequestFuncInput,
-                                  RequestFuncOutput)
+from backend_request_func import (ASYNC_REQUEST_FUNCS, MOCK_BACKEND_CONFIG,
+                                  RequestFuncInput, RequestFuncOutput)
 from tqdm.asyncio import tqdm
 from transformers import PreTrainedTokenizerBase
 
@@ -70,6 +81,22 @@ class BenchmarkMetrics:
     median_itl_ms: float
     std_itl_ms: float
     p99_itl_ms: float
+    # Requests per second that met all the service level objectives.
+    request_goodput: float
+
+
+@dataclass
+class TraceRequest:
+    # When the request is sent, in seconds from the start of the benchmark.
+    # A turn of a session is sent no earlier than `think_time` seconds after
+    # the previous turn has completed.
+    timestamp: float
+    prompt: str
+    output_len: int
+    lora_name: Optional[str] = None
+    stream: bool = True
+    session_id: Optional[Hashable] = None
+    think_time: float = 0.0
 
 
 def sample_sharegpt_requests(
@@ -212,6 +239,98 @@ def sample_random_requests(
     return input_requests
 
 
+def random_text(tokenizer: PreTrainedTokenizerBase, num_tokens: int) -> str:
+    offset = np.random.randint(0, tokenizer.vocab_size)
+    return tokenizer.decode([(offset + j) % tokenizer.vocab_size
+                             for j in range(num_tokens)])
+
+
+def load_trace_requests(
+    dataset_path: str,
+    tokenizer: PreTrainedTokenizerBase,
+    time_scale: float = 1.0,
+) -> List[TraceRequest]:
+    """Load a trace in JSON lines format, one request per line, with keys:
+
+    - `timestamp`: the arrival time of the request, in seconds. The trace is
+      replayed from its first arrival, with the gaps multiplied by
+      `time_scale`.
+    - `prompt`, or `prompt_len` for a random prompt of that many tokens.
+    - `output_len`: the number of tokens to generate.
+    - `lora` (optional): the name of the LoRA adapter to use.
+    - `stream` (optional, default true): whether the response is streamed.
+    - `session_id` (optional): requests with the same session ID are the
+      turns of a conversation, in the order of their timestamps.
+    - `think_time` (optional): the minimum time between the completion of
+      the previous turn of the session and this request, in seconds.
+    """
+    with open(dataset_path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if not records:
+        raise ValueError(f"The trace {dataset_path} is empty.")
+    start = min(record["timestamp"] for record in records)
+
+    trace_requests: List[TraceRequest] = []
+    for record in sorted(records, key=lambda record: record["timestamp"]):
+        if "prompt" in record:
+            prompt = record["prompt"]
+        else:
+            prompt = random_text(tokenizer, record["prompt_len"])
+        trace_requests.append(
+            TraceRequest(
+                timestamp=(record["timestamp"] - start) * time_scale,
+                prompt=prompt,
+                output_len=record["output_len"],
+                lora_name=record.get("lora"),
+                stream=record.get("stream", True),
+                session_id=record.get("session_id"),
+                think_time=record.get("think_time", 0.0) * time_scale,
+            ))
+    return trace_requests
+
+
+def sample_session_requests(
+    num_sessions: int,
+    num_turns: int,
+    num_prefixes: int,
+    prefix_len: int,
+    input_len: int,
+    output_len: int,
+    think_time: float,
+    request_rate: float,
+    lora_names: List[str],
+    non_stream_ratio: float,
+    tokenizer: PreTrainedTokenizerBase,
+) -> List[TraceRequest]:
+    """Generate multi-turn sessions, arriving as a Poisson process at
+    `request_rate` sessions per second. Every session starts with one of
+    `num_prefixes` shared prefixes (e.g. system prompts), and each of its
+    turns adds a user message of `input_len` tokens to the conversation."""
+    prefixes = [
+        random_text(tokenizer, prefix_len) for _ in range(num_prefixes)
+    ]
+    trace_requests: List[TraceRequest] = []
+    arrival_time = 0.0
+    for session_id in range(num_sessions):
+        lora_name = random.choice(lora_names) if lora_names else None
+        stream = random.random() >= non_stream_ratio
+        for turn in range(num_turns):
+            prompt = random_text(tokenizer, input_len)
+            if turn == 0 and prefixes:
+                prompt = random.choice(prefixes) + prompt
+            trace_requests.append(
+                TraceRequest(timestamp=arrival_time,
+                             prompt=prompt,
+                             output_len=output_len,
+                             lora_name=lora_name,
+                             stream=stream,
+                             session_id=session_id,
+                             think_time=think_time))
+        if request_rate != float("inf"):
+            arrival_time += np.random.exponential(1.0 / request_rate)
+    return trace_requests
+
+
 async def get_request(
     input_requests: List[Tuple[str, int, int]],
     request_rate: float,
@@ -231,14 +350,15 @@ async def get_request(
 
 
 def calculate_metrics(
-    input_requests: List[Tuple[str, int, int]],
     outputs: List[RequestFuncOutput],
     dur_s: float,
     tokenizer: PreTrainedTokenizerBase,
+    goodput_config: Dict[str, float],
 ) -> Tuple[BenchmarkMetrics, List[int]]:
     actual_output_lens: List[int] = []
     total_input = 0
     completed = 0
+    good_completed = 0
     itls: List[float] = []
     tpots: List[float] = []
     ttfts: List[float] = []
@@ -252,10 +372,20 @@ def calculate_metrics(
                 tokenizer(outputs[i].generated_text,
                           add_special_tokens=False).input_ids)
             actual_output_lens.append(output_len)
-            total_input += input_requests[i][1]
-            if output_len > 1:
-                tpots.append(
-                    (outputs[i].latency - outputs[i].ttft) / (output_len - 1))
+            total_input += outputs[i].prompt_len
+            tpot = 0.0
+            if output_len > 1 and outputs[i].streamed:
+                tpot = (outputs[i].latency - outputs[i].ttft) / (output_len -
+                                                                 1)
+                tpots.append(tpot)
+            slo_values = {
+                "ttft": outputs[i].ttft,
+                "tpot": tpot,
+                "e2el": outputs[i].latency,
+            }
+            if all(slo_values[name] * 1000 <= slo_ms
+                   for name, slo_ms in goodput_config.items()):
+                good_completed += 1
             itls += outputs[i].itl
             ttfts.append(outputs[i].ttft)
             completed += 1
@@ -287,38 +417,131 @@ def calculate_metrics(
         median_itl_ms=np.median(itls or 0) * 1000,
         std_itl_ms=np.std(itls or 0) * 1000,
         p99_itl_ms=np.percentile(itls or 0, 99) * 1000,
+        request_goodput=good_completed / dur_s,
     )
 
     return metrics, actual_output_lens
 
 
+async def replay_trace(
+    request_func,
+    backend: str,
+    api_url: str,
+    model_id: str,
+    tokenizer: PreTrainedTokenizerBase,
+    trace_requests: List[TraceRequest],
+    best_of: int,
+    use_beam_search: bool,
+    pbar: Optional[tqdm],
+) -> List[RequestFuncOutput]:
+    """Send the requests of a trace at their timestamps, and the turns of a
+    session one after the other, each with the conversation so far."""
+    sessions: Dict[Hashable, List[int]] = {}
+    for i, request in enumerate(trace_requests):
+        key = (request.session_id if request.session_id is not None else
+               ("request", i))
+        sessions.setdefault(key, []).append(i)
+    outputs: List[RequestFuncOutput] = [
+        RequestFuncOutput() for _ in trace_requests
+    ]
+    start_time = time.perf_counter()
+
+    async def run_session(indices: List[int]) -> None:
+        conversation = ""
+        messages: List[Dict[str, str]] = []
+        last_completion_time: Optional[float] = None
+        for turn, i in enumerate(indices):
+            request = trace_requests[i]
+            send_time = request.timestamp
+            if last_completion_time is not None:
+                send_time = max(send_time,
+                                last_completion_time + request.think_time)
+            delay = send_time - (time.perf_counter() - start_time)
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            prompt = conversation + request.prompt
+            request_func_input = RequestFuncInput(
+                model=model_id,
+                prompt=request.prompt if backend == "openai-chat" else prompt,
+                api_url=api_url,
+                prompt_len=len(tokenizer(prompt).input_ids),
+                output_len=request.output_len,
+                best_of=best_of,
+                use_beam_search=use_beam_search,
+                lora_name=request.lora_name,
+                stream=request.stream,
+                messages=list(messages),
+            )
+            output = await request_func(request_func_input=request_func_input,
+                                        pbar=pbar)
+            outputs[i] = output
+            if not output.success:
+                # The rest of the conversation can not be sent.
+                for j in indices[turn + 1:]:
+                    outputs[j].error = "A previous turn of the session failed."
+                    if pbar is not None:
+                        pbar.update(1)
+                return
+            last_completion_time = time.perf_counter() - start_time
+            conversation = prompt + output.generated_text + "\n"
+            messages += [{
+                "role": "user",
+                "content": request.prompt
+            }, {
+                "role": "assistant",
+                "content": output.generated_text
+            }]
+
+    await asyncio.gather(*(run_session(indices)
+                           for indices in sessions.values()))
+    return outputs
+
+
 async def benchmark(
     backend: str,
     api_url: str,
     model_id: str,
     tokenizer: PreTrainedTokenizerBase,
-    input_requests: List[Tuple[str, int, int]],
+    input_requests: Union[List[Tuple[str, int, int]], List[TraceRequest]],
     best_of: int,
     use_beam_search: bool,
     request_rate: float,
     disable_tqdm: bool,
+    goodput_config: Dict[str, float],
 ):
     if backend in ASYNC_REQUEST_FUNCS:
         request_func = ASYNC_REQUEST_FUNCS[backend]
     else:
         raise ValueError(f"Unknown backend: {backend}")
+    # Traces and sessions are replayed with their own arrival times.
+    is_trace = isinstance(input_requests[0], TraceRequest)
 
     print("Starting initial single prompt test run...")
-    test_prompt, test_prompt_len, test_output_len = input_requests[0]
-    test_input = RequestFuncInput(
-        model=model_id,
-        prompt=test_prompt,
-        api_url=api_url,
-        prompt_len=test_prompt_len,
-        output_len=test_output_len,
-        best_of=best_of,
-        use_beam_search=use_beam_search,
-    )
+    if is_trace:
+        first_request = input_requests[0]
+        test_input = RequestFuncInput(
+            model=model_id,
+            prompt=first_request.prompt,
+            api_url=api_url,
+            prompt_len=len(tokenizer(first_request.prompt).input_ids),
+            output_len=first_request.output_len,
+            best_of=best_of,
+            use_beam_search=use_beam_search,
+            lora_name=first_request.lora_name,
+            stream=first_request.stream,
+        )
+    else:
+        test_prompt, test_prompt_len, test_output_len = input_requests[0]
+        test_input = RequestFuncInput(
+            model=model_id,
+            prompt=test_prompt,
+            api_url=api_url,
+            prompt_len=test_prompt_len,
+            output_len=test_output_len,
+            best_of=best_of,
+            use_beam_search=use_beam_search,
+        )
     test_output = await request_func(request_func_input=test_input)
     if not test_output.success:
         raise ValueError(
@@ -326,28 +549,42 @@ async def benchmark(
             f"are correctly specified. Error: {test_output.error}")
     else:
         print("Initial test run completed. Starting main benchmark run...")
-    print(f"Traffic request rate: {request_rate}")
+    if not is_trace:
+        print(f"Traffic request rate: {request_rate}")
 
     pbar = None if disable_tqdm else tqdm(total=len(input_requests))
 
     benchmark_start_time = time.perf_counter()
-    tasks: List[asyncio.Task] = []
-    async for request in get_request(input_requests, request_rate):
-        prompt, prompt_len, output_len = request
-        request_func_input = RequestFuncInput(
-            model=model_id,
-            prompt=prompt,
+    if is_trace:
+        outputs = await replay_trace(
+            request_func=request_func,
+            backend=backend,
             api_url=api_url,
-            prompt_len=prompt_len,
-            output_len=output_len,
+            model_id=model_id,
+            tokenizer=tokenizer,
+            trace_requests=input_requests,
             best_of=best_of,
             use_beam_search=use_beam_search,
+            pbar=pbar,
         )
-        tasks.append(
-            asyncio.create_task(
-                request_func(request_func_input=request_func_input,
-                             pbar=pbar)))
-    outputs: List[RequestFuncOutput] = await asyncio.gather(*tasks)
+    else:
+        tasks: List[asyncio.Task] = []
+        async for request in get_request(input_requests, request_rate):
+            prompt, prompt_len, output_len = request
+            request_func_input = RequestFuncInput(
+                model=model_id,
+                prompt=prompt,
+                api_url=api_url,
+                prompt_len=prompt_len,
+                output_len=output_len,
+                best_of=best_of,
+                use_beam_search=use_beam_search,
+            )
+            tasks.append(
+                asyncio.create_task(
+                    request_func(request_func_input=request_func_input,
+                                 pbar=pbar)))
+        outputs = await asyncio.gather(*tasks)
 
     if pbar is not None:
         pbar.close()
@@ -355,10 +592,10 @@ async def benchmark(
     benchmark_duration = time.perf_counter() - benchmark_start_time
 
     metrics, actual_output_lens = calculate_metrics(
-        input_requests=input_requests,
         outputs=outputs,
         dur_s=benchmark_duration,
         tokenizer=tokenizer,
+        goodput_config=goodput_config,
     )
 
     print("{s:{c}^{n}}".format(s=' Serving Benchmark Result ', n=50, c='='))
@@ -370,6 +607,9 @@ async def benchmark(
                                  metrics.total_output))
     print("{:<40} {:<10.2f}".format("Request throughput (req/s):",
                                     metrics.request_throughput))
+    if goodput_config:
+        print("{:<40} {:<10.2f}".format("Request goodput (req/s):",
+                                        metrics.request_goodput))
     print("{:<40} {:<10.2f}".format("Input token throughput (tok/s):",
                                     metrics.input_throughput))
     print("{:<40} {:<10.2f}".format("Output token throughput (tok/s):",
@@ -419,9 +659,25 @@ async def benchmark(
         "generated_texts": [output.generated_text for output in outputs],
         "errors": [output.error for output in outputs],
     }
+    if goodput_config:
+        result["request_goodput"] = metrics.request_goodput
     return result
 
 
+def parse_goodput(slo_pairs: Optional[List[str]]) -> Dict[str, float]:
+    goodput_config: Dict[str, float] = {}
+    for slo_pair in slo_pairs or []:
+        name, sep, value = slo_pair.partition(":")
+        if not sep or name not in ("ttft", "tpot", "e2el"):
+            raise ValueError(
+                f"Invalid goodput SLO {slo_pair!r}. Please use NAME:VALUE, "
+                "with NAME one of ttft, tpot and e2el.")
+        goodput_config[name] = float(value)
+        if goodput_config[name] <= 0:
+            raise ValueError(f"The {name} SLO must be positive.")
+    return goodput_config
+
+
 def main(args: argparse.Namespace):
     print(args)
     random.seed(args.seed)
@@ -438,6 +694,12 @@ def main(args: argparse.Namespace):
 
     tokenizer = get_tokenizer(tokenizer_id,
                               trust_remote_code=args.trust_remote_code)
+    goodput_config = parse_goodput(args.goodput)
+    if backend == "mock":
+        MOCK_BACKEND_CONFIG.ttft = args.mock_ttft_ms / 1000
+        MOCK_BACKEND_CONFIG.prefill_per_token = (
+            args.mock_prefill_ms_per_token / 1000)
+        MOCK_BACKEND_CONFIG.itl = args.mock_itl_ms / 1000
 
     if args.dataset is not None:
         warnings.warn(
@@ -499,6 +761,28 @@ def main(args: argparse.Namespace):
             tokenizer=tokenizer,
         )
 
+    elif args.dataset_name == "trace":
+        input_requests = load_trace_requests(
+            dataset_path=args.dataset_path,
+            tokenizer=tokenizer,
+            time_scale=args.trace_time_scale,
+        )
+
+    elif args.dataset_name == "sessions":
+        input_requests = sample_session_requests(
+            num_sessions=args.num_prompts,
+            num_turns=args.session_turns,
+            num_prefixes=args.session_num_prefixes,
+            prefix_len=args.session_prefix_len,
+            input_len=args.session_input_len,
+            output_len=args.session_output_len,
+            think_time=args.session_think_time,
+            request_rate=args.request_rate,
+            lora_names=args.lora_names or [],
+            non_stream_ratio=args.non_stream_ratio,
+            tokenizer=tokenizer,
+        )
+
     else:
         raise ValueError(f"Unknown dataset: {args.dataset_name}")
 
@@ -513,6 +797,7 @@ def main(args: argparse.Namespace):
             use_beam_search=args.use_beam_search,
             request_rate=args.request_rate,
             disable_tqdm=args.disable_tqdm,
+            goodput_config=goodput_config,
         ))
 
     # Save config and results to json
@@ -592,7 +877,7 @@ if __name__ == "__main__":
         "--dataset-name",
         type=str,
         default="sharegpt",
-        choices=["sharegpt", "sonnet", "random"],
+        choices=["sharegpt", "sonnet", "random", "trace", "sessions"],
         help="Name of the dataset to benchmark on.",
     )
     parser.add_argument("--dataset-path",
@@ -623,7 +908,8 @@ if __name__ == "__main__":
         "--num-prompts",
         type=int,
         default=1000,
-        help="Number of prompts to process.",
+        help="Number of prompts to process, or of sessions for the "
+        "sessions dataset.",
     )
     parser.add_argument(
         "--sharegpt-output-len",
@@ -673,6 +959,70 @@ if __name__ == "__main__":
         help="Range of sampled ratio of input/output length, "
         "used only for random sampling.",
     )
+    parser.add_argument(
+        "--trace-time-scale",
+        type=float,
+        default=1.0,
+        help="Factor to scale the time between the requests of a trace, "
+        "used only for the trace dataset.",
+    )
+    parser.add_argument(
+        "--session-turns",
+        type=int,
+        default=4,
+        help="Number of turns per session, used only for the sessions "
+        "dataset.",
+    )
+    parser.add_argument(
+        "--session-num-prefixes",
+        type=int,
+        default=1,
+        help="Number of distinct prefixes (e.g. system prompts) shared by "
+        "the sessions, used only for the sessions dataset.",
+    )
+    parser.add_argument(
+        "--session-prefix-len",
+        type=int,
+        default=512,
+        help="Number of tokens of the shared prefixes, used only for the "
+        "sessions dataset.",
+    )
+    parser.add_argument(
+        "--session-input-len",
+        type=int,
+        default=128,
+        help="Number of input tokens per turn, used only for the sessions "
+        "dataset.",
+    )
+    parser.add_argument(
+        "--session-output-len",
+        type=int,
+        default=128,
+        help="Number of output tokens per turn, used only for the sessions "
+        "dataset.",
+    )
+    parser.add_argument(
+        "--session-think-time",
+        type=float,
+        default=1.0,
+        help="Seconds between the completion of a turn and the next turn "
+        "of the session, used only for the sessions dataset.",
+    )
+    parser.add_argument(
+        "--lora-names",
+        type=str,
+        nargs="+",
+        default=None,
+        help="Names of the LoRA adapters to pick from for each session, "
+        "used only for the sessions dataset.",
+    )
+    parser.add_argument(
+        "--non-stream-ratio",
+        type=float,
+        default=0.0,
+        help="Fraction of the sessions whose responses are not streamed, "
+        "used only for the sessions dataset.",
+    )
     parser.add_argument(
         "--request-rate",
         type=float,
@@ -680,7 +1030,37 @@ if __name__ == "__main__":
         help="Number of requests per second. If this is inf, "
         "then all the requests are sent at time 0. "
         "Otherwise, we use Poisson process to synthesize "
-        "the request arrival times.",
+        "the request arrival times. For the sessions dataset, the number "
+        "of new sessions per second.",
+    )
+    parser.add_argument(
+        "--goodput",
+        metavar="NAME:VALUE",
+        nargs="+",
+        default=None,
+        help="Service level objectives in milliseconds, e.g. "
+        "--goodput ttft:500 tpot:50. The rate of the requests meeting all "
+        "of them is reported as the goodput. NAME is one of ttft, tpot and "
+        "e2el (end-to-end latency).",
+    )
+    parser.add_argument(
+        "--mock-ttft-ms",
+        type=float,
+        default=50.0,
+        help="Time to first token of the mock backend.",
+    )
+    parser.add_argument(
+        "--mock-prefill-ms-per-token",
+        type=float,
+        default=0.0,
+        help="Time added to the time to first token of the mock backend "
+        "per prompt token.",
+    )
+    parser.add_argument(
+        "--mock-itl-ms",
+        type=float,
+        default=10.0,
+        help="Inter-token latency of the mock backend.",
     )
     parser.add_argument("--seed", type=int, default=0)
     parser.add_argument(
@@ -0,0 +1,221 @@
+"""Benchmark the weight loading throughput (GB/s) of each load format.
+
+The benchmark runs the weight iterators of the model loaders and copies every
+tensor into a destination buffer on the target device, which is what the
+models' `load_weights` do. It runs on CPU by default, so it does not need a
+GPU. Without `--model`, a synthetic checkpoint is written to a temporary
+directory in every format the default loader understands.
+
+Example:
+    python benchmarks/benchmark_weight_loading.py --num-shards 8 \\
+        --shard-size-mb 512 --num-threads 8 --cold
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from typing import Dict, Iterable, List, Tuple
+
+import torch
+from safetensors.torch import save_file
+
+from vllm.config import LoadConfig, LoadFormat
+from vllm.model_executor.model_loader.loader import (DefaultModelLoader,
+                                                     get_model_loader)
+from vllm.model_executor.model_loader.weight_utils import (
+    initialize_dummy_weights)
+from vllm.utils import FlexibleArgumentParser
+
+# Load formats that read the checkpoints through `DefaultModelLoader`.
+FILE_LOAD_FORMATS = [
+    LoadFormat.AUTO, LoadFormat.SAFETENSORS, LoadFormat.PT, LoadFormat.NPCACHE,
+    LoadFormat.MMAP_CACHE
+]
+
+
+def write_synthetic_checkpoint(path: str, num_shards: int, shard_size_mb: int,
+                               dtype: torch.dtype) -> None:
+    """Write the same random weights as safetensors, .bin and .pt shards."""
+    element_size = torch.tensor([], dtype=dtype).element_size()
+    hidden_size = 4096
+    rows = max(1, shard_size_mb * 1024 * 1024 // (hidden_size * element_size))
+    # Split each shard into a handful of tensors like a real layer would be.
+    tensors_per_shard = 4
+    for shard in range(num_shards):
+        state_dict = {
+            f"layers.{shard}.weight_{i}":
+            torch.randn(max(1, rows // tensors_per_shard),
+                        hidden_size).to(dtype)
+            for i in range(tensors_per_shard)
+        }
+        stem = f"{shard + 1:05d}-of-{num_shards:05d}"
+        save_file(state_dict, os.path.join(path, f"model-{stem}.safetensors"))
+        torch.save(state_dict, os.path.join(path, f"pytorch_model-{stem}.bin"))
+        torch.save(state_dict, os.path.join(path, f"model-{stem}.pt"))
+
+
+def drop_page_cache(path: str) -> None:
+    """Evict the checkpoint files from the page cache, best effort."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for root, _, files in os.walk(path):
+        for name in files:
+            fd = os.open(os.path.join(root, name), os.O_RDONLY)
+            try:
+                os.fsync(fd)
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            except OSError:
+                pass
+            finally:
+                os.close(fd)
+
+
+def consume(weights: Iterable[Tuple[str, torch.Tensor]], device: str,
+            dtype: torch.dtype) -> int:
+    """Copy every weight to the target device like `default_weight_loader`
+    does and return the number of bytes loaded."""
+    num_bytes = 0
+    for _, weight in weights:
+        param = torch.empty(weight.shape, dtype=dtype, device=device)
+        param.copy_(weight)
+        num_bytes += weight.numel() * weight.element_size()
+    return num_bytes
+
+
+def bench_file_format(args: argparse.Namespace, model_path: str,
+                      load_format: LoadFormat, extra_config: Dict,
+                      dtype: torch.dtype) -> Tuple[int, float]:
+    loader = get_model_loader(
+        LoadConfig(load_format=load_format,
+                   model_loader_extra_config=extra_config))
+    assert isinstance(loader, DefaultModelLoader)
+    if args.cold:
+        drop_page_cache(model_path)
+    start = time.perf_counter()
+    num_bytes = consume(
+        loader._get_weights_iterator(model_path,
+                                     revision=None,
+                                     fall_back_to_pt=False), args.device,
+        dtype)
+    if args.device.startswith("cuda"):
+        torch.cuda.synchronize()
+    return num_bytes, time.perf_counter() - start
+
+
+def bench_dummy(args: argparse.Namespace, model_path: str,
+                dtype: torch.dtype) -> Tuple[int, float]:
+    # Use the shapes of the checkpoint so the amount of data is comparable.
+    loader = get_model_loader(LoadConfig(load_format=LoadFormat.SAFETENSORS))
+    assert isinstance(loader, DefaultModelLoader)
+    model = torch.nn.Module()
+    for i, (_, weight) in enumerate(
+            loader._get_weights_iterator(model_path,
+                                         revision=None,
+                                         fall_back_to_pt=False)):
+        model.register_parameter(
+            f"p{i}",
+            torch.nn.Parameter(torch.empty(weight.shape,
+                                           dtype=dtype,
+                                           device=args.device),
+                               requires_grad=False))
+    start = time.perf_counter()
+    initialize_dummy_weights(model)
+    if args.device.startswith("cuda"):
+        torch.cuda.synchronize()
+    num_bytes = sum(p.numel() * p.element_size() for p in model.parameters())
+    return num_bytes, time.perf_counter() - start
+
+
+def main(args: argparse.Namespace):
+    print(args)
+    dtype = getattr(torch, args.dtype)
+
+    tmp_dir = None
+    if args.model is None:
+        tmp_dir = tempfile.mkdtemp(prefix="vllm-weight-loading-")
+        write_synthetic_checkpoint(tmp_dir, args.num_shards,
+                                   args.shard_size_mb, dtype)
+        model_path = tmp_dir
+    else:
+        model_path = args.model
+
+    runs: List[Tuple[str, LoadFormat, Dict]] = []
+    for load_format in FILE_LOAD_FORMATS:
+        runs.append((load_format.value, load_format, {}))
+        if load_format in (LoadFormat.AUTO, LoadFormat.SAFETENSORS,
+                           LoadFormat.PT):
+            runs.append((f"{load_format.value} (multithread)", load_format, {
+                "enable_multithread_load": True,
+                "num_threads": args.num_threads
+            }))
+
+    try:
+        results: List[Tuple[str, int, float]] = []
+        for name, load_format, extra_config in runs:
+            if args.load_formats and load_format.value not in args.load_formats:
+                continue
+            timings = []
+            try:
+                for _ in range(args.num_iters):
+                    num_bytes, elapsed = bench_file_format(
+                        args, model_path, load_format, extra_config, dtype)
+                    timings.append(elapsed)
+            except (RuntimeError, ValueError, AssertionError) as e:
+                print(f"Skipping {name}: {e}")
+                continue
+            results.append((name, num_bytes, min(timings)))
+
+        if not args.load_formats or LoadFormat.DUMMY.value in args.load_formats:
+            timings = []
+            for _ in range(args.num_iters):
+                num_bytes, elapsed = bench_dummy(args, model_path, dtype)
+                timings.append(elapsed)
+            results.append((LoadFormat.DUMMY.value, num_bytes, min(timings)))
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print(f"{'load format':<28}{'size (GB)':>12}{'time (s)':>12}"
+          f"{'GB/s':>10}")
+    for name, num_bytes, elapsed in results:
+        gb = num_bytes / 1024**3
+        print(f"{name:<28}{gb:>12.2f}{elapsed:>12.3f}{gb / elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description="Benchmark the weight loading throughput of each load "
+        "format.")
+    parser.add_argument("--model",
+                        type=str,
+                        default=None,
+                        help="Local checkpoint directory. If not set, a "
+                        "synthetic checkpoint is generated.")
+    parser.add_argument("--num-shards", type=int, default=4)
+    parser.add_argument("--shard-size-mb", type=int, default=256)
+    parser.add_argument("--dtype",
+                        type=str,
+                        default="float16",
+                        choices=["float16", "bfloat16", "float32"])
+    parser.add_argument("--device",
+                        type=str,
+                        default="cpu",
+                        help="Device the weights are copied to.")
+    parser.add_argument("--num-threads",
+                        type=int,
+                        default=DefaultModelLoader.DEFAULT_NUM_THREADS,
+                        help="Reader threads for the multithread variants.")
+    parser.add_argument("--num-iters", type=int, default=3)
+    parser.add_argument("--cold",
+                        action="store_true",
+                        help="Evict the checkpoint from the page cache "
+                        "before every iteration.")
+    parser.add_argument("--load-formats",
+                        nargs="*",
+                        default=[],
+                        choices=[f.value for f in FILE_LOAD_FORMATS] +
+                        [LoadFormat.DUMMY.value],
+                        help="Only benchmark these load formats.")
+    args = parser.parse_args()
+    main(args)
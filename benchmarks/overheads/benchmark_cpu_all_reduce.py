@@ -0,0 +1,110 @@
+"""Benchmark the all-reduce and all-gather of CPU tensors across processes.
+
+`--world-size` processes on this node run each collective on tensors of
+`--dtype` from `--min-size` to `--max-size` bytes, doubling the size, once
+with gloo (as `torch.distributed` does for the CPU backend) and once with
+`ShmAllreduce`. The average latency of each is reported by rank 0.
+"""
+import multiprocessing
+import os
+import time
+from typing import Callable
+
+import torch
+import torch.distributed as dist
+
+from vllm.distributed.device_communicators.shm_all_reduce import ShmAllreduce
+from vllm.utils import FlexibleArgumentParser, get_open_port
+
+DTYPES = {
+    "float32": torch.float32,
+    "bfloat16": torch.bfloat16,
+    "float16": torch.float16,
+}
+
+
+def time_per_call(fn: Callable[[], object], num_iters: int) -> float:
+    for _ in range(max(num_iters // 10, 1)):
+        fn()
+    dist.barrier()
+    start = time.perf_counter()
+    for _ in range(num_iters):
+        fn()
+    elapsed = time.perf_counter() - start
+    # the latency of a collective is that of the slowest rank
+    elapsed_tensor = torch.tensor([elapsed])
+    dist.all_reduce(elapsed_tensor, op=dist.ReduceOp.MAX)
+    return elapsed_tensor.item() / num_iters
+
+
+def worker(rank: int, port: int, args) -> None:
+    torch.set_num_threads(args.num_threads)
+    dist.init_process_group(backend="gloo",
+                            init_method=f"tcp://127.0.0.1:{port}",
+                            world_size=args.world_size,
+                            rank=rank)
+    comm = ShmAllreduce(dist.group.WORLD)
+    dtype = DTYPES[args.dtype]
+    element_size = torch.empty((), dtype=dtype).element_size()
+
+    if rank == 0:
+        print(f"{args.world_size} ranks, {args.dtype}, "
+              f"{args.num_threads} threads per rank, latency in us:")
+        print(f"{'size':>10} | {'all-reduce gloo':>15} {'shm':>10} | "
+              f"{'all-gather gloo':>15} {'shm':>10}")
+
+    size = args.min_size
+    while size <= args.max_size:
+        inp = torch.randn(size // element_size).to(dtype)
+        output = torch.empty((args.world_size, ) + inp.shape, dtype=dtype)
+
+        gloo_reduce = time_per_call(
+            lambda inp=inp: dist.all_reduce(inp.clone()), args.num_iters)
+        shm_reduce = time_per_call(lambda inp=inp: comm.all_reduce(inp),
+                                   args.num_iters)
+        gloo_gather = time_per_call(
+            lambda out=output, inp=inp: dist.all_gather_into_tensor(out, inp),
+            args.num_iters)
+        shm_gather = time_per_call(
+            lambda out=output, inp=inp: comm.all_gather_into_tensor(out, inp),
+            args.num_iters)
+
+        if rank == 0:
+            print(f"{size:>10} | {gloo_reduce * 1e6:>15.1f} "
+                  f"{shm_reduce * 1e6:>10.1f} | {gloo_gather * 1e6:>15.1f} "
+                  f"{shm_gather * 1e6:>10.1f}")
+        size *= 2
+
+    comm.close()
+    dist.destroy_process_group()
+
+
+def main(args):
+    os.environ.setdefault("OMP_NUM_THREADS", str(args.num_threads))
+    port = get_open_port()
+    processes = [
+        multiprocessing.Process(target=worker, args=(rank, port, args))
+        for rank in range(args.world_size)
+    ]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+        assert p.exitcode == 0
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark the shared memory all-reduce of CPU tensors '
+        'against gloo.')
+    parser.add_argument('--world-size', type=int, default=2)
+    parser.add_argument('--dtype',
+                        type=str,
+                        choices=list(DTYPES),
+                        default="bfloat16")
+    parser.add_argument('--min-size', type=int, default=1024)
+    parser.add_argument('--max-size', type=int, default=64 * 1024 * 1024)
+    parser.add_argument('--num-threads', type=int, default=4)
+    parser.add_argument('--num-iters', type=int, default=100)
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,135 @@
+"""Benchmark building the input tensors of the CPU model runner.
+
+Compares `CPUInputTensorBuilder` with the per-token Python loops it replaced,
+for a batch of `--num-prompts` prompts of `--prompt-len` tokens and a batch
+of `--num-decodes` decoding sequences.
+"""
+import time
+from typing import List, Optional
+
+import torch
+
+from vllm import SamplingParams
+from vllm.sequence import SequenceData, SequenceGroupMetadata
+from vllm.utils import FlexibleArgumentParser
+from vllm.worker.cpu_model_runner import _PAD_SLOT_ID, CPUInputTensorBuilder
+
+
+def build_prompt_with_loops(
+        seq_group_metadata_list: List[SequenceGroupMetadata], block_size: int,
+        sliding_window: Optional[int]):
+    input_tokens: List[int] = []
+    input_positions: List[int] = []
+    slot_mapping: List[int] = []
+    for seq_group_metadata in seq_group_metadata_list:
+        seq_id = next(iter(seq_group_metadata.seq_data))
+        seq_data = seq_group_metadata.seq_data[seq_id]
+        prompt_tokens = seq_data.get_token_ids()
+        computed_len = seq_data.get_num_computed_tokens()
+        seq_len = len(prompt_tokens)
+        input_tokens.extend(prompt_tokens)
+        input_positions.extend(list(range(computed_len, seq_len)))
+
+        block_table = seq_group_metadata.block_tables[seq_id]
+        start_idx = 0
+        if sliding_window is not None:
+            start_idx = max(0, seq_len - sliding_window)
+        for i in range(computed_len, seq_len):
+            if i < start_idx:
+                slot_mapping.append(_PAD_SLOT_ID)
+                continue
+            block_number = block_table[i // block_size]
+            block_offset = i % block_size
+            slot_mapping.append(block_number * block_size + block_offset)
+
+    return (torch.tensor(input_tokens, dtype=torch.long),
+            torch.tensor(input_positions, dtype=torch.long),
+            torch.tensor(slot_mapping, dtype=torch.long))
+
+
+def build_decode_with_loops(
+        seq_group_metadata_list: List[SequenceGroupMetadata], block_size: int):
+    input_tokens: List[int] = []
+    input_positions: List[int] = []
+    slot_mapping: List[int] = []
+    for seq_group_metadata in seq_group_metadata_list:
+        for seq_id, seq_data in seq_group_metadata.seq_data.items():
+            input_tokens.append(seq_data.get_last_token_id())
+            position = seq_data.get_len() - 1
+            input_positions.append(position)
+            block_table = seq_group_metadata.block_tables[seq_id]
+            block_number = block_table[position // block_size]
+            slot_mapping.append(block_number * block_size +
+                                position % block_size)
+
+    return (torch.tensor(input_tokens, dtype=torch.long),
+            torch.tensor(input_positions, dtype=torch.long),
+            torch.tensor(slot_mapping, dtype=torch.long))
+
+
+def create_batch(num_seqs: int, seq_len: int, block_size: int,
+                 is_prompt: bool) -> List[SequenceGroupMetadata]:
+    num_blocks = (seq_len + block_size - 1) // block_size
+    return [
+        SequenceGroupMetadata(
+            request_id=str(i),
+            is_prompt=is_prompt,
+            seq_data={i: SequenceData(list(range(seq_len)))},
+            sampling_params=SamplingParams(),
+            block_tables={
+                i: list(range(i * num_blocks, (i + 1) * num_blocks))
+            },
+        ) for i in range(num_seqs)
+    ]
+
+
+def time_per_call(fn, num_iters: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(num_iters):
+        fn()
+    return (time.perf_counter() - start) / num_iters
+
+
+def main(args):
+    builder = CPUInputTensorBuilder(args.block_size, args.sliding_window)
+
+    prompts = create_batch(args.num_prompts,
+                           args.prompt_len,
+                           args.block_size,
+                           is_prompt=True)
+    loop_time = time_per_call(
+        lambda: build_prompt_with_loops(prompts, args.block_size, args.
+                                        sliding_window), args.num_iters)
+    builder_time = time_per_call(lambda: builder.build_prompt(prompts),
+                                 args.num_iters)
+    print(f"Prompts ({args.num_prompts} x {args.prompt_len} tokens): "
+          f"loops {loop_time * 1e3:.3f} ms, "
+          f"builder {builder_time * 1e3:.3f} ms")
+
+    decodes = create_batch(args.num_decodes,
+                           args.prompt_len,
+                           args.block_size,
+                           is_prompt=False)
+    loop_time = time_per_call(
+        lambda: build_decode_with_loops(decodes, args.block_size),
+        args.num_iters)
+    builder_time = time_per_call(lambda: builder.build_decode(decodes),
+                                 args.num_iters)
+    print(f"Decodes ({args.num_decodes} sequences): "
+          f"loops {loop_time * 1e3:.3f} ms, "
+          f"builder {builder_time * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark building the input tensors of the CPU model '
+        'runner.')
+    parser.add_argument('--num-prompts', type=int, default=4)
+    parser.add_argument('--prompt-len', type=int, default=8192)
+    parser.add_argument('--num-decodes', type=int, default=256)
+    parser.add_argument('--block-size', type=int, default=16)
+    parser.add_argument('--sliding-window', type=int, default=None)
+    parser.add_argument('--num-iters', type=int, default=20)
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,293 @@
+"""Benchmark the CPU overheads of the engine without running a model.
+
+A trace of requests, each with an arrival time, a prompt length, an output
+length, and optionally a shared prefix and a LoRA id, is replayed through the
+real `LLMEngine` (`--mode sync`) or `AsyncLLMEngine` (`--mode async`). The
+model is replaced by `MockExecutor`, which sleeps for a modeled step latency
+and samples tokens synthetically, so that only the scheduler, the block
+manager, detokenization and output processing consume CPU time. Only the
+tokenizer and the config of `--model` are loaded.
+
+The trace is read from `--trace`, a JSON lines file of objects with the keys
+`arrival_time` (seconds from the start), `prompt_len`, `output_len`, and the
+optional `prefix_id`, `prefix_len` and `lora_id`, or generated with Poisson
+arrivals at `--request-rate`. The engine CPU time per step and per output
+token is reported, with its breakdown into the step phases.
+"""
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from vllm.engine.arg_utils import AsyncEngineArgs, EngineArgs
+from vllm.engine.async_llm_engine import AsyncLLMEngine
+from vllm.engine.llm_engine import LLMEngine
+from vllm.executor.mock_executor import (MockExecutor, MockExecutorAsync,
+                                         MockExecutorConfig)
+from vllm.inputs import TokensPrompt
+from vllm.lora.request import LoRARequest
+from vllm.sampling_params import SamplingParams
+from vllm.step_profile import enable_step_profile, pop_step_phase_times
+from vllm.utils import FlexibleArgumentParser
+
+
+@dataclass
+class TraceRequest:
+    arrival_time: float
+    prompt_len: int
+    output_len: int
+    prefix_id: Optional[int] = None
+    prefix_len: int = 0
+    lora_id: Optional[int] = None
+
+
+def load_trace(path: str) -> List[TraceRequest]:
+    with open(path, encoding="utf-8") as f:
+        trace = [
+            TraceRequest(**json.loads(line)) for line in f if line.strip()
+        ]
+    return sorted(trace, key=lambda request: request.arrival_time)
+
+
+def generate_trace(args) -> List[TraceRequest]:
+    rng = random.Random(args.seed)
+    trace = []
+    arrival_time = 0.0
+    for _ in range(args.num_requests):
+        if args.request_rate != float("inf"):
+            arrival_time += rng.expovariate(args.request_rate)
+        request = TraceRequest(arrival_time=arrival_time,
+                               prompt_len=args.prompt_len,
+                               output_len=args.output_len)
+        if args.num_prefixes > 0:
+            request.prefix_id = rng.randrange(args.num_prefixes)
+            request.prefix_len = args.prefix_len
+        if args.num_loras > 0:
+            request.lora_id = rng.randrange(args.num_loras) + 1
+        trace.append(request)
+    return trace
+
+
+class RequestFactory:
+    """Turns the requests of a trace into engine inputs. The prompts are
+    token IDs: the shared prefix of the request's `prefix_id`, followed by
+    unique tokens."""
+
+    def __init__(self, vocab_size: int, seed: int) -> None:
+        self.vocab_size = vocab_size
+        self.rng = random.Random(seed)
+        self.prefixes: Dict[int, List[int]] = {}
+
+    def _random_tokens(self, num_tokens: int) -> List[int]:
+        # Skip the first ids, which are usually special tokens.
+        return [
+            self.rng.randrange(100, self.vocab_size) for _ in range(num_tokens)
+        ]
+
+    def prompt(self, request: TraceRequest) -> TokensPrompt:
+        prefix: List[int] = []
+        if request.prefix_id is not None:
+            prefix = self.prefixes.setdefault(
+                request.prefix_id, self._random_tokens(request.prefix_len))
+        suffix_len = max(request.prompt_len - len(prefix), 1)
+        return TokensPrompt(prompt_token_ids=prefix +
+                            self._random_tokens(suffix_len))
+
+    @staticmethod
+    def sampling_params(request: TraceRequest) -> SamplingParams:
+        return SamplingParams(temperature=1.0,
+                              ignore_eos=True,
+                              max_tokens=request.output_len)
+
+    @staticmethod
+    def lora_request(request: TraceRequest) -> Optional[LoRARequest]:
+        if request.lora_id is None:
+            return None
+        # The mock executor loads nothing, the path is never read.
+        return LoRARequest(f"lora-{request.lora_id}", request.lora_id,
+                           f"/nonexistent/lora-{request.lora_id}")
+
+
+def engine_args_kwargs(args, executor_cls) -> dict:
+    mock_config = MockExecutorConfig(
+        step_latency_s=args.step_latency,
+        per_token_latency_s=args.per_token_latency,
+        token_mode=args.token_mode,
+        num_gpu_blocks=args.num_gpu_blocks,
+        seed=args.seed)
+    return dict(
+        model=args.model,
+        tokenizer=args.tokenizer,
+        max_num_seqs=args.max_num_seqs,
+        max_num_batched_tokens=args.max_num_batched_tokens,
+        max_model_len=args.max_model_len,
+        enable_chunked_prefill=args.enable_chunked_prefill,
+        enable_prefix_caching=args.enable_prefix_caching,
+        use_v2_block_manager=args.use_v2_block_manager,
+        enable_lora=args.enable_lora or args.num_loras > 0,
+        max_loras=args.max_loras,
+        disable_log_stats=True,
+        distributed_executor_backend=executor_cls.with_config(mock_config))
+
+
+def make_requests(trace: List[TraceRequest], vocab_size: int,
+                  seed: int) -> List[tuple]:
+    # Built before the replay, so that it does not count as engine time.
+    factory = RequestFactory(vocab_size, seed)
+    return [(factory.prompt(request), factory.sampling_params(request),
+             factory.lora_request(request)) for request in trace]
+
+
+def run_sync(args, trace: List[TraceRequest]) -> Tuple[LLMEngine, float]:
+    engine = LLMEngine.from_engine_args(
+        EngineArgs(**engine_args_kwargs(args, MockExecutor)))
+    requests = make_requests(trace,
+                             engine.get_model_config().get_vocab_size(),
+                             args.seed)
+
+    pop_step_phase_times()
+    start_cpu_time = time.process_time()
+    start = time.perf_counter()
+    next_request = 0
+    while next_request < len(trace) or engine.has_unfinished_requests():
+        now = time.perf_counter() - start
+        while (next_request < len(trace)
+               and trace[next_request].arrival_time <= now):
+            prompt, sampling_params, lora_request = requests[next_request]
+            engine.add_request(str(next_request),
+                               prompt,
+                               sampling_params,
+                               lora_request=lora_request)
+            next_request += 1
+        if engine.has_unfinished_requests():
+            engine.step()
+        else:
+            time.sleep(trace[next_request].arrival_time - now)
+    return engine, time.process_time() - start_cpu_time
+
+
+async def run_async(args,
+                    trace: List[TraceRequest]) -> Tuple[LLMEngine, float]:
+    engine = AsyncLLMEngine.from_engine_args(
+        AsyncEngineArgs(**engine_args_kwargs(args, MockExecutorAsync),
+                        disable_log_requests=True))
+    requests = make_requests(trace,
+                             (await
+                              engine.get_model_config()).get_vocab_size(),
+                             args.seed)
+
+    async def send(request_id: int, arrival_time: float, prompt,
+                   sampling_params: SamplingParams,
+                   lora_request: Optional[LoRARequest]) -> None:
+        await asyncio.sleep(arrival_time)
+        async for _ in engine.generate(prompt,
+                                       sampling_params,
+                                       str(request_id),
+                                       lora_request=lora_request):
+            pass
+
+    pop_step_phase_times()
+    start_cpu_time = time.process_time()
+    await asyncio.gather(*(send(i, request.arrival_time, *requests[i])
+                           for i, request in enumerate(trace)))
+    return engine.engine, time.process_time() - start_cpu_time
+
+
+def main(args):
+    trace = load_trace(args.trace) if args.trace else generate_trace(args)
+    enable_step_profile()
+
+    start_time = time.perf_counter()
+    if args.mode == "sync":
+        engine, cpu_time = run_sync(args, trace)
+    else:
+        engine, cpu_time = asyncio.run(run_async(args, trace))
+    elapsed_time = time.perf_counter() - start_time
+
+    executor = engine.model_executor
+    assert isinstance(executor, MockExecutor)
+    # The modeled step latency is spent sleeping, so the CPU time of the
+    # process during the replay is that of the engine, and of the
+    # synthetic sampling, which is not an engine overhead.
+    engine_cpu_time = cpu_time - executor.cpu_time_s
+    num_steps = executor.num_steps
+    num_output_tokens = sum(request.output_len for request in trace)
+    phase_times = pop_step_phase_times()
+
+    print(f"{len(trace)} requests, {num_steps} steps, "
+          f"{num_output_tokens} output tokens in {elapsed_time:.2f} s")
+    print(f"engine CPU time:           {engine_cpu_time:.2f} s "
+          f"({executor.cpu_time_s:.2f} s in the mock executor)")
+    print(f"engine CPU time per step:  "
+          f"{engine_cpu_time / num_steps * 1e3:.3f} ms")
+    print(f"engine CPU time per token: "
+          f"{engine_cpu_time / num_output_tokens * 1e6:.1f} us")
+    print("wall time per step of each phase:")
+    for name, phase_time in sorted(phase_times.items(),
+                                   key=lambda item: -item[1]):
+        print(f"  {name:>16}: {phase_time / num_steps * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark the CPU overheads of the engine with a mock '
+        'executor.')
+    parser.add_argument('--model', type=str, default='facebook/opt-125m')
+    parser.add_argument('--tokenizer', type=str, default=None)
+    parser.add_argument('--mode',
+                        type=str,
+                        choices=['sync', 'async'],
+                        default='sync')
+    parser.add_argument('--trace',
+                        type=str,
+                        default=None,
+                        help='JSON lines trace to replay, instead of a '
+                        'generated one.')
+    parser.add_argument('--num-requests', type=int, default=1000)
+    parser.add_argument('--request-rate',
+                        type=float,
+                        default=float('inf'),
+                        help='Poisson arrival rate of the generated trace, '
+                        'in requests per second. inf sends all requests at '
+                        'once.')
+    parser.add_argument('--prompt-len', type=int, default=256)
+    parser.add_argument('--output-len', type=int, default=128)
+    parser.add_argument('--num-prefixes',
+                        type=int,
+                        default=0,
+                        help='Number of shared prefixes in the generated '
+                        'trace.')
+    parser.add_argument('--prefix-len', type=int, default=128)
+    parser.add_argument('--num-loras',
+                        type=int,
+                        default=0,
+                        help='Number of LoRA ids in the generated trace.')
+    parser.add_argument('--enable-lora',
+                        action='store_true',
+                        help='Enable LoRA for a replayed trace with LoRA ids.')
+    parser.add_argument('--max-loras', type=int, default=4)
+    parser.add_argument('--step-latency',
+                        type=float,
+                        default=0.0,
+                        help='Modeled latency of a step, in seconds.')
+    parser.add_argument('--per-token-latency',
+                        type=float,
+                        default=0.0,
+                        help='Modeled latency per scheduled token, in '
+                        'seconds.')
+    parser.add_argument('--token-mode',
+                        type=str,
+                        choices=['prompt', 'random'],
+                        default='prompt')
+    parser.add_argument('--num-gpu-blocks', type=int, default=None)
+    parser.add_argument('--max-num-seqs', type=int, default=256)
+    parser.add_argument('--max-num-batched-tokens', type=int, default=None)
+    parser.add_argument('--max-model-len', type=int, default=None)
+    parser.add_argument('--enable-chunked-prefill', action='store_true')
+    parser.add_argument('--enable-prefix-caching', action='store_true')
+    parser.add_argument('--use-v2-block-manager', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    main(args)
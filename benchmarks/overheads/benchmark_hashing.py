@@ -1,7 +1,9 @@
 import cProfile
 import pstats
+import time
 
 from vllm import LLM, SamplingParams
+from vllm.sequence import Sequence
 from vllm.utils import FlexibleArgumentParser
 
 # A very long prompt, total number of tokens is about 15k.
@@ -10,7 +12,36 @@ LONG_PROMPT = ["You are an expert in large language models, aren't you?"
 LONG_PROMPT = ' '.join(LONG_PROMPT)
 
 
+def benchmark_sequence_hashing(args):
+    """Time hashing the blocks of a sequence as the v1 block manager does:
+    all blocks of the prompt once, then the last block after every new token.
+    """
+    prompt_token_ids = list(range(args.prompt_len))
+    start = time.perf_counter()
+    num_calls = 0
+    for seq_id in range(args.num_seqs):
+        seq = Sequence(seq_id,
+                       inputs={"prompt_token_ids": prompt_token_ids},
+                       block_size=args.block_size)
+        for logical_idx in range(seq.n_blocks):
+            seq.hash_of_block(logical_idx)
+        num_calls += seq.n_blocks
+        for token_id in range(args.output_len):
+            seq.data.append_token_id(token_id, 0.0)
+            seq.hash_of_block(seq.n_blocks - 1)
+        num_calls += args.output_len
+    total_time = time.perf_counter() - start
+    print(f"Hashing {args.num_seqs} sequences of {args.prompt_len} prompt "
+          f"tokens took {total_time:.4f} seconds, "
+          f"{total_time / num_calls * 1e6:.2f} us per call "
+          f"({num_calls} calls).")
+
+
 def main(args):
+    if args.sequence_only:
+        benchmark_sequence_hashing(args)
+        return
+
     llm = LLM(
         model=args.model,
         enforce_eager=True,
@@ -39,10 +70,10 @@ def main(args):
     total_calls = 0
     for func in stats.stats:
         if 'hash_of_block' in func[2]:
-            total_time = stats.stats[func][3]
-            total_calls = stats.stats[func][0]
+            total_time += stats.stats[func][3]
+            total_calls += stats.stats[func][0]
     percentage = (total_time / stats.total_tt) * 100
-    print(f"Hashing took {total_time:.2f} seconds,"
+    print(f"Hashing took {total_time:.2f} seconds in {total_calls} calls, "
           f"{percentage:.2f}% of the total runtime.")
 
 
@@ -59,5 +90,12 @@ if __name__ == "__main__":
     parser.add_argument('--use-v2-block-manager',
                         action='store_true',
                         help='Use BlockSpaceMangerV2')
+    parser.add_argument('--sequence-only',
+                        action='store_true',
+                        help='Only time Sequence.hash_of_block, without '
+                        'loading a model')
+    parser.add_argument('--prompt-len', type=int, default=16384)
+    parser.add_argument('--block-size', type=int, default=16)
+    parser.add_argument('--num-seqs', type=int, default=10)
     args = parser.parse_args()
     main(args)
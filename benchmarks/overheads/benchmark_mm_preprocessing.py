@@ -0,0 +1,161 @@
+"""Benchmark the preprocessing of image requests on CPU.
+
+A tiny LLaVA model (config and CLIP image processor only, no weights) is
+written to a temporary directory, and a convolution over the patches stands
+in for its vision encoder. `--num-requests` requests, whose images are drawn
+from `--num-unique-images` distinct images of `--image-size` pixels, are
+processed in two ways:
+
+* inline: each image is mapped to pixel values by the consumer, as the model
+  runner does when it prepares a step, then encoded;
+* offloaded: the images are mapped concurrently by `MultiModalPreprocessor`
+  (in `VLLM_MM_PREPROCESS_WORKERS` processes, with its content-hash cache)
+  while the consumer encodes the mapped inputs.
+"""
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+
+from vllm.config import ModelConfig
+from vllm.multimodal import MULTIMODAL_REGISTRY
+from vllm.multimodal.preprocessor import MultiModalPreprocessor
+from vllm.utils import FlexibleArgumentParser
+
+IMAGE_SIZE = 336
+PATCH_SIZE = 14
+
+
+def write_model(model_dir: str) -> None:
+    config = {
+        "architectures": ["LlavaForConditionalGeneration"],
+        "model_type": "llava",
+        "image_token_index": 32000,
+        "vision_config": {
+            "model_type": "clip_vision_model",
+            "image_size": IMAGE_SIZE,
+            "patch_size": PATCH_SIZE,
+            "hidden_size": 64,
+            "intermediate_size": 128,
+            "num_attention_heads": 2,
+            "num_hidden_layers": 1,
+        },
+        "text_config": {
+            "model_type": "llama",
+            "hidden_size": 64,
+            "intermediate_size": 128,
+            "num_attention_heads": 2,
+            "num_hidden_layers": 1,
+            "vocab_size": 32064,
+            "max_position_embeddings": 4096,
+        },
+    }
+    preprocessor_config = {
+        "image_processor_type": "CLIPImageProcessor",
+        "crop_size": {
+            "height": IMAGE_SIZE,
+            "width": IMAGE_SIZE
+        },
+        "size": {
+            "shortest_edge": IMAGE_SIZE
+        },
+        "do_center_crop": True,
+        "do_convert_rgb": True,
+        "do_normalize": True,
+        "do_rescale": True,
+        "do_resize": True,
+        "image_mean": [0.48145466, 0.4578275, 0.40821073],
+        "image_std": [0.26862954, 0.26130258, 0.27577711],
+        "resample": 3,
+        "rescale_factor": 1 / 255,
+    }
+    with open(os.path.join(model_dir, "config.json"), "w") as f:
+        json.dump(config, f)
+    with open(os.path.join(model_dir, "preprocessor_config.json"), "w") as f:
+        json.dump(preprocessor_config, f)
+
+
+def make_requests(args):
+    rng = np.random.default_rng(0)
+    images = [
+        Image.fromarray(
+            rng.integers(0,
+                         256, (args.image_size, args.image_size, 3),
+                         dtype=np.uint8))
+        for _ in range(args.num_unique_images)
+    ]
+    random.seed(0)
+    return [{"image": random.choice(images)} for _ in range(args.num_requests)]
+
+
+def main(args):
+    torch.set_num_threads(args.encoder_threads)
+    # A stand-in for the vision encoder.
+    encoder = torch.nn.Conv2d(3, 64, PATCH_SIZE, stride=PATCH_SIZE)
+
+    @torch.inference_mode()
+    def encode(pixel_values: torch.Tensor) -> None:
+        encoder(pixel_values.float())
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        write_model(model_dir)
+        model_config = ModelConfig(model=model_dir,
+                                   tokenizer=model_dir,
+                                   tokenizer_mode="auto",
+                                   trust_remote_code=False,
+                                   dtype="float32",
+                                   seed=0)
+        requests = make_requests(args)
+
+        start = time.perf_counter()
+        for data in requests:
+            encode(
+                MULTIMODAL_REGISTRY.map_input(model_config,
+                                              data)["pixel_values"])
+        inline_time = time.perf_counter() - start
+
+        preprocessor = MultiModalPreprocessor(model_config)
+
+        async def run_offloaded():
+            # Warm up the preprocessing pool, outside of the measurement.
+            await preprocessor.map_input_async(
+                {"image": Image.new("RGB", (args.image_size, ) * 2)})
+            start = time.perf_counter()
+            tasks = [
+                asyncio.create_task(preprocessor.map_input_async(data))
+                for data in requests
+            ]
+            for task in tasks:
+                encode((await task)["image"]["pixel_values"])
+            return time.perf_counter() - start
+
+        offloaded_time = asyncio.run(run_offloaded())
+
+    print(f"{args.num_requests} requests, {args.num_unique_images} distinct "
+          f"{args.image_size}x{args.image_size} images:")
+    print(f"  inline:    {inline_time:.3f} s "
+          f"({args.num_requests / inline_time:.1f} requests/s)")
+    print(f"  offloaded: {offloaded_time:.3f} s "
+          f"({args.num_requests / offloaded_time:.1f} requests/s), "
+          f"{len(preprocessor.cache)} cached inputs")
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark the preprocessing of image requests, inline '
+        'versus offloaded to the preprocessing pool and cached.')
+    parser.add_argument('--num-requests', type=int, default=256)
+    parser.add_argument('--num-unique-images', type=int, default=64)
+    parser.add_argument('--image-size', type=int, default=1024)
+    parser.add_argument('--encoder-threads',
+                        type=int,
+                        default=1,
+                        help='Number of threads of the stand-in encoder.')
+    args = parser.parse_args()
+    main(args)
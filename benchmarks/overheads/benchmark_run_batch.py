@@ -0,0 +1,152 @@
+"""Benchmark the OpenAI batch runner on a large batch file.
+
+A batch file of `--num-requests` chat requests is written to a temporary
+directory and run through `vllm.entrypoints.openai.run_batch`, once as a
+whole in memory and once with `--stream`. The engine is replaced by a stub
+which serves `--engine-max-num-seqs` requests at a time, each for
+`--engine-latency` seconds, and answers with `--output-len` characters.
+The wall time and the peak Python memory of both modes are reported.
+"""
+import asyncio
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from io import StringIO
+from typing import List
+
+from vllm.entrypoints.openai.protocol import (BatchRequestInput,
+                                              ChatCompletionRequest,
+                                              ChatCompletionResponse,
+                                              ChatCompletionResponseChoice,
+                                              ChatMessage, UsageInfo)
+from vllm.entrypoints.openai.run_batch import (read_file, run_batch_streaming,
+                                               run_request, write_file)
+from vllm.utils import FlexibleArgumentParser
+
+
+class StubEngine:
+
+    def __init__(self, max_num_seqs: int, latency: float,
+                 output_len: int) -> None:
+        self.latency = latency
+        self.output = "x" * output_len
+        self.max_num_seqs = max_num_seqs
+        self.running = None
+
+    async def create_chat_completion(
+            self, request: ChatCompletionRequest) -> ChatCompletionResponse:
+        if self.running is None:
+            self.running = asyncio.Semaphore(self.max_num_seqs)
+        async with self.running:
+            await asyncio.sleep(self.latency)
+        return ChatCompletionResponse(model=request.model,
+                                      choices=[
+                                          ChatCompletionResponseChoice(
+                                              index=0,
+                                              message=ChatMessage(
+                                                  role="assistant",
+                                                  content=self.output),
+                                              finish_reason="stop")
+                                      ],
+                                      usage=UsageInfo())
+
+
+def write_batch_file(path: str, num_requests: int, prompt_len: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(num_requests):
+            f.write(
+                json.dumps({
+                    "custom_id": f"request-{i}",
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model":
+                        "stub",
+                        "messages": [{
+                            "role": "user",
+                            "content": f"{i} " + "y" * prompt_len
+                        }],
+                    },
+                }) + "\n")
+
+
+async def run_in_memory(input_file: str, output_file: str,
+                        engine: StubEngine) -> None:
+    # The same steps as `run_batch.main` without `--stream`.
+    response_futures = []
+    for request_json in (await read_file(input_file)).strip().split("\n"):
+        request_json = request_json.strip()
+        if not request_json:
+            continue
+        request = BatchRequestInput.model_validate_json(request_json)
+        response_futures.append(
+            run_request(engine.create_chat_completion, request))
+
+    responses = await asyncio.gather(*response_futures)
+
+    output_buffer = StringIO()
+    for response in responses:
+        print(response.model_dump_json(), file=output_buffer)
+
+    output_buffer.seek(0)
+    await write_file(output_file, output_buffer.read().strip())
+
+
+def measure(name: str, coro, num_requests: int) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    asyncio.run(coro)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name}: {elapsed:.2f} s "
+          f"({num_requests / elapsed:.0f} requests/s), "
+          f"peak memory {peak / 2**20:.1f} MiB")
+
+
+def main(args):
+    engine = StubEngine(args.engine_max_num_seqs, args.engine_latency,
+                        args.output_len)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        input_file = os.path.join(tmp_dir, "input.jsonl")
+        output_files: List[str] = []
+        write_batch_file(input_file, args.num_requests, args.prompt_len)
+        print(f"{args.num_requests} requests "
+              f"({os.path.getsize(input_file) / 2**20:.1f} MiB):")
+
+        output_files.append(os.path.join(tmp_dir, "in_memory.jsonl"))
+        measure("in memory", run_in_memory(input_file, output_files[-1],
+                                           engine), args.num_requests)
+
+        engine.running = None
+        output_files.append(os.path.join(tmp_dir, "streaming.jsonl"))
+        measure(
+            "streaming",
+            run_batch_streaming(
+                input_file,
+                output_files[-1],
+                lambda request: engine.create_chat_completion,
+                max_concurrent_requests=args.max_concurrent_requests,
+                checkpoint_file=os.path.join(tmp_dir, "checkpoint.json"),
+                checkpoint_interval=args.checkpoint_interval),
+            args.num_requests)
+
+        for output_file in output_files:
+            with open(output_file, encoding="utf-8") as f:
+                assert sum(1 for _ in f) == args.num_requests
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark the batch runner in memory versus streaming.')
+    parser.add_argument('--num-requests', type=int, default=100000)
+    parser.add_argument('--prompt-len', type=int, default=1000)
+    parser.add_argument('--output-len', type=int, default=500)
+    parser.add_argument('--engine-max-num-seqs', type=int, default=256)
+    parser.add_argument('--engine-latency', type=float, default=0.01)
+    parser.add_argument('--max-concurrent-requests', type=int, default=1024)
+    parser.add_argument('--checkpoint-interval', type=int, default=1000)
+    args = parser.parse_args()
+    main(args)
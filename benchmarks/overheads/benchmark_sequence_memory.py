@@ -0,0 +1,58 @@
+"""Benchmark the host memory held by the sequences of running requests.
+
+`--num-seqs` sequences with prompts of `--prompt-len` tokens are created, as
+the engine does when requests are added, and `--output-len` tokens are
+appended to each with `--num-logprobs` logprobs per token. The memory they
+hold is measured with tracemalloc and reported per 1k sequences.
+"""
+import random
+import time
+import tracemalloc
+
+from vllm.inputs import LLMInputs
+from vllm.sequence import Logprob, Sequence
+from vllm.utils import FlexibleArgumentParser
+
+
+def main(args):
+    random.seed(0)
+    vocab = range(args.vocab_size)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    seqs = []
+    for i in range(args.num_seqs):
+        prompt_token_ids = random.choices(vocab, k=args.prompt_len)
+        seq = Sequence(i,
+                       LLMInputs(prompt_token_ids=prompt_token_ids),
+                       block_size=16)
+        for _ in range(args.output_len):
+            token_ids = random.sample(vocab, args.num_logprobs + 1)
+            seq.append_token_id(
+                token_ids[0], {
+                    token_id: Logprob(-rank, rank=rank + 1)
+                    for rank, token_id in enumerate(token_ids)
+                })
+        seqs.append(seq)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    scale = 1000 / args.num_seqs
+    print(f"{args.num_seqs} sequences of {args.prompt_len} prompt tokens and "
+          f"{args.output_len} output tokens ({args.num_logprobs} logprobs):")
+    print(f"  memory: {current * scale / 2**20:.1f} MiB per 1k sequences "
+          f"({current / args.num_seqs / 2**10:.1f} KiB per sequence)")
+    print(f"  time to create: {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark the host memory of running sequences.')
+    parser.add_argument('--num-seqs', type=int, default=1000)
+    parser.add_argument('--prompt-len', type=int, default=8192)
+    parser.add_argument('--output-len', type=int, default=256)
+    parser.add_argument('--num-logprobs', type=int, default=1)
+    parser.add_argument('--vocab-size', type=int, default=32000)
+    args = parser.parse_args()
+    main(args)
@@ -3,6 +3,12 @@ Saves each worker's model state dict directly to a checkpoint, which enables a
 fast load path for large tensor-parallel models where each worker only needs to
 read its own shard rather than the entire checkpoint.
 
+Each worker also writes an index describing the final, post-fusion and
+post-quantization layout of its tensors. Loading such a "ready-to-run"
+checkpoint only memory-maps the shards and assigns the tensors, skipping the
+model's weight name remapping, q/k/v and gate/up fusion and quantization
+post-processing.
+
 Example usage:
 
 python save_sharded_state.py \
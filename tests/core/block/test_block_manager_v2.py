@@ -443,3 +443,50 @@ def test_sliding_window(block_size, prompt_len, num_slots_to_append,
             check_used(0, sliding_blocks + 1)
         else:
             check_used(sliding_blocks, sliding_blocks + 1)
+
+
+def test_sliding_window_swap():
+    """Verify the null block of a sequence is not swapped with the blocks it
+    replaced.
+    """
+    block_size = 4
+    block_manager = BlockSpaceManagerV2(
+        block_size=block_size,
+        num_gpu_blocks=16,
+        num_cpu_blocks=16,
+        watermark=0,
+        sliding_window=block_size,
+    )
+    prompt_len = 6 * block_size
+    seq, seq_group = create_dummy_prompt("1",
+                                         prompt_length=prompt_len,
+                                         block_size=block_size)
+    block_manager.allocate(seq_group)
+    seq.status = SequenceStatus.RUNNING
+    seq.data.update_num_computed_tokens(prompt_len)
+    seq.append_token_id(0, {0: Logprob(0.0)})
+    block_manager.append_slots(seq, num_lookahead_slots=0)
+
+    # The first 3 blocks are replaced by the null block.
+    gpu_blocks = block_manager.get_block_table(seq)
+    null_block_id = gpu_blocks[0]
+    assert gpu_blocks[:3] == [null_block_id] * 3
+    assert null_block_id not in gpu_blocks[3:]
+    assert block_manager.get_num_free_gpu_blocks() == 16 - 5
+
+    # Only the blocks in the window are swapped out.
+    assert block_manager.can_swap_out(seq_group)
+    mapping = block_manager.swap_out(seq_group)
+    assert [gpu_block_id for gpu_block_id, _ in mapping] == gpu_blocks[3:]
+    assert block_manager.get_num_free_gpu_blocks() == 16 - 1
+    assert block_manager.get_num_free_cpu_blocks() == 16 - 4
+    seq.status = SequenceStatus.SWAPPED
+
+    assert block_manager.can_swap_in(seq_group, num_lookahead_slots=0)
+    mapping = block_manager.swap_in(seq_group)
+    assert len(mapping) == 4
+    gpu_blocks = block_manager.get_block_table(seq)
+    assert gpu_blocks[:3] == [null_block_id] * 3
+    assert null_block_id not in gpu_blocks[3:]
+    assert block_manager.get_num_free_gpu_blocks() == 16 - 5
+    assert block_manager.get_num_free_cpu_blocks() == 16
@@ -342,6 +342,55 @@ def test_fork(seq_len: int, block_size: int, allocator_type: str):
     assert allocator.get_num_free_blocks(device=Device.GPU) == num_gpu_blocks
 
 
+@pytest.mark.parametrize("block_size", [1, 8])
+def test_fork_sliding_window(block_size: int):
+    """Fork a sequence after blocks are dropped due to sliding window, and
+    verify the forked sequence shares the null block and the remaining blocks,
+    without referencing the dropped ones.
+    """
+    num_gpu_blocks = 1024
+    max_block_sliding_window = 2
+
+    allocator = CpuGpuBlockAllocator.create(
+        allocator_type="naive",
+        num_gpu_blocks=num_gpu_blocks,
+        num_cpu_blocks=0,
+        block_size=block_size,
+    )
+
+    seq_len = 5 * block_size
+    block_table = BlockTable(
+        block_size=block_size,
+        block_allocator=allocator,
+        max_block_sliding_window=max_block_sliding_window,
+    )
+    block_table.allocate(list(range(seq_len)))
+    block_table.append_token_ids([seq_len], num_computed_slots=seq_len)
+
+    # The first 3 blocks are dropped, and a new block is allocated.
+    null_block_id = block_table.physical_block_ids[0]
+    assert block_table.physical_block_ids[:3] == [null_block_id] * 3
+    num_free_blocks_before_fork = allocator.get_num_free_blocks(
+        device=Device.GPU)
+    assert num_free_blocks_before_fork == num_gpu_blocks - 4
+
+    forked_block_table = block_table.fork()
+    assert (block_table.physical_block_ids ==
+            forked_block_table.physical_block_ids)
+    assert forked_block_table.num_full_slots == block_table.num_full_slots
+    assert allocator.get_num_free_blocks(
+        device=Device.GPU) == num_free_blocks_before_fork
+
+    block_table.free()
+    assert allocator.get_num_free_blocks(
+        device=Device.GPU) == num_free_blocks_before_fork
+
+    # Only the null block remains allocated.
+    forked_block_table.free()
+    assert allocator.get_num_free_blocks(
+        device=Device.GPU) == num_gpu_blocks - 1
+
+
 @pytest.mark.parametrize("block_size", [8])
 @pytest.mark.parametrize("sequence_len", [1, 16, 129])
 @pytest.mark.parametrize("append_len", [1, 16, 129])
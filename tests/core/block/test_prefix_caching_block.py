@@ -682,6 +682,171 @@ class TestPrefixCachingBlockAllocator:
 
         assert new_block[0].block_id == last_block_id
 
+    @staticmethod
+    @pytest.mark.parametrize("block_size", [1, 16])
+    def test_prefix_cache_hit_rate(block_size: int):
+        allocator = PrefixCachingBlockAllocator(num_blocks=8,
+                                                block_size=block_size)
+        assert allocator.get_prefix_cache_hit_rate() == 0
+
+        token_ids = list(range(2 * block_size))
+        first_chain = TestPrefixCachingBlockAllocator.create_immutable_chain(
+            block_size=block_size, token_ids=token_ids, allocator=allocator)
+        assert allocator.get_prefix_cache_hit_rate() == 0
+
+        # The second chain shares the first block of the first one.
+        TestPrefixCachingBlockAllocator.create_immutable_chain(
+            block_size=block_size,
+            token_ids=token_ids[:block_size] + [-1] * block_size,
+            allocator=allocator)
+        assert allocator.get_prefix_cache_hit_rate() == 1 / 4
+
+        # Freed blocks are still hits, from the evictor.
+        for block in first_chain:
+            allocator.free(block)
+        TestPrefixCachingBlockAllocator.create_immutable_chain(
+            block_size=block_size, token_ids=token_ids, allocator=allocator)
+        assert allocator.get_prefix_cache_hit_rate() == 3 / 6
+
+    @staticmethod
+    @pytest.mark.parametrize("block_size", [1, 16])
+    def test_get_num_cached_tokens(block_size: int):
+        allocator = PrefixCachingBlockAllocator(num_blocks=8,
+                                                block_size=block_size)
+        token_ids = list(range(3 * block_size))
+        assert allocator.get_num_cached_tokens(token_ids) == 0
+
+        # The blocks of a running chain are not computed yet.
+        chain = TestPrefixCachingBlockAllocator.create_immutable_chain(
+            block_size=block_size, token_ids=token_ids, allocator=allocator)
+        assert allocator.get_num_cached_tokens(token_ids) == 0
+
+        # Freed blocks are computed, and are matched from the evictor.
+        for block in chain:
+            allocator.free(block)
+        num_free_blocks = allocator.get_num_free_blocks()
+        hit_rate = allocator.get_prefix_cache_hit_rate()
+        # The last block is left for the model to compute.
+        assert allocator.get_num_cached_tokens(token_ids) == 2 * block_size
+        assert allocator.get_num_cached_tokens(token_ids +
+                                               [-1]) == 3 * block_size
+        # Tokens without a computed block sharing them are not matched.
+        assert allocator.get_num_cached_tokens(token_ids + [-1] *
+                                               block_size) == 3 * block_size
+        # The match stops at the first block that is not cached.
+        assert allocator.get_num_cached_tokens(
+            token_ids[:block_size] + [-1] * block_size +
+            token_ids[2 * block_size:]) == block_size
+        assert allocator.get_num_cached_tokens([-1] * block_size +
+                                               token_ids) == 0
+
+        # The queries do not allocate the blocks, or count as lookups.
+        assert allocator.get_num_free_blocks() == num_free_blocks
+        assert allocator.evictor.num_blocks == len(chain)
+        assert allocator.get_prefix_cache_hit_rate() == hit_rate
+
+    @staticmethod
+    @pytest.mark.parametrize("block_size", [4, 16])
+    def test_copy_computed_tokens(block_size: int):
+        num_blocks = 8
+        allocator = PrefixCachingBlockAllocator(num_blocks=num_blocks,
+                                                block_size=block_size)
+        half = block_size // 2
+        token_ids = list(range(2 * block_size))
+        chain = TestPrefixCachingBlockAllocator.create_immutable_chain(
+            block_size=block_size, token_ids=token_ids, allocator=allocator)
+        src_block_id = chain[1].block_id
+
+        # The blocks of a running chain are not computed, so not copied.
+        block = allocator.allocate_mutable_block(prev_block=chain[0])
+        block.append_token_ids(token_ids[block_size:block_size + 1])
+        assert allocator.copy_computed_tokens(block, block_size) == 0
+        for chain_block in chain + [block]:
+            allocator.free(chain_block)
+
+        # A prompt sharing a prefix that ends in the middle of a block copies
+        # the shared tokens of the block.
+        prompt = token_ids[:block_size + half] + [-1] * block_size
+        assert allocator.get_num_cached_tokens(prompt) == block_size + half
+        first = allocator.allocate_immutable_block(
+            prev_block=None, token_ids=prompt[:block_size])
+        second = allocator.allocate_immutable_block(
+            prev_block=first, token_ids=prompt[block_size:2 * block_size])
+        # Cached blocks are shared rather than copied to.
+        assert allocator.copy_computed_tokens(first, block_size) == 0
+        assert allocator.copy_computed_tokens(second, block_size) == half
+
+        # The source block is held until the copy is cleared.
+        assert src_block_id not in allocator.evictor
+        assert allocator.clear_copy_on_writes() == [(src_block_id,
+                                                     second.block_id)]
+        assert src_block_id in allocator.evictor
+
+        # At most max_num_tokens are copied.
+        block = allocator.allocate_mutable_block(prev_block=first)
+        block.append_token_ids(token_ids[block_size:block_size + half])
+        assert allocator.copy_computed_tokens(block, 1) == 1
+        assert allocator.clear_copy_on_writes() == [(src_block_id,
+                                                     block.block_id)]
+
+        # A freed partial block is cached under its exact tokens, and the
+        # tokens of a new block extending it are copied from it.
+        tail_token_ids = [-2] * half
+        allocator.free(block)
+        block = allocator.allocate_mutable_block(prev_block=first)
+        block.append_token_ids(tail_token_ids)
+        tail_block_id = block.block_id
+        allocator.free(block)
+        assert tail_block_id in allocator.evictor
+        assert allocator.get_num_cached_tokens(prompt[:block_size] +
+                                               tail_token_ids +
+                                               [-3]) == block_size + half
+        block = allocator.allocate_mutable_block(prev_block=first)
+        block.append_token_ids(tail_token_ids + [-3])
+        assert allocator.copy_computed_tokens(block, block_size) == half
+        assert allocator.clear_copy_on_writes() == [(tail_block_id,
+                                                     block.block_id)]
+
+        # Evicted blocks are no longer copied.
+        for prompt_block in [block, second, first]:
+            allocator.free(prompt_block)
+        assert allocator.get_num_free_blocks() == num_blocks
+        for _ in range(num_blocks):
+            allocator.allocate_mutable_block(prev_block=None)
+        assert allocator.get_num_cached_tokens(prompt) == 0
+
+    @staticmethod
+    def test_hold_computed_tokens_source():
+        block_size = 4
+        allocator = PrefixCachingBlockAllocator(num_blocks=4,
+                                                block_size=block_size)
+        token_ids = list(range(2 * block_size))
+        chain = TestPrefixCachingBlockAllocator.create_immutable_chain(
+            block_size=block_size, token_ids=token_ids, allocator=allocator)
+        src_block_id = chain[1].block_id
+        for chain_block in chain:
+            allocator.free(chain_block)
+
+        prompt = token_ids[:block_size + 2] + [-1]
+        assert allocator.get_num_cached_tokens(prompt) == block_size + 2
+        allocator.hold_computed_tokens_source(prompt)
+        assert src_block_id not in allocator.evictor
+
+        # Allocating the blocks of the prompt, and all the other free blocks,
+        # does not evict the held block.
+        first = allocator.allocate_immutable_block(
+            prev_block=None, token_ids=prompt[:block_size])
+        second = allocator.allocate_mutable_block(prev_block=first)
+        second.append_token_ids(prompt[block_size:])
+        while allocator.get_num_free_blocks() > 0:
+            allocator.allocate_mutable_block(prev_block=None)
+        assert allocator.copy_computed_tokens(second, block_size) == 2
+
+        # The block is released with the copies.
+        assert allocator.clear_copy_on_writes() == [(src_block_id,
+                                                     second.block_id)]
+        assert src_block_id in allocator.evictor
+
     @staticmethod
     def create_immutable_chain(
         block_size: int,
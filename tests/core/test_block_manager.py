@@ -5,7 +5,7 @@ from typing import List
 import pytest
 
 from vllm import SamplingParams
-from vllm.block import PhysicalTokenBlock
+from vllm.block import DEFAULT_LAST_ACCESSED_TIME, PhysicalTokenBlock
 from vllm.core.block.utils import (STR_NOT_IMPL_ENC_DEC_PREFIX_CACHE,
                                    STR_NOT_IMPL_ENC_DEC_SWA)
 from vllm.core.block_manager_v1 import (BlockSpaceManagerV1,
@@ -421,6 +421,47 @@ def test_free():
         block_manager.get_block_table(prompt)
 
 
+def test_last_access_is_stamped_on_free():
+    block_size = 4
+    num_cpu_blocks = 4
+    num_gpu_blocks = 8
+    block_manager = BlockSpaceManagerV1(block_size,
+                                        num_cpu_blocks,
+                                        num_gpu_blocks,
+                                        watermark=0,
+                                        enable_caching=True)
+
+    old_seq, old_seq_group = create_dummy_prompt("1", 2 * block_size,
+                                                 block_size)
+    new_seq, new_seq_group = create_dummy_prompt(
+        "2",
+        2 * block_size,
+        block_size,
+        prompt_tokens=list(range(100, 100 + 2 * block_size)))
+    block_manager.allocate(old_seq_group)
+    block_manager.allocate(new_seq_group)
+    old_blocks = list(block_manager.block_tables[old_seq.seq_id])
+    new_blocks = list(block_manager.block_tables[new_seq.seq_id])
+
+    block_manager.access_all_blocks_in_seq(old_seq, 1.0)
+    block_manager.access_all_blocks_in_seq(new_seq, 1.0)
+    block_manager.access_all_blocks_in_seq(new_seq, 2.0)
+    # Accessing a sequence does not walk its blocks.
+    assert all(block.last_accessed == DEFAULT_LAST_ACCESSED_TIME
+               for block in old_blocks + new_blocks)
+
+    # The evictor expects blocks to be freed in the order of their access
+    # times, as the scheduler frees finished sequences.
+    block_manager.free(old_seq)
+    block_manager.free(new_seq)
+    assert all(block.last_accessed == 1.0 for block in old_blocks)
+    assert all(block.last_accessed == 2.0 for block in new_blocks)
+
+    # The blocks of the least recently accessed sequence are evicted first.
+    evictor = block_manager.gpu_allocator.evictor
+    assert evictor.evict() in old_blocks
+
+
 def test_free_encoder_decoder():
     block_size = 4
     num_cpu_blocks = 4
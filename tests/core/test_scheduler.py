@@ -389,6 +389,101 @@ def test_prefill_schedule_token_budget():
     assert len(remaining_waiting) == 0
 
 
+@pytest.mark.parametrize("use_v2_block_manager", [False, True])
+def test_prefill_schedule_prefix_cached_token_budget(use_v2_block_manager):
+    """
+    Test the cached prefix of a prompt does not use the token budget.
+    """
+    block_size = 4
+    scheduler_config = SchedulerConfig(
+        64, 64, 64, use_v2_block_manager=use_v2_block_manager)
+    cache_config = CacheConfig(block_size,
+                               1.0,
+                               1,
+                               "auto",
+                               enable_prefix_caching=True)
+    cache_config.num_cpu_blocks = 16
+    cache_config.num_gpu_blocks = 16
+    scheduler = Scheduler(scheduler_config, cache_config, None)
+
+    # Cache the prompt.
+    _, seq_group = create_dummy_prompt("0",
+                                       prompt_length=16,
+                                       block_size=block_size)
+    scheduler.add_seq_group(seq_group)
+    schedule_and_update_computed_tokens(scheduler)
+    assert seq_group.metrics.num_cached_tokens == 0
+    scheduler.abort_seq_group("0")
+
+    # The last block of a prompt is always computed, so 12 of the 16 tokens
+    # are cached, and each prompt costs 4 tokens of the budget.
+    seq_groups = []
+    for i in range(1, 3):
+        seq, seq_group = create_dummy_prompt(str(i),
+                                             prompt_length=16,
+                                             block_size=block_size)
+        assert scheduler.block_manager.get_num_cached_tokens(seq) == 12
+        scheduler.add_seq_group(seq_group)
+        seq_groups.append(seq_group)
+    _, seq_group = create_dummy_prompt("3",
+                                       prompt_length=16,
+                                       block_size=block_size,
+                                       prompt_tokens=list(range(100, 116)))
+    scheduler.add_seq_group(seq_group)
+
+    budget = create_token_budget(token_budget=8)
+    output = scheduler._schedule_prefills(budget, None)
+    assert [s.seq_group for s in output.seq_groups] == seq_groups
+    assert [s.token_chunk_size for s in output.seq_groups] == [16, 16]
+    assert budget.num_batched_tokens == 32
+    assert budget.num_cached_tokens == 24
+    assert budget.remaining_token_budget() == 0
+    assert len(scheduler.waiting) == 1
+    for seq_group in seq_groups:
+        assert seq_group.metrics.num_cached_tokens == 12
+
+
+def test_prefill_copies_partially_cached_block():
+    """
+    Test the tokens that a prompt shares with a cached block are copied to
+    its own block in the same step, and are not computed.
+    """
+    block_size = 4
+    scheduler_config = SchedulerConfig(64, 64, 64, use_v2_block_manager=True)
+    cache_config = CacheConfig(block_size,
+                               1.0,
+                               1,
+                               "auto",
+                               enable_prefix_caching=True)
+    cache_config.num_cpu_blocks = 16
+    cache_config.num_gpu_blocks = 16
+    scheduler = Scheduler(scheduler_config, cache_config, None)
+
+    # Cache a prompt of 2 blocks.
+    seq, seq_group = create_dummy_prompt("0",
+                                         prompt_length=8,
+                                         block_size=block_size)
+    scheduler.add_seq_group(seq_group)
+    schedule_and_update_computed_tokens(scheduler)
+    cached_block_ids = scheduler.block_manager.get_block_table(seq)
+    scheduler.abort_seq_group("0")
+
+    # The prompt shares the first block and half of the second one.
+    seq, seq_group = create_dummy_prompt("1",
+                                         prompt_length=8,
+                                         block_size=block_size,
+                                         prompt_tokens=list(range(6)) +
+                                         [100, 101])
+    scheduler.add_seq_group(seq_group)
+    seq_group_meta_list, out = scheduler.schedule()
+    block_ids = scheduler.block_manager.get_block_table(seq)
+    assert block_ids[0] == cached_block_ids[0]
+    assert out.blocks_to_copy == [(cached_block_ids[1], block_ids[1])]
+    assert seq_group_meta_list[0].computed_block_nums == [block_ids[0]]
+    assert seq_group_meta_list[0].num_computed_partial_tokens == 2
+    assert seq_group.metrics.num_cached_tokens == 6
+
+
 def test_prefill_schedule_max_seqs():
     """
     Test max seq respected.
@@ -837,6 +932,19 @@ def test_scheduling_budget():
     assert budget.remaining_token_budget() == 4
     assert budget.num_batched_tokens == 0
 
+    # Verify cached tokens do not use the token budget.
+    budget.add_num_batched_tokens("2", 4, num_cached_tokens=3)
+    assert budget.num_batched_tokens == 4
+    assert budget.num_cached_tokens == 3
+    assert budget.remaining_token_budget() == 3
+    assert budget.can_schedule(num_new_tokens=5,
+                               num_new_seqs=1,
+                               num_cached_tokens=2)
+    assert not budget.can_schedule(
+        num_new_tokens=5, num_new_seqs=1, num_cached_tokens=1)
+    budget.subtract_num_batched_tokens("2", 4)
+    budget = SchedulingBudget(token_budget=TOKEN_BUDGET, max_num_seqs=MAX_SEQS)
+
     # Verify add/subtract max seqs.
     _, seq_group = create_dummy_prompt("1", 3)
     budget.add_num_seqs(seq_group.request_id, 2)
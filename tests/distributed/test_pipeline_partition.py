@@ -2,6 +2,7 @@ import os
 
 import pytest
 
+from vllm.distributed.pp_layer_partition import LayerCosts, partition_layers
 from vllm.distributed.utils import get_pp_indices
 
 
@@ -32,3 +33,74 @@ def test_custom_layer_partition():
     # Wrong number of layers
     with pytest.raises(ValueError):
         _verify("5,5,5,5", 21, 4, [(0, 5), (5, 10), (10, 15), (15, 20)])
+    # Automatic partition which was not resolved for this model
+    _verify("auto", 20, 4, [(0, 5), (5, 10), (10, 15), (15, 20)])
+
+
+def test_resolved_layer_partition():
+    bak = os.environ.pop("VLLM_PP_LAYER_PARTITION", None)
+    try:
+        for env in [None, "auto", "5,5,5,5"]:
+            if env is not None:
+                os.environ["VLLM_PP_LAYER_PARTITION"] = env
+            # The resolved partition takes precedence over the variable.
+            goldens = [(0, 4), (4, 10), (10, 16), (16, 20)]
+            for pp_rank, golden in enumerate(goldens):
+                assert get_pp_indices(20, pp_rank, 4, [4, 6, 6, 4]) == golden
+            with pytest.raises(ValueError):
+                get_pp_indices(20, 0, 4, [4, 6, 6])
+    finally:
+        os.environ.pop("VLLM_PP_LAYER_PARTITION", None)
+        if bak is not None:
+            os.environ["VLLM_PP_LAYER_PARTITION"] = bak
+
+
+def test_partition_layers():
+
+    def _stage_costs(costs, partitions):
+        times, memory = [], []
+        start = 0
+        for stage, num_layers in enumerate(partitions):
+            end = start + num_layers
+            times.append(sum(costs.layer_times[start:end]))
+            memory.append(sum(costs.layer_memory[start:end]))
+            if stage == 0:
+                times[-1] += costs.first_stage_time
+                memory[-1] += costs.first_stage_memory
+            if stage == len(partitions) - 1:
+                times[-1] += costs.last_stage_time
+                memory[-1] += costs.last_stage_memory
+            start = end
+        return times, memory
+
+    # Uniform layers are split evenly
+    costs = LayerCosts(layer_times=[1.0] * 20, layer_memory=[1] * 20)
+    assert partition_layers(costs, 4) == [5, 5, 5, 5]
+    assert partition_layers(costs, 1) == [20]
+
+    # The LM head and the sampler of the last stage take the time of 4 layers
+    costs.last_stage_time = 4.0
+    assert partition_layers(costs, 4) == [6, 6, 6, 2]
+
+    # The embedding and the LM head take the memory of 3 layers, so that the
+    # first and last stages can only hold 4 layers
+    costs.first_stage_memory = costs.last_stage_memory = 3
+    partitions = partition_layers(costs, 4, memory_limit=7)
+    assert sum(partitions) == 20
+    times, memory = _stage_costs(costs, partitions)
+    assert max(times) == 7.0
+    assert max(memory) <= 7
+
+    # Heavier layers are spread out
+    costs = LayerCosts(layer_times=[1.0, 1.0, 4.0, 4.0, 1.0, 1.0],
+                       layer_memory=[0] * 6)
+    assert partition_layers(costs, 2) == [3, 3]
+    times, _ = _stage_costs(costs, partition_layers(costs, 3))
+    assert max(times) == 6.0
+
+    # The weights do not fit
+    with pytest.raises(ValueError):
+        partition_layers(costs, 2, memory_limit=-1)
+    # More stages than layers
+    with pytest.raises(ValueError):
+        partition_layers(costs, 7)
@@ -0,0 +1,40 @@
+import random
+
+import torch
+import torch.distributed as dist
+
+from vllm.distributed.device_communicators.shm_all_reduce import ShmAllreduce
+
+from .test_shm_broadcast import distributed_run, worker_fn_wrapper
+
+
+@worker_fn_wrapper
+def worker_fn():
+    rank = dist.get_rank()
+    world_size = dist.get_world_size()
+    # a small max_size so that the larger tensors are exchanged in chunks
+    comm = ShmAllreduce(dist.group.WORLD, max_size=4096)
+    assert not comm.disabled
+
+    random.seed(0)
+    for _ in range(100):
+        numel = random.randint(1, 10_000)
+        dtype = random.choice([torch.float32, torch.bfloat16, torch.int64])
+        inputs = [(torch.arange(numel) * (r + 1)).to(dtype)
+                  for r in range(world_size)]
+
+        expected = inputs[0].clone()
+        for inp in inputs[1:]:
+            expected += inp
+        out = comm.all_reduce(inputs[rank].view(-1, 1))
+        assert out.shape == (numel, 1)
+        torch.testing.assert_close(out.view(-1), expected)
+
+        gathered = torch.empty((world_size, numel), dtype=dtype)
+        comm.all_gather_into_tensor(gathered, inputs[rank])
+        torch.testing.assert_close(gathered, torch.stack(inputs))
+    comm.close()
+
+
+def test_shm_all_reduce():
+    distributed_run(worker_fn, 4)
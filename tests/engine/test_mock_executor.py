@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from vllm.engine.arg_utils import AsyncEngineArgs, EngineArgs
+from vllm.engine.async_llm_engine import AsyncLLMEngine
+from vllm.engine.llm_engine import LLMEngine
+from vllm.executor.mock_executor import (MockExecutor, MockExecutorAsync,
+                                         MockExecutorConfig)
+from vllm.inputs import TokensPrompt
+from vllm.sampling_params import SamplingParams
+
+PROMPT_TOKEN_IDS = [2, 100, 200, 300, 400]
+
+
+@pytest.mark.parametrize("model", ["facebook/opt-125m"])
+@pytest.mark.parametrize("enable_chunked_prefill", [False, True])
+def test_mock_executor(model, enable_chunked_prefill):
+    executor_cls = MockExecutor.with_config(
+        MockExecutorConfig(step_latency_s=0.001, num_gpu_blocks=32))
+    engine_args = EngineArgs(
+        model=model,
+        max_num_batched_tokens=8 if enable_chunked_prefill else None,
+        max_model_len=64,
+        enable_chunked_prefill=enable_chunked_prefill,
+        distributed_executor_backend=executor_cls)
+    engine = LLMEngine.from_engine_args(engine_args)
+    assert engine.cache_config.num_gpu_blocks == 32
+
+    for i in range(4):
+        engine.add_request(
+            str(i), TokensPrompt(prompt_token_ids=PROMPT_TOKEN_IDS),
+            SamplingParams(n=2,
+                           ignore_eos=True,
+                           max_tokens=10 + i,
+                           logprobs=2,
+                           prompt_logprobs=1))
+    outputs = {}
+    while engine.has_unfinished_requests():
+        for output in engine.step():
+            if output.finished:
+                outputs[output.request_id] = output
+
+    assert len(outputs) == 4
+    for i in range(4):
+        output = outputs[str(i)]
+        assert len(output.prompt_logprobs) == len(PROMPT_TOKEN_IDS)
+        assert len(output.outputs) == 2
+        for completion in output.outputs:
+            assert len(completion.token_ids) == 10 + i
+            assert len(completion.logprobs) == 10 + i
+            # the "prompt" token mode continues the prompt
+            assert set(completion.token_ids) <= set(PROMPT_TOKEN_IDS)
+    assert engine.model_executor.num_steps > 0
+
+
+@pytest.mark.parametrize("model", ["facebook/opt-125m"])
+def test_mock_executor_async(model):
+    executor_cls = MockExecutorAsync.with_config(
+        MockExecutorConfig(token_mode="random", per_token_latency_s=1e-4))
+    engine_args = AsyncEngineArgs(model=model,
+                                  distributed_executor_backend=executor_cls)
+    engine = AsyncLLMEngine.from_engine_args(engine_args)
+
+    async def generate(request_id: str) -> int:
+        async for output in engine.generate(
+                TokensPrompt(prompt_token_ids=PROMPT_TOKEN_IDS),
+                SamplingParams(ignore_eos=True, max_tokens=16), request_id):
+            pass
+        return len(output.outputs[0].token_ids)
+
+    async def run():
+        return await asyncio.gather(*(generate(str(i)) for i in range(8)))
+
+    assert asyncio.run(run()) == [16] * 8
@@ -140,3 +140,49 @@ def test_multiple_sampling_params(llm: LLM):
     # sampling_params is None, default params should be applied
     outputs = llm.generate(PROMPTS, sampling_params=None)
     assert len(PROMPTS) == len(outputs)
+
+
+@pytest.mark.skip_global_cleanup
+def test_generate_stream(llm: LLM):
+    sampling_params = SamplingParams(temperature=0.0, top_p=1.0)
+    prompts = PROMPTS * 4
+
+    expected_outputs = llm.generate(prompts, sampling_params=sampling_params)
+
+    # The inputs are consumed lazily from a generator.
+    stream_outputs = list(
+        llm.generate_stream((p for p in prompts),
+                            sampling_params=sampling_params,
+                            max_in_flight=3))
+    assert len(stream_outputs) == len(prompts)
+    stream_outputs.sort(key=lambda o: int(o.request_id))
+    assert_outputs_equal(expected_outputs, stream_outputs)
+
+    # Requests added to the engine by others are not yielded by the stream.
+    llm.llm_engine.add_request("other", PROMPTS[0], sampling_params)
+    stream_outputs = list(
+        llm.generate_stream(iter(prompts),
+                            sampling_params=sampling_params,
+                            max_in_flight=3))
+    assert len(stream_outputs) == len(prompts)
+    assert "other" not in [output.request_id for output in stream_outputs]
+    assert not llm.llm_engine.has_unfinished_requests()
+
+    # Closing the stream early aborts the requests left in the engine.
+    stream = llm.generate_stream(iter(prompts),
+                                 sampling_params=sampling_params,
+                                 max_in_flight=3)
+    next(stream)
+    stream.close()
+    assert not llm.llm_engine.has_unfinished_requests()
+
+    # Errors raised while processing the inputs are raised by the stream.
+    invalid_prompt = {
+        "encoder_prompt": PROMPTS[1],
+        "decoder_prompt": PROMPTS[2],
+    }
+    with pytest.raises(ValueError, match="encoder-decoder"):
+        list(
+            llm.generate_stream([PROMPTS[0], invalid_prompt],
+                                sampling_params=sampling_params))
+    assert not llm.llm_engine.has_unfinished_requests()
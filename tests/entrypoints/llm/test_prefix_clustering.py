@@ -0,0 +1,65 @@
+import pytest
+
+from vllm import LLM, SamplingParams
+from vllm.entrypoints.prefix_clustering import order_by_shared_prefix
+from vllm.executor.mock_executor import MockExecutor, MockExecutorConfig
+from vllm.inputs import TokensPrompt
+from vllm.utils import Device
+
+MODEL_NAME = "facebook/opt-125m"
+
+
+def test_order_by_shared_prefix():
+    prompts = [
+        [1, 2, 3, 4],
+        [5, 6, 7, 8],
+        [1, 2, 9],
+        [5, 6],
+        [1, 2, 3, 4, 10],
+        [1, 3],
+    ]
+    assert order_by_shared_prefix(prompts, 2) == [0, 4, 2, 3, 1, 5]
+    # Without a shared first chunk, the order is kept.
+    assert order_by_shared_prefix(prompts, 4) == [0, 4, 1, 2, 3, 5]
+    # Each group is ordered on its own, in the order of its first prompt.
+    assert order_by_shared_prefix(prompts, 2,
+                                  groups=[0, 0, 1, 0, 1,
+                                          0]) == [0, 3, 1, 5, 2, 4]
+    assert order_by_shared_prefix([], 2) == []
+    with pytest.raises(ValueError):
+        order_by_shared_prefix(prompts, 0)
+
+
+@pytest.mark.parametrize("use_v2_block_manager", [False, True])
+def test_cluster_by_prefix(use_v2_block_manager: bool):
+    block_size = 16
+    # Interleaved prompts of 4 prefixes, each of 4 blocks, and a cache that
+    # holds at most 2 prefixes.
+    prefixes = [[100 + i] * 4 * block_size for i in range(4)]
+    prompts = [
+        TokensPrompt(prompt_token_ids=prefixes[i % 4] + [200 + i])
+        for i in range(16)
+    ]
+    sampling_params = SamplingParams(temperature=0,
+                                     ignore_eos=True,
+                                     max_tokens=4)
+
+    hit_rates = []
+    for cluster_by_prefix in [False, True]:
+        llm = LLM(model=MODEL_NAME,
+                  block_size=block_size,
+                  max_num_seqs=1,
+                  enable_prefix_caching=True,
+                  use_v2_block_manager=use_v2_block_manager,
+                  distributed_executor_backend=MockExecutor.with_config(
+                      MockExecutorConfig(num_gpu_blocks=12)))
+        outputs = llm.generate(prompts,
+                               sampling_params,
+                               cluster_by_prefix=cluster_by_prefix)
+        # The outputs are in the input order.
+        assert [output.prompt_token_ids for output in outputs
+                ] == [prompt["prompt_token_ids"] for prompt in prompts]
+        hit_rates.append(llm.llm_engine.scheduler[0].get_prefix_cache_hit_rate(
+            Device.GPU))
+
+    assert hit_rates[1] > hit_rates[0]
@@ -1,8 +1,16 @@
+import asyncio
+import os
 import subprocess
 import sys
 import tempfile
 
-from vllm.entrypoints.openai.protocol import BatchRequestOutput
+import pytest
+
+from vllm.entrypoints.openai.protocol import (BatchRequestOutput,
+                                              ChatCompletionRequest,
+                                              ChatCompletionResponse,
+                                              UsageInfo)
+from vllm.entrypoints.openai.run_batch import run_batch_streaming
 
 # ruff: noqa: E501
 INPUT_BATCH = """{"custom_id": "request-1", "method": "POST", "url": "/v1/chat/completions", "body": {"model": "NousResearch/Meta-Llama-3-8B-Instruct", "messages": [{"role": "system", "content": "You are a helpful assistant."},{"role": "user", "content": "Hello world!"}],"max_tokens": 1000}}
@@ -100,3 +108,82 @@ def test_embeddings():
             # Ensure that the output format conforms to the openai api.
             # Validation should throw if the schema is wrong.
             BatchRequestOutput.model_validate_json(line)
+
+
+def test_completions_streaming():
+    with tempfile.NamedTemporaryFile(
+            "w") as input_file, tempfile.NamedTemporaryFile(
+                "r") as output_file:
+        input_file.write(INPUT_BATCH)
+        input_file.flush()
+        proc = subprocess.Popen([
+            sys.executable, "-m", "vllm.entrypoints.openai.run_batch", "-i",
+            input_file.name, "-o", output_file.name, "--model",
+            "NousResearch/Meta-Llama-3-8B-Instruct", "--stream",
+            "--max-concurrent-requests", "2"
+        ], )
+        proc.communicate()
+        proc.wait()
+        assert proc.returncode == 0, f"{proc=}"
+
+        contents = output_file.read()
+        custom_ids = set()
+        for line in contents.strip().split("\n"):
+            output = BatchRequestOutput.model_validate_json(line)
+            custom_ids.add(output.custom_id)
+        assert custom_ids == {"request-1", "request-2", "request-3"}
+
+
+@pytest.mark.asyncio
+async def test_streaming_resumes_from_checkpoint(tmp_path):
+    input_file = tmp_path / "input.jsonl"
+    output_file = str(tmp_path / "output.jsonl")
+    checkpoint_file = str(tmp_path / "checkpoint.json")
+    input_file.write_text(INPUT_BATCH)
+
+    served = []
+
+    def get_serving_func(fail_on: str):
+
+        async def create_chat_completion(request: ChatCompletionRequest):
+            content = request.messages[0]["content"]
+            if content == fail_on:
+                # Let the other requests finish first.
+                await asyncio.sleep(0.1)
+                raise RuntimeError("The engine died")
+            served.append(content)
+            return ChatCompletionResponse(model=request.model,
+                                          choices=[],
+                                          usage=UsageInfo())
+
+        return lambda request: create_chat_completion
+
+    with pytest.raises(RuntimeError):
+        await run_batch_streaming(
+            str(input_file),
+            output_file,
+            get_serving_func(fail_on="You are an unhelpful assistant."),
+            max_concurrent_requests=4,
+            checkpoint_file=checkpoint_file,
+            checkpoint_interval=1,
+            sort_window=2)
+    assert os.path.exists(checkpoint_file)
+    assert served == ["You are a helpful assistant."]
+
+    served.clear()
+    await run_batch_streaming(str(input_file),
+                              output_file,
+                              get_serving_func(fail_on=""),
+                              max_concurrent_requests=4,
+                              checkpoint_file=checkpoint_file,
+                              checkpoint_interval=1,
+                              sort_window=2)
+    # Only the requests without an output are run again.
+    assert sorted(served) == ["You are an unhelpful assistant."] * 2
+
+    with open(output_file) as f:
+        custom_ids = [
+            BatchRequestOutput.model_validate_json(line).custom_id
+            for line in f
+        ]
+    assert sorted(custom_ids) == ["request-1", "request-2", "request-3"]
@@ -1,12 +1,17 @@
 import os
 import tempfile
+from typing import List
 
 import huggingface_hub.constants
 import pytest
+import torch
 from huggingface_hub.utils import LocalEntryNotFoundError
+from safetensors.torch import save_file
 
 from vllm.model_executor.model_loader.weight_utils import (
-    download_weights_from_hf, enable_hf_transfer)
+    _iterate_shards_concurrently, download_weights_from_hf, enable_hf_transfer,
+    mmap_cache_weights_iterator, mmap_safetensors_file,
+    multi_thread_safetensors_weights_iterator, safetensors_weights_iterator)
 
 
 def test_hf_transfer_auto_activation():
@@ -49,6 +54,104 @@ def test_download_weights_from_hf():
             cache_dir=tmpdir) is not None
 
 
+def test_mmap_safetensors_file():
+    state_dict = {
+        "fp16": torch.randn(4, 8).half(),
+        "bf16": torch.randn(3, 5).bfloat16(),
+        "fp32": torch.randn(7),
+        "int": torch.arange(6, dtype=torch.int64).view(2, 3),
+        "empty": torch.empty(0, 4),
+    }
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "model.safetensors")
+        save_file(state_dict, path)
+        loaded = mmap_safetensors_file(path)
+        assert loaded.keys() == state_dict.keys()
+        for name, tensor in state_dict.items():
+            assert loaded[name].dtype == tensor.dtype
+            assert torch.equal(loaded[name], tensor)
+
+
+def test_multi_thread_safetensors_weights_iterator():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        files = []
+        for i in range(4):
+            path = os.path.join(tmpdir, f"model-{i}.safetensors")
+            save_file(
+                {
+                    f"layer.{i}.weight": torch.randn(16, 16),
+                    f"layer.{i}.bias": torch.randn(16),
+                }, path)
+            files.append(path)
+        expected = dict(safetensors_weights_iterator(files))
+        loaded = dict(
+            multi_thread_safetensors_weights_iterator(files, max_workers=2))
+        assert loaded.keys() == expected.keys()
+        for name, tensor in expected.items():
+            assert torch.equal(loaded[name], tensor)
+
+
+def test_iterate_shards_concurrently_bounds_pending_shards():
+    max_workers = 2
+    num_shards = 8
+    started: List[str] = []
+
+    def _load_file(name: str):
+        started.append(name)
+        return {name: torch.zeros(1)}
+
+    files = [f"shard-{i}" for i in range(num_shards)]
+    loaded: List[str] = []
+    for name, _ in _iterate_shards_concurrently(_load_file, files, max_workers,
+                                                "test"):
+        # Besides the shard being consumed, at most `max_workers` shards
+        # may have been submitted ahead of the consumer.
+        assert len(started) <= len(loaded) + 1 + max_workers
+        loaded.append(name)
+    assert sorted(loaded) == sorted(files)
+
+
+def test_mmap_cache_weights_iterator():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, "model.safetensors")
+        state_dict = {
+            "a": torch.randn(3, 5).half(),
+            "b": torch.arange(7, dtype=torch.int32),
+            "c": torch.randn(2, 2).bfloat16(),
+        }
+        save_file(state_dict, path)
+        cache_folder = os.path.join(tmpdir, "mmap_cache")
+        num_conversions = 0
+
+        def source():
+            nonlocal num_conversions
+            num_conversions += 1
+            return safetensors_weights_iterator([path])
+
+        for _ in range(2):
+            loaded = dict(
+                mmap_cache_weights_iterator(tmpdir, tmpdir, cache_folder,
+                                            [path], source))
+            assert loaded.keys() == state_dict.keys()
+            for name, tensor in state_dict.items():
+                assert torch.equal(loaded[name], tensor)
+        # The second load maps the existing cache.
+        assert num_conversions == 1
+
+        # Changing the checkpoint invalidates the cache.
+        state_dict["a"] = torch.randn(3, 5).half()
+        save_file(state_dict, path)
+        loaded = dict(
+            mmap_cache_weights_iterator(tmpdir, tmpdir, cache_folder, [path],
+                                        source))
+        assert num_conversions == 2
+        assert torch.equal(loaded["a"], state_dict["a"])
+
+
 if __name__ == "__main__":
     test_hf_transfer_auto_activation()
     test_download_weights_from_hf()
+    test_mmap_safetensors_file()
+    test_multi_thread_safetensors_weights_iterator()
+    test_iterate_shards_concurrently_bounds_pending_shards()
+    test_mmap_cache_weights_iterator()
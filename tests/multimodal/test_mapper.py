@@ -1,9 +1,11 @@
 import numpy as np
 import pytest
+import torch
 from transformers import CLIPImageProcessor, LlavaNextImageProcessor
 
 from vllm.config import ModelConfig
-from vllm.multimodal import MULTIMODAL_REGISTRY
+from vllm.model_executor.models.utils import get_vision_embeddings
+from vllm.multimodal import MULTIMODAL_REGISTRY, MultiModalInputs
 from vllm.multimodal.utils import rescale_image_size
 
 
@@ -83,3 +85,38 @@ def test_llava_next_image_processor(image_assets, dtype, size_factor):
 
             assert hf_arr.shape == vllm_arr.shape, f"Failed for key={key}"
             assert np.allclose(hf_arr, vllm_arr), f"Failed for key={key}"
+
+
+def test_batch_mixed_pixel_values_and_embeddings():
+    pixel_values = [torch.rand(1, 3, 8, 8) for _ in range(2)]
+    image_embeds = torch.rand(1, 4, 16)
+
+    batched = MultiModalInputs.batch([
+        MultiModalInputs({"pixel_values": pixel_values[0]}),
+        MultiModalInputs({"image_embeds": image_embeds}),
+        MultiModalInputs({"pixel_values": pixel_values[1]}),
+    ])
+
+    assert batched.keys() == {"pixel_values", "image_embeds"}
+    assert batched["pixel_values"][1] is None
+    assert batched["image_embeds"][0] is None
+    assert batched["image_embeds"][2] is None
+
+    # The images given by pixel values are embedded together, and the
+    # embeddings of the batch are in order.
+    def embed_pixel_inputs(pixel_values=None):
+        assert pixel_values.shape == (2, 3, 8, 8)
+        return pixel_values.flatten(1)[:, :64].view(2, 4, 16)
+
+    vision_embeddings = get_vision_embeddings(
+        batched,
+        pixel_input_keys=("pixel_values", ),
+        embed_pixel_inputs=embed_pixel_inputs,
+        embed_dim=16,
+    )
+
+    assert len(vision_embeddings) == 3
+    for i in (0, 2):
+        assert torch.equal(vision_embeddings[i],
+                           pixel_values[i // 2].flatten()[:64].view(4, 16))
+    assert torch.equal(vision_embeddings[1], image_embeds[0])
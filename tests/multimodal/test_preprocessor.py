@@ -0,0 +1,84 @@
+import pytest
+import torch
+from PIL import Image
+
+from vllm.config import ModelConfig
+from vllm.multimodal import MULTIMODAL_REGISTRY, MultiModalInputs
+from vllm.multimodal.preprocessor import (MultiModalInputsCache,
+                                          MultiModalPreprocessor,
+                                          hash_multimodal_data)
+from vllm.multimodal.utils import rescale_image_size
+
+
+def test_hash_multimodal_data():
+    image = Image.new("RGB", (4, 4), color=(255, 0, 0))
+
+    assert hash_multimodal_data(image) == hash_multimodal_data(image.copy())
+    assert hash_multimodal_data(image) != hash_multimodal_data(
+        Image.new("RGB", (4, 4), color=(0, 255, 0)))
+    # Same pixel data, different shape.
+    assert hash_multimodal_data(Image.new("RGB", (2, 8))) != \
+        hash_multimodal_data(Image.new("RGB", (8, 2)))
+    assert hash_multimodal_data([image, image]) != hash_multimodal_data(image)
+    assert hash_multimodal_data(torch.zeros(4)) is None
+
+
+def test_multimodal_inputs_cache_evicts_least_recently_used():
+    # Each entry holds 64 bytes.
+    cache = MultiModalInputsCache(max_bytes=128)
+    inputs = [
+        MultiModalInputs({"pixel_values": torch.zeros(16)}) for _ in range(3)
+    ]
+
+    cache.put(("image", b"0"), inputs[0])
+    cache.put(("image", b"1"), inputs[1])
+    assert cache.get(("image", b"0")) is inputs[0]
+    cache.put(("image", b"2"), inputs[2])
+
+    assert cache.get(("image", b"1")) is None
+    assert cache.get(("image", b"0")) is inputs[0]
+    assert cache.get(("image", b"2")) is inputs[2]
+    assert cache.num_bytes == 128
+
+    # Larger than the whole cache.
+    cache.put(("image", b"3"),
+              MultiModalInputs({"pixel_values": torch.zeros(64)}))
+    assert cache.get(("image", b"3")) is None
+    assert len(cache) == 2
+
+
+@pytest.mark.asyncio
+async def test_preprocessor_caches_mapped_images(image_assets):
+    MODEL_NAME = "llava-hf/llava-1.5-7b-hf"
+
+    model_config = ModelConfig(
+        model=MODEL_NAME,
+        tokenizer=MODEL_NAME,
+        tokenizer_mode="auto",
+        trust_remote_code=False,
+        seed=0,
+        dtype="half",
+        revision=None,
+    )
+    preprocessor = MultiModalPreprocessor(model_config)
+
+    for asset in image_assets:
+        image = rescale_image_size(asset.pil_image, 0.5)
+        expected = MULTIMODAL_REGISTRY.map_input(model_config,
+                                                 {"image": image})
+
+        mapped = await preprocessor.map_input_async({"image": image})
+        assert isinstance(mapped["image"], MultiModalInputs)
+        assert torch.equal(mapped["image"]["pixel_values"],
+                           expected["pixel_values"])
+
+        # The same image is mapped once, and the model runner passes the
+        # mapped inputs through as is.
+        assert preprocessor.map_input({"image": image.copy()
+                                       })["image"] is mapped["image"]
+        assert torch.equal(
+            MULTIMODAL_REGISTRY.map_input(model_config,
+                                          mapped)["pixel_values"],
+            expected["pixel_values"])
+
+    assert len(preprocessor.cache) == len(image_assets)
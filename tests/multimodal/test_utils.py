@@ -5,9 +5,12 @@ from typing import Dict, Tuple
 
 import numpy as np
 import pytest
+import torch
 from PIL import Image
 
-from vllm.multimodal.utils import async_fetch_image, fetch_image
+from vllm.multimodal.utils import (async_fetch_image,
+                                   encode_image_embeds_base64, fetch_image,
+                                   load_image_embeds_from_base64)
 
 # Test different image extensions (JPG/PNG) and formats (gray/RGB/RGBA)
 TEST_IMAGE_URLS = [
@@ -80,3 +83,16 @@ async def test_fetch_image_base64(url_images: Dict[str, Image.Image],
 
         data_image_async = await async_fetch_image(data_url)
         assert _image_equals(data_image_sync, data_image_async)
+
+
+def test_image_embeds_base64_roundtrip():
+    image_embeds = torch.randn(576, 64)
+
+    encoded = encode_image_embeds_base64(image_embeds)
+    decoded = load_image_embeds_from_base64(encoded, [576, 64])
+
+    assert decoded.dtype == torch.float16
+    assert torch.equal(decoded, image_embeds.to(torch.float16))
+
+    with pytest.raises(ValueError):
+        load_image_embeds_from_base64(encoded, [576, 32])
@@ -3,14 +3,16 @@ import random
 from typing import Dict, List, Optional, Tuple
 from unittest.mock import Mock, patch
 
+import numpy as np
 import pytest
 import torch
 from transformers import GenerationConfig, GenerationMixin
 
-from vllm.model_executor.layers.sampler import Sampler
+from vllm.model_executor.layers.sampler import Sampler, _get_columnar_logprobs
 from vllm.model_executor.sampling_metadata import SamplingMetadata
 from vllm.model_executor.utils import set_random_seed
-from vllm.sequence import SamplingParams, SequenceData, SequenceGroupMetadata
+from vllm.sequence import (Logprob, SamplingParams, SequenceData,
+                           SequenceGroupMetadata)
 from vllm.utils import Counter, is_pin_memory_available
 
 
@@ -728,3 +730,28 @@ def test_sampler_include_gpu_probs_tensor(device: str):
     assert sampler_output.sampled_token_probs is not None
     assert sampler_output.logprobs is not None
     assert sampler_output.sampled_token_ids is not None
+
+
+def test_get_columnar_logprobs():
+    token_ids = np.array([3, 7])
+    token_logprobs = np.array([-0.5, -3.0], dtype=np.float32)
+    token_ranks = np.array([2, 9])
+    top_token_ids = np.array([[1, 3], [2, 4]])
+    top_logprobs = np.array([[-0.25, -0.5], [-1.0, -2.0]], dtype=np.float32)
+
+    logprobs = _get_columnar_logprobs(token_ids, token_logprobs, token_ranks,
+                                      top_token_ids, top_logprobs)
+
+    # The same as the dicts of the token updated with the top tokens.
+    assert list(logprobs) == [
+        {
+            3: Logprob(-0.5, rank=2),
+            1: Logprob(-0.25, rank=1)
+        },
+        {
+            7: Logprob(-3.0, rank=9),
+            2: Logprob(-1.0, rank=1),
+            4: Logprob(-2.0, rank=2)
+        },
+    ]
+    assert list(logprobs[0]) == [3, 1]
@@ -0,0 +1,143 @@
+import random
+from typing import List
+from unittest.mock import MagicMock
+
+import pytest
+import torch
+
+from vllm.sampling_params import SamplingParams
+from vllm.sequence import SequenceGroupMetadata
+from vllm.spec_decode.adaptive_proposal_len import (
+    AdaptiveProposalLenController, expected_num_tokens)
+from vllm.spec_decode.interfaces import SpeculativeProposals
+from vllm.spec_decode.spec_decode_worker import SpecDecodeWorker
+
+
+def _create_seq_group_metadata_list(
+        batch_size: int,
+        temperature: float = 0.0) -> List[SequenceGroupMetadata]:
+    return [
+        SequenceGroupMetadata(
+            request_id=str(i),
+            is_prompt=False,
+            seq_data={
+                i: MagicMock(),
+            },
+            sampling_params=SamplingParams(temperature=temperature),
+            block_tables={
+                i: MagicMock(),
+            },
+            lora_request=None,
+        ) for i in range(batch_size)
+    ]
+
+
+def _run_steps(controller: AdaptiveProposalLenController,
+               seq_group_metadata_list: List[SequenceGroupMetadata],
+               acceptance_rates: List[float], num_steps: int,
+               draft_time_per_step_ms: float, fixed_scoring_time_ms: float,
+               scoring_time_per_token_ms: float) -> List[int]:
+    rng = random.Random(0)
+    proposal_lens: List[int] = []
+    for _ in range(num_steps):
+        proposal_lens = controller.get_proposal_lens(seq_group_metadata_list)
+        num_accepted_tokens = []
+        for rate, proposal_len in zip(acceptance_rates, proposal_lens):
+            num_accepted = 0
+            while num_accepted < proposal_len and rng.random() < rate:
+                num_accepted += 1
+            num_accepted_tokens.append(num_accepted)
+        num_scored_tokens = len(proposal_lens) + sum(proposal_lens)
+        controller.observe(
+            seq_group_metadata_list,
+            proposal_lens,
+            num_accepted_tokens,
+            draft_time_per_step_ms=draft_time_per_step_ms,
+            # Jitter the time so that the cost model sees some variance.
+            scoring_time_ms=fixed_scoring_time_ms +
+            scoring_time_per_token_ms * num_scored_tokens + rng.random())
+    return proposal_lens
+
+
+def test_expected_num_tokens():
+    assert expected_num_tokens(0.5, 0) == pytest.approx(1.0)
+    assert expected_num_tokens(0.5, 2) == pytest.approx(1.75)
+    assert expected_num_tokens(1.0, 3) == pytest.approx(4.0)
+
+
+def test_full_proposal_len_during_warmup():
+    """Before any step is timed, every sequence gets the full length.
+    """
+    controller = AdaptiveProposalLenController(max_proposal_len=4)
+    seq_group_metadata_list = _create_seq_group_metadata_list(3)
+    assert controller.get_proposal_lens(seq_group_metadata_list) == [4, 4, 4]
+
+
+def test_proposal_len_follows_acceptance_rate():
+    """Sequences whose proposals are rarely accepted get shorter proposals
+    than sequences whose proposals are usually accepted.
+    """
+    k = 5
+    controller = AdaptiveProposalLenController(max_proposal_len=k)
+    seq_group_metadata_list = _create_seq_group_metadata_list(8)
+    acceptance_rates = [0.95] * 4 + [0.1] * 4
+    proposal_lens = _run_steps(controller,
+                               seq_group_metadata_list,
+                               acceptance_rates,
+                               num_steps=50,
+                               draft_time_per_step_ms=1.0,
+                               fixed_scoring_time_ms=10.0,
+                               scoring_time_per_token_ms=0.5)
+
+    assert min(proposal_lens[:4]) > max(proposal_lens[4:])
+    assert all(0 <= proposal_len <= k for proposal_len in proposal_lens)
+    assert controller.get_acceptance_rate(0) > controller.get_acceptance_rate(
+        7)
+
+
+def test_no_speculation_when_scoring_is_expensive():
+    """When draft tokens are never accepted and every scored token costs a
+    lot, no sequence is speculated on.
+    """
+    controller = AdaptiveProposalLenController(max_proposal_len=4,
+                                               proposer_keeps_state=False)
+    seq_group_metadata_list = _create_seq_group_metadata_list(4)
+    proposal_lens = _run_steps(controller,
+                               seq_group_metadata_list, [0.0] * 4,
+                               num_steps=20,
+                               draft_time_per_step_ms=5.0,
+                               fixed_scoring_time_ms=10.0,
+                               scoring_time_per_token_ms=2.0)
+    assert proposal_lens == [0, 0, 0, 0]
+
+
+def test_free_seqs():
+    controller = AdaptiveProposalLenController(max_proposal_len=2)
+    seq_group_metadata_list = _create_seq_group_metadata_list(2)
+    controller.observe(seq_group_metadata_list, [2, 2], [1, 2],
+                       draft_time_per_step_ms=1.0,
+                       scoring_time_ms=10.0)
+    assert controller.get_acceptance_rate(0) is not None
+
+    controller.free_seqs([0])
+    assert controller.get_acceptance_rate(0) is None
+    assert controller.get_acceptance_rate(1) is not None
+
+
+def test_truncate_proposals():
+    """Proposals are cut to the picked length and padded with -1.
+    """
+    proposals = SpeculativeProposals(
+        proposal_token_ids=torch.arange(1, 13).reshape(3, 4),
+        proposal_probs=torch.rand(3, 4, 8),
+        proposal_lens=torch.tensor([4, 4, 0]),
+    )
+    truncated = SpecDecodeWorker._truncate_proposals(proposals, [2, 0, 3])
+
+    assert truncated.proposal_lens.tolist() == [2, 0, 0]
+    assert truncated.proposal_token_ids.tolist() == [
+        [1, 2, -1, -1],
+        [-1, -1, -1, -1],
+        [-1, -1, -1, -1],
+    ]
+    assert truncated.proposal_probs is proposals.proposal_probs
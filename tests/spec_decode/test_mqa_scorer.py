@@ -0,0 +1,258 @@
+import pytest
+import torch
+
+from vllm.model_executor.utils import set_random_seed
+from vllm.sampling_params import SamplingParams
+from vllm.sequence import ExecuteModelRequest
+from vllm.spec_decode.batch_expansion import (DEFAULT_SIMPLE_SAMPLING_PARAMS,
+                                              BatchExpansionTop1Scorer)
+from vllm.spec_decode.interfaces import SpeculativeProposals
+from vllm.spec_decode.mqa_scorer import MQAScorer
+from vllm.spec_decode.target_model_runner import TargetModelRunner
+from vllm.worker.worker import Worker
+
+from .utils import (create_batch, create_seq_group_metadata_from_prompts,
+                    create_worker, mock_worker)
+
+
+@pytest.mark.parametrize('k', [1, 2, 6])
+@pytest.mark.skip_global_cleanup
+def test_create_multi_token_seq_group_metadata(k: int):
+    """Verify the scoring sequence holds the proposal tokens and schedules the
+    last token and all proposal tokens as one query.
+    """
+    prompt_tokens = [1, 2, 3]
+    prev_output_tokens = [4, 5, 6]
+    token_ids = list(range(k))
+    final_seq_len = len(prompt_tokens) + len(prev_output_tokens) + k
+
+    block_size = 32
+    input_seq_group_metadata = create_seq_group_metadata_from_prompts(
+        [prompt_tokens], 2048 // block_size, block_size, [final_seq_len],
+        [prev_output_tokens])[0]
+    input_seq_id = list(input_seq_group_metadata.seq_data.keys())[0]
+    target_seq_id = 100
+
+    output = MQAScorer._create_multi_token_seq_group_metadata(  # pylint: disable=protected-access
+        input_seq_group_metadata,
+        target_seq_id,
+        token_ids,
+        token_chunk_size=k + 1,
+        sampling_params=input_seq_group_metadata.sampling_params)
+
+    assert output.request_id == input_seq_group_metadata.request_id
+    assert not output.is_prompt
+    assert output.token_chunk_size == k + 1
+    assert list(output.seq_data.keys()) == [target_seq_id]
+    seq_data = output.seq_data[target_seq_id]
+    assert seq_data.get_prompt_token_ids() == tuple(prompt_tokens)
+    assert seq_data.get_output_token_ids() == tuple(prev_output_tokens +
+                                                    token_ids)
+    assert seq_data.get_num_computed_tokens() == final_seq_len - k - 1
+    assert output.block_tables[
+        target_seq_id] == input_seq_group_metadata.block_tables[input_seq_id]
+
+
+@pytest.mark.parametrize('k', [1, 3])
+@pytest.mark.skip_global_cleanup
+def test_mqa_scorer_creates_one_seq_group_per_seq(k: int):
+    """The scoring batch has one sequence group per input sequence, with the
+    speculative sequences first.
+    """
+    batch_size = 4
+    worker = mock_worker()
+    scorer = MQAScorer(worker, 'cuda:0', 32_000)
+    seq_group_metadata_list, _, _ = create_batch(batch_size, k)
+    proposal_lens = torch.tensor([k, 0, k, 0])
+
+    proposals = SpeculativeProposals(
+        proposal_token_ids=torch.randint(0, 100, (batch_size, k)),
+        proposal_probs=torch.rand(batch_size, k, 32_000),
+        proposal_lens=proposal_lens,
+    )
+    # Stop after the scoring batch is created.
+    worker.execute_model.side_effect = RuntimeError
+    with pytest.raises(RuntimeError):
+        scorer.score_proposals(
+            ExecuteModelRequest(
+                seq_group_metadata_list=seq_group_metadata_list,
+                num_lookahead_slots=k), proposals)
+
+    execute_model_req = worker.execute_model.call_args.kwargs[
+        "execute_model_req"]
+    target_seq_group_metadata_list = (
+        execute_model_req.seq_group_metadata_list)
+    assert len(target_seq_group_metadata_list) == batch_size
+    assert [
+        seq_group_metadata.request_id
+        for seq_group_metadata in target_seq_group_metadata_list
+    ] == ["0", "2", "1", "3"]
+    assert [
+        seq_group_metadata.token_chunk_size
+        for seq_group_metadata in target_seq_group_metadata_list
+    ] == [k + 1, k + 1, 1, 1]
+
+
+@pytest.mark.parametrize('k', [1, 3])
+@pytest.mark.skip_global_cleanup
+def test_mqa_scorer_samples_only_bonus_token_with_seq_params(k: int):
+    """As in batch expansion, a non-greedy sequence only samples its bonus
+    token with its own sampling parameters.
+    """
+    batch_size = 2
+    worker = mock_worker()
+    scorer = MQAScorer(worker, 'cuda:0', 32_000)
+    seq_group_metadata_list, _, _ = create_batch(batch_size, k)
+    sampling_params = SamplingParams(temperature=1.0, seed=0)
+    for seq_group_metadata in seq_group_metadata_list:
+        seq_group_metadata.sampling_params = sampling_params
+
+    proposals = SpeculativeProposals(
+        proposal_token_ids=torch.randint(0, 100, (batch_size, k)),
+        proposal_probs=torch.rand(batch_size, k, 32_000),
+        proposal_lens=torch.tensor([k, 0]),
+    )
+    # Stop after the scoring batch is created.
+    worker.execute_model.side_effect = RuntimeError
+    with pytest.raises(RuntimeError):
+        scorer.score_proposals(
+            ExecuteModelRequest(
+                seq_group_metadata_list=seq_group_metadata_list,
+                num_lookahead_slots=k), proposals)
+
+    execute_model_req = worker.execute_model.call_args.kwargs[
+        "execute_model_req"]
+    target_seq_group_metadata_list = (
+        execute_model_req.seq_group_metadata_list)
+    assert [
+        seq_group_metadata.token_chunk_size
+        for seq_group_metadata in target_seq_group_metadata_list
+    ] == [k, 1, 1]
+    assert [
+        seq_group_metadata.sampling_params
+        for seq_group_metadata in target_seq_group_metadata_list
+    ] == [DEFAULT_SIMPLE_SAMPLING_PARAMS, sampling_params, sampling_params]
+
+
+@pytest.mark.parametrize('model_name', ['JackFram/llama-68m'])
+@pytest.mark.parametrize('batch_size', [1, 8])
+@pytest.mark.parametrize('k', [1, 4])
+@torch.inference_mode()
+def test_mqa_scorer_matches_batch_expansion(model_name: str, batch_size: int,
+                                            k: int):
+    """Verify the MQA scorer produces the same greedy tokens as batch
+    expansion, including for sequences without proposals.
+    """
+    block_size = 16
+    num_gpu_blocks = 2048 // block_size
+    scorer_worker = create_worker(Worker,
+                                  model_name,
+                                  block_size,
+                                  num_gpu_blocks,
+                                  seed=0,
+                                  model_runner_cls=TargetModelRunner)
+    scorer_worker.model_runner.model.sampler.include_gpu_probs_tensor = True
+    scorer_worker.model_runner.model.sampler.\
+        should_modify_greedy_probs_inplace = True
+    if scorer_worker.model_runner.attn_backend.get_name() != "flash-attn":
+        pytest.skip("The MQA scorer requires the flash-attn backend.")
+
+    vocab_size = scorer_worker.vocab_size
+    seq_group_metadata_list, _, _ = create_batch(batch_size,
+                                                 k,
+                                                 block_size=block_size,
+                                                 num_gpu_blocks=num_gpu_blocks)
+    proposal_lens = torch.tensor(
+        [k if i % 2 == 0 else 0 for i in range(batch_size)], device='cuda')
+    proposals = SpeculativeProposals(
+        proposal_token_ids=torch.randint(low=0,
+                                         high=vocab_size,
+                                         size=(batch_size, k),
+                                         device='cuda'),
+        proposal_probs=torch.rand(batch_size, k, vocab_size, device='cuda'),
+        proposal_lens=proposal_lens,
+    )
+
+    def score(scorer_cls):
+        scorer = scorer_cls(scorer_worker, 'cuda:0', vocab_size)
+        return scorer.score_proposals(
+            ExecuteModelRequest(
+                seq_group_metadata_list=seq_group_metadata_list,
+                num_lookahead_slots=k), proposals)
+
+    batch_expansion_scores = score(BatchExpansionTop1Scorer)
+    mqa_scores = score(MQAScorer)
+
+    assert torch.equal(batch_expansion_scores.token_ids, mqa_scores.token_ids)
+    assert torch.allclose(batch_expansion_scores.probs,
+                          mqa_scores.probs,
+                          atol=1e-3)
+
+
+@pytest.mark.parametrize('model_name', ['JackFram/llama-68m'])
+@pytest.mark.parametrize('batch_size', [1, 8])
+@pytest.mark.parametrize('k', [1, 4])
+@torch.inference_mode()
+def test_mqa_scorer_matches_batch_expansion_seeded(model_name: str,
+                                                   batch_size: int, k: int):
+    """Verify the MQA scorer samples the same bonus tokens as batch expansion
+    for seeded requests, i.e. it advances the per-request generators the same
+    way.
+    """
+    block_size = 16
+    num_gpu_blocks = 2048 // block_size
+    scorer_worker = create_worker(Worker,
+                                  model_name,
+                                  block_size,
+                                  num_gpu_blocks,
+                                  seed=0,
+                                  model_runner_cls=TargetModelRunner)
+    scorer_worker.model_runner.model.sampler.include_gpu_probs_tensor = True
+    if scorer_worker.model_runner.attn_backend.get_name() != "flash-attn":
+        pytest.skip("The MQA scorer requires the flash-attn backend.")
+
+    vocab_size = scorer_worker.vocab_size
+    seq_group_metadata_list, _, _ = create_batch(batch_size,
+                                                 k,
+                                                 block_size=block_size,
+                                                 num_gpu_blocks=num_gpu_blocks)
+    for i, seq_group_metadata in enumerate(seq_group_metadata_list):
+        seq_group_metadata.sampling_params = SamplingParams(temperature=1.0,
+                                                            seed=i)
+    proposal_lens = torch.tensor(
+        [k if i % 2 == 0 else 0 for i in range(batch_size)], device='cuda')
+    proposals = SpeculativeProposals(
+        proposal_token_ids=torch.randint(low=0,
+                                         high=vocab_size,
+                                         size=(batch_size, k),
+                                         device='cuda'),
+        proposal_probs=torch.rand(batch_size, k, vocab_size, device='cuda'),
+        proposal_lens=proposal_lens,
+    )
+
+    def score(scorer_cls):
+        # Start both scorers from the same generator states.
+        set_random_seed(0)
+        generators = scorer_worker.model_runner.generators
+        for i, seq_group_metadata in enumerate(seq_group_metadata_list):
+            generators[seq_group_metadata.request_id] = torch.Generator(
+                device='cuda').manual_seed(i)
+        scorer = scorer_cls(scorer_worker, 'cuda:0', vocab_size)
+        scores = scorer.score_proposals(
+            ExecuteModelRequest(
+                seq_group_metadata_list=seq_group_metadata_list,
+                num_lookahead_slots=k), proposals)
+        generator_states = [
+            generators[seq_group_metadata.request_id].get_state()
+            for seq_group_metadata in seq_group_metadata_list
+        ]
+        return scores, generator_states
+
+    batch_expansion_scores, batch_expansion_states = score(
+        BatchExpansionTop1Scorer)
+    mqa_scores, mqa_states = score(MQAScorer)
+
+    assert torch.equal(batch_expansion_scores.token_ids, mqa_scores.token_ids)
+    for batch_expansion_state, mqa_state in zip(batch_expansion_states,
+                                                mqa_states):
+        assert torch.equal(batch_expansion_state, mqa_state)
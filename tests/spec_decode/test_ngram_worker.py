@@ -1,7 +1,8 @@
 import torch
 
 from vllm.sequence import ExecuteModelRequest
-from vllm.spec_decode.ngram_worker import NGramWorker
+from vllm.spec_decode.ngram_worker import (NGramWorker,
+                                           SuffixAutomatonNGramWorker)
 from vllm.spec_decode.top1_proposer import Top1Proposer
 
 from .utils import create_seq_group_metadata_from_prompts, create_worker
@@ -211,3 +212,71 @@ def test_ngram_algo_correctness_for_batches_match_all():
         assert proposals.proposal_token_ids[0][i] == prompts[0][i + 1]
         assert proposals.proposal_token_ids[1][i] == prompts[1][i + 3]
         assert proposals.proposal_token_ids[2][i] == prompts[2][i + 5]
+
+
+def test_suffix_automaton_ngram_worker():
+    """Verify the suffix automaton worker drafts from the longest earlier
+    match of each sequence, pads short drafts and keeps its index up to date
+    as sequences grow.
+    """
+    block_size = 32
+    num_gpu_blocks = 2048 // block_size
+    seed = 100
+    model_name = 'JackFram/llama-68m'
+    vocab_size = 32_000
+    device = 'cuda:0'
+
+    ngram_worker = create_worker(
+        SuffixAutomatonNGramWorker,
+        model_name,
+        block_size,
+        num_gpu_blocks,
+        seed,
+    )
+
+    proposer = Top1Proposer(
+        worker=ngram_worker,
+        device=device,
+        vocab_size=vocab_size,
+        max_proposal_len=20,
+    )
+    ngram_worker.set_ngram_window_size(1, 3)
+
+    prompts = [
+        # "4 5 6" occurs earlier, followed by 7 8 9 10.
+        [1, 4, 5, 6, 7, 8, 9, 10, 2, 4, 5, 6],
+        # Shall find no candidate.
+        [11, 12, 13, 14],
+        # Only two tokens follow the match; the draft is padded with -1.
+        [21, 22, 23, 24, 23],
+    ]
+    proposal_len = 3
+    final_prompt_lens = [len(prompt) + proposal_len + 1 for prompt in prompts]
+    seq_group_metadata_list = create_seq_group_metadata_from_prompts(
+        prompts,
+        num_gpu_blocks,
+        block_size,
+        final_prompt_lens=final_prompt_lens)
+
+    proposals = proposer.get_spec_proposals(
+        execute_model_req=ExecuteModelRequest(
+            seq_group_metadata_list=seq_group_metadata_list,
+            num_lookahead_slots=proposal_len),
+        seq_ids_with_bonus_token_in_last_step=None)
+
+    assert proposals.proposal_lens.tolist() == [proposal_len, 0, 2]
+    assert proposals.proposal_token_ids[0].tolist() == [7, 8, 9]
+    assert proposals.proposal_token_ids[2].tolist() == [24, 23, -1]
+    assert not proposals.proposal_probs[2][2].any()
+
+    # Append tokens to the second sequence so that it repeats itself.
+    seq_data = seq_group_metadata_list[1].seq_data[1]
+    seq_data.append_token_id(11, 0.0)
+    seq_data.append_token_id(12, 0.0)
+    proposals = proposer.get_spec_proposals(
+        execute_model_req=ExecuteModelRequest(
+            seq_group_metadata_list=seq_group_metadata_list[1:2],
+            num_lookahead_slots=proposal_len),
+        seq_ids_with_bonus_token_in_last_step=None)
+    assert proposals.proposal_lens.tolist() == [proposal_len]
+    assert proposals.proposal_token_ids[0].tolist() == [13, 14, 11]
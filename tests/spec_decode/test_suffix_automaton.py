@@ -0,0 +1,77 @@
+import random
+from typing import List, Tuple
+
+import pytest
+
+from vllm.spec_decode.suffix_automaton import (RecentOutputIndex,
+                                               SequenceSuffixIndex,
+                                               SuffixAutomaton)
+
+
+def _brute_force_longest_repeated_suffix(
+        token_ids: List[int]) -> Tuple[int, int]:
+    best_len, best_start = 0, 0
+    for length in range(1, len(token_ids)):
+        suffix = token_ids[-length:]
+        for end in range(length - 1, len(token_ids) - 1):
+            if token_ids[end - length + 1:end + 1] == suffix:
+                best_len, best_start = length, end + 1
+                break
+    return best_len, best_start
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_longest_repeated_suffix(seed: int):
+    rng = random.Random(seed)
+    token_ids = [rng.randrange(3) for _ in range(60)]
+    automaton = SuffixAutomaton()
+    for i, token_id in enumerate(token_ids):
+        automaton.extend([token_id])
+        assert automaton.longest_repeated_suffix(
+        ) == _brute_force_longest_repeated_suffix(token_ids[:i + 1])
+
+
+def test_sequence_index_is_incremental():
+    index = SequenceSuffixIndex(num_prompt_tokens=4)
+    token_ids = [1, 2, 3, 4]
+    index.update(token_ids, corpus=None)
+    assert index.propose(None, min_match_len=1, num_tokens=3) is None
+
+    token_ids += [1, 2]
+    index.update(token_ids, corpus=None)
+    assert len(index.automaton) == 6
+    assert index.propose(None, min_match_len=1, num_tokens=3) == [3, 4, 1]
+    # The match is too short.
+    assert index.propose(None, min_match_len=3, num_tokens=3) is None
+
+
+def test_draft_from_recent_outputs():
+    corpus = RecentOutputIndex(max_tokens=1000)
+    corpus.add([5, 6, 7, 8, 9])
+    corpus.add([30, 31, 32])
+
+    index = SequenceSuffixIndex(num_prompt_tokens=3)
+    token_ids = [40, 41, 6, 7]
+    index.update(token_ids, corpus)
+    # The draft stops at the end of the matched output.
+    assert index.propose(corpus, min_match_len=2, num_tokens=5) == [8, 9]
+
+    # Adding an output invalidates the match; it is recomputed on update.
+    corpus.add([7, 100, 101])
+    token_ids.append(8)
+    index.update(token_ids, corpus)
+    assert index.propose(corpus, min_match_len=2, num_tokens=5) == [9]
+
+    # Without the corpus, there is no match.
+    assert index.propose(None, min_match_len=2, num_tokens=5) is None
+
+
+def test_recent_outputs_are_bounded():
+    corpus = RecentOutputIndex(max_tokens=20)
+    for i in range(10):
+        corpus.add([i] * 5)
+        assert len(corpus.automaton) <= 20
+    # The most recent output is always kept.
+    index = SequenceSuffixIndex(num_prompt_tokens=0)
+    index.update([9, 9], corpus)
+    assert index.propose(corpus, min_match_len=2, num_tokens=2) == [9, 9]
@@ -7,7 +7,7 @@ from typing import List, Optional
 import pytest
 
 from vllm.lora.request import LoRARequest
-from vllm.sequence import Sequence
+from vllm.sequence import Logprob, Sequence
 from vllm.transformers_utils.tokenizer_group import TokenizerGroup
 
 # Make two prefixes with different first blocks.
@@ -97,3 +97,36 @@ def test_auto_prefix_caching(model: str, block_size: int, max_num_seqs: int,
         different_hashes = [h[-1] for h in hash_pref]
         assert (len(set(same_hashes)) == 1)
         assert (len(set(different_hashes)) == len(different_hashes))
+
+
+@pytest.mark.parametrize("block_size", [2, 4, 16])
+def test_block_hashes_are_incremental(block_size: int):
+    """Hashing the blocks of a sequence while it grows, as the block manager
+    does, gives the same hashes as hashing the blocks of the full sequence."""
+    prompt_token_ids = list(range(3 * block_size + 1))
+    output_token_ids = list(range(100, 100 + 2 * block_size))
+
+    def make_seq(seq_id: int) -> Sequence:
+        return Sequence(seq_id,
+                        inputs={"prompt_token_ids": prompt_token_ids},
+                        block_size=block_size)
+
+    growing_seq = make_seq(0)
+    partial_block_hash = growing_seq.hash_of_block(growing_seq.n_blocks - 1)
+    for token_id in output_token_ids:
+        growing_seq.append_token_id(token_id, {token_id: Logprob(0.0)})
+        growing_seq.hash_of_block(growing_seq.n_blocks - 1)
+
+    full_seq = make_seq(1)
+    for token_id in output_token_ids:
+        full_seq.append_token_id(token_id, {token_id: Logprob(0.0)})
+    num_blocks = full_seq.get_len() // block_size
+    # Hash the last block first, which hashes all blocks before it.
+    full_hashes = [
+        full_seq.hash_of_block(idx) for idx in reversed(range(num_blocks))
+    ][::-1]
+
+    assert [growing_seq.hash_of_block(idx)
+            for idx in range(num_blocks)] == full_hashes
+    # The partially filled block was not cached.
+    assert partial_block_hash != full_hashes[3]
@@ -1,7 +1,9 @@
+import numpy as np
 import pytest
 
-from vllm.sequence import (CompletionSequenceGroupOutput, SamplerOutput,
-                           SequenceData, SequenceOutput)
+from vllm.sequence import (CompletionSequenceGroupOutput, Logprob,
+                           SamplerOutput, SequenceData, SequenceLogprobs,
+                           SequenceOutput)
 
 from .core.utils import create_dummy_prompt
 
@@ -74,6 +76,104 @@ def test_sequence_data_prefill():
     assert seq_data.get_num_computed_tokens() == 0
 
 
+def test_sequence_data_token_ids():
+    seq_data = SequenceData(prompt_token_ids=[1, 2, 3], output_token_ids=[4])
+    seq_data.append_token_id(5, logprob=-1.0)
+    assert seq_data.get_token_ids() == [1, 2, 3, 4, 5]
+    assert list(seq_data.get_token_ids_array()) == [1, 2, 3, 4, 5]
+    assert seq_data.prompt_token_ids == (1, 2, 3)
+    assert seq_data.output_token_ids == (4, 5)
+    assert seq_data.get_last_token_id() == 5
+    assert seq_data.get_prefix_token_ids(4) == ((1, 2, 3), (4, ))
+    assert seq_data.get_prefix_token_ids(2) == ((1, 2), None)
+
+    seq_data.output_token_ids = [6]
+    assert seq_data.get_token_ids() == [1, 2, 3, 6]
+    assert seq_data.prompt_token_ids is seq_data.get_prompt_token_ids()
+    seq_data.prompt_token_ids = [7]
+    assert seq_data.get_token_ids() == [7, 6]
+    assert seq_data.prompt_token_ids == (7, )
+    assert seq_data.get_prompt_len() == 1
+    assert seq_data.get_output_len() == 1
+
+
+def test_sequence_logprobs():
+    logprobs = SequenceLogprobs()
+    logprobs.append({5: Logprob(-0.5, rank=1), 6: Logprob(-1.5, rank=2)})
+    snapshot = logprobs.snapshot()
+    logprobs.append({7: Logprob(-2.0)})
+
+    assert len(logprobs) == 2
+    assert logprobs[0] == {5: Logprob(-0.5, rank=1), 6: Logprob(-1.5, rank=2)}
+    assert logprobs[-1] == {7: Logprob(-2.0)}
+    assert logprobs[1:] == [{7: Logprob(-2.0)}]
+    with pytest.raises(IndexError):
+        logprobs[2]
+
+    logprobs.set_decoded_tokens(0, {6: "b"})
+    assert logprobs[0][6].decoded_token == "b"
+    assert logprobs[0][5].decoded_token is None
+
+    # Changes made to a materialized Logprob are kept.
+    logprobs[0][5].decoded_token = "a"
+    assert logprobs[0][5].decoded_token == "a"
+
+    # The snapshot does not see the positions appended after it was taken.
+    assert len(snapshot) == 1
+    assert list(snapshot) == [logprobs[0]]
+
+
+def test_sequence_logprobs_columns():
+    logprobs = SequenceLogprobs()
+    logprobs.append(None)
+    logprobs.extend(
+        SequenceLogprobs.from_columns(token_ids=np.array([5, 6, 7]),
+                                      logprobs=np.array([-0.5, -1.5, -2.0]),
+                                      ranks=np.array([1, 2, -1]),
+                                      num_candidates=np.array([2, 1])))
+    logprobs.extend([{8: Logprob(-0.25)}])
+
+    assert logprobs == [
+        None,
+        {
+            5: Logprob(-0.5, rank=1),
+            6: Logprob(-1.5, rank=2)
+        },
+        {
+            7: Logprob(-2.0)
+        },
+        {
+            8: Logprob(-0.25)
+        },
+    ]
+
+
+def test_sequence_logprobs_decoded_tokens():
+    logprobs = SequenceLogprobs()
+    logprobs.append(None)
+    logprobs.append({})
+    logprobs.extend(
+        SequenceLogprobs.from_columns(token_ids=np.array([5, 6, 7]),
+                                      logprobs=np.array([-0.5, -1.5, -2.0]),
+                                      ranks=np.array([1, 2, 3]),
+                                      num_candidates=np.array([3])))
+
+    # Empty positions keep their value.
+    assert logprobs.get_candidates(0) is None
+    assert logprobs.get_candidates(1) == []
+    assert logprobs[0] is None
+    assert logprobs[1] == {}
+
+    assert logprobs.get_candidates(2) == [(5, None), (6, None), (7, None)]
+    logprobs.set_decoded_tokens(2, {5: "a", 7: "c"})
+    assert logprobs.get_candidates(2) == [(5, "a"), (6, None), (7, "c")]
+    assert logprobs[2][7].decoded_token == "c"
+    logprobs.set_decoded_tokens(2, {6: "b"})
+    assert logprobs[2][6].decoded_token == "b"
+    with pytest.raises(KeyError):
+        logprobs.set_decoded_tokens(2, {8: "d"})
+
+
 def test_sequence_group_stage():
     _, seq_group = create_dummy_prompt("1", 12)
     assert seq_group.is_prefill() is True
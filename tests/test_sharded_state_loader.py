@@ -1,3 +1,4 @@
+import json
 import multiprocessing as mp
 import os
 import shutil
@@ -8,6 +9,8 @@ import torch
 from huggingface_hub import snapshot_download
 
 from vllm import LLM, SamplingParams
+from vllm.model_executor.layers.quantization.base_config import (
+    QuantizeMethodBase)
 from vllm.model_executor.model_loader.loader import ShardedStateLoader
 
 prompts = [
@@ -43,6 +46,113 @@ def test_filter_subtensors():
         assert tensor is state_dict[key]
 
 
+class _TinyModel(torch.nn.Module):
+
+    def __init__(self):
+        super().__init__()
+        self.embed = torch.nn.Embedding(8, 4)
+        self.proj = torch.nn.Linear(4, 6, bias=False)
+        self.head = torch.nn.Linear(4, 8, bias=False)
+        # Tied like lm_head and embed_tokens.
+        self.head.weight = self.embed.weight
+
+
+def test_save_and_load_indexed_state(monkeypatch):
+    import vllm.distributed
+    monkeypatch.setattr(vllm.distributed, "get_tensor_model_parallel_rank",
+                        lambda: 0)
+    monkeypatch.setattr(vllm.distributed,
+                        "get_tensor_model_parallel_world_size", lambda: 1)
+
+    src = _TinyModel()
+    # Emulate a quantization post-processing that changes the layout.
+    src.proj.weight = torch.nn.Parameter(src.proj.weight.data.half().t(),
+                                         requires_grad=False)
+    with TemporaryDirectory() as output_dir:
+        ShardedStateLoader.save_model(src, output_dir, max_size=64)
+        index_path = os.path.join(
+            output_dir, ShardedStateLoader.INDEX_PATTERN.format(rank=0))
+        with open(index_path) as f:
+            index = json.load(f)
+        assert index["views"]["head.weight"]["base"] == "embed.weight"
+
+        dst = _TinyModel()
+        ShardedStateLoader._load_indexed_state(dst, output_dir, index,
+                                               torch.device("cpu"))
+
+    assert dst.head.weight is dst.embed.weight
+    assert torch.equal(dst.embed.weight, src.embed.weight)
+    assert dst.proj.weight.dtype == torch.float16
+    assert dst.proj.weight.stride() == src.proj.weight.stride()
+    assert torch.equal(dst.proj.weight, src.proj.weight)
+
+
+class _RepackMethod(QuantizeMethodBase):
+    """Emulates a GPTQ-marlin like method: the post-processing repacks the
+    weight, which must not happen twice, and attaches runtime state that is
+    not part of the state dict."""
+
+    def create_weights(self, layer: torch.nn.Module, *weight_args,
+                       **extra_weight_attrs):
+        layer.qweight = torch.nn.Parameter(torch.randn(6, 4),
+                                           requires_grad=False)
+        layer.ready = False
+
+    def process_weights_after_loading(self, layer: torch.nn.Module) -> None:
+        assert not layer.ready
+        perm = torch.argsort(layer.qweight[:, 0])
+        layer.qweight = torch.nn.Parameter(layer.qweight[perm].t() * 2,
+                                           requires_grad=False)
+        layer.perm = perm
+        layer.scale = float(layer.qweight.abs().max())
+        layer.ready = True
+
+    def apply(self, layer: torch.nn.Module, x: torch.Tensor) -> torch.Tensor:
+        assert layer.ready
+        out = torch.empty(x.shape[0], 6)
+        out[:, layer.perm] = x @ layer.qweight / 2
+        return out * layer.scale
+
+
+class _TinyQuantModel(torch.nn.Module):
+
+    def __init__(self):
+        super().__init__()
+        self.proj = torch.nn.Module()
+        self.proj.quant_method = _RepackMethod()
+        self.proj.quant_method.create_weights(self.proj)
+
+
+def test_save_and_load_indexed_quantized_state(monkeypatch):
+    import vllm.distributed
+    monkeypatch.setattr(vllm.distributed, "get_tensor_model_parallel_rank",
+                        lambda: 0)
+    monkeypatch.setattr(vllm.distributed,
+                        "get_tensor_model_parallel_world_size", lambda: 1)
+
+    src = _TinyQuantModel()
+    weight = src.proj.qweight.clone()
+    src.proj.quant_method.process_weights_after_loading(src.proj)
+    with TemporaryDirectory() as output_dir:
+        ShardedStateLoader.save_model(src, output_dir)
+        index_path = os.path.join(
+            output_dir, ShardedStateLoader.INDEX_PATTERN.format(rank=0))
+        with open(index_path) as f:
+            index = json.load(f)
+
+        dst = _TinyQuantModel()
+        ShardedStateLoader._load_indexed_state(dst, output_dir, index,
+                                               torch.device("cpu"))
+
+    assert dst.proj.ready
+    assert torch.equal(dst.proj.qweight, src.proj.qweight)
+    assert torch.equal(dst.proj.perm, src.proj.perm)
+    assert dst.proj.scale == src.proj.scale
+    x = torch.randn(3, 4)
+    expected = x @ weight.t() * src.proj.scale
+    assert torch.allclose(dst.proj.quant_method.apply(dst.proj, x), expected)
+
+
 @pytest.fixture(scope="module")
 def llama_2_7b_files():
     with TemporaryDirectory() as cache_dir:
@@ -0,0 +1,36 @@
+import time
+
+from vllm import startup_profile
+from vllm.startup_profile import get_startup_profile, startup_phase
+
+
+def test_startup_phase_disabled(monkeypatch):
+    monkeypatch.delenv("VLLM_STARTUP_PROFILE", raising=False)
+    monkeypatch.setattr(startup_profile, "_phase_times", {})
+    with startup_phase("disabled"):
+        pass
+    assert get_startup_profile() == {}
+
+
+def test_nested_startup_phases(monkeypatch):
+    monkeypatch.setenv("VLLM_STARTUP_PROFILE", "1")
+    monkeypatch.setattr(startup_profile, "_phase_times", {})
+
+    with startup_phase("outer"):
+        time.sleep(0.02)
+        with startup_phase("inner"):
+            time.sleep(0.05)
+    with startup_phase("outer"):
+        time.sleep(0.02)
+
+    profile = get_startup_profile()
+    assert list(profile) == ["inner", "outer"]
+    assert profile["inner"] >= 0.05
+    # The nested phase is excluded from the enclosing one.
+    assert 0.04 <= profile["outer"] < 0.09
+
+
+def test_lazy_top_level_imports():
+    import vllm
+    assert set(vllm._LAZY_IMPORTS) <= set(vllm.__all__)
+    assert "SamplingParams" in dir(vllm)
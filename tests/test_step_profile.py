@@ -0,0 +1,62 @@
+import json
+import time
+
+import pytest
+
+from vllm import step_profile
+from vllm.step_profile import (pop_step_phase_times, record_step_phase,
+                               start_step_trace, stop_step_trace)
+
+
+def test_step_phases_disabled(monkeypatch):
+    monkeypatch.setattr(step_profile, "_enabled", False)
+    monkeypatch.setattr(step_profile, "_phase_times", {})
+    record_step_phase(step_profile.SCHEDULE, time.perf_counter())
+    assert pop_step_phase_times() == {}
+    with pytest.raises(RuntimeError):
+        start_step_trace()
+
+
+def test_step_phases_add_up(monkeypatch):
+    monkeypatch.setattr(step_profile, "_enabled", True)
+    monkeypatch.setattr(step_profile, "_phase_times", {})
+
+    for _ in range(2):
+        start = time.perf_counter()
+        time.sleep(0.01)
+        record_step_phase(step_profile.DETOKENIZE, start)
+    start = time.perf_counter()
+    record_step_phase(step_profile.SCHEDULE, start)
+
+    phase_times = pop_step_phase_times()
+    assert list(phase_times) == [
+        step_profile.DETOKENIZE, step_profile.SCHEDULE
+    ]
+    assert phase_times[step_profile.DETOKENIZE] >= 0.02
+    assert pop_step_phase_times() == {}
+
+
+def test_rolling_step_trace(monkeypatch, tmp_path):
+    monkeypatch.setattr(step_profile, "_enabled", True)
+    monkeypatch.setattr(step_profile, "_trace_events", None)
+    monkeypatch.setenv("VLLM_STEP_TRACE_DIR", str(tmp_path))
+
+    with pytest.raises(RuntimeError):
+        stop_step_trace()
+
+    start_step_trace(max_events=3)
+    for phase in (step_profile.SCHEDULE, step_profile.PREPARE_INPUT,
+                  step_profile.FORWARD, step_profile.SAMPLE):
+        record_step_phase(phase, time.perf_counter())
+    trace_path = stop_step_trace()
+
+    assert trace_path.startswith(str(tmp_path))
+    with open(trace_path) as f:
+        trace_events = json.load(f)["traceEvents"]
+    # Only the most recent events are kept.
+    assert [event["name"] for event in trace_events] == [
+        step_profile.PREPARE_INPUT, step_profile.FORWARD, step_profile.SAMPLE
+    ]
+    assert all(event["ph"] == "X" and event["dur"] >= 0
+               for event in trace_events)
+    assert not step_profile.is_step_trace_active()
@@ -0,0 +1,61 @@
+import pytest
+
+from vllm.sampling_params import SamplingParams
+from vllm.sequence import SequenceData, SequenceGroupMetadata
+from vllm.worker.cpu_model_runner import CPUInputTensorBuilder
+
+
+def _create_seq_group_metadata(request_id: str, is_prompt: bool, seq_len: int,
+                               block_table):
+    return SequenceGroupMetadata(
+        request_id=request_id,
+        is_prompt=is_prompt,
+        seq_data={0: SequenceData(list(range(100, 100 + seq_len)))},
+        sampling_params=SamplingParams(temperature=0),
+        block_tables={0: block_table},
+    )
+
+
+def test_build_prompt_with_sliding_window():
+    # The example of the sliding window mask: prompt len 10, sliding window 8
+    # and block size 4.
+    builder = CPUInputTensorBuilder(block_size=4, sliding_window=8)
+    seq_group_metadata_list = [
+        _create_seq_group_metadata("0", True, 10, [0, 1, 0]),
+        _create_seq_group_metadata("1", True, 3, [5]),
+    ]
+
+    (input_tokens, input_positions, slot_mapping,
+     seq_lens) = builder.build_prompt(seq_group_metadata_list)
+
+    assert seq_lens == [10, 3]
+    assert input_tokens.tolist() == list(range(100, 110)) + [100, 101, 102]
+    assert input_positions.tolist() == list(range(10)) + [0, 1, 2]
+    assert slot_mapping.tolist() == [-1, -1, 2, 3, 4, 5, 6, 7, 0, 1
+                                     ] + [20, 21, 22]
+
+
+@pytest.mark.parametrize("sliding_window", [None, 8])
+def test_build_decode(sliding_window):
+    builder = CPUInputTensorBuilder(block_size=4,
+                                    sliding_window=sliding_window)
+    # Build a larger batch first, so that the buffers are reused.
+    builder.build_prompt(
+        [_create_seq_group_metadata("0", True, 64, list(range(16)))])
+    seq_group_metadata_list = [
+        _create_seq_group_metadata("0", False, 10, [3, 7, 9]),
+        _create_seq_group_metadata("1", False, 4, [2]),
+    ]
+
+    (input_tokens, input_positions, slot_mapping, seq_lens,
+     block_tables) = builder.build_decode(seq_group_metadata_list)
+
+    assert input_tokens.tolist() == [109, 103]
+    assert input_positions.tolist() == [9, 3]
+    assert slot_mapping.tolist() == [9 * 4 + 1, 2 * 4 + 3]
+    if sliding_window is None:
+        assert seq_lens == [10, 4]
+        assert block_tables == [[3, 7, 9], [2]]
+    else:
+        assert seq_lens == [8, 4]
+        assert block_tables == [[7, 9], [2]]
@@ -1,19 +1,45 @@
 """vLLM: a high-throughput and memory-efficient inference engine for LLMs"""
+import importlib
+from typing import TYPE_CHECKING, Any
 
-from vllm.engine.arg_utils import AsyncEngineArgs, EngineArgs
-from vllm.engine.async_llm_engine import AsyncLLMEngine
-from vllm.engine.llm_engine import LLMEngine
-from vllm.entrypoints.llm import LLM
-from vllm.executor.ray_utils import initialize_ray_cluster
-from vllm.inputs import PromptInputs, TextPrompt, TokensPrompt
-from vllm.model_executor.models import ModelRegistry
-from vllm.outputs import (CompletionOutput, EmbeddingOutput,
-                          EmbeddingRequestOutput, RequestOutput)
-from vllm.pooling_params import PoolingParams
-from vllm.sampling_params import SamplingParams
+from vllm.startup_profile import startup_phase
 
 from .version import __commit__, __version__
 
+if TYPE_CHECKING:
+    from vllm.engine.arg_utils import AsyncEngineArgs, EngineArgs
+    from vllm.engine.async_llm_engine import AsyncLLMEngine
+    from vllm.engine.llm_engine import LLMEngine
+    from vllm.entrypoints.llm import LLM
+    from vllm.executor.ray_utils import initialize_ray_cluster
+    from vllm.inputs import PromptInputs, TextPrompt, TokensPrompt
+    from vllm.model_executor.models import ModelRegistry
+    from vllm.outputs import (CompletionOutput, EmbeddingOutput,
+                              EmbeddingRequestOutput, RequestOutput)
+    from vllm.pooling_params import PoolingParams
+    from vllm.sampling_params import SamplingParams
+
+# The public API is imported lazily on first access, so that importing vllm
+# (e.g. for the CLI or `vllm.envs`) does not pull in torch and transformers.
+_LAZY_IMPORTS = {
+    "AsyncEngineArgs": "vllm.engine.arg_utils",
+    "EngineArgs": "vllm.engine.arg_utils",
+    "AsyncLLMEngine": "vllm.engine.async_llm_engine",
+    "LLMEngine": "vllm.engine.llm_engine",
+    "LLM": "vllm.entrypoints.llm",
+    "initialize_ray_cluster": "vllm.executor.ray_utils",
+    "PromptInputs": "vllm.inputs",
+    "TextPrompt": "vllm.inputs",
+    "TokensPrompt": "vllm.inputs",
+    "ModelRegistry": "vllm.model_executor.models",
+    "CompletionOutput": "vllm.outputs",
+    "EmbeddingOutput": "vllm.outputs",
+    "EmbeddingRequestOutput": "vllm.outputs",
+    "RequestOutput": "vllm.outputs",
+    "PoolingParams": "vllm.pooling_params",
+    "SamplingParams": "vllm.sampling_params",
+}
+
 __all__ = [
     "__commit__",
     "__version__",
@@ -34,3 +60,18 @@ __all__ = [
     "initialize_ray_cluster",
     "PoolingParams",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_IMPORTS:
+        with startup_phase("import"):
+            module = importlib.import_module(_LAZY_IMPORTS[name])
+        value = getattr(module, name)
+        # Cache the attribute so that later accesses bypass __getattr__.
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return list(globals().keys()) + list(_LAZY_IMPORTS.keys())
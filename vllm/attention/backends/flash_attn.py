@@ -132,6 +132,10 @@ class FlashAttentionMetadata(AttentionMetadata):
     # TODO(woosuk): Move `use_cuda_graph` out since it's unrelated to attention.
     use_cuda_graph: bool
 
+    # Maximum query length among decode batch. Decodes that score several
+    # speculative tokens at once have a query length larger than 1.
+    max_decode_query_len: int = 1
+
     _cached_prefill_metadata: Optional["FlashAttentionMetadata"] = None
     _cached_decode_metadata: Optional["FlashAttentionMetadata"] = None
 
@@ -178,6 +182,16 @@ class FlashAttentionMetadata(AttentionMetadata):
         assert self.block_tables is not None
         assert self.seq_lens_tensor is not None
 
+        query_start_loc = None
+        seq_start_loc = None
+        if self.max_decode_query_len > 1:
+            assert self.query_start_loc is not None
+            assert self.seq_start_loc is not None
+            query_start_loc = (self.query_start_loc[self.num_prefills:] -
+                               self.query_start_loc[self.num_prefills])
+            seq_start_loc = (self.seq_start_loc[self.num_prefills:] -
+                             self.seq_start_loc[self.num_prefills])
+
         self._cached_decode_metadata = FlashAttentionMetadata(
             num_prefills=0,
             num_prefill_tokens=0,
@@ -188,11 +202,12 @@ class FlashAttentionMetadata(AttentionMetadata):
             max_query_len=None,
             max_prefill_seq_len=0,
             max_decode_seq_len=self.max_decode_seq_len,
-            query_start_loc=None,
-            seq_start_loc=None,
+            query_start_loc=query_start_loc,
+            seq_start_loc=seq_start_loc,
             context_lens_tensor=None,
             block_tables=self.block_tables[self.num_prefills:],
             use_cuda_graph=self.use_cuda_graph,
+            max_decode_query_len=self.max_decode_query_len,
         )
         return self._cached_decode_metadata
 
@@ -206,6 +221,7 @@ class FlashAttentionMetadataBuilder(
         self.context_lens: List[int] = []
         self.block_tables: List[List[int]] = []
         self.curr_seq_lens: List[int] = []
+        self.max_decode_query_len = 1
         self.num_prefills = 0
         self.num_prefill_tokens = 0
         self.num_decode_tokens = 0
@@ -242,10 +258,12 @@ class FlashAttentionMetadataBuilder(
                 self.num_prefill_tokens += token_len
                 self.prefill_seq_lens.append(seq_len)
             else:
-                assert query_len == 1, (
+                assert query_len == 1 or not chunked_prefill_enabled, (
                     "seq_len: {}, context_len: {}, query_len: {}".format(
                         seq_len, context_len, query_len))
                 self.num_decode_tokens += query_len
+                self.max_decode_query_len = max(self.max_decode_query_len,
+                                                query_len)
                 self.curr_seq_lens.append(curr_seq_len)
 
             # Compute block table.
@@ -364,6 +382,7 @@ class FlashAttentionMetadataBuilder(
             context_lens_tensor=context_lens_tensor,
             block_tables=block_tables,
             use_cuda_graph=use_captured_graph,
+            max_decode_query_len=self.max_decode_query_len,
         )
 
 
@@ -553,17 +572,36 @@ class FlashAttentionImpl(AttentionImpl):
                 )
 
         if decode_meta := attn_metadata.decode_metadata:
-            # Decoding run.
-            output[num_prefill_tokens:] = flash_attn_with_kvcache(
-                decode_query.unsqueeze(1),
-                key_cache,
-                value_cache,
-                block_table=decode_meta.block_tables,
-                cache_seqlens=decode_meta.seq_lens_tensor,
-                softmax_scale=self.scale,
-                causal=True,
-                alibi_slopes=self.alibi_slopes,
-            ).squeeze(1)
+            if decode_meta.max_decode_query_len > 1:
+                # Decoding run scoring several tokens per sequence. The new
+                # tokens attend to the cached context and causally to each
+                # other.
+                output[num_prefill_tokens:] = flash_attn_varlen_func(
+                    q=decode_query,
+                    k=key_cache,
+                    v=value_cache,
+                    cu_seqlens_q=decode_meta.query_start_loc,
+                    max_seqlen_q=decode_meta.max_decode_query_len,
+                    cu_seqlens_k=decode_meta.seq_start_loc,
+                    max_seqlen_k=decode_meta.max_decode_seq_len,
+                    softmax_scale=self.scale,
+                    causal=True,
+                    alibi_slopes=self.alibi_slopes,
+                    block_table=decode_meta.block_tables,
+                    softcap=self.logits_soft_cap,
+                )
+            else:
+                # Decoding run.
+                output[num_prefill_tokens:] = flash_attn_with_kvcache(
+                    decode_query.unsqueeze(1),
+                    key_cache,
+                    value_cache,
+                    block_table=decode_meta.block_tables,
+                    cache_seqlens=decode_meta.seq_lens_tensor,
+                    softmax_scale=self.scale,
+                    causal=True,
+                    alibi_slopes=self.alibi_slopes,
+                ).squeeze(1)
 
         # Reshape the output tensor.
         return output.view(num_tokens, hidden_size)
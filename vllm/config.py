@@ -435,7 +435,8 @@ class ModelConfig:
                                           "num_hidden_layers", 0)
         pp_rank = parallel_config.rank // parallel_config.tensor_parallel_size
         pp_size = parallel_config.pipeline_parallel_size
-        start, end = get_pp_indices(total_num_hidden_layers, pp_rank, pp_size)
+        start, end = get_pp_indices(total_num_hidden_layers, pp_rank, pp_size,
+                                    parallel_config.pp_layer_partition)
         return end - start
 
     def contains_seqlen_agnostic_layers(
@@ -628,6 +629,7 @@ class LoadFormat(str, enum.Enum):
     PT = "pt"
     SAFETENSORS = "safetensors"
     NPCACHE = "npcache"
+    MMAP_CACHE = "mmap_cache"
     DUMMY = "dummy"
     TENSORIZER = "tensorizer"
     SHARDED_STATE = "sharded_state"
@@ -647,7 +649,11 @@ class LoadConfig:
             "pt" will load the weights in the pytorch bin format.
             "safetensors" will load the weights in the safetensors format.
             "npcache" will load the weights in pytorch format and store
-                a numpy cache to speed up the loading.
+                a numpy cache to speed up the loading. Deprecated in favor of
+                "mmap_cache".
+            "mmap_cache" will convert the weights (safetensors, pytorch bin
+                or dequantized GGUF) once into a single memory-mapped blob,
+                which later loads map without copying.
             "dummy" will initialize the weights with random values, which is
                 mainly for profiling.
             "tensorizer" will use CoreWeave's tensorizer library for
@@ -742,6 +748,9 @@ class ParallelConfig:
         self.tokenizer_pool_config = tokenizer_pool_config
         self.ray_workers_use_nsight = ray_workers_use_nsight
         self.placement_group = placement_group
+        # The number of layers of each pipeline stage, if they are not split
+        # evenly. Set by the executor for VLLM_PP_LAYER_PARTITION=auto.
+        self.pp_layer_partition: Optional[List[int]] = None
 
         self.world_size = pipeline_parallel_size * self.tensor_parallel_size
         if worker_use_ray:
@@ -965,6 +974,10 @@ class SpeculativeConfig:
         typical_acceptance_sampler_posterior_threshold: Optional[float],
         typical_acceptance_sampler_posterior_alpha: Optional[float],
         disable_logprobs: Optional[bool],
+        adaptive_proposal_len: bool = False,
+        disable_mqa_scorer: bool = False,
+        ngram_index: str = "lookup",
+        ngram_corpus_size: int = 0,
     ) -> Optional["SpeculativeConfig"]:
         """Create a SpeculativeConfig if possible, else return None.
 
@@ -1001,6 +1014,13 @@ class SpeculativeConfig:
                 window, if provided.
             ngram_prompt_lookup_min (Optional[int]): Min size of ngram token
                 window, if provided.
+            ngram_index (str): How n-gram speculation finds matches: "lookup"
+                searches the token history for n-grams every step, while
+                "suffix_automaton" keeps an incrementally updated suffix
+                automaton per sequence.
+            ngram_corpus_size (int): With the suffix automaton index, the
+                number of tokens of recently finished outputs which are also
+                searched for matches. 0 disables it.
             draft_token_acceptance_method (str): The method to use for
                 accepting draft tokens. This can take two possible
                 values 'rejection_sampler' and 'typical_acceptance_sampler'
@@ -1019,6 +1039,13 @@ class SpeculativeConfig:
                 If set to False, token log probabilities are returned
                 according to the log probability settings in SamplingParams.
                 If not specified, it defaults to True.
+            adaptive_proposal_len (bool): If set to True, the number of
+                speculative tokens scored for each sequence is picked every
+                step from its observed acceptance rate and the measured step
+                times, up to num_speculative_tokens.
+            disable_mqa_scorer (bool): If set to True, proposals are always
+                scored with batch expansion, even if the attention backend
+                supports multi-token queries on the KV cache.
     
         Returns:
             Optional["SpeculativeConfig"]: An instance of SpeculativeConfig if
@@ -1063,6 +1090,15 @@ class SpeculativeConfig:
             if ngram_prompt_lookup_min > ngram_prompt_lookup_max:
                 raise ValueError(f"{ngram_prompt_lookup_min=} cannot be "
                                  f"larger than {ngram_prompt_lookup_max=}")
+            if ngram_index not in ("lookup", "suffix_automaton"):
+                raise ValueError(f"{ngram_index=} must be either 'lookup' or "
+                                 "'suffix_automaton'")
+            if ngram_corpus_size < 0:
+                raise ValueError(f"{ngram_corpus_size=} must be >= 0")
+            if ngram_corpus_size > 0 and ngram_index != "suffix_automaton":
+                raise ValueError(
+                    "ngram_corpus_size requires ngram_index='suffix_automaton'"
+                )
 
             # TODO: current we still need extract vocab_size from target model
             # config, in future, we may try refactor it out, and set
@@ -1072,6 +1108,8 @@ class SpeculativeConfig:
         else:
             ngram_prompt_lookup_max = 0
             ngram_prompt_lookup_min = 0
+            ngram_index = "lookup"
+            ngram_corpus_size = 0
             draft_model_config = ModelConfig(
                 model=speculative_model,
                 tokenizer=target_model_config.tokenizer,
@@ -1148,6 +1186,10 @@ class SpeculativeConfig:
                 typical_acceptance_sampler_posterior_alpha,
             disable_logprobs=disable_logprobs,
             disable_log_stats=disable_log_stats,
+            adaptive_proposal_len=adaptive_proposal_len,
+            disable_mqa_scorer=disable_mqa_scorer,
+            ngram_index=ngram_index,
+            ngram_corpus_size=ngram_corpus_size,
         )
 
     @staticmethod
@@ -1242,6 +1284,10 @@ class SpeculativeConfig:
         typical_acceptance_sampler_posterior_alpha: float,
         disable_logprobs: bool,
         disable_log_stats: bool,
+        adaptive_proposal_len: bool = False,
+        disable_mqa_scorer: bool = False,
+        ngram_index: str = "lookup",
+        ngram_corpus_size: int = 0,
     ):
         """Create a SpeculativeConfig object.
 
@@ -1276,6 +1322,14 @@ class SpeculativeConfig:
                 returned.
             disable_log_stats: Whether to disable periodic printing of stage
                 times in speculative decoding.
+            adaptive_proposal_len: Whether to pick the proposal length of
+                each sequence every step, up to num_speculative_tokens.
+            disable_mqa_scorer: Whether to always score proposals with batch
+                expansion instead of a multi-token query per sequence.
+            ngram_index: The index used by n-gram speculation, "lookup" or
+                "suffix_automaton".
+            ngram_corpus_size: The number of tokens of recently finished
+                outputs searched by the suffix automaton index.
         """
         self.draft_model_config = draft_model_config
         self.draft_parallel_config = draft_parallel_config
@@ -1291,6 +1345,10 @@ class SpeculativeConfig:
             typical_acceptance_sampler_posterior_alpha
         self.disable_logprobs = disable_logprobs
         self.disable_log_stats = disable_log_stats
+        self.adaptive_proposal_len = adaptive_proposal_len
+        self.disable_mqa_scorer = disable_mqa_scorer
+        self.ngram_index = ngram_index
+        self.ngram_corpus_size = ngram_corpus_size
 
         self._verify_args()
 
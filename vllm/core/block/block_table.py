@@ -2,6 +2,7 @@ import math
 from typing import List, Optional
 
 from vllm.core.block.common import BlockList
+from vllm.core.block.cpu_gpu_block_allocator import NullBlock
 from vllm.core.block.interfaces import Block, DeviceAwareBlockAllocator
 from vllm.utils import Device, cdiv, chunk_list
 
@@ -140,6 +141,11 @@ class BlockTable:
                 if b is not null_block:
                     self._allocator.free(b)
                     self._blocks[idx] = null_block
+            if end_block_idx > 0:
+                # The dropped blocks go back to the allocator, so unlink them
+                # from the remaining blocks, which are walked from the last
+                # block on fork and swap.
+                self._blocks[end_block_idx].prev_block = None
 
         # Ensure there are enough empty slots for the new tokens plus
         # lookahead slots
@@ -200,6 +206,10 @@ class BlockTable:
         assert self._is_allocated
         assert len(self._blocks) > 0
         forked_blocks = self._allocator.fork(self._blocks[-1])
+        # The blocks dropped due to sliding window are not linked to the
+        # remaining ones, and are shared as null blocks.
+        num_null_blocks = len(self._blocks) - len(forked_blocks)
+        forked_blocks = self.blocks[:num_null_blocks] + forked_blocks
         return BlockTable(
             block_size=self._block_size,
             block_allocator=self._allocator,
@@ -303,7 +313,11 @@ class BlockTable:
     def _get_num_token_ids(self) -> int:
         res = 0
         for block in self.blocks:
-            res += len(block.token_ids)
+            if isinstance(block, NullBlock):
+                # The block was full when it was dropped.
+                res += self._block_size
+            else:
+                res += len(block.token_ids)
 
         return res
 
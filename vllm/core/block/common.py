@@ -282,6 +282,26 @@ class BlockList:
         return self._block_ids
 
 
+class CacheMetricData:
+    """Counts the lookups of full blocks in a prefix cache, and the ones that
+    found a cached block."""
+
+    def __init__(self) -> None:
+        self.num_queries = 0
+        self.num_hits = 0
+
+    def query(self, hit: bool) -> None:
+        self.num_queries += 1
+        self.num_hits += hit
+
+    def get_hit_rate(self) -> float:
+        """The fraction of the lookups that were hits, 0 if there were
+        none."""
+        if self.num_queries == 0:
+            return 0.0
+        return self.num_hits / self.num_queries
+
+
 def get_all_blocks_recursively(last_block: Block) -> List[Block]:
     """Retrieves all the blocks in a sequence starting from the last block.
 
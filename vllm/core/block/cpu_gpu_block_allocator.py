@@ -247,6 +247,11 @@ class CpuGpuBlockAllocator(DeviceAwareBlockAllocator):
             Dict[int, int]: Swap mapping from source_device
                 on to dest_device.
         """
+        # The null block stays on the GPU: it has no content, and is shared
+        # by all the sequences whose blocks were dropped by sliding window.
+        blocks = [
+            block for block in blocks if not isinstance(block, NullBlock)
+        ]
         src_block_ids = [block.block_id for block in blocks]
         self._allocators[src_device].swap_out(blocks)
         self._allocators[dst_device].swap_in(blocks)
@@ -276,6 +281,9 @@ class CpuGpuBlockAllocator(DeviceAwareBlockAllocator):
             int: the number of blocks that will be touched by
                 swapping in/out the given blocks on to the 'device'.
         """
+        blocks = [
+            block for block in blocks if not isinstance(block, NullBlock)
+        ]
         return self._allocators[device].get_num_blocks_touched(
             blocks, num_lookahead_slots)
 
@@ -323,6 +331,25 @@ class CpuGpuBlockAllocator(DeviceAwareBlockAllocator):
     def all_block_ids(self) -> FrozenSet[int]:
         return frozenset(self._block_ids_to_allocator.keys())
 
+    def get_prefix_cache_hit_rate(self, device: Device) -> float:
+        """Prefix cache hit rate. -1 means not supported or disabled."""
+        assert device in self._allocators
+        return self._allocators[device].get_prefix_cache_hit_rate()
+
+    def get_num_cached_tokens(self, token_ids: List[int],
+                              device: Device) -> int:
+        return self._allocators[device].get_num_cached_tokens(token_ids)
+
+    def copy_computed_tokens(self, block: Block, max_num_tokens: int) -> int:
+        # Prefix caching only supported on GPU.
+        device = Device.GPU
+        return self._allocators[device].copy_computed_tokens(
+            block, max_num_tokens)
+
+    def hold_computed_tokens_source(self, token_ids: List[int],
+                                    device: Device) -> None:
+        self._allocators[device].hold_computed_tokens_source(token_ids)
+
     def get_and_reset_swaps(self) -> List[Tuple[int, int]]:
         """Returns and clears the mapping of source to destination block IDs.
         Will be called after every swapping operations for now, and after every
@@ -381,6 +408,10 @@ class NullBlock(Block):
     def prev_block(self):
         return self._proxy.prev_block
 
+    @prev_block.setter
+    def prev_block(self, value):
+        raise ValueError("null block should not be modified")
+
     @property
     def computed(self):
         return self._proxy.computed
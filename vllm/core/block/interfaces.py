@@ -50,6 +50,13 @@ class Block(ABC):
     def prev_block(self) -> Optional["Block"]:
         pass
 
+    @prev_block.setter
+    @abstractmethod
+    def prev_block(self, value: Optional["Block"]) -> None:
+        """Should be only used by BlockTable, to unlink the blocks that are
+        dropped due to sliding window"""
+        raise NotImplementedError
+
     @property
     @abstractmethod
     def computed(self) -> bool:
@@ -186,6 +193,31 @@ class BlockAllocator(ABC):
                                num_lookahead_slots: int = 0) -> int:
         pass
 
+    @abstractmethod
+    def get_prefix_cache_hit_rate(self) -> float:
+        """Prefix cache hit rate. -1 means not supported or disabled."""
+        pass
+
+    @abstractmethod
+    def get_num_cached_tokens(self, token_ids: List[int]) -> int:
+        """The number of leading tokens of `token_ids` that allocating them
+        would reuse from the cache, leaving at least the last token to be
+        computed. It allocates nothing, and does not change the state of the
+        cache."""
+        pass
+
+    @abstractmethod
+    def copy_computed_tokens(self, block: Block, max_num_tokens: int) -> int:
+        """Records a copy-on-write of the computed leading tokens of a new
+        block from a cached block, and returns their number."""
+        pass
+
+    @abstractmethod
+    def hold_computed_tokens_source(self, token_ids: List[int]) -> None:
+        """Holds the cached block that copy_computed_tokens() would copy from
+        for `token_ids`, until the copy-on-writes are cleared."""
+        pass
+
     class NoFreeBlocksError(ValueError):
         pass
 
@@ -270,6 +302,25 @@ class DeviceAwareBlockAllocator(ABC):
     def get_physical_block_id(self, device: Device, absolute_id: int) -> int:
         pass
 
+    @abstractmethod
+    def get_prefix_cache_hit_rate(self, device: Device) -> float:
+        """Prefix cache hit rate. -1 means not supported or disabled."""
+        pass
+
+    @abstractmethod
+    def get_num_cached_tokens(self, token_ids: List[int],
+                              device: Device) -> int:
+        pass
+
+    @abstractmethod
+    def copy_computed_tokens(self, block: Block, max_num_tokens: int) -> int:
+        pass
+
+    @abstractmethod
+    def hold_computed_tokens_source(self, token_ids: List[int],
+                                    device: Device) -> None:
+        pass
+
     @abstractmethod
     def allocate_or_get_null_block(self) -> Block:
         """
@@ -317,6 +317,18 @@ class NaiveBlockAllocator(BlockAllocator):
         num_touched_blocks = new_block_count + len(old_block_set)
         return num_touched_blocks
 
+    def get_prefix_cache_hit_rate(self) -> float:
+        return -1
+
+    def get_num_cached_tokens(self, token_ids: List[int]) -> int:
+        return 0
+
+    def copy_computed_tokens(self, block: Block, max_num_tokens: int) -> int:
+        return 0
+
+    def hold_computed_tokens_source(self, token_ids: List[int]) -> None:
+        pass
+
     def swap_out(self, blocks: List[Block]) -> None:
         for block in blocks:
             self._free_block_id(block)
@@ -456,6 +468,10 @@ class NaiveBlock(Block):
     def prev_block(self) -> Optional["Block"]:
         return self._prev_block
 
+    @prev_block.setter
+    def prev_block(self, value: Optional["Block"]) -> None:
+        self._prev_block = value
+
     @property
     def content_hash(self) -> Optional[int]:
         return None
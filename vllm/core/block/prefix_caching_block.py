@@ -1,9 +1,11 @@
 """Token blocks."""
 
+import time
+from bisect import bisect_left, insort
 from os.path import commonprefix
 from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
 
-from vllm.core.block.common import (CopyOnWriteTracker,
+from vllm.core.block.common import (CacheMetricData, CopyOnWriteTracker,
                                     get_all_blocks_recursively)
 from vllm.core.block.interfaces import Block, BlockAllocator, BlockId, Device
 from vllm.core.block.naive_block import (BlockPool, NaiveBlock,
@@ -107,6 +109,26 @@ class PrefixCachingBlockAllocator(BlockAllocator):
         self._cow_tracker = CopyOnWriteTracker(
             refcounter=self._refcounter.as_readonly())
 
+        # The computed cached blocks, as sources of the leading tokens of new
+        # blocks (see copy_computed_tokens). For the hash of each previous
+        # block (None for first blocks), the (token IDs, block ID) of the
+        # blocks following it, sorted so that the blocks sharing the longest
+        # prefix with some token IDs are next to them.
+        self._computed_blocks_by_prev_hash: Dict[Optional[PrefixHash],
+                                                 List[Tuple[Tuple[int, ...],
+                                                            BlockId]]] = {}
+        # Block ID -> (prev hash, token IDs, content hash, num tokens total)
+        # of the blocks in _computed_blocks_by_prev_hash.
+        self._computed_block_keys: Dict[BlockId, Tuple[Optional[PrefixHash],
+                                                       Tuple[int, ...],
+                                                       PrefixHash, int]] = {}
+        # The sources of the recorded copies of computed tokens, held until
+        # the copies are cleared, so that they are not evicted and reused
+        # before being copied.
+        self._copy_src_block_ids: List[BlockId] = []
+
+        self.metric_data = CacheMetricData()
+
     # Implements Block.Factory.
     def _create_block(
         self,
@@ -154,6 +176,7 @@ class PrefixCachingBlockAllocator(BlockAllocator):
         assert block.content_hash is not None
 
         cached_block_id = self._cached_blocks.get(block.content_hash, None)
+        self.metric_data.query(hit=cached_block_id is not None)
         if cached_block_id is not None:
             block.block_id = cached_block_id
             self._incr_refcount_cached_block(block)
@@ -240,6 +263,12 @@ class PrefixCachingBlockAllocator(BlockAllocator):
         # (This keeps the cached block around so it can be reused)
         self.evictor.add(block_id, block.content_hash, block.num_tokens_total,
                          self._block_tracker[block_id].last_accessed)
+        if block_id not in self._computed_block_keys:
+            prev_block = block.prev_block
+            self._add_computed_block(
+                block_id,
+                None if prev_block is None else prev_block.content_hash,
+                block.token_ids, block.content_hash, block.num_tokens_total)
 
         # Stop tracking the block
         self._untrack_block_id(block_id)
@@ -260,6 +289,86 @@ class PrefixCachingBlockAllocator(BlockAllocator):
         # itself (will be handled by the caller)
         self._hashless_allocator.free(block, keep_block_object=True)
 
+    def _maybe_cache_partial_block(self, block: Block) -> bool:
+        """Keeps a freed partially filled block in the evictor, keyed by the
+        hash of its exact token IDs, so that its computed tokens can be copied
+        by copy_computed_tokens() until it is evicted. Returns whether the
+        block is cached, in which case its block id is released.
+        """
+        block_id = block.block_id
+        assert block_id is not None
+        token_ids = block.token_ids
+        if (not token_ids or block.is_full
+                or self._refcounter.get(block_id) != 1):
+            return False
+
+        prev_block = block.prev_block
+        prev_block_hash = (None
+                           if prev_block is None else prev_block.content_hash)
+        if prev_block is not None and prev_block_hash is None:
+            return False
+
+        content_hash = PrefixCachingBlock.hash_block_tokens(
+            prev_block is None, prev_block_hash, token_ids)
+        if content_hash in self._cached_blocks:
+            return False
+
+        refcount = self._refcounter.decr(block_id)
+        assert refcount == 0
+        self._cached_blocks[content_hash] = block_id
+        num_tokens_total = block.num_tokens_total
+        self.evictor.add(block_id, content_hash, num_tokens_total,
+                         self._block_tracker[block_id].last_accessed)
+        self._add_computed_block(block_id, prev_block_hash, token_ids,
+                                 content_hash, num_tokens_total)
+        self._untrack_block_id(block_id)
+
+        block.block_id = None
+        return True
+
+    def _add_computed_block(self, block_id: BlockId,
+                            prev_block_hash: Optional[PrefixHash],
+                            token_ids: List[int], content_hash: PrefixHash,
+                            num_tokens_total: int) -> None:
+        key = tuple(token_ids)
+        insort(
+            self._computed_blocks_by_prev_hash.setdefault(prev_block_hash, []),
+            (key, block_id))
+        self._computed_block_keys[block_id] = (prev_block_hash, key,
+                                               content_hash, num_tokens_total)
+
+    def _remove_computed_block(self, block_id: BlockId) -> None:
+        if block_id not in self._computed_block_keys:
+            return
+        prev_block_hash, key, _, _ = self._computed_block_keys.pop(block_id)
+        entries = self._computed_blocks_by_prev_hash[prev_block_hash]
+        entries.pop(bisect_left(entries, (key, block_id)))
+        if not entries:
+            del self._computed_blocks_by_prev_hash[prev_block_hash]
+
+    def _find_longest_prefix_block(
+            self, prev_block_hash: Optional[PrefixHash],
+            token_ids: List[int]) -> Tuple[Optional[BlockId], int]:
+        """Returns the computed block following the block of
+        `prev_block_hash` that shares the longest prefix with `token_ids`,
+        and the length of the prefix.
+        """
+        entries = self._computed_blocks_by_prev_hash.get(prev_block_hash)
+        if not entries or not token_ids:
+            return None, 0
+
+        # In lexicographic order, the longest common prefix is with either
+        # neighbor of the insertion point.
+        key = tuple(token_ids)
+        idx = bisect_left(entries, (key, ))
+        src_block_id: Optional[BlockId] = None
+        num_tokens = 0
+        for src_key, block_id in entries[max(idx - 1, 0):idx + 1]:
+            prefix_len = len(commonprefix([src_key, key]))
+            if prefix_len > num_tokens:
+                src_block_id, num_tokens = block_id, prefix_len
+        return src_block_id, num_tokens
+
     def _allocate_block_id(self) -> BlockId:
         """First tries to allocate a block id from the hashless allocator,
         and if there are no blocks, then tries to evict an unused cached block.
@@ -305,6 +414,7 @@ class PrefixCachingBlockAllocator(BlockAllocator):
         assert _block_id == block_id
 
         self._cached_blocks.pop(content_hash_to_evict)
+        self._remove_computed_block(block_id)
 
         self._refcounter.incr(block_id)
         self._track_block_id(block_id, computed=False)
@@ -337,7 +447,8 @@ class PrefixCachingBlockAllocator(BlockAllocator):
         """Release the block (look at free_block_id(..) docs)
         """
         # Release the physical block index
-        self._free_block_id(block)
+        if not self._maybe_cache_partial_block(block):
+            self._free_block_id(block)
 
         # Release the block object to the pool
         if not keep_block_object:
@@ -474,6 +585,67 @@ class PrefixCachingBlockAllocator(BlockAllocator):
 
         return trg_block_id
 
+    def copy_computed_tokens(self, block: Block, max_num_tokens: int) -> int:
+        """Copies the KV cache of the leading tokens of a newly allocated
+        block from a computed cached block with the same previous blocks,
+        the one sharing the longest prefix of token IDs with it.
+
+        This reuses a cached prefix that ends in the middle of a block, e.g.
+        a shared prompt prefix followed by different tokens, or a partially
+        filled block that was freed. The copy is recorded as a copy-on-write,
+        and the source block is held until the copies are cleared.
+
+        Args:
+            block (Block): The new block, which must not be shared. Nothing
+                is copied unless its previous block is computed.
+            max_num_tokens (int): The maximum number of tokens to copy.
+
+        Returns:
+            int: The number of leading tokens of the block whose KV cache is
+                copied, i.e. that are computed once the copy is done.
+        """
+        block_id = block.block_id
+        assert block_id is not None
+        if (self._refcounter.get(block_id) != 1
+                or self.block_is_computed(block_id)):
+            return 0
+
+        prev_block = block.prev_block
+        prev_block_hash = None
+        if prev_block is not None:
+            prev_block_hash = prev_block.content_hash
+            if (prev_block_hash is None or prev_block.block_id is None
+                    or not self.block_is_computed(prev_block.block_id)):
+                return 0
+
+        src_block_id, num_tokens = self._find_longest_prefix_block(
+            prev_block_hash, block.token_ids)
+        num_tokens = min(num_tokens, max_num_tokens)
+        if src_block_id is None or num_tokens <= 0:
+            return 0
+
+        self._hold_copy_src_block(src_block_id)
+        self._cow_tracker.record_cow(src_block_id, block_id)
+        return num_tokens
+
+    def hold_computed_tokens_source(self, token_ids: List[int]) -> None:
+        """Holds the cached block that copy_computed_tokens() copies from when
+        `token_ids` are allocated in a new block table, as counted by
+        get_num_cached_tokens(), so that allocating the blocks cannot evict
+        it. The block is released by clear_copy_on_writes().
+        """
+        _, src_block_id, _ = self._find_cached_prefix(token_ids)
+        if src_block_id is not None:
+            self._hold_copy_src_block(src_block_id)
+
+    def _hold_copy_src_block(self, src_block_id: BlockId) -> None:
+        # Hold the source block, which is also accessed now.
+        if self._refcounter.incr(src_block_id) == 1:
+            self.evictor.remove(src_block_id)
+            self._track_block_id(src_block_id, computed=True)
+            self._block_tracker[src_block_id].last_accessed = time.time()
+        self._copy_src_block_ids.append(src_block_id)
+
     def clear_copy_on_writes(self) -> List[Tuple[BlockId, BlockId]]:
         """Returns the copy-on-write source->destination mapping and clears it.
 
@@ -481,6 +653,15 @@ class PrefixCachingBlockAllocator(BlockAllocator):
             List[Tuple[BlockId, BlockId]]: A list mapping source
                 block indices to destination block indices.
         """
+        # The copies are done before the blocks can be reused.
+        for block_id in self._copy_src_block_ids:
+            if self._refcounter.decr(block_id) == 0:
+                _, _, content_hash, num_tokens_total = (
+                    self._computed_block_keys[block_id])
+                self.evictor.add(block_id, content_hash, num_tokens_total,
+                                 self._block_tracker[block_id].last_accessed)
+                self._untrack_block_id(block_id)
+        self._copy_src_block_ids.clear()
         return self._cow_tracker.clear_cows()
 
     def mark_blocks_as_accessed(self, block_ids: List[int],
@@ -593,6 +774,55 @@ class PrefixCachingBlockAllocator(BlockAllocator):
                     num_touched_blocks += 1
         return num_touched_blocks
 
+    def get_prefix_cache_hit_rate(self) -> float:
+        return self.metric_data.get_hit_rate()
+
+    def get_num_cached_tokens(self, token_ids: List[int]) -> int:
+        """The number of leading tokens of `token_ids` that allocating them in
+        a new block table would reuse from the cache: the tokens of the cached
+        and computed full blocks, and those that the next block would copy
+        with copy_computed_tokens(). As the model computes at least the last
+        token, the last block is not reused as a computed block, as in
+        ComputedBlocksTracker.
+
+        The content hashes are chained, so that `_cached_blocks` is a trie of
+        the cached blocks, in which each block is looked up under the hash of
+        its parent. The query walks it without allocating or touching the
+        blocks, so it has no effect on the cache or its eviction order.
+        """
+        num_tokens, _, num_copied_tokens = self._find_cached_prefix(token_ids)
+        return num_tokens + num_copied_tokens
+
+    def _find_cached_prefix(
+            self, token_ids: List[int]) -> Tuple[int, Optional[BlockId], int]:
+        """Returns the number of leading tokens of `token_ids` in the reused
+        full blocks, and the block that the tokens of the next block are
+        copied from (if any) with their number. See get_num_cached_tokens().
+        """
+        block_size = self._block_size
+        prev_block_hash: Optional[int] = None
+        start = 0
+        while start + block_size <= len(token_ids):
+            block_hash = PrefixCachingBlock.hash_block_tokens(
+                prev_block_hash is None, prev_block_hash,
+                token_ids[start:start + block_size])
+            block_id = self._cached_blocks.get(block_hash)
+            if block_id is None:
+                break
+            # A cached block is shared rather than copied to, so the match
+            # stops at it if it is not reused as computed.
+            if (not self.block_is_computed(block_id)
+                    or start + block_size == len(token_ids)):
+                return start, None, 0
+            prev_block_hash = block_hash
+            start += block_size
+
+        # The last token is not copied either.
+        end = min(start + block_size, len(token_ids) - 1)
+        src_block_id, num_tokens = self._find_longest_prefix_block(
+            prev_block_hash, token_ids[start:end])
+        return start, src_block_id, num_tokens
+
     def swap_out(self, blocks: List[Block]) -> None:
         """Execute the swap out actions. Basically just free the 
         given blocks.
@@ -780,6 +1010,14 @@ class PrefixCachingBlock(Block):
     def prev_block(self) -> Optional[Block]:
         return self._prev_block
 
+    @prev_block.setter
+    def prev_block(self, value: Optional[Block]) -> None:
+        # The content hash and the total number of tokens of a full block are
+        # already computed, and do not change.
+        assert self.content_hash is not None
+        self._prev_block = value
+        self._block.prev_block = value
+
     @property
     def content_hash(self) -> Optional[int]:
         """Return the content-based hash of the current block, or None if it is
@@ -3,11 +3,13 @@ import math
 from abc import ABC, abstractmethod
 from itertools import count, takewhile
 from os.path import commonprefix
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional
 from typing import Sequence as GenericSequence
 from typing import Set, Tuple
 
-from vllm.block import BlockTable, PhysicalTokenBlock
+from vllm.block import (DEFAULT_LAST_ACCESSED_TIME, BlockTable,
+                        PhysicalTokenBlock)
+from vllm.core.block.common import CacheMetricData
 from vllm.core.block.utils import check_no_caching_or_swa_for_blockmgr_encdec
 from vllm.core.evictor_v1 import EvictionPolicy, Evictor, make_evictor
 from vllm.core.interfaces import AllocStatus, BlockSpaceManager
@@ -56,10 +58,19 @@ class BlockAllocatorBase(ABC):
     def contains_block(self, block_hash: int) -> bool:
         pass
 
+    @abstractmethod
+    def block_is_computed(self, block_hash: int) -> bool:
+        pass
+
     @abstractmethod
     def update_hash(self, block_hash: int, block: PhysicalTokenBlock):
         pass
 
+    @abstractmethod
+    def get_prefix_cache_hit_rate(self) -> float:
+        """Prefix cache hit rate. -1 means not supported or disabled."""
+        pass
+
 
 class CachedBlockAllocator(BlockAllocatorBase):
     """Manages free physical token blocks for a device.
@@ -85,12 +96,16 @@ class CachedBlockAllocator(BlockAllocatorBase):
 
         self.default_hash_ctr = count()
 
+        self.metric_data = CacheMetricData()
+
     def allocate_block(self, block_hash: int,
                        num_hashed_tokens: int) -> PhysicalTokenBlock:
         if self.current_num_blocks == self.num_blocks:
             block = self.evictor.evict()
             block.block_hash = block_hash
             block.num_hashed_tokens = num_hashed_tokens
+            # The block holds new content now.
+            block.last_accessed = DEFAULT_LAST_ACCESSED_TIME
             return block
         block = PhysicalTokenBlock(device=self.device,
                                    block_number=self.current_num_blocks,
@@ -105,6 +120,8 @@ class CachedBlockAllocator(BlockAllocatorBase):
                  num_hashed_tokens: int = 0) -> PhysicalTokenBlock:
         if block_hash is None:
             block_hash = next(self.default_hash_ctr)
+        else:
+            self.metric_data.query(hit=self.contains_block(block_hash))
         if block_hash in self.evictor:
             assert block_hash not in self.cached_blocks
             block = self.evictor.remove(block_hash)
@@ -142,6 +159,15 @@ class CachedBlockAllocator(BlockAllocatorBase):
     def contains_block(self, block_hash: int) -> bool:
         return block_hash in self.cached_blocks or block_hash in self.evictor
 
+    def block_is_computed(self, block_hash: int) -> bool:
+        """Whether the block with the hash value block_hash is cached and
+        computed. Unlike `allocate`, it does not take the block out of the
+        evictor."""
+        block = self.cached_blocks.get(block_hash)
+        if block is None:
+            block = self.evictor.get(block_hash)
+        return block is not None and block.computed
+
     def update_hash(self, block_hash: int, block: PhysicalTokenBlock):
         # Update the hash of block and the cached_blocks dictionary.
         assert not self.contains_block(block_hash)
@@ -150,6 +176,9 @@ class CachedBlockAllocator(BlockAllocatorBase):
         del self.cached_blocks[old_hash]
         self.cached_blocks[block_hash] = block
 
+    def get_prefix_cache_hit_rate(self) -> float:
+        return self.metric_data.get_hit_rate()
+
 
 class UncachedBlockAllocator(BlockAllocatorBase):
     """Manages free physical token blocks for a device.
@@ -205,10 +234,17 @@ class UncachedBlockAllocator(BlockAllocatorBase):
         raise NotImplementedError(
             "Invalid codepath for uncached block allocator.")
 
+    def block_is_computed(self, block_hash: int) -> bool:
+        raise NotImplementedError(
+            "Invalid codepath for uncached block allocator.")
+
     def update_hash(self, block_hash: int, block: PhysicalTokenBlock):
         raise NotImplementedError(
             "Invalid codepath for uncached block allocator.")
 
+    def get_prefix_cache_hit_rate(self) -> float:
+        return -1
+
 
 class BlockSpaceManagerV1(BlockSpaceManager):
     """Manages the mapping between logical and physical token blocks."""
@@ -262,6 +298,12 @@ class BlockSpaceManagerV1(BlockSpaceManager):
         # request ID
         self.cross_block_tables: Dict[str, BlockTable] = {}
 
+        # Mapping: seq_id -> last access time of its blocks. Accessing a
+        # sequence only records the time here; its blocks are stamped with it
+        # when the sequence releases them (see _release_blocks), which is
+        # when the evictor may need it.
+        self._seq_last_access: Dict[int, float] = {}
+
     def _get_seq_num_required_blocks(self, seq: Sequence) -> int:
         return 0 if seq is None else seq.n_blocks
 
@@ -376,6 +418,7 @@ class BlockSpaceManagerV1(BlockSpaceManager):
         # if new_hash is already in the cached table, then free last_block
         # and return the cached version
         if self.gpu_allocator.contains_block(new_hash):
+            self._release_blocks(seq.seq_id, (last_block, ))
             self.gpu_allocator.free(last_block)
             return self.gpu_allocator.allocate(new_hash)
         else:
@@ -470,6 +513,7 @@ class BlockSpaceManagerV1(BlockSpaceManager):
             new_block = self._allocate_last_physical_block(seq)
 
             block_table[-1] = new_block
+            self._release_blocks(seq.seq_id, (last_block, ))
             self.gpu_allocator.free(last_block)
             return [(last_block.block_number, new_block.block_number)]
 
@@ -481,6 +525,9 @@ class BlockSpaceManagerV1(BlockSpaceManager):
             return
         src_block_table = self.block_tables[parent_seq.seq_id]
         self.block_tables[child_seq.seq_id] = src_block_table.copy()
+        if parent_seq.seq_id in self._seq_last_access:
+            self._seq_last_access[child_seq.seq_id] = self._seq_last_access[
+                parent_seq.seq_id]
 
         # When using a sliding window, blocks will be eventually reused.
         # In this case the block tables will contain repeated blocks.
@@ -528,12 +575,15 @@ class BlockSpaceManagerV1(BlockSpaceManager):
         else:
             return AllocStatus.LATER
 
-    def _swap_block_table(
-            self, block_table: BlockTable, src_allocator: BlockAllocatorBase,
-            dest_allocator: BlockAllocatorBase,
-            mapping: Dict[PhysicalTokenBlock,
-                          PhysicalTokenBlock]) -> BlockTable:
+    def _swap_block_table(self,
+                          block_table: BlockTable,
+                          src_allocator: BlockAllocatorBase,
+                          dest_allocator: BlockAllocatorBase,
+                          mapping: Dict[PhysicalTokenBlock,
+                                        PhysicalTokenBlock],
+                          seq_id: Optional[int] = None) -> BlockTable:
         new_block_table: BlockTable = BlockTable()
+        self._release_blocks(seq_id, block_table)
 
         for from_block in block_table:
             if from_block in mapping:
@@ -560,7 +610,7 @@ class BlockSpaceManagerV1(BlockSpaceManager):
             self.block_tables[seq.seq_id] = \
                 self._swap_block_table(self.block_tables[seq.seq_id],
                                        self.cpu_allocator, self.gpu_allocator,
-                                       mapping)
+                                       mapping, seq.seq_id)
 
         if seq_group.is_encoder_decoder():
             self.cross_block_tables[request_id] = \
@@ -586,7 +636,7 @@ class BlockSpaceManagerV1(BlockSpaceManager):
             self.block_tables[seq.seq_id] = \
                 self._swap_block_table(self.block_tables[seq.seq_id],
                                        self.gpu_allocator, self.cpu_allocator,
-                                       mapping)
+                                       mapping, seq.seq_id)
 
         if seq_group.is_encoder_decoder():
             self.cross_block_tables[request_id] = \
@@ -598,7 +648,22 @@ class BlockSpaceManagerV1(BlockSpaceManager):
         return [(cpu_block.block_number, gpu_block.block_number)
                 for cpu_block, gpu_block in mapping.items()]
 
-    def _free_block_table(self, block_table: BlockTable) -> None:
+    def _release_blocks(self, seq_id: Optional[int],
+                        blocks: Iterable[PhysicalTokenBlock]) -> None:
+        """Stamp the blocks a sequence is about to free with its last access
+        time. A block shared by several sequences keeps the latest one."""
+        if not self.enable_caching or seq_id is None:
+            return
+        access_time = self._seq_last_access.get(seq_id)
+        if access_time is None:
+            return
+        for block in blocks:
+            if block.last_accessed < access_time:
+                block.last_accessed = access_time
+
+    def _free_block_table(self,
+                          block_table: BlockTable,
+                          seq_id: Optional[int] = None) -> None:
         # when using a sliding window, each seq will only use up
         # to `self.block_sliding_window` blocks. When freeing
         # the block table, we must make sure to not free blocks more
@@ -607,6 +672,7 @@ class BlockSpaceManagerV1(BlockSpaceManager):
         blocks_to_free = (block_table[-self.block_sliding_window:]
                           if self.block_sliding_window is not None else
                           block_table)
+        self._release_blocks(seq_id, blocks_to_free)
         for block in set(blocks_to_free):
             if block.device == Device.GPU:
                 self.gpu_allocator.free(block)
@@ -618,8 +684,9 @@ class BlockSpaceManagerV1(BlockSpaceManager):
             # Already freed or haven't been scheduled yet.
             return
         block_table = self.block_tables[seq.seq_id]
-        self._free_block_table(block_table)
+        self._free_block_table(block_table, seq.seq_id)
         del self.block_tables[seq.seq_id]
+        self._seq_last_access.pop(seq.seq_id, None)
 
     def free_cross(self, seq_group: SequenceGroup) -> None:
         if seq_group.request_id not in self.cross_block_tables:
@@ -631,9 +698,10 @@ class BlockSpaceManagerV1(BlockSpaceManager):
 
     def reset(self) -> None:
         # Free decoder block tables
-        for block_table in self.block_tables.values():
-            self._free_block_table(block_table)
+        for seq_id, block_table in self.block_tables.items():
+            self._free_block_table(block_table, seq_id)
         self.block_tables.clear()
+        self._seq_last_access.clear()
         # Free cross-attention block tables
         for block_table in self.cross_block_tables.values():
             self._free_block_table(block_table)
@@ -652,17 +720,41 @@ class BlockSpaceManagerV1(BlockSpaceManager):
     def get_num_free_cpu_blocks(self) -> int:
         return self.cpu_allocator.get_num_free_blocks()
 
+    def get_num_cached_tokens(self, seq: Sequence) -> int:
+        if not self.enable_caching:
+            return 0
+        # As in get_all_computed_blocks, the last block is never reused as
+        # computed, so that the model computes at least one token.
+        num_blocks = (seq.get_len() - 1) // self.block_size
+        for logical_idx in range(num_blocks):
+            if not self.gpu_allocator.block_is_computed(
+                    seq.hash_of_block(logical_idx)):
+                return logical_idx * self.block_size
+        return num_blocks * self.block_size
+
+    def get_num_computed_partial_tokens(self, seq: Sequence) -> int:
+        return 0
+
+    def clear_copy_on_writes(self) -> List[Tuple[int, int]]:
+        return []
+
+    def get_prefix_cache_hit_rate(self, device: Device) -> float:
+        if device == Device.GPU:
+            return self.gpu_allocator.get_prefix_cache_hit_rate()
+        if device == Device.CPU:
+            return self.cpu_allocator.get_prefix_cache_hit_rate()
+        raise ValueError(f"Invalid device: {device}")
+
     def access_all_blocks_in_seq(
         self,
         seq: Sequence,
         access_time: float,
     ) -> None:
         if self.enable_caching:
-            # Update the last accessed time of all the blocks accessed
-            # in this step.
-            block_table = self.block_tables[seq.seq_id]
-            for block in block_table:
-                block.last_accessed = access_time
+            # Only record the access time of the sequence. Walking its whole
+            # block table every step would cost O(total blocks in flight);
+            # the blocks are stamped once, when they are freed.
+            self._seq_last_access[seq.seq_id] = access_time
 
     def compute_full_blocks_in_seq(self, seq: Sequence):
         if seq.seq_id not in self.block_tables:
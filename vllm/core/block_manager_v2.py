@@ -1,5 +1,6 @@
 """A block manager that manages token blocks."""
 from itertools import chain
+from os.path import commonprefix
 from typing import Dict, List, Optional
 from typing import Sequence as GenericSequence
 from typing import Tuple
@@ -107,6 +108,10 @@ class BlockSpaceManagerV2(BlockSpaceManager):
         self._last_access_blocks_tracker = LastAccessBlocksTracker(
             self.block_allocator)
 
+        # Seq id -> (block index, number of tokens) of the computed leading
+        # tokens of a block that were copied when allocating the sequence.
+        self._computed_partial_blocks: Dict[SeqId, Tuple[int, int]] = {}
+
     def can_allocate(self, seq_group: SequenceGroup) -> AllocStatus:
         # FIXME(woosuk): Here we assume that all sequences in the group share
         # the same prompt. This may not be true for preempted sequences.
@@ -115,13 +120,13 @@ class BlockSpaceManagerV2(BlockSpaceManager):
 
         seq = seq_group.get_seqs(status=SequenceStatus.WAITING)[0]
         num_required_blocks = BlockTable.get_num_required_blocks(
-            seq.get_token_ids(),
+            seq.get_token_ids_array(),
             block_size=self.block_size,
         )
 
         if seq_group.is_encoder_decoder():
             num_required_blocks += BlockTable.get_num_required_blocks(
-                seq_group.get_encoder_seq().get_token_ids(),
+                seq_group.get_encoder_seq().get_token_ids_array(),
                 block_size=self.block_size,
             )
 
@@ -147,7 +152,7 @@ class BlockSpaceManagerV2(BlockSpaceManager):
             block_allocator=self.block_allocator,
             max_block_sliding_window=self.max_block_sliding_window,
         )
-        block_table.allocate(seq.get_token_ids())
+        block_table.allocate(seq.get_token_ids_array())
 
         return block_table
 
@@ -161,6 +166,10 @@ class BlockSpaceManagerV2(BlockSpaceManager):
         # NOTE: Here we assume that all sequences in the group have the same
         # prompt.
         seq = waiting_seqs[0]
+        copy_computed_tokens = (self.enable_caching
+                                and self.sliding_window is None)
+        if copy_computed_tokens:
+            self._hold_computed_tokens_source(seq)
         block_table: BlockTable = self._allocate_sequence(seq)
         self.block_tables[seq.seq_id] = block_table
 
@@ -168,6 +177,9 @@ class BlockSpaceManagerV2(BlockSpaceManager):
         self._computed_blocks_tracker.add_seq(seq.seq_id)
         self._last_access_blocks_tracker.add_seq(seq.seq_id)
 
+        if copy_computed_tokens:
+            self._copy_computed_tokens(seq, block_table)
+
         # Assign the block table for each sequence.
         for seq in waiting_seqs[1:]:
             self.block_tables[seq.seq_id] = block_table.fork()
@@ -192,6 +204,40 @@ class BlockSpaceManagerV2(BlockSpaceManager):
             block_table = self._allocate_sequence(seq_group.get_encoder_seq())
             self.cross_block_tables[request_id] = block_table
 
+    def _hold_computed_tokens_source(self, seq: Sequence) -> None:
+        """Holds the cached block that the computed tokens of a new sequence
+        are copied from, before its blocks are allocated. Otherwise,
+        allocating them could evict it, after the tokens were counted as
+        cached by the scheduler's token budget."""
+        token_ids = seq.get_token_ids_array()
+        num_required_blocks = BlockTable.get_num_required_blocks(
+            token_ids, block_size=self.block_size)
+        # Holding the block takes it from the free blocks, which must still
+        # be enough to allocate the sequence.
+        if (self.block_allocator.get_num_free_blocks(device=Device.GPU) >
+                num_required_blocks):
+            self.block_allocator.hold_computed_tokens_source(
+                token_ids, Device.GPU)
+
+    def _copy_computed_tokens(self, seq: Sequence,
+                              block_table: BlockTable) -> None:
+        """Copies the computed leading tokens of the first block after the
+        computed blocks of a newly allocated sequence from the prefix cache,
+        e.g. a shared prefix that ends in the middle of the block."""
+        block_ids = block_table.physical_block_ids
+        computed_block_ids = self.block_allocator.get_computed_block_ids(
+            [], block_ids, skip_last_block_id=False)
+        block_idx = len(commonprefix([block_ids, computed_block_ids]))
+        if block_idx == len(block_ids):
+            return
+
+        # As for computed blocks, the model computes at least one token.
+        num_tokens = self.block_allocator.copy_computed_tokens(
+            block_table.blocks[block_idx],
+            max_num_tokens=seq.get_len() - 1 - block_idx * self.block_size)
+        if num_tokens > 0:
+            self._computed_partial_blocks[seq.seq_id] = (block_idx, num_tokens)
+
     def can_append_slots(self, seq_group: SequenceGroup,
                          num_lookahead_slots: int) -> bool:
         """Determine if there is enough space in the GPU KV cache to continue
@@ -213,7 +259,7 @@ class BlockSpaceManagerV2(BlockSpaceManager):
             num_touched_blocks += (
                 block_table.get_num_blocks_touched_by_append_slots(
                     token_ids=block_table.get_unseen_token_ids(
-                        seq.get_token_ids()),
+                        seq.get_token_ids_array()),
                     num_lookahead_slots=num_lookahead_slots,
                 ))
 
@@ -230,7 +276,8 @@ class BlockSpaceManagerV2(BlockSpaceManager):
         block_table = self.block_tables[seq.seq_id]
 
         block_table.append_token_ids(
-            token_ids=block_table.get_unseen_token_ids(seq.get_token_ids()),
+            token_ids=block_table.get_unseen_token_ids(
+                seq.get_token_ids_array()),
             num_lookahead_slots=num_lookahead_slots,
             num_computed_slots=seq.data.get_num_computed_tokens(),
         )
@@ -252,6 +299,7 @@ class BlockSpaceManagerV2(BlockSpaceManager):
         # Untrack seq
         self._last_access_blocks_tracker.remove_seq(seq_id)
         self._computed_blocks_tracker.remove_seq(seq_id)
+        self._computed_partial_blocks.pop(seq_id, None)
 
         # Free table/blocks
         self.block_tables[seq_id].free()
@@ -316,6 +364,24 @@ class BlockSpaceManagerV2(BlockSpaceManager):
         return self.block_allocator.get_common_computed_block_ids(
             computed_seq_block_ids)  # type: ignore
 
+    def get_num_computed_partial_tokens(self, seq: Sequence) -> int:
+        partial_block = self._computed_partial_blocks.get(seq.seq_id)
+        if partial_block is None:
+            return 0
+
+        # The copied tokens follow the computed blocks of the sequence.
+        block_idx, num_tokens = partial_block
+        block_ids = self.block_tables[seq.seq_id].physical_block_ids
+        computed_block_ids = (self._computed_blocks_tracker.
+                              get_cached_computed_blocks_and_update(
+                                  seq.seq_id, block_ids))
+        if computed_block_ids != block_ids[:block_idx]:
+            return 0
+        return num_tokens
+
+    def clear_copy_on_writes(self) -> List[Tuple[int, int]]:
+        return self.block_allocator.clear_copy_on_writes()
+
     def fork(self, parent_seq: Sequence, child_seq: Sequence) -> None:
         if parent_seq.seq_id not in self.block_tables:
             # Parent sequence has either been freed or never existed.
@@ -441,6 +507,17 @@ class BlockSpaceManagerV2(BlockSpaceManager):
     def get_num_free_cpu_blocks(self) -> int:
         return self.block_allocator.get_num_free_blocks(Device.CPU)
 
+    def get_prefix_cache_hit_rate(self, device: Device) -> float:
+        return self.block_allocator.get_prefix_cache_hit_rate(device)
+
+    def get_num_cached_tokens(self, seq: Sequence) -> int:
+        # The model runner does not reuse computed blocks with a sliding
+        # window.
+        if not self.enable_caching or self.sliding_window is not None:
+            return 0
+        return self.block_allocator.get_num_cached_tokens(
+            seq.get_token_ids_array(), Device.GPU)
+
     def _can_swap(self,
                   seq_group: SequenceGroup,
                   device: Device,
@@ -2,6 +2,7 @@ from typing import List, Tuple
 
 from vllm.core.interfaces import AllocStatus, BlockSpaceManager
 from vllm.sequence import Sequence, SequenceGroup
+from vllm.utils import Device
 
 
 class EmbeddingModelBlockSpaceManager(BlockSpaceManager):
@@ -68,6 +69,18 @@ class EmbeddingModelBlockSpaceManager(BlockSpaceManager):
     def get_num_free_cpu_blocks(self) -> int:
         return 1
 
+    def get_prefix_cache_hit_rate(self, device: Device) -> float:
+        return -1
+
+    def get_num_cached_tokens(self, seq: Sequence) -> int:
+        return 0
+
+    def get_num_computed_partial_tokens(self, seq: Sequence) -> int:
+        return 0
+
+    def clear_copy_on_writes(self) -> List[Tuple[int, int]]:
+        return []
+
     def access_all_blocks_in_seq(
         self,
         seq: Sequence,
@@ -1,6 +1,6 @@
 import enum
 from abc import ABC, abstractmethod
-from typing import OrderedDict
+from typing import Optional, OrderedDict
 
 from vllm.block import PhysicalTokenBlock
 
@@ -44,6 +44,12 @@ class Evictor(ABC):
         """
         pass
 
+    @abstractmethod
+    def get(self, block_hash: int) -> Optional[PhysicalTokenBlock]:
+        """Returns the block with the hash value block_hash if it is in the
+        evictor, without removing it, and None otherwise."""
+        pass
+
     @property
     @abstractmethod
     def num_blocks(self) -> int:
@@ -94,6 +100,9 @@ class LRUEvictor(Evictor):
         self.free_table.pop(block_hash)
         return block
 
+    def get(self, block_hash: int) -> Optional[PhysicalTokenBlock]:
+        return self.free_table.get(block_hash)
+
     @property
     def num_blocks(self) -> int:
         return len(self.free_table)
@@ -5,6 +5,7 @@ from typing import Sequence as GenericSequence
 from typing import Tuple
 
 from vllm.sequence import Sequence, SequenceGroup
+from vllm.utils import Device
 
 
 class AllocStatus(enum.Enum):
@@ -116,3 +117,29 @@ class BlockSpaceManager(ABC):
     @abstractmethod
     def mark_blocks_as_computed(self, seq_group: SequenceGroup):
         pass
+
+    @abstractmethod
+    def get_prefix_cache_hit_rate(self, device: Device) -> float:
+        """Prefix cache hit rate. -1 means not supported or disabled."""
+        pass
+
+    @abstractmethod
+    def get_num_cached_tokens(self, seq: Sequence) -> int:
+        """The number of leading tokens of the sequence whose KV cache would
+        be reused from the prefix cache, rather than computed, if it were
+        allocated now. It allocates nothing, and does not change the state
+        of the cache."""
+        pass
+
+    @abstractmethod
+    def get_num_computed_partial_tokens(self, seq: Sequence) -> int:
+        """The number of leading tokens of the block after the common computed
+        blocks of the sequence that are copied from the prefix cache at
+        allocation, and so need not be computed by its prefill."""
+        pass
+
+    @abstractmethod
+    def clear_copy_on_writes(self) -> List[Tuple[int, int]]:
+        """Returns the copy-on-writes recorded by allocate() since the last
+        call, and clears them."""
+        pass
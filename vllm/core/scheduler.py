@@ -13,7 +13,7 @@ from vllm.lora.request import LoRARequest
 from vllm.prompt_adapter.request import PromptAdapterRequest
 from vllm.sequence import (Sequence, SequenceData, SequenceGroup,
                            SequenceGroupMetadata, SequenceStatus)
-from vllm.utils import PyObjectCache
+from vllm.utils import Device, PyObjectCache
 
 logger = init_logger(__name__)
 
@@ -48,29 +48,44 @@ class SchedulingBudget:
     updated more than once when scheduling RUNNING requests. Since this won't
     happen if we only have chunked prefill scheduling, we can remove this
     feature from the API when chunked prefill is enabled by default.
+
+    The batched tokens of a prefill whose prefix is in the prefix cache
+    include the cached tokens, which the model skips. They are counted as
+    cached tokens, and do not use the token budget.
     """
     token_budget: int
     max_num_seqs: int
     _request_ids_num_batched_tokens: Set[str] = field(default_factory=set)
     _request_ids_num_curr_seqs: Set[str] = field(default_factory=set)
     _num_batched_tokens: int = 0
+    _num_cached_tokens: int = 0
     _num_curr_seqs: int = 0
 
-    def can_schedule(self, *, num_new_tokens: int, num_new_seqs: int):
+    def can_schedule(self,
+                     *,
+                     num_new_tokens: int,
+                     num_new_seqs: int,
+                     num_cached_tokens: int = 0):
         assert num_new_tokens != 0
         assert num_new_seqs != 0
-        return (self.num_batched_tokens + num_new_tokens <= self.token_budget
+        assert num_cached_tokens < num_new_tokens
+        return (self.num_computed_tokens + num_new_tokens - num_cached_tokens
+                <= self.token_budget
                 and self.num_curr_seqs + num_new_seqs <= self.max_num_seqs)
 
     def remaining_token_budget(self):
-        return self.token_budget - self.num_batched_tokens
+        return self.token_budget - self.num_computed_tokens
 
-    def add_num_batched_tokens(self, req_id: str, num_batched_tokens: int):
+    def add_num_batched_tokens(self,
+                               req_id: str,
+                               num_batched_tokens: int,
+                               num_cached_tokens: int = 0):
         if req_id in self._request_ids_num_batched_tokens:
             return
 
         self._request_ids_num_batched_tokens.add(req_id)
         self._num_batched_tokens += num_batched_tokens
+        self._num_cached_tokens += num_cached_tokens
 
     def subtract_num_batched_tokens(self, req_id: str,
                                     num_batched_tokens: int):
@@ -94,6 +109,15 @@ class SchedulingBudget:
     def num_batched_tokens(self):
         return self._num_batched_tokens
 
+    @property
+    def num_cached_tokens(self):
+        return self._num_cached_tokens
+
+    @property
+    def num_computed_tokens(self):
+        """The number of batched tokens that the model computes."""
+        return self._num_batched_tokens - self._num_cached_tokens
+
     @property
     def num_curr_seqs(self):
         return self._num_curr_seqs
@@ -256,6 +280,9 @@ class SchedulerPrefillOutputs:
     # Ignored sequence groups.
     ignored_seq_groups: List[SequenceGroup]
     num_lookahead_slots: int
+    # The blocks to copy cached tokens from, into the blocks of the selected
+    # sequences.
+    blocks_to_copy: List[Tuple[int, int]]
 
     @classmethod
     def create_empty(cls) -> "SchedulerPrefillOutputs":
@@ -263,6 +290,7 @@ class SchedulerPrefillOutputs:
             seq_groups=[],
             ignored_seq_groups=[],
             num_lookahead_slots=0,
+            blocks_to_copy=[],
         )
 
 
@@ -448,6 +476,9 @@ class Scheduler:
         return len(self.waiting) != 0 or len(self.running) != 0 or len(
             self.swapped) != 0
 
+    def get_prefix_cache_hit_rate(self, device: Device) -> float:
+        return self.block_manager.get_prefix_cache_hit_rate(device)
+
     def get_num_unfinished_seq_groups(self) -> int:
         return len(self.waiting) + len(self.running) + len(self.swapped)
 
@@ -794,10 +825,20 @@ class Scheduler:
                     waiting_queue.popleft()
                     continue
 
+            # The model skips the prefix of the prompt that is in the prefix
+            # cache, so only the rest of the prompt uses the token budget.
+            # Chunked prefill does not support prefix caching.
+            num_cached_tokens = 0
+            if (not enable_chunking and num_new_tokens > 0
+                    and self.cache_config.enable_prefix_caching):
+                num_cached_tokens = self.block_manager.get_num_cached_tokens(
+                    waiting_seqs[0])
+
             num_new_seqs = seq_group.get_max_num_running_seqs()
-            if (num_new_tokens == 0
-                    or not budget.can_schedule(num_new_tokens=num_new_tokens,
-                                               num_new_seqs=num_new_seqs)):
+            if (num_new_tokens == 0 or not budget.can_schedule(
+                    num_new_tokens=num_new_tokens,
+                    num_new_seqs=num_new_seqs,
+                    num_cached_tokens=num_cached_tokens)):
                 break
 
             # Can schedule this request.
@@ -805,10 +846,14 @@ class Scheduler:
                 curr_loras.add(lora_int_id)
             waiting_queue.popleft()
             self._allocate_and_set_running(seq_group)
+            if self.cache_config.enable_prefix_caching:
+                seq_group.maybe_set_num_cached_tokens(num_cached_tokens)
             seq_groups.append(
                 ScheduledSequenceGroup(seq_group=seq_group,
                                        token_chunk_size=num_new_tokens))
-            budget.add_num_batched_tokens(seq_group.request_id, num_new_tokens)
+            budget.add_num_batched_tokens(seq_group.request_id,
+                                          num_new_tokens,
+                                          num_cached_tokens=num_cached_tokens)
             budget.add_num_seqs(seq_group.request_id, num_new_seqs)
 
         # Queue requests that couldn't be scheduled.
@@ -816,10 +861,16 @@ class Scheduler:
         if len(seq_groups) > 0:
             self.prev_prompt = True
 
+        # The copies of cached tokens done by the allocations. They are
+        # collected after all the allocations, since their source blocks can
+        # be evicted once they are cleared.
+        blocks_to_copy = self.block_manager.clear_copy_on_writes()
+
         return SchedulerPrefillOutputs(
             seq_groups=seq_groups,
             ignored_seq_groups=ignored_seq_groups,
-            num_lookahead_slots=self._get_num_lookahead_slots(is_prefill=True))
+            num_lookahead_slots=self._get_num_lookahead_slots(is_prefill=True),
+            blocks_to_copy=blocks_to_copy)
 
     def _schedule_default(self) -> SchedulerOutputs:
         """Schedule queued requests.
@@ -867,7 +918,7 @@ class Scheduler:
                     running_scheduled.swapped_out) == 0:
                 swapped_in = self._schedule_swapped(budget, curr_loras)
 
-        assert (budget.num_batched_tokens <=
+        assert (budget.num_computed_tokens <=
                 self.scheduler_config.max_num_batched_tokens)
         assert budget.num_curr_seqs <= self.scheduler_config.max_num_seqs
 
@@ -902,7 +953,8 @@ class Scheduler:
             scheduled_seq_groups = running_scheduled.decode_seq_groups
         scheduled_seq_groups.extend(swapped_in.decode_seq_groups)
 
-        blocks_to_copy = running_scheduled.blocks_to_copy
+        blocks_to_copy = prefills.blocks_to_copy
+        blocks_to_copy.extend(running_scheduled.blocks_to_copy)
         blocks_to_copy.extend(swapped_in.blocks_to_copy)
 
         ignored_seq_groups = prefills.ignored_seq_groups
@@ -960,7 +1012,7 @@ class Scheduler:
                                            curr_loras,
                                            enable_chunking=True)
 
-        assert (budget.num_batched_tokens <=
+        assert (budget.num_computed_tokens <=
                 self.scheduler_config.max_num_batched_tokens)
         assert budget.num_curr_seqs <= self.scheduler_config.max_num_seqs
 
@@ -991,7 +1043,7 @@ class Scheduler:
             blocks_to_swap_in=swapped_in.blocks_to_swap_in,
             blocks_to_swap_out=running_scheduled.blocks_to_swap_out,
             blocks_to_copy=running_scheduled.blocks_to_copy +
-            swapped_in.blocks_to_copy,
+            swapped_in.blocks_to_copy + prefills.blocks_to_copy,
             ignored_seq_groups=prefills.ignored_seq_groups +
             swapped_in.infeasible_seq_groups,
             num_lookahead_slots=running_scheduled.num_lookahead_slots,
@@ -1036,6 +1088,7 @@ class Scheduler:
 
         if not self.cache_config.enable_prefix_caching:
             common_computed_block_nums = []
+        num_computed_partial_tokens = 0
 
         # Create input data structures.
         seq_group_metadata_list: List[SequenceGroupMetadata] = []
@@ -1095,6 +1148,13 @@ class Scheduler:
             # prefill < decoding.
             is_prompt = seq_group.is_prefill()
 
+            # Chunked prefill does not support prefix caching.
+            if (self.cache_config.enable_prefix_caching
+                    and not self.scheduler_config.chunked_prefill_enabled):
+                num_computed_partial_tokens = (
+                    self.block_manager.get_num_computed_partial_tokens(
+                        seq_group.get_seqs()[0]) if is_prompt else 0)
+
             seq_group_metadata.__init__(
                 request_id=seq_group.request_id,
                 is_prompt=is_prompt,
@@ -1106,6 +1166,7 @@ class Scheduler:
                 token_chunk_size=token_chunk_size,
                 lora_request=seq_group.lora_request,
                 computed_block_nums=common_computed_block_nums,
+                num_computed_partial_tokens=num_computed_partial_tokens,
                 encoder_seq_data=encoder_seq_data,
                 cross_block_table=cross_block_table,
                 # `multi_modal_data` will only be present for the 1st comm
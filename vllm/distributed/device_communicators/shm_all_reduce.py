@@ -0,0 +1,186 @@
+import os
+import time
+from multiprocessing import shared_memory
+from typing import Iterator, List, Tuple
+from unittest.mock import patch
+
+import numpy as np
+import torch
+import torch.distributed as dist
+from torch.distributed import ProcessGroup
+
+import vllm.envs as envs
+from vllm.distributed.parallel_state import in_the_same_node_as
+from vllm.logger import init_logger
+
+VLLM_RINGBUFFER_WARNING_INTERVAL = envs.VLLM_RINGBUFFER_WARNING_INTERVAL
+
+logger = init_logger(__name__)
+
+# the flag of each rank is on its own cache line
+_FLAG_STRIDE_BYTES = 64
+
+
+class ShmAllreduce:
+
+    # max_size: max bytes exchanged per rank at once, larger tensors are
+    # exchanged in chunks of this size
+    def __init__(self,
+                 group: ProcessGroup,
+                 max_size: int = 16 * 1024 * 1024) -> None:
+        """
+        All-reduce and all-gather of CPU tensors through shared memory, for
+        the CPU backend where the ranks of a tensor parallel group are
+        processes on the same node (e.g. one per socket).
+
+        Shared memory layout:
+
+        +-------+-------+-----+-------+--------------+--------------+
+        | flag0 | flag1 | ... | flagN | buffer 0     | buffer 1     |
+        +-------+-------+-----+-------+--------------+--------------+
+        | world_size x 64 bytes       | world_size x max_size bytes |
+
+        Each collective is a generation, numbered from 1. A rank copies its
+        input into its slot of the buffer `generation % 2`, sets its flag to
+        the generation, and waits until every flag has reached it. Then the
+        slots of all ranks are read: summed in rank order for all-reduce, so
+        that every rank computes the same result, or copied for all-gather.
+
+        A rank only writes into a buffer again two generations later, after
+        every rank has set its flag for the generation in between, i.e.
+        after every rank has finished reading the buffer. Like
+        :class:`~vllm.distributed.device_communicators.shm_broadcast.ShmRingBuffer`,
+        this relies on the data being visible to the other processes before
+        the flag that is written after it.
+
+        Args:
+            group: the process group to work on. It must not be a NCCL group.
+                The communicator is disabled if the ranks of the group are
+                not all on the same node.
+        """  # noqa
+        self.disabled = True
+        self.group = group
+
+        assert dist.get_backend(group) != dist.Backend.NCCL, (
+            "ShmAllreduce should be attached to a non-NCCL group.")
+
+        self.rank = dist.get_rank(group=group)
+        self.world_size = dist.get_world_size(group=group)
+        if self.world_size == 1:
+            return
+
+        if not all(in_the_same_node_as(group, source_rank=0)):
+            logger.warning(
+                "Shared memory allreduce is disabled because this process "
+                "group spans across nodes.")
+            return
+
+        self.max_size = max_size
+        flags_size = self.world_size * _FLAG_STRIDE_BYTES
+        total_size = flags_size + 2 * self.world_size * max_size
+        ranks = dist.get_process_group_ranks(group)
+        if self.rank == 0:
+            self.shared_memory = shared_memory.SharedMemory(create=True,
+                                                            size=total_size)
+            self.shared_memory.buf[:flags_size] = bytes(flags_size)
+            dist.broadcast_object_list([self.shared_memory.name],
+                                       src=ranks[0],
+                                       group=group)
+        else:
+            recv = [None]
+            dist.broadcast_object_list(recv, src=ranks[0], group=group)
+            # fix to https://stackoverflow.com/q/62748654/9191338
+            # Python incorrectly tracks shared memory even if it is not
+            # created by the process. The following patch is a workaround.
+            with patch("multiprocessing.resource_tracker.register",
+                       lambda *args, **kwargs: None):
+                self.shared_memory = shared_memory.SharedMemory(name=recv[0])
+        # once every rank has mapped the shared memory, its name is no longer
+        # needed, and unlinking it now means it is freed even if the
+        # processes do not exit cleanly
+        dist.barrier(group=group)
+        if self.rank == 0:
+            self.shared_memory.unlink()
+
+        self._flags = np.ndarray((self.world_size, _FLAG_STRIDE_BYTES // 8),
+                                 dtype=np.int64,
+                                 buffer=self.shared_memory.buf)[:, 0]
+        data = torch.frombuffer(self.shared_memory.buf,
+                                dtype=torch.uint8,
+                                offset=flags_size)
+        self._buffers: List[List[torch.Tensor]] = [
+            list(buffer.split(max_size))
+            for buffer in data.split(self.world_size * max_size)
+        ]
+        self._generation = 0
+        self.disabled = False
+
+    def _exchange(self, inp: torch.Tensor) -> List[torch.Tensor]:
+        """Exchange a 1-D tensor of at most `max_size` bytes with the other
+        ranks, and return the tensor of each rank, in rank order.
+
+        The returned tensors are views of the shared memory, which are valid
+        until the next call."""
+        self._generation += 1
+        generation = self._generation
+        slots = self._buffers[generation % 2]
+        nbytes = inp.numel() * inp.element_size()
+        slots[self.rank][:nbytes].view(inp.dtype).copy_(inp)
+        self._flags[self.rank] = generation
+
+        start_time = time.monotonic()
+        n_warning = 1
+        while self._flags.min() < generation:
+            os.sched_yield()
+            # if we wait for a long time, we should warn the user
+            if (time.monotonic() - start_time >
+                    VLLM_RINGBUFFER_WARNING_INTERVAL * n_warning):
+                logger.warning(
+                    "No available shared memory allreduce result after "
+                    "%d seconds. This typically happens when some ranks "
+                    "skip or reorder a collective operation.",
+                    VLLM_RINGBUFFER_WARNING_INTERVAL)
+                n_warning += 1
+
+        return [slot[:nbytes].view(inp.dtype) for slot in slots]
+
+    def _chunks(self, inp: torch.Tensor) -> Iterator[Tuple[int, int]]:
+        chunk_numel = self.max_size // inp.element_size()
+        for start in range(0, inp.numel(), chunk_numel):
+            yield start, min(start + chunk_numel, inp.numel())
+
+    def all_reduce(self, inp: torch.Tensor) -> torch.Tensor:
+        """Return the sum of `inp` over the ranks, in a new tensor."""
+        inp_flat = inp.reshape(-1)
+        out = torch.empty_like(inp, memory_format=torch.contiguous_format)
+        out_flat = out.view(-1)
+        for start, end in self._chunks(inp_flat):
+            slots = self._exchange(inp_flat[start:end])
+            out_chunk = out_flat[start:end]
+            out_chunk.copy_(slots[0])
+            for slot in slots[1:]:
+                out_chunk.add_(slot)
+        return out
+
+    def all_gather_into_tensor(self, output: torch.Tensor,
+                               inp: torch.Tensor) -> None:
+        """Gather `inp` of every rank into `output`, a contiguous tensor of
+        shape `(world_size, *inp.shape)`."""
+        assert output.is_contiguous()
+        inp_flat = inp.reshape(-1)
+        out_flat = output.view(self.world_size, -1)
+        for start, end in self._chunks(inp_flat):
+            slots = self._exchange(inp_flat[start:end])
+            for rank, slot in enumerate(slots):
+                out_flat[rank, start:end].copy_(slot)
+
+    def close(self) -> None:
+        if not self.disabled:
+            self.disabled = True
+            # the views must be released before the memory is unmapped
+            del self._flags
+            del self._buffers
+            self.shared_memory.close()
+
+    def __del__(self):
+        self.close()
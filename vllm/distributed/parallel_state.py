@@ -100,6 +100,7 @@ class GroupCoordinator:
     # communicators are only created for world size > 1
     pynccl_comm: Optional[Any]  # PyNccl communicator
     ca_comm: Optional[Any]  # Custom allreduce communicator
+    shm_comm: Optional[Any]  # shared memory allreduce communicator for CPU
     mq_broadcaster: Optional[Any]  # shared memory broadcaster
 
     def __init__(
@@ -111,6 +112,7 @@ class GroupCoordinator:
         use_custom_allreduce: bool,
         use_tpu_communicator: bool,
         use_message_queue_broadcaster: bool = False,
+        use_shm_allreduce: bool = False,
     ):
 
         self.rank = torch.distributed.get_rank()
@@ -174,6 +176,18 @@ class GroupCoordinator:
         if use_tpu_communicator and self.world_size > 1:
             self.tpu_communicator = TpuCommunicator(group=self.cpu_group)
 
+        # For the CPU backend, replace the gloo all-reduce and all-gather of
+        # the device group with shared memory, if all ranks are on this node.
+        from vllm.distributed.device_communicators.shm_all_reduce import (
+            ShmAllreduce)
+        from vllm.platforms import current_platform
+        self.shm_comm: Optional[ShmAllreduce] = None
+        if (use_shm_allreduce and self.world_size > 1
+                and self.device.type == "cpu"
+                and torch.distributed.get_backend(self.device_group) == "gloo"
+                and not current_platform.is_tpu()):
+            self.shm_comm = ShmAllreduce(group=self.cpu_group)
+
         from vllm.distributed.device_communicators.shm_broadcast import (
             MessageQueue)
         self.mq_broadcaster: Optional[MessageQueue] = None
@@ -283,6 +297,9 @@ class GroupCoordinator:
             out = ca_comm.custom_all_reduce(input_)
             if out is not None:
                 return out
+        shm_comm = self.shm_comm
+        if shm_comm is not None and not shm_comm.disabled and input_.is_cpu:
+            return shm_comm.all_reduce(input_)
         pynccl_comm = self.pynccl_comm
         if (pynccl_comm is not None and not pynccl_comm.disabled):
             pynccl_comm.all_reduce(input_)
@@ -315,9 +332,13 @@ class GroupCoordinator:
                                     dtype=input_.dtype,
                                     device=input_.device)
         # All-gather.
-        torch.distributed.all_gather_into_tensor(output_tensor,
-                                                 input_,
-                                                 group=self.device_group)
+        shm_comm = self.shm_comm
+        if shm_comm is not None and not shm_comm.disabled and input_.is_cpu:
+            shm_comm.all_gather_into_tensor(output_tensor, input_)
+        else:
+            torch.distributed.all_gather_into_tensor(output_tensor,
+                                                     input_,
+                                                     group=self.device_group)
         # Reshape
         output_tensor = output_tensor.movedim(0, dim)
         output_tensor = output_tensor.reshape(input_size[:dim] +
@@ -737,6 +758,9 @@ class GroupCoordinator:
             self.pynccl_comm = None
         if self.ca_comm is not None:
             self.ca_comm = None
+        if self.shm_comm is not None:
+            self.shm_comm.close()
+            self.shm_comm = None
         if self.mq_broadcaster is not None:
             self.mq_broadcaster = None
 
@@ -767,6 +791,7 @@ def init_model_parallel_group(
     backend: str,
     use_custom_allreduce: Optional[bool] = None,
     use_message_queue_broadcaster: bool = False,
+    use_shm_allreduce: bool = False,
 ) -> GroupCoordinator:
     if use_custom_allreduce is None:
         use_custom_allreduce = _ENABLE_CUSTOM_ALL_REDUCE
@@ -778,6 +803,7 @@ def init_model_parallel_group(
         use_custom_allreduce=use_custom_allreduce,
         use_tpu_communicator=True,
         use_message_queue_broadcaster=use_message_queue_broadcaster,
+        use_shm_allreduce=use_shm_allreduce,
     )
 
 
@@ -927,11 +953,13 @@ def initialize_model_parallel(
                   (i + 1) * tensor_model_parallel_size))
         group_ranks.append(ranks)
 
-    # message queue broadcaster is only used in tensor model parallel group
+    # message queue broadcaster and shared memory allreduce are only used in
+    # tensor model parallel group
     _TP = init_model_parallel_group(group_ranks,
                                     get_world_group().local_rank,
                                     backend,
-                                    use_message_queue_broadcaster=True)
+                                    use_message_queue_broadcaster=True,
+                                    use_shm_allreduce=True)
 
     # Build the pipeline model-parallel groups.
     num_pipeline_model_parallel_groups: int = (world_size //
@@ -0,0 +1,363 @@
+"""Automatic partitioning of the layers of a model across pipeline stages.
+
+With ``VLLM_PP_LAYER_PARTITION=auto``, the engine picks the number of layers
+of each stage that minimizes the time of the slowest stage, given the time
+and weight memory of each layer, and the extra cost of the first stage (the
+embedding and any multi-modal encoder) and of the last stage (the final norm,
+the LM head and the sampler), such that the weights of each stage fit in the
+memory of its devices.
+
+The costs are measured by every stage during the profile run of the model
+runner, and cached per model and hardware under ``VLLM_CACHE_ROOT``. Until
+each layer has been profiled, they are estimated from the model config.
+"""
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import torch
+
+import vllm.envs as envs
+from vllm.config import CacheConfig, ModelConfig, ParallelConfig
+from vllm.logger import init_logger
+
+logger = init_logger(__name__)
+
+
+@dataclass
+class LayerCosts:
+    """The time and the weight memory (in bytes, per device) of each hidden
+    layer, and the extra time and memory of the first and last stages.
+
+    The times are only compared with each other, so any unit will do."""
+    layer_times: List[float]
+    layer_memory: List[int]
+    first_stage_time: float = 0.0
+    first_stage_memory: int = 0
+    last_stage_time: float = 0.0
+    last_stage_memory: int = 0
+
+
+def partition_layers(costs: LayerCosts,
+                     pp_size: int,
+                     memory_limit: Optional[int] = None) -> List[int]:
+    """Return the number of layers of each stage, which minimizes the time
+    of the slowest stage such that the memory of each stage is at most
+    `memory_limit`.
+
+    Every stage has at least one layer.
+    """
+    num_layers = len(costs.layer_times)
+    if not 1 <= pp_size <= num_layers:
+        raise ValueError(f"Cannot partition {num_layers} layers into "
+                         f"{pp_size} pipeline stages.")
+
+    prefix_times = [0.0]
+    prefix_memory = [0]
+    for layer_time, layer_memory in zip(costs.layer_times, costs.layer_memory):
+        prefix_times.append(prefix_times[-1] + layer_time)
+        prefix_memory.append(prefix_memory[-1] + layer_memory)
+
+    def stage_time(stage: int, start: int, end: int) -> float:
+        # time of stage `stage` with the layers [start, end), or infinity if
+        # they do not fit in memory
+        memory = prefix_memory[end] - prefix_memory[start]
+        stage_time = prefix_times[end] - prefix_times[start]
+        if stage == 0:
+            memory += costs.first_stage_memory
+            stage_time += costs.first_stage_time
+        if stage == pp_size - 1:
+            memory += costs.last_stage_memory
+            stage_time += costs.last_stage_time
+        if memory_limit is not None and memory > memory_limit:
+            return float("inf")
+        return stage_time
+
+    # best[stage][end]: the time of the slowest stage, when the first `end`
+    # layers are partitioned into the stages [0, stage]; start[stage][end]:
+    # the first layer of `stage` in that partition
+    best = [[float("inf")] * (num_layers + 1) for _ in range(pp_size)]
+    start = [[0] * (num_layers + 1) for _ in range(pp_size)]
+    for end in range(1, num_layers - pp_size + 2):
+        best[0][end] = stage_time(0, 0, end)
+    for stage in range(1, pp_size):
+        for end in range(stage + 1, num_layers - pp_size + stage + 2):
+            for begin in range(stage, end):
+                cost = max(best[stage - 1][begin],
+                           stage_time(stage, begin, end))
+                if cost < best[stage][end]:
+                    best[stage][end] = cost
+                    start[stage][end] = begin
+
+    if best[pp_size - 1][num_layers] == float("inf"):
+        raise ValueError(
+            f"The weights of the model do not fit in {pp_size} pipeline "
+            f"stages of {memory_limit} bytes.")
+
+    partitions = []
+    end = num_layers
+    for stage in reversed(range(pp_size)):
+        partitions.append(end - start[stage][end])
+        end = start[stage][end]
+    return partitions[::-1]
+
+
+def _get_weight_bits(model_config: ModelConfig) -> Optional[int]:
+    # The bits per weight of the linear layers, or None if they are not known
+    # from the config (e.g. for GGUF, bitsandbytes or compressed-tensors).
+    if model_config.quantization is None:
+        return torch.empty((), dtype=model_config.dtype).element_size() * 8
+    if model_config.quantization in ("fp8", "fbgemm_fp8", "tpu_int8"):
+        return 8
+    quant_config = getattr(model_config.hf_config, "quantization_config", None)
+    if isinstance(quant_config, dict):
+        # GPTQ, AWQ and their Marlin variants
+        bits = quant_config.get("bits", quant_config.get("w_bit"))
+        if isinstance(bits, int):
+            return bits
+    return None
+
+
+def estimate_layer_costs(model_config: ModelConfig,
+                         parallel_config: ParallelConfig) -> LayerCosts:
+    """Estimate the costs of the layers from the number of their parameters,
+    to which the time of their matrix multiplications is proportional.
+
+    The memory of quantized weights is estimated from their number of bits,
+    without their scales and zero points. If the number of bits is not known
+    from the config, the memory of the layers is taken to be 0, i.e. only the
+    profiled costs bound the layers of a stage by the memory of its devices.
+    """
+    hf_config = model_config.hf_text_config
+    num_layers = getattr(hf_config, "num_hidden_layers", 0)
+    hidden_size = model_config.get_hidden_size()
+    head_size = model_config.get_head_size()
+    num_heads = getattr(hf_config, "num_attention_heads", 0)
+    num_kv_heads = model_config.get_total_num_kv_heads()
+    intermediate_size = getattr(hf_config, "intermediate_size",
+                                4 * hidden_size)
+    num_experts = getattr(hf_config, "num_local_experts", 1)
+    num_active_experts = getattr(hf_config, "num_experts_per_tok", 1)
+
+    attention_params = (2 * num_heads +
+                        2 * num_kv_heads) * head_size * (hidden_size)
+    # gate, up and down projections
+    mlp_params = 3 * hidden_size * intermediate_size
+    embedding_params = model_config.get_vocab_size() * hidden_size
+
+    tp_size = parallel_config.tensor_parallel_size
+    # The embedding and the LM head are not quantized.
+    bytes_per_param = torch.empty((), dtype=model_config.dtype).element_size()
+    embedding_memory = embedding_params * bytes_per_param // tp_size
+    weight_bits = _get_weight_bits(model_config)
+    if weight_bits is None:
+        layer_memory = 0
+    else:
+        layer_memory = ((attention_params + num_experts * mlp_params) *
+                        weight_bits // 8 // tp_size)
+
+    return LayerCosts(
+        layer_times=[attention_params + num_active_experts * mlp_params] *
+        num_layers,
+        layer_memory=[layer_memory] * num_layers,
+        first_stage_memory=embedding_memory,
+        last_stage_time=embedding_params,
+        last_stage_memory=embedding_memory,
+    )
+
+
+def _get_device_name() -> str:
+    from vllm.platforms import current_platform
+    try:
+        return current_platform.get_device_name()
+    except NotImplementedError:
+        return current_platform._enum.name.lower()
+
+
+def _get_cache_dir(model_config: ModelConfig,
+                   parallel_config: ParallelConfig) -> str:
+    key = json.dumps([
+        model_config.model,
+        model_config.revision,
+        str(model_config.dtype),
+        model_config.quantization,
+        parallel_config.tensor_parallel_size,
+        _get_device_name(),
+    ])
+    return os.path.join(envs.VLLM_CACHE_ROOT, "pp_layer_costs",
+                        hashlib.sha256(key.encode()).hexdigest()[:16])
+
+
+def save_stage_costs(model_config: ModelConfig,
+                     parallel_config: ParallelConfig, start_layer: int,
+                     end_layer: int, layer_times: List[float],
+                     layer_memory: List[int], stage_time: float,
+                     stage_memory: int) -> None:
+    """Cache the costs measured by the stage with the layers
+    [start_layer, end_layer)."""
+    cache_dir = _get_cache_dir(model_config, parallel_config)
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, f"layers_{start_layer}_{end_layer}.json")
+    costs = {
+        "model": model_config.model,
+        "start_layer": start_layer,
+        "end_layer": end_layer,
+        "layer_times": layer_times,
+        "layer_memory": layer_memory,
+        "stage_time": stage_time,
+        "stage_memory": stage_memory,
+    }
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(costs, f)
+    os.replace(tmp_path, path)
+    logger.debug("Saved the costs of layers [%d, %d) to %s", start_layer,
+                 end_layer, path)
+
+
+def load_profiled_layer_costs(
+        model_config: ModelConfig,
+        parallel_config: ParallelConfig) -> Optional[LayerCosts]:
+    """Return the costs cached by previous profile runs, or None if some
+    layers, or the first or last stage, have not been profiled yet."""
+    cache_dir = _get_cache_dir(model_config, parallel_config)
+    if not os.path.isdir(cache_dir):
+        return None
+    num_layers = getattr(model_config.hf_text_config, "num_hidden_layers", 0)
+
+    layer_times: Dict[int, float] = {}
+    layer_memory: Dict[int, int] = {}
+    first_stage: Optional[Tuple[float, int]] = None
+    last_stage: Optional[Tuple[float, int]] = None
+    for filename in sorted(os.listdir(cache_dir)):
+        if not filename.endswith(".json"):
+            continue
+        with open(os.path.join(cache_dir, filename)) as f:
+            costs = json.load(f)
+        start_layer, end_layer = costs["start_layer"], costs["end_layer"]
+        if end_layer > num_layers:
+            continue
+        for i, layer in enumerate(range(start_layer, end_layer)):
+            layer_times[layer] = costs["layer_times"][i]
+            layer_memory[layer] = costs["layer_memory"][i]
+        # what the stage spends outside of its layers
+        extra_cost = (costs["stage_time"] - sum(costs["layer_times"]),
+                      costs["stage_memory"] - sum(costs["layer_memory"]))
+        if start_layer == 0:
+            first_stage = extra_cost
+        if end_layer == num_layers:
+            last_stage = extra_cost
+
+    if (len(layer_times) < num_layers or first_stage is None
+            or last_stage is None):
+        return None
+    return LayerCosts(
+        layer_times=[layer_times[layer] for layer in range(num_layers)],
+        layer_memory=[layer_memory[layer] for layer in range(num_layers)],
+        first_stage_time=max(first_stage[0], 0.0),
+        first_stage_memory=max(first_stage[1], 0),
+        last_stage_time=max(last_stage[0], 0.0),
+        last_stage_memory=max(last_stage[1], 0),
+    )
+
+
+def resolve_pp_layer_partition(model_config: ModelConfig,
+                               parallel_config: ParallelConfig,
+                               cache_config: CacheConfig) -> List[int]:
+    """Pick the number of layers of each pipeline stage, from the profiled
+    costs of the layers if they are cached, else from estimated ones."""
+    pp_size = parallel_config.pipeline_parallel_size
+    costs = load_profiled_layer_costs(model_config, parallel_config)
+    source = "profiled"
+    if costs is None:
+        costs = estimate_layer_costs(model_config, parallel_config)
+        source = "estimated"
+
+    from vllm.platforms import current_platform
+    try:
+        memory_limit: Optional[int] = int(
+            current_platform.get_device_total_memory() *
+            cache_config.gpu_memory_utilization)
+    except NotImplementedError:
+        memory_limit = None
+
+    partitions = partition_layers(costs, pp_size, memory_limit)
+    logger.info(
+        "Partitioned the %d layers of the model into pipeline stages of %s "
+        "layers, based on %s layer costs.", len(costs.layer_times),
+        ",".join(map(str, partitions)), source)
+    return partitions
+
+
+def _find_stage_layers(
+        model: torch.nn.Module
+) -> Optional[Tuple[int, int, torch.nn.ModuleList]]:
+    # The decoder of models which support pipeline parallelism creates its
+    # layers with `make_layers`, and keeps the range of its own layers.
+    for module in model.modules():
+        layers = getattr(module, "layers", None)
+        if (isinstance(getattr(module, "start_layer", None), int)
+                and isinstance(getattr(module, "end_layer", None), int)
+                and isinstance(layers, torch.nn.ModuleList)):
+            return module.start_layer, module.end_layer, layers
+    return None
+
+
+def _get_memory(module: torch.nn.Module) -> int:
+    return sum(p.numel() * p.element_size() for p in module.parameters())
+
+
+@contextmanager
+def profile_stage_costs(model: torch.nn.Module, model_config: ModelConfig,
+                        parallel_config: ParallelConfig) -> Iterator[None]:
+    """Measure the time of each layer of this pipeline stage, and of the
+    whole stage, while the model runs in this context, and cache them with
+    the memory of their weights. Does nothing unless
+    `VLLM_PP_LAYER_PARTITION=auto`."""
+    if (envs.VLLM_PP_LAYER_PARTITION != "auto"
+            or parallel_config.pipeline_parallel_size == 1):
+        yield
+        return
+    stage_layers = _find_stage_layers(model)
+    if stage_layers is None:
+        yield
+        return
+    start_layer, end_layer, layers = stage_layers
+
+    layer_times = [0.0] * (end_layer - start_layer)
+    layer_start_times = [0.0] * (end_layer - start_layer)
+    handles = []
+    for i, layer in enumerate(layers[start_layer:end_layer]):
+
+        def pre_hook(module, args, i=i):
+            torch.cuda.synchronize()
+            layer_start_times[i] = time.perf_counter()
+
+        def hook(module, args, output, i=i):
+            torch.cuda.synchronize()
+            layer_times[i] += time.perf_counter() - layer_start_times[i]
+
+        handles.append(layer.register_forward_pre_hook(pre_hook))
+        handles.append(layer.register_forward_hook(hook))
+
+    torch.cuda.synchronize()
+    start_time = time.perf_counter()
+    try:
+        yield
+        torch.cuda.synchronize()
+    finally:
+        for handle in handles:
+            handle.remove()
+    stage_time = time.perf_counter() - start_time
+
+    from vllm.distributed.parallel_state import get_tp_group
+    if get_tp_group().rank_in_group == 0:
+        save_stage_costs(
+            model_config, parallel_config, start_layer, end_layer, layer_times,
+            [_get_memory(layer)
+             for layer in layers[start_layer:end_layer]], stage_time,
+            _get_memory(model))
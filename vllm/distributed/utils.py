@@ -2,7 +2,8 @@
 # Adapted from
 # https://github.com/NVIDIA/Megatron-LM/blob/main/megatron/core/tensor_parallel/utils.py
 # Copyright (c) 2022, NVIDIA CORPORATION. All rights reserved.
-from typing import Sequence, Tuple
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Sequence, Tuple
 
 import torch
 
@@ -53,14 +54,45 @@ def split_tensor_along_last_dim(
     return tensor_list
 
 
-def get_pp_indices(num_hidden_layers: int, pp_rank: int,
-                   pp_size: int) -> Tuple[int, int]:
+# The partition used by `make_layers` for the model being created, see
+# `set_pp_layer_partition`.
+_pp_layer_partition: Optional[List[int]] = None
+
+
+@contextmanager
+def set_pp_layer_partition(partitions: Optional[List[int]]) -> Iterator[None]:
+    """Split the layers of the models created in this context into
+    pipeline stages of `partitions` layers, see :func:`get_pp_indices`."""
+    global _pp_layer_partition
+    old_partitions = _pp_layer_partition
+    _pp_layer_partition = partitions
+    try:
+        yield
+    finally:
+        _pp_layer_partition = old_partitions
+
+
+def get_pp_layer_partition() -> Optional[List[int]]:
+    return _pp_layer_partition
+
+
+def get_pp_indices(num_hidden_layers: int,
+                   pp_rank: int,
+                   pp_size: int,
+                   partitions: Optional[List[int]] = None) -> Tuple[int, int]:
     """Try to evenly distribute layers across partitions.
     If the number of layers is not divisible by the number of partitions,
     the last partition will have the remaining layers.
+
+    If `partitions`, or else `VLLM_PP_LAYER_PARTITION`, is set, it gives the
+    number of layers of each partition instead. The executor resolves
+    `VLLM_PP_LAYER_PARTITION=auto` into `ParallelConfig.pp_layer_partition`;
+    where no partition was resolved, e.g. for the draft model of speculative
+    decoding, `auto` distributes the layers evenly.
     """
     partition_list_str = envs.VLLM_PP_LAYER_PARTITION
-    if partition_list_str is not None:
+    if (partitions is None and partition_list_str is not None
+            and partition_list_str != "auto"):
         try:
             partitions = [
                 int(layer) for layer in partition_list_str.split(",")
@@ -68,6 +100,7 @@ def get_pp_indices(num_hidden_layers: int, pp_rank: int,
         except ValueError as err:
             raise ValueError("Invalid partition string: {}".format(
                 partition_list_str)) from err
+    if partitions is not None:
         if len(partitions) != pp_size:
             raise ValueError(f"{len(partitions)=} does not match {pp_size=}.")
         if sum(partitions) != num_hidden_layers:
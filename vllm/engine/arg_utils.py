@@ -112,11 +112,15 @@ class EngineArgs:
     speculative_disable_by_batch_size: Optional[int] = None
     ngram_prompt_lookup_max: Optional[int] = None
     ngram_prompt_lookup_min: Optional[int] = None
+    ngram_index: str = "lookup"
+    ngram_corpus_size: int = 0
     spec_decoding_acceptance_method: str = 'rejection_sampler'
     typical_acceptance_sampler_posterior_threshold: Optional[float] = None
     typical_acceptance_sampler_posterior_alpha: Optional[float] = None
     qlora_adapter_name_or_path: Optional[str] = None
     disable_logprobs_during_spec_decoding: Optional[bool] = None
+    spec_decoding_adaptive_proposal_len: bool = False
+    speculative_disable_mqa_scorer: bool = False
 
     otlp_traces_endpoint: Optional[str] = None
     collect_detailed_traces: Optional[str] = None
@@ -188,8 +192,8 @@ class EngineArgs:
             type=str,
             default=EngineArgs.load_format,
             choices=[
-                'auto', 'pt', 'safetensors', 'npcache', 'dummy', 'tensorizer',
-                'bitsandbytes'
+                'auto', 'pt', 'safetensors', 'npcache', 'mmap_cache', 'dummy',
+                'tensorizer', 'bitsandbytes'
             ],
             help='The format of the model weights to load.\n\n'
             '* "auto" will try to load the weights in the safetensors format '
@@ -198,7 +202,11 @@ class EngineArgs:
             '* "pt" will load the weights in the pytorch bin format.\n'
             '* "safetensors" will load the weights in the safetensors format.\n'
             '* "npcache" will load the weights in pytorch format and store '
-            'a numpy cache to speed up the loading.\n'
+            'a numpy cache to speed up the loading. Deprecated in favor of '
+            '"mmap_cache".\n'
+            '* "mmap_cache" will convert the weights (safetensors, pytorch '
+            'bin or dequantized GGUF) once into a single memory-mapped file, '
+            'which later loads map without copying.\n'
             '* "dummy" will initialize the weights with random values, '
             'which is mainly for profiling.\n'
             '* "tensorizer" will load the weights using tensorizer from '
@@ -571,6 +579,25 @@ class EngineArgs:
             help='Min size of window for ngram prompt lookup in speculative '
             'decoding.')
 
+        parser.add_argument(
+            '--ngram-index',
+            type=str,
+            default=EngineArgs.ngram_index,
+            choices=['lookup', 'suffix_automaton'],
+            help='How ngram speculation finds matches. "lookup" searches the '
+            'token history of each sequence every step. "suffix_automaton" '
+            'keeps a suffix automaton of each sequence up to date, drafts '
+            'from the longest earlier match and costs time linear in the '
+            'number of new and draft tokens per step.')
+
+        parser.add_argument(
+            '--ngram-corpus-size',
+            type=int,
+            default=EngineArgs.ngram_corpus_size,
+            help='With --ngram-index suffix_automaton, also draft from the '
+            'outputs of recently finished requests, keeping up to this many '
+            'tokens of them. 0 disables it.')
+
         parser.add_argument(
             '--spec-decoding-acceptance-method',
             type=str,
@@ -615,6 +642,21 @@ class EngineArgs:
             'calculation in proposal sampling, target sampling, and after '
             'accepted tokens are determined.')
 
+        parser.add_argument(
+            '--spec-decoding-adaptive-proposal-len',
+            action='store_true',
+            help='Pick the number of speculative tokens scored for each '
+            'sequence every step, from its observed acceptance rate, the '
+            'batch size and the measured draft and target step times. '
+            '--num-speculative-tokens is the upper bound.')
+
+        parser.add_argument(
+            '--speculative-disable-mqa-scorer',
+            action='store_true',
+            help='Score speculative tokens with batch expansion even if the '
+            'attention backend can score all of them in one query per '
+            'sequence.')
+
         parser.add_argument('--model-loader-extra-config',
                             type=nullable_str,
                             default=EngineArgs.model_loader_extra_config,
@@ -685,8 +727,9 @@ class EngineArgs:
         return engine_args
 
     def create_engine_config(self, ) -> EngineConfig:
-        # gguf file needs a specific model loader and doesn't use hf_repo
-        if self.model.endswith(".gguf"):
+        # gguf file needs a specific model loader and doesn't use hf_repo,
+        # unless it is dequantized into an mmap cache
+        if self.model.endswith(".gguf") and self.load_format != "mmap_cache":
             self.quantization = self.load_format = "gguf"
 
         # bitsandbytes quantization needs a specific model loader
@@ -811,6 +854,8 @@ class EngineArgs:
             disable_log_stats=self.disable_log_stats,
             ngram_prompt_lookup_max=self.ngram_prompt_lookup_max,
             ngram_prompt_lookup_min=self.ngram_prompt_lookup_min,
+            ngram_index=self.ngram_index,
+            ngram_corpus_size=self.ngram_corpus_size,
             draft_token_acceptance_method=\
                 self.spec_decoding_acceptance_method,
             typical_acceptance_sampler_posterior_threshold=self.
@@ -818,6 +863,8 @@ class EngineArgs:
             typical_acceptance_sampler_posterior_alpha=self.
             typical_acceptance_sampler_posterior_alpha,
             disable_logprobs=self.disable_logprobs_during_spec_decoding,
+            adaptive_proposal_len=self.spec_decoding_adaptive_proposal_len,
+            disable_mqa_scorer=self.speculative_disable_mqa_scorer,
         )
 
         scheduler_config = SchedulerConfig(
@@ -28,6 +28,8 @@ from vllm.pooling_params import PoolingParams
 from vllm.prompt_adapter.request import PromptAdapterRequest
 from vllm.sampling_params import SamplingParams
 from vllm.sequence import ExecuteModelRequest, SamplerOutput
+from vllm.startup_profile import startup_phase
+from vllm.step_profile import SCHEDULE, STEP, record_step_phase
 from vllm.usage.usage_lib import UsageContext
 
 logger = init_logger(__name__)
@@ -263,8 +265,10 @@ class _AsyncLLMEngine(LLMEngine):
         and updates the scheduler with the model outputs. Finally, it decodes
         the sequences and returns the newly generated results.
         """
+        step_start = time.perf_counter()
         seq_group_metadata_list, scheduler_outputs = self.scheduler[
             virtual_engine].schedule()
+        record_step_phase(SCHEDULE, step_start)
 
         if not scheduler_outputs.is_empty():
             # Execute the model.
@@ -287,6 +291,7 @@ class _AsyncLLMEngine(LLMEngine):
         request_outputs = self._process_model_outputs(
             output, scheduler_outputs.scheduled_seq_groups,
             scheduler_outputs.ignored_seq_groups, seq_group_metadata_list)
+        record_step_phase(STEP, step_start)
 
         # Log stats.
         self.do_log_stats(scheduler_outputs, output)
@@ -431,7 +436,12 @@ class _AsyncLLMEngine(LLMEngine):
                 prompt_adapter_request=prompt_adapter_request,
             )
 
-        return self.input_processor(model_inputs)
+        processed_inputs = self.input_processor(model_inputs)
+        multi_modal_data = processed_inputs.get("multi_modal_data")
+        if self.mm_preprocessor is not None and multi_modal_data:
+            processed_inputs["multi_modal_data"] = (
+                await self.mm_preprocessor.map_input_async(multi_modal_data))
+        return processed_inputs
 
     async def add_request_async(
         self,
@@ -589,7 +599,8 @@ class AsyncLLMEngine:
     ) -> "AsyncLLMEngine":
         """Creates an async LLM engine from the engine arguments."""
         # Create the engine configs.
-        engine_config = engine_args.create_engine_config()
+        with startup_phase("config_resolution"):
+            engine_config = engine_args.create_engine_config()
 
         if engine_args.engine_use_ray:
             from vllm.executor import ray_utils
@@ -1093,6 +1104,18 @@ class AsyncLLMEngine:
         else:
             return self.engine.is_tracing_enabled()
 
+    async def start_step_trace(self) -> None:
+        if self.engine_use_ray:
+            await self.engine.start_step_trace.remote()  # type: ignore
+        else:
+            self.engine.start_step_trace()
+
+    async def stop_step_trace(self) -> str:
+        if self.engine_use_ray:
+            return await self.engine.stop_step_trace.remote()  # type: ignore
+        else:
+            return self.engine.stop_step_trace()
+
     def add_logger(self, logger_name: str, logger: StatLoggerBase) -> None:
         if self.engine_use_ray:
             ray.get(
@@ -30,6 +30,7 @@ from vllm.inputs.parse import is_explicit_encoder_decoder_prompt
 from vllm.logger import init_logger
 from vllm.lora.request import LoRARequest
 from vllm.multimodal import MultiModalDataDict
+from vllm.multimodal.preprocessor import MultiModalPreprocessor
 from vllm.outputs import (EmbeddingRequestOutput, RequestOutput,
                           RequestOutputFactory)
 from vllm.pooling_params import PoolingParams
@@ -39,6 +40,11 @@ from vllm.sequence import (EmbeddingSequenceGroupOutput, ExecuteModelRequest,
                            PoolerOutput, SamplerOutput, Sequence,
                            SequenceGroup, SequenceGroupMetadata,
                            SequenceStatus)
+from vllm.startup_profile import log_startup_profile, startup_phase
+from vllm.step_profile import (CREATE_OUTPUTS, SCHEDULE, STEP,
+                               enable_step_profile, pop_step_phase_times,
+                               record_step_phase, start_step_trace,
+                               stop_step_trace)
 from vllm.tracing import (SpanAttributes, SpanKind, extract_trace_context,
                           init_tracer)
 from vllm.transformers_utils.config import try_get_generation_config
@@ -47,7 +53,7 @@ from vllm.transformers_utils.tokenizer_group import (
     AnyTokenizer, BaseTokenizerGroup, init_tokenizer_from_configs)
 from vllm.usage.usage_lib import (UsageContext, is_usage_stats_enabled,
                                   usage_message)
-from vllm.utils import Counter
+from vllm.utils import Counter, Device
 from vllm.version import __version__ as VLLM_VERSION
 
 logger = init_logger(__name__)
@@ -243,7 +249,8 @@ class LLMEngine:
         self.log_stats = log_stats
 
         if not self.model_config.skip_tokenizer_init:
-            self.tokenizer = self._init_tokenizer()
+            with startup_phase("tokenizer_load"):
+                self.tokenizer = self._init_tokenizer()
             self.detokenizer = Detokenizer(self.tokenizer)
         else:
             self.tokenizer = None
@@ -255,20 +262,25 @@ class LLMEngine:
 
         self.input_processor = INPUT_REGISTRY.create_input_processor(
             self.model_config)
-
-        self.model_executor = executor_class(
-            model_config=model_config,
-            cache_config=cache_config,
-            parallel_config=parallel_config,
-            scheduler_config=scheduler_config,
-            device_config=device_config,
-            lora_config=lora_config,
-            multimodal_config=multimodal_config,
-            speculative_config=speculative_config,
-            load_config=load_config,
-            prompt_adapter_config=prompt_adapter_config,
-            observability_config=self.observability_config,
-        )
+        self.mm_preprocessor = (MultiModalPreprocessor(self.model_config)
+                                if self.model_config.multimodal_config
+                                is not None else None)
+
+        # Weight loading is recorded separately, in get_model.
+        with startup_phase("executor_init"):
+            self.model_executor = executor_class(
+                model_config=model_config,
+                cache_config=cache_config,
+                parallel_config=parallel_config,
+                scheduler_config=scheduler_config,
+                device_config=device_config,
+                lora_config=lora_config,
+                multimodal_config=multimodal_config,
+                speculative_config=speculative_config,
+                load_config=load_config,
+                prompt_adapter_config=prompt_adapter_config,
+                observability_config=self.observability_config,
+            )
 
         if not self.model_config.embedding_mode:
             self._initialize_kv_caches()
@@ -326,6 +338,7 @@ class LLMEngine:
 
         # Metric Logging.
         if self.log_stats:
+            enable_step_profile()
             if stat_loggers is not None:
                 self.stat_loggers = stat_loggers
             else:
@@ -363,14 +376,17 @@ class LLMEngine:
                 ),
             ))
 
+        log_startup_profile()
+
     def _initialize_kv_caches(self) -> None:
         """Initialize the KV cache in the worker(s).
 
         The workers will determine the number of blocks in both the GPU cache
         and the swap CPU cache.
         """
-        num_gpu_blocks, num_cpu_blocks = (
-            self.model_executor.determine_num_available_blocks())
+        with startup_phase("kv_cache_profiling"):
+            num_gpu_blocks, num_cpu_blocks = (
+                self.model_executor.determine_num_available_blocks())
 
         if self.cache_config.num_gpu_blocks_override is not None:
             num_gpu_blocks_override = self.cache_config.num_gpu_blocks_override
@@ -383,7 +399,10 @@ class LLMEngine:
         self.cache_config.num_gpu_blocks = num_gpu_blocks
         self.cache_config.num_cpu_blocks = num_cpu_blocks
 
-        self.model_executor.initialize_cache(num_gpu_blocks, num_cpu_blocks)
+        # Graph capture is recorded separately, in capture_model.
+        with startup_phase("kv_cache_init"):
+            self.model_executor.initialize_cache(num_gpu_blocks,
+                                                 num_cpu_blocks)
 
     @classmethod
     def _get_executor_cls(cls,
@@ -450,7 +469,8 @@ class LLMEngine:
     ) -> "LLMEngine":
         """Creates an LLM engine from the engine arguments."""
         # Create the engine configs.
-        engine_config = engine_args.create_engine_config()
+        with startup_phase("config_resolution"):
+            engine_config = engine_args.create_engine_config()
         executor_class = cls._get_executor_cls(engine_config)
         # Create the LLM engine.
         engine = cls(
@@ -948,7 +968,12 @@ class LLMEngine:
                 prompt_adapter_request=prompt_adapter_request,
             )
 
-        return self.input_processor(model_inputs)
+        processed_inputs = self.input_processor(model_inputs)
+        multi_modal_data = processed_inputs.get("multi_modal_data")
+        if self.mm_preprocessor is not None and multi_modal_data:
+            processed_inputs["multi_modal_data"] = (
+                self.mm_preprocessor.map_input(multi_modal_data))
+        return processed_inputs
 
     def add_request(
         self,
@@ -1213,6 +1238,7 @@ class LLMEngine:
             scheduler.free_finished_seq_groups()
 
         # Create the outputs.
+        create_outputs_start = time.perf_counter()
         request_outputs: List[Union[RequestOutput,
                                     EmbeddingRequestOutput]] = []
         for scheduled_seq_group in scheduled_seq_groups:
@@ -1223,6 +1249,7 @@ class LLMEngine:
         for seq_group in ignored_seq_groups:
             request_output = RequestOutputFactory.create(seq_group)
             request_outputs.append(request_output)
+        record_step_phase(CREATE_OUTPUTS, create_outputs_start)
         return request_outputs
 
     def step(self) -> List[Union[RequestOutput, EmbeddingRequestOutput]]:
@@ -1280,8 +1307,10 @@ class LLMEngine:
             raise NotImplementedError(
                 "Pipeline parallelism is only supported through AsyncLLMEngine "
                 "as performance will be severely degraded otherwise.")
+        step_start = time.perf_counter()
         seq_group_metadata_list, scheduler_outputs = self.scheduler[
             0].schedule()
+        record_step_phase(SCHEDULE, step_start)
 
         if not scheduler_outputs.is_empty():
             finished_requests_ids = self.scheduler[
@@ -1302,6 +1331,7 @@ class LLMEngine:
         request_outputs = self._process_model_outputs(
             output, scheduler_outputs.scheduled_seq_groups,
             scheduler_outputs.ignored_seq_groups, seq_group_metadata_list)
+        record_step_phase(STEP, step_start)
 
         # Log stats.
         self.do_log_stats(scheduler_outputs, output)
@@ -1379,6 +1409,13 @@ class LLMEngine:
                 for scheduler in self.scheduler)
             cpu_cache_usage_sys = 1.0 - (num_free_cpu / num_total_cpu)
 
+        # Prefix Cache Hit Rate. Note that we always use
+        # the cache hit rate of the first virtual engine.
+        gpu_prefix_cache_hit_rate = self.scheduler[
+            0].get_prefix_cache_hit_rate(Device.GPU)
+        cpu_prefix_cache_hit_rate = self.scheduler[
+            0].get_prefix_cache_hit_rate(Device.CPU)
+
         # Iteration stats
         num_prompt_tokens_iter = 0
         num_generation_tokens_iter = 0
@@ -1477,6 +1514,11 @@ class LLMEngine:
         else:
             spec_decode_metrics = None
 
+        # Phase times of the steps since the last stats, only collected at the
+        # end of a step so that forced logs do not split a step.
+        step_phase_times_iter = (pop_step_phase_times()
+                                 if scheduler_outputs is not None else {})
+
         return Stats(
             now=now,
             # System stats
@@ -1487,6 +1529,9 @@ class LLMEngine:
             #   KV Cache Usage in %
             gpu_cache_usage_sys=gpu_cache_usage_sys,
             cpu_cache_usage_sys=cpu_cache_usage_sys,
+            #   Prefix Cache Hit Rate
+            gpu_prefix_cache_hit_rate=gpu_prefix_cache_hit_rate,
+            cpu_prefix_cache_hit_rate=cpu_prefix_cache_hit_rate,
 
             # Iteration stats
             num_prompt_tokens_iter=num_prompt_tokens_iter,
@@ -1495,6 +1540,7 @@ class LLMEngine:
             time_per_output_tokens_iter=time_per_output_tokens_iter,
             spec_decode_metrics=spec_decode_metrics,
             num_preemption_iter=num_preemption_iter,
+            step_phase_times_iter=step_phase_times_iter,
 
             # Request stats
             #   Latency
@@ -1537,6 +1583,15 @@ class LLMEngine:
     def is_tracing_enabled(self) -> bool:
         return self.tracer is not None
 
+    def start_step_trace(self) -> None:
+        """Start recording a rolling Chrome trace of the step phases."""
+        start_step_trace()
+
+    def stop_step_trace(self) -> str:
+        """Stop recording the step trace and return the path it was dumped
+        to."""
+        return stop_step_trace()
+
     def do_tracing(self, scheduler_outputs: SchedulerOutputs) -> None:
         if self.tracer is None:
             return
@@ -30,6 +30,7 @@ prometheus_client.disable_created_metrics()
 # begin-metrics-definitions
 class Metrics:
     labelname_finish_reason = "finished_reason"
+    labelname_step_phase = "phase"
     _gauge_cls = prometheus_client.Gauge
     _counter_cls = prometheus_client.Counter
     _histogram_cls = prometheus_client.Histogram
@@ -64,6 +65,15 @@ class Metrics:
             name="vllm:cpu_cache_usage_perc",
             documentation="CPU KV-cache usage. 1 means 100 percent usage.",
             labelnames=labelnames)
+        #   Prefix caching block hit rate
+        self.gauge_gpu_prefix_cache_hit_rate = self._gauge_cls(
+            name="vllm:gpu_prefix_cache_hit_rate",
+            documentation="GPU prefix cache block hit rate.",
+            labelnames=labelnames)
+        self.gauge_cpu_prefix_cache_hit_rate = self._gauge_cls(
+            name="vllm:cpu_prefix_cache_hit_rate",
+            documentation="CPU prefix cache block hit rate.",
+            labelnames=labelnames)
 
         # Iteration stats
         self.counter_num_preemption = self._counter_cls(
@@ -94,6 +104,15 @@ class Metrics:
                 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.75,
                 1.0, 2.5
             ])
+        self.histogram_step_phase_time = self._histogram_cls(
+            name="vllm:step_phase_time_seconds",
+            documentation="Histogram of the time spent in each phase of an "
+            "engine step in seconds.",
+            labelnames=labelnames + [Metrics.labelname_step_phase],
+            buckets=[
+                0.00001, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+            ])
 
         # Request stats
         #   Latency
@@ -142,6 +161,11 @@ class Metrics:
             name="vllm:spec_decode_efficiency",
             documentation="Speculative decoding system efficiency.",
             labelnames=labelnames)
+        self.gauge_spec_decode_mean_proposal_len = self._gauge_cls(
+            name="vllm:spec_decode_mean_proposal_len",
+            documentation="Average number of draft tokens scored per "
+            "sequence and decode step.",
+            labelnames=labelnames)
         self.counter_spec_decode_num_accepted_tokens = (self._counter_cls(
             name="vllm:spec_decode_num_accepted_tokens_total",
             documentation="Number of accepted tokens.",
@@ -308,6 +332,9 @@ class Stats:
     #   KV Cache Usage in %
     gpu_cache_usage_sys: float
     cpu_cache_usage_sys: float
+    #   Prefix caching block hit rate, -1 if prefix caching is disabled
+    gpu_prefix_cache_hit_rate: float
+    cpu_prefix_cache_hit_rate: float
 
     # Iteration stats (should have _iter suffix)
     num_prompt_tokens_iter: int
@@ -315,6 +342,8 @@ class Stats:
     time_to_first_tokens_iter: List[float]
     time_per_output_tokens_iter: List[float]
     num_preemption_iter: int
+    # Time spent in each phase of the steps, see vllm.step_profile.
+    step_phase_times_iter: Dict[str, float]
 
     # Request stats (should have _requests suffix)
     #   Latency
@@ -417,6 +446,13 @@ class LoggingStatLogger(StatLoggerBase):
                 stats.gpu_cache_usage_sys * 100,
                 stats.cpu_cache_usage_sys * 100,
             )
+            if (stats.gpu_prefix_cache_hit_rate >= 0
+                    or stats.cpu_prefix_cache_hit_rate >= 0):
+                logger.info(
+                    "Prefix cache hit rate: GPU: %.2f%%, CPU: %.2f%%",
+                    max(stats.gpu_prefix_cache_hit_rate, 0) * 100,
+                    max(stats.cpu_prefix_cache_hit_rate, 0) * 100,
+                )
 
             if self.spec_decode_metrics is not None:
                 logger.info(
@@ -436,6 +472,8 @@ class LoggingStatLogger(StatLoggerBase):
                 f"Draft acceptance rate: {metrics.draft_acceptance_rate:.3f}, "
                 f"System efficiency: {metrics.system_efficiency:.3f}, "
                 f"Number of speculative tokens: {metrics.num_spec_tokens}, "
+                f"Mean proposal length: {metrics.mean_proposal_len:.2f}, "
+                f"Speculated sequences: {metrics.spec_seq_fraction:.3f}, "
                 f"Number of accepted tokens: {metrics.accepted_tokens}, "
                 f"Number of draft tokens: {metrics.draft_tokens}, "
                 f"Number of emitted tokens: {metrics.emitted_tokens}.")
@@ -489,6 +527,12 @@ class PrometheusStatLogger(StatLoggerBase):
                         stats.gpu_cache_usage_sys)
         self._log_gauge(self.metrics.gauge_cpu_cache_usage,
                         stats.cpu_cache_usage_sys)
+        if stats.gpu_prefix_cache_hit_rate >= 0:
+            self._log_gauge(self.metrics.gauge_gpu_prefix_cache_hit_rate,
+                            stats.gpu_prefix_cache_hit_rate)
+        if stats.cpu_prefix_cache_hit_rate >= 0:
+            self._log_gauge(self.metrics.gauge_cpu_prefix_cache_hit_rate,
+                            stats.cpu_prefix_cache_hit_rate)
 
         # Iteration level data
         self._log_counter(self.metrics.counter_num_preemption,
@@ -501,6 +545,11 @@ class PrometheusStatLogger(StatLoggerBase):
                             stats.time_to_first_tokens_iter)
         self._log_histogram(self.metrics.histogram_time_per_output_token,
                             stats.time_per_output_tokens_iter)
+        for phase, phase_time in stats.step_phase_times_iter.items():
+            self.metrics.histogram_step_phase_time.labels(
+                **{
+                    **self.labels, Metrics.labelname_step_phase: phase
+                }).observe(phase_time)
 
         # Request level data
         # Latency
@@ -570,6 +619,9 @@ class PrometheusStatLogger(StatLoggerBase):
                     self.spec_decode_metrics.draft_acceptance_rate)
                 self._log_gauge(self.metrics.gauge_spec_decode_efficiency,
                                 self.spec_decode_metrics.system_efficiency)
+                self._log_gauge(
+                    self.metrics.gauge_spec_decode_mean_proposal_len,
+                    self.spec_decode_metrics.mean_proposal_len)
                 self._log_counter(
                     self.metrics.counter_spec_decode_num_accepted_tokens,
                     self.spec_decode_metrics.accepted_tokens)
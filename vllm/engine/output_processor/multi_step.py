@@ -1,4 +1,5 @@
 import functools
+import time
 from typing import Callable, List
 
 from transformers import PreTrainedTokenizer
@@ -11,6 +12,7 @@ from vllm.logger import init_logger
 from vllm.sampling_params import SamplingParams
 from vllm.sequence import (Sequence, SequenceGroup, SequenceGroupOutput,
                            SequenceOutput, SequenceStatus)
+from vllm.step_profile import DETOKENIZE, STOP_CHECK, record_step_phase
 from vllm.transformers_utils.detokenizer import Detokenizer
 from vllm.utils import Counter
 
@@ -128,15 +130,19 @@ class MultiStepOutputProcessor(SequenceGroupOutputProcessor):
 
             new_char_count = 0
             if sampling_params.detokenize:
+                detokenize_start = time.perf_counter()
                 new_char_count = self.detokenizer.decode_sequence_inplace(
                     seq, sampling_params)
+                record_step_phase(DETOKENIZE, detokenize_start)
 
             # TODO(sang): Support lora.
+            stop_check_start = time.perf_counter()
             self.stop_checker.maybe_stop_sequence(
                 seq,
                 new_char_count=new_char_count,
                 sampling_params=sampling_params,
             )
+            record_step_phase(STOP_CHECK, stop_check_start)
             if seq.is_finished():
                 break
 
@@ -1,3 +1,4 @@
+import time
 from typing import Dict, List, Optional, Tuple, Union
 
 from vllm.config import SchedulerConfig
@@ -8,7 +9,8 @@ from vllm.engine.output_processor.stop_checker import StopChecker
 from vllm.logger import init_logger
 from vllm.sampling_params import SamplingParams
 from vllm.sequence import (Sequence, SequenceGroup, SequenceGroupOutput,
-                           SequenceOutput, SequenceStatus)
+                           SequenceLogprobs, SequenceOutput, SequenceStatus)
+from vllm.step_profile import DETOKENIZE, STOP_CHECK, record_step_phase
 from vllm.transformers_utils.detokenizer import Detokenizer
 from vllm.utils import Counter
 
@@ -68,14 +70,19 @@ class SingleStepOutputProcessor(SequenceGroupOutputProcessor):
         # have a logprob associated with it.
         if prompt_logprobs is not None:
             if not seq_group.prompt_logprobs:
-                prompt_logprobs = [None] + prompt_logprobs
-                seq_group.prompt_logprobs = []
+                first_prompt_logprobs = SequenceLogprobs()
+                first_prompt_logprobs.append(None)
+                first_prompt_logprobs.extend(prompt_logprobs)
+                prompt_logprobs = first_prompt_logprobs
+                seq_group.prompt_logprobs = SequenceLogprobs()
 
             if seq_group.sampling_params.detokenize and self.detokenizer:
+                detokenize_start = time.perf_counter()
                 self.detokenizer.decode_prompt_logprobs_inplace(
                     seq_group,
                     prompt_logprobs,
                     position_offset=len(seq_group.prompt_logprobs))
+                record_step_phase(DETOKENIZE, detokenize_start)
 
             seq_group.prompt_logprobs.extend(prompt_logprobs)
 
@@ -89,16 +96,20 @@ class SingleStepOutputProcessor(SequenceGroupOutputProcessor):
             seq = seq_group.seqs[0]
             seq.append_token_id(sample.output_token, sample.logprobs)
             if sampling_params.detokenize and self.detokenizer:
+                detokenize_start = time.perf_counter()
                 new_char_count = self.detokenizer.decode_sequence_inplace(
                     seq, sampling_params)
+                record_step_phase(DETOKENIZE, detokenize_start)
             else:
                 new_char_count = 0
+            stop_check_start = time.perf_counter()
             self.stop_checker.maybe_stop_sequence(
                 seq,
                 new_char_count,
                 sampling_params,
                 lora_req=seq_group.lora_request,
             )
+            record_step_phase(STOP_CHECK, stop_check_start)
             if seq.is_finished():
                 for scheduler in self.scheduler:
                     scheduler.free_seq(seq)
@@ -151,16 +162,20 @@ class SingleStepOutputProcessor(SequenceGroupOutputProcessor):
 
         for seq, _ in child_seqs:
             if sampling_params.detokenize and self.detokenizer:
+                detokenize_start = time.perf_counter()
                 new_char_count = self.detokenizer.decode_sequence_inplace(
                     seq, sampling_params)
+                record_step_phase(DETOKENIZE, detokenize_start)
             else:
                 new_char_count = 0
+            stop_check_start = time.perf_counter()
             self.stop_checker.maybe_stop_sequence(
                 seq,
                 new_char_count,
                 sampling_params,
                 lora_req=seq_group.lora_request,
             )
+            record_step_phase(STOP_CHECK, stop_check_start)
 
         # Non-beam search case
         if not sampling_params.use_beam_search:
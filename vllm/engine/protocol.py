@@ -73,6 +73,12 @@ class AsyncEngineClient(Protocol):
     async def is_tracing_enabled(self) -> bool:
         pass
 
+    async def start_step_trace(self) -> None:
+        """Start recording a rolling Chrome trace of the engine step phases"""
+
+    async def stop_step_trace(self) -> str:
+        """Stop recording the step trace and return the path of its dump"""
+
     async def do_log_stats(
         self,
         scheduler_outputs: Optional[SchedulerOutputs] = None,
@@ -2,7 +2,8 @@ import codecs
 from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Awaitable, Iterable, List, Optional, Tuple, Union, cast
+from typing import (Any, Awaitable, Iterable, List, Literal, Optional, Tuple,
+                    Union, cast)
 
 # yapf conflicts with isort for this block
 # yapf: disable
@@ -21,7 +22,8 @@ from typing_extensions import Required, TypedDict
 from vllm.config import ModelConfig
 from vllm.logger import init_logger
 from vllm.multimodal import MultiModalDataDict
-from vllm.multimodal.utils import async_get_and_parse_image
+from vllm.multimodal.utils import (async_get_and_parse_image,
+                                   async_get_and_parse_image_embeds)
 from vllm.transformers_utils.tokenizer import AnyTokenizer
 
 logger = init_logger(__name__)
@@ -34,8 +36,28 @@ class CustomChatCompletionContentPartParam(TypedDict, total=False):
     """The type of the content part."""
 
 
-ChatCompletionContentPartParam = Union[OpenAIChatCompletionContentPartParam,
-                                       CustomChatCompletionContentPartParam]
+class ImageEmbeds(TypedDict, total=False):
+    data: Required[str]
+    """The base64-encoded float16 values of the embeddings, in C order."""
+
+    shape: Required[List[int]]
+    """The shape of the embeddings, `[image_feature_size, hidden_size]`."""
+
+
+class ChatCompletionContentPartImageEmbedsParam(TypedDict, total=False):
+    """The embeddings of an image, passed to the language model instead of
+    the outputs of the vision encoder and projector of the model."""
+
+    image_embeds: Required[ImageEmbeds]
+
+    type: Required[Literal["image_embeds"]]
+    """The type of the content part."""
+
+
+ChatCompletionContentPartParam = Union[
+    OpenAIChatCompletionContentPartParam,
+    ChatCompletionContentPartImageEmbedsParam,
+    CustomChatCompletionContentPartParam]
 
 
 class CustomChatCompletionMessageParam(TypedDict, total=False):
@@ -156,6 +178,17 @@ def _parse_chat_message_content_parts(
 
             image_future = async_get_and_parse_image(image_url["url"])
             mm_futures.append(image_future)
+        elif part_type == "image_embeds":
+            if len(mm_futures) > 0:
+                raise NotImplementedError(
+                    "Multiple 'image_url' or 'image_embeds' input is "
+                    "currently not supported.")
+
+            image_embeds = cast(ChatCompletionContentPartImageEmbedsParam,
+                                part)["image_embeds"]
+            mm_futures.append(
+                async_get_and_parse_image_embeds(image_embeds["data"],
+                                                 image_embeds["shape"]))
         else:
             raise NotImplementedError(f"Unknown part type: {part_type}")
 
@@ -1,11 +1,16 @@
+import queue
+import threading
+import time
 from contextlib import contextmanager
-from typing import ClassVar, List, Optional, Sequence, Union, cast, overload
+from typing import (ClassVar, Iterable, Iterator, List, Optional, Sequence,
+                    Set, Union, cast, overload)
 
 from tqdm import tqdm
 from transformers import PreTrainedTokenizer, PreTrainedTokenizerFast
 
 from vllm.engine.arg_utils import EngineArgs
 from vllm.engine.llm_engine import LLMEngine
+from vllm.entrypoints.prefix_clustering import order_by_shared_prefix
 from vllm.inputs import PromptInputs, TextPrompt, TokensPrompt
 from vllm.inputs.parse import parse_and_batch_prompt
 from vllm.logger import init_logger
@@ -275,7 +280,8 @@ class LLM:
         lora_request: Optional[Union[List[LoRARequest], LoRARequest]] = None,
         prompt_adapter_request: Optional[PromptAdapterRequest] = None,
         guided_options_request: Optional[Union[LLMGuidedOptions,
-                                               GuidedDecodingRequest]] = None
+                                               GuidedDecodingRequest]] = None,
+        cluster_by_prefix: bool = False,
     ) -> List[RequestOutput]:
         """Generates the completions for the input prompts.
 
@@ -294,6 +300,12 @@ class LLM:
             lora_request: LoRA request to use for generation, if any.
             prompt_adapter_request: Prompt Adapter request to use for 
                 generation, if any.
+            cluster_by_prefix: Whether to add the requests to the engine in
+                an order where prompts sharing a prefix are adjacent, rather
+                than in the input order. With prefix caching enabled, this
+                lets the requests sharing a prefix run while its blocks are
+                cached, instead of evicting them in between. The outputs are
+                returned in the input order regardless.
 
         Returns:
             A list of `RequestOutput` objects containing the
@@ -334,11 +346,151 @@ class LLM:
             params=sampling_params,
             lora_request=lora_request,
             prompt_adapter_request=prompt_adapter_request,
-            guided_options=guided_options_request)
+            guided_options=guided_options_request,
+            cluster_by_prefix=cluster_by_prefix)
 
         outputs = self._run_engine(use_tqdm=use_tqdm)
         return LLMEngine.validate_outputs(outputs, RequestOutput)
 
+    def generate_stream(
+        self,
+        inputs: Iterable[PromptInputs],
+        sampling_params: Optional[SamplingParams] = None,
+        *,
+        max_in_flight: Optional[int] = None,
+        lora_request: Optional[LoRARequest] = None,
+        prompt_adapter_request: Optional[PromptAdapterRequest] = None,
+    ) -> Iterator[RequestOutput]:
+        """Generates the completions for a stream of inputs.
+
+        Unlike :meth:`generate`, the inputs are consumed lazily: they are
+        read from the iterable in a background thread while the engine steps,
+        and tokenized and added to the engine whenever it has fewer than
+        ``max_in_flight`` unfinished requests. Finished outputs are yielded as
+        soon as they complete, so neither the inputs nor the outputs of the
+        whole stream are held in memory.
+
+        Args:
+            inputs: An iterable of inputs to generate completions for. It is
+                consumed from a background thread.
+            sampling_params: The sampling parameters applied to every input.
+                If None, we use the default sampling parameters.
+            max_in_flight: The maximum number of requests in the engine, and
+                of inputs waiting to be added to it. Defaults to
+                twice the maximum number of sequences per iteration, so that
+                the scheduler always has waiting requests to fill a batch.
+            lora_request: LoRA request to use for generation, if any.
+            prompt_adapter_request: Prompt Adapter request to use for
+                generation, if any.
+
+        Yields:
+            The `RequestOutput` of each input, in the order in which they
+            finish. The `request_id` of the outputs increases in the order of
+            the inputs.
+
+        Note:
+            If the generator is closed before it is exhausted, the requests
+            left in the engine are aborted.
+        """
+        if self.llm_engine.model_config.embedding_mode:
+            raise ValueError(
+                "LLM.generate_stream() is only supported for (conditional) "
+                "generation models (XForCausalLM, XForConditionalGeneration).")
+        if lora_request is not None and not self.llm_engine.lora_config:
+            raise ValueError(f"Got lora_request {lora_request} but LoRA is "
+                             "not enabled!")
+
+        if sampling_params is None:
+            # Use default sampling params.
+            sampling_params = SamplingParams()
+        if max_in_flight is None:
+            max_in_flight = (2 * self.llm_engine.scheduler_config.max_num_seqs)
+        if max_in_flight < 1:
+            raise ValueError(
+                f"max_in_flight must be at least 1, got {max_in_flight}.")
+
+        # The inputs are only read in the background thread. They are
+        # processed here, as the tokenizer is also used by the detokenizer
+        # and fast tokenizers must not be used from two threads at once.
+        inputs_queue: "queue.Queue[object]" = queue.Queue(max_in_flight)
+        stop_event = threading.Event()
+        feeder = threading.Thread(target=self._read_inputs_in_background,
+                                  args=(inputs, inputs_queue, stop_event),
+                                  name="vllm_llm_input_reader",
+                                  daemon=True)
+        feeder.start()
+
+        in_flight: Set[str] = set()
+        inputs_exhausted = False
+        try:
+            while True:
+                # Top up the engine. Only block on the background thread if
+                # the engine would otherwise be idle.
+                while not inputs_exhausted and len(in_flight) < max_in_flight:
+                    try:
+                        item = inputs_queue.get(block=not in_flight)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        inputs_exhausted = True
+                    elif isinstance(item, BaseException):
+                        raise item
+                    else:
+                        request_id = str(next(self.request_counter))
+                        self.llm_engine.add_request(
+                            request_id,
+                            cast(PromptInputs, item),
+                            sampling_params,
+                            lora_request=lora_request,
+                            prompt_adapter_request=prompt_adapter_request)
+                        in_flight.add(request_id)
+
+                if not in_flight:
+                    return
+
+                for output in self.llm_engine.step():
+                    # Other requests may have been added to the engine.
+                    if output.finished and output.request_id in in_flight:
+                        in_flight.discard(output.request_id)
+                        yield cast(RequestOutput, output)
+        finally:
+            # The background thread exits by itself once it sees the event.
+            # It is not joined, since it may be blocked reading the inputs.
+            # Drop the inputs it has queued.
+            stop_event.set()
+            try:
+                while True:
+                    inputs_queue.get_nowait()
+            except queue.Empty:
+                pass
+            if in_flight:
+                self.llm_engine.abort_request(in_flight)
+
+    def _read_inputs_in_background(
+        self,
+        inputs: Iterable[PromptInputs],
+        inputs_queue: "queue.Queue[object]",
+        stop_event: threading.Event,
+    ) -> None:
+        # Puts each input, then None; or the exception raised by the inputs.
+        # Stops once stop_event is set, even if the queue stays full.
+        def put(item: object) -> bool:
+            while not stop_event.is_set():
+                try:
+                    inputs_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        try:
+            for request_inputs in inputs:
+                if not put(request_inputs):
+                    return
+            put(None)
+        except BaseException as e:
+            put(e)
+
     @overload  # LEGACY: single (prompt + optional token ids)
     def encode(
         self,
@@ -532,6 +684,7 @@ class LLM:
         lora_request: Optional[Union[Sequence[LoRARequest], LoRARequest]],
         prompt_adapter_request: Optional[PromptAdapterRequest],
         guided_options: Optional[GuidedDecodingRequest] = None,
+        cluster_by_prefix: bool = False,
     ) -> None:
         if isinstance(inputs, (str, dict)):
             # Convert a single prompt to a list.
@@ -556,6 +709,11 @@ class LLM:
         elif isinstance(params, SamplingParams):
             params = self._add_guided_processor(params, guided_options)
 
+        if cluster_by_prefix:
+            self._add_requests_by_shared_prefix(inputs, params, lora_request,
+                                                prompt_adapter_request)
+            return
+
         # Add requests to the engine.
         for i, request_inputs in enumerate(inputs):
             self._add_request(
@@ -565,6 +723,57 @@ class LLM:
                     lora_request, Sequence) else lora_request,
                 prompt_adapter_request=prompt_adapter_request)
 
+    def _add_requests_by_shared_prefix(
+        self,
+        inputs: Sequence[PromptInputs],
+        params: Union[SamplingParams, Sequence[SamplingParams], PoolingParams,
+                      Sequence[PoolingParams]],
+        lora_request: Optional[Union[Sequence[LoRARequest], LoRARequest]],
+        prompt_adapter_request: Optional[PromptAdapterRequest],
+    ) -> None:
+        # The request IDs follow the input order, which _run_engine restores,
+        # but the requests are added to the FCFS scheduler in the order of
+        # their prompts' trie, so that requests sharing a prefix are
+        # scheduled together.
+        requests = []
+        for i, request_inputs in enumerate(inputs):
+            request_lora = lora_request[i] if isinstance(
+                lora_request, Sequence) else lora_request
+            if request_lora is not None and not self.llm_engine.lora_config:
+                raise ValueError(f"Got lora_request {request_lora} but LoRA "
+                                 "is not enabled!")
+            request_id = str(next(self.request_counter))
+            processed_inputs = self.llm_engine.process_model_inputs(
+                request_inputs,
+                request_id=request_id,
+                lora_request=request_lora,
+                prompt_adapter_request=prompt_adapter_request)
+            requests.append(
+                (request_id, processed_inputs,
+                 params[i] if isinstance(params, Sequence) else params,
+                 request_lora))
+
+        order = order_by_shared_prefix(
+            [
+                processed_inputs["prompt_token_ids"]
+                for _, processed_inputs, _, _ in requests
+            ],
+            self.llm_engine.cache_config.block_size,
+            groups=[
+                request_lora.lora_int_id if request_lora else 0
+                for _, _, _, request_lora in requests
+            ])
+        for i in order:
+            request_id, processed_inputs, request_params, request_lora = (
+                requests[i])
+            self.llm_engine._add_processed_request(
+                request_id,
+                processed_inputs,
+                request_params,
+                arrival_time=time.time(),
+                lora_request=request_lora,
+                prompt_adapter_request=prompt_adapter_request)
+
     def _add_request(
             self,
             inputs: PromptInputs,
@@ -145,6 +145,8 @@ async def build_async_engine_client(args) -> AsyncIterator[AsyncEngineClient]:
 
 
 router = APIRouter()
+# Operational endpoints, only served with --enable-admin-endpoints.
+admin_router = APIRouter()
 
 
 def mount_metrics(app: FastAPI):
@@ -196,6 +198,30 @@ async def show_version():
     return JSONResponse(content=ver)
 
 
+@admin_router.post("/admin/step_trace/start")
+async def start_step_trace():
+    """Start recording a rolling Chrome trace of the engine step phases."""
+    try:
+        await async_engine_client.start_step_trace()
+    except RuntimeError as e:
+        err = openai_serving_completion.create_error_response(message=str(e))
+        return JSONResponse(err.model_dump(),
+                            status_code=HTTPStatus.BAD_REQUEST)
+    return Response(status_code=200)
+
+
+@admin_router.post("/admin/step_trace/stop")
+async def stop_step_trace():
+    """Stop recording the step trace and dump it on the engine host."""
+    try:
+        trace_path = await async_engine_client.stop_step_trace()
+    except RuntimeError as e:
+        err = openai_serving_completion.create_error_response(message=str(e))
+        return JSONResponse(err.model_dump(),
+                            status_code=HTTPStatus.BAD_REQUEST)
+    return JSONResponse(content={"path": trace_path})
+
+
 @router.post("/v1/chat/completions")
 async def create_chat_completion(request: ChatCompletionRequest,
                                  raw_request: Request):
@@ -240,6 +266,8 @@ async def create_embedding(request: EmbeddingRequest, raw_request: Request):
 def build_app(args: Namespace) -> FastAPI:
     app = FastAPI(lifespan=lifespan)
     app.include_router(router)
+    if args.enable_admin_endpoints:
+        app.include_router(admin_router)
     app.root_path = args.root_path
 
     mount_metrics(app)
@@ -265,7 +293,8 @@ def build_app(args: Namespace) -> FastAPI:
             root_path = "" if args.root_path is None else args.root_path
             if request.method == "OPTIONS":
                 return await call_next(request)
-            if not request.url.path.startswith(f"{root_path}/v1"):
+            if not request.url.path.startswith(
+                (f"{root_path}/v1", f"{root_path}/admin")):
                 return await call_next(request)
             if request.headers.get("Authorization") != "Bearer " + token:
                 return JSONResponse(content={"error": "Unauthorized"},
@@ -139,6 +139,12 @@ def make_arg_parser(parser: FlexibleArgumentParser) -> FlexibleArgumentParser:
         action="store_true",
         help="If specified, will run the OpenAI frontend server in the same "
         "process as the model serving engine.")
+    parser.add_argument(
+        "--enable-admin-endpoints",
+        action="store_true",
+        help="If specified, serve the /admin endpoints, which start and "
+        "stop a Chrome trace of the engine step phases. The trace is "
+        "dumped to VLLM_STEP_TRACE_DIR on the engine host.")
 
     parser = AsyncEngineArgs.add_cli_args(parser)
 
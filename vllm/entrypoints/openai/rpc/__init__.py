@@ -36,6 +36,8 @@ class RPCUtilityRequest(Enum):
     DO_LOG_STATS = 7
     CHECK_HEALTH = 8
     IS_TRACING_ENABLED = 9
+    START_STEP_TRACE = 10
+    STOP_STEP_TRACE = 11
 
 
 RPC_REQUEST_TYPE = Union[RPCGenerateRequest, RPCAbortRequest,
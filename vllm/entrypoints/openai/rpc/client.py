@@ -201,6 +201,31 @@ class AsyncEngineRPCClient:
             request=RPCUtilityRequest.DO_LOG_STATS,
             error_message="RPCRequest DO_LOG_STATS failed.")
 
+    async def _send_step_trace_rpc_request(self,
+                                           request: RPCUtilityRequest) -> str:
+        """Send a step trace request, raising the error of the server if it
+        failed."""
+        with self.socket() as socket:
+            await socket.send(cloudpickle.dumps(request))
+            response = cloudpickle.loads(await socket.recv())
+
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def start_step_trace(self):
+        """Send a START_STEP_TRACE signal to the RPC Server"""
+
+        await self._send_step_trace_rpc_request(
+            RPCUtilityRequest.START_STEP_TRACE)
+
+    async def stop_step_trace(self) -> str:
+        """Send a STOP_STEP_TRACE signal to the RPC Server and return the
+        path of the dumped trace"""
+
+        return await self._send_step_trace_rpc_request(
+            RPCUtilityRequest.STOP_STEP_TRACE)
+
     @property
     def is_running(self) -> bool:
         return not self._errored
@@ -78,6 +78,24 @@ class AsyncEngineRPCServer:
         await self.socket.send_multipart(
             [identity, cloudpickle.dumps(tracing_flag)])
 
+    async def start_step_trace(self, identity):
+        """Start the step trace and confirm success."""
+        try:
+            await self.engine.start_step_trace()
+            await self.socket.send_multipart(
+                [identity, cloudpickle.dumps(VLLM_RPC_SUCCESS_STR)])
+        except Exception as e:
+            await self.socket.send_multipart([identity, cloudpickle.dumps(e)])
+
+    async def stop_step_trace(self, identity):
+        """Stop the step trace and send the path of its dump."""
+        try:
+            trace_path = await self.engine.stop_step_trace()
+            await self.socket.send_multipart(
+                [identity, cloudpickle.dumps(trace_path)])
+        except Exception as e:
+            await self.socket.send_multipart([identity, cloudpickle.dumps(e)])
+
     async def do_log_stats(self, identity):
         """Log stats and confirm success."""
         await self.engine.do_log_stats()
@@ -165,6 +183,10 @@ class AsyncEngineRPCServer:
                 return self.check_health(identity)
             elif request == RPCUtilityRequest.IS_TRACING_ENABLED:
                 return self.is_tracing_enabled(identity)
+            elif request == RPCUtilityRequest.START_STEP_TRACE:
+                return self.start_step_trace(identity)
+            elif request == RPCUtilityRequest.STOP_STEP_TRACE:
+                return self.stop_step_trace(identity)
             else:
                 raise ValueError(f"Unknown RPCUtilityRequest type: {request}")
 
@@ -1,6 +1,9 @@
 import asyncio
+import json
+import os
 from io import StringIO
-from typing import Awaitable, Callable, List
+from typing import (AsyncIterator, Awaitable, Callable, Iterable, List,
+                    Optional, Set, Tuple)
 
 import aiohttp
 
@@ -11,6 +14,7 @@ from vllm.entrypoints.logger import RequestLogger
 from vllm.entrypoints.openai.protocol import (BatchRequestInput,
                                               BatchRequestOutput,
                                               BatchResponseData,
+                                              ChatCompletionRequest,
                                               ChatCompletionResponse,
                                               EmbeddingResponse, ErrorResponse)
 # yapf: enable
@@ -50,6 +54,41 @@ def parse_args():
                         help="The role name to return if "
                         "`request.add_generation_prompt=True`.")
 
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Read the input file line by line and write each output as soon "
+        "as it is done, with at most `--max-concurrent-requests` requests in "
+        "flight, instead of holding the whole batch in memory. The outputs "
+        "are written in the order in which they finish, to a local file.")
+    parser.add_argument(
+        "--max-concurrent-requests",
+        type=int,
+        default=1024,
+        help="The maximum number of requests in flight with `--stream`.")
+    parser.add_argument(
+        "--checkpoint-file",
+        type=nullable_str,
+        default=None,
+        help="With `--stream`, the path of a file to which the progress of "
+        "the batch is saved. If it exists, the batch resumes from it: the "
+        "outputs written after it was saved are discarded, and only the "
+        "requests without a saved output are run.")
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=int,
+        default=1000,
+        help="Save the progress every this many outputs with `--stream`.")
+    parser.add_argument(
+        "--sort-by-prefix-window",
+        type=int,
+        default=0,
+        help="Sort each window of this many requests by their prompts "
+        "before running them, so that requests sharing a prefix run "
+        "together and hit the prefix cache. Without `--stream`, the outputs "
+        "are still written in the order of the input file. 0 keeps the "
+        "order of the input file.")
+
     parser = AsyncEngineArgs.add_cli_args(parser)
 
     parser.add_argument('--max-log-len',
@@ -85,6 +124,222 @@ async def write_file(path_or_url: str, data: str) -> None:
             f.write(data)
 
 
+async def iter_lines(path_or_url: str) -> AsyncIterator[str]:
+    """Yield the non-empty lines of a file, without reading it whole."""
+    if path_or_url.startswith("http://") or path_or_url.startswith("https://"):
+        async with aiohttp.ClientSession() as session, \
+                   session.get(path_or_url) as resp:
+            async for raw_line in resp.content:
+                line = raw_line.decode("utf-8").strip()
+                if line:
+                    yield line
+    else:
+        # Like `write_file`, this blocks the event loop, but only for a
+        # buffered read at a time.
+        with open(path_or_url, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+
+
+def get_prefix_key(request: BatchRequestInput) -> str:
+    """Return a key under which requests sharing a prompt prefix sort next
+    to each other."""
+    if isinstance(request.body, ChatCompletionRequest):
+        return json.dumps(request.body.messages, default=str)
+    return json.dumps(request.body.input)
+
+
+async def iter_requests(
+        path_or_url: str,
+        sort_window: int = 0) -> AsyncIterator[BatchRequestInput]:
+    """Yield the requests of a batch file, sorting each window of
+    `sort_window` requests by prompt if it is positive.
+
+    The order only depends on the file, so that a resumed batch runs the
+    requests in the same order.
+    """
+    window: List[Tuple[str, int, BatchRequestInput]] = []
+    async for line in iter_lines(path_or_url):
+        request = BatchRequestInput.model_validate_json(line)
+        if sort_window <= 0:
+            yield request
+            continue
+        window.append((get_prefix_key(request), len(window), request))
+        if len(window) == sort_window:
+            for _, _, sorted_request in sorted(window):
+                yield sorted_request
+            window.clear()
+    for _, _, sorted_request in sorted(window):
+        yield sorted_request
+
+
+def get_prefix_order(requests: List[BatchRequestInput],
+                     sort_window: int = 0) -> List[int]:
+    """Return the positions of `requests` in the order in which to run them,
+    with each window of `sort_window` requests sorted by prompt if it is
+    positive, as in :func:`iter_requests`."""
+    if sort_window <= 0:
+        return list(range(len(requests)))
+    order: List[int] = []
+    for start in range(0, len(requests), sort_window):
+        window = range(start, min(start + sort_window, len(requests)))
+        order.extend(sorted(window, key=lambda i: get_prefix_key(requests[i])))
+    return order
+
+
+class BatchProgress:
+    """The requests of a streamed batch whose outputs have been written,
+    identified by their position in the order in which they are run.
+
+    Since at most a bounded number of requests are in flight, the positions
+    are stored as a count of the leading positions which are all done, plus
+    the few done positions after them.
+    """
+
+    def __init__(self,
+                 num_leading_done: int = 0,
+                 done: Iterable[int] = (),
+                 output_bytes: int = 0) -> None:
+        self.num_leading_done = num_leading_done
+        self.done: Set[int] = set(done)
+        # The size of the output file with the outputs of these requests.
+        self.output_bytes = output_bytes
+
+    def is_done(self, position: int) -> bool:
+        return position < self.num_leading_done or position in self.done
+
+    def mark_done(self, position: int, output_bytes: int) -> None:
+        self.done.add(position)
+        while self.num_leading_done in self.done:
+            self.done.remove(self.num_leading_done)
+            self.num_leading_done += 1
+        self.output_bytes += output_bytes
+
+    def save(self, path: str) -> None:
+        """Atomically replace the checkpoint file with this progress."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "num_leading_done": self.num_leading_done,
+                    "done": sorted(self.done),
+                    "output_bytes": self.output_bytes,
+                }, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BatchProgress":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+
+async def run_batch_streaming(
+    input_file: str,
+    output_file: str,
+    get_serving_func: Callable[[BatchRequestInput], Callable],
+    *,
+    max_concurrent_requests: int,
+    checkpoint_file: Optional[str] = None,
+    checkpoint_interval: int = 1000,
+    sort_window: int = 0,
+) -> None:
+    """Run the requests of a batch file with bounded memory.
+
+    Requests are read lazily and admitted while fewer than
+    `max_concurrent_requests` are in flight; each output is appended to
+    `output_file` as soon as it is done. The progress is saved to
+    `checkpoint_file` every `checkpoint_interval` outputs, after flushing
+    the outputs it covers.
+    """
+    if output_file.startswith("http://") or output_file.startswith("https://"):
+        raise ValueError("Streaming batches can only be written to a local "
+                         "output file.")
+
+    if checkpoint_file is not None and os.path.exists(checkpoint_file):
+        progress = BatchProgress.load(checkpoint_file)
+        logger.info(
+            "Resuming the batch from %s: %d outputs were already written.",
+            checkpoint_file, progress.num_leading_done + len(progress.done))
+        # Discard the outputs written after the checkpoint was saved; their
+        # requests are run again.
+        with open(output_file, "ab") as f:
+            f.truncate(progress.output_bytes)
+    else:
+        progress = BatchProgress()
+        open(output_file, "wb").close()
+
+    slots = asyncio.Semaphore(max_concurrent_requests)
+    tasks: Set[asyncio.Task] = set()
+    errors: List[BaseException] = []
+    num_unsaved = 0
+
+    def on_done(task: asyncio.Task) -> None:
+        tasks.discard(task)
+        if task.cancelled():
+            return
+        exc = task.exception()
+        if exc is not None:
+            errors.append(exc)
+
+    with open(output_file, "ab") as out:
+
+        def save_progress() -> None:
+            out.flush()
+            os.fsync(out.fileno())
+            assert checkpoint_file is not None
+            progress.save(checkpoint_file)
+
+        async def run(position: int, request: BatchRequestInput,
+                      serving_func: Callable) -> None:
+            nonlocal num_unsaved
+            try:
+                response = await run_request(serving_func, request)
+                data = (response.model_dump_json() + "\n").encode("utf-8")
+                out.write(data)
+                progress.mark_done(position, len(data))
+                num_unsaved += 1
+                if (checkpoint_file is not None
+                        and num_unsaved >= checkpoint_interval):
+                    save_progress()
+                    num_unsaved = 0
+            finally:
+                slots.release()
+
+        try:
+            position = 0
+            async for request in iter_requests(input_file, sort_window):
+                if not progress.is_done(position):
+                    serving_func = get_serving_func(request)
+                    # Backpressure: no more input is read until a slot is
+                    # free.
+                    await slots.acquire()
+                    # Fail on the first error, like asyncio.gather in the
+                    # in-memory mode; the saved progress lets the batch be
+                    # resumed.
+                    if errors:
+                        raise errors[0]
+                    task = asyncio.create_task(
+                        run(position, request, serving_func))
+                    tasks.add(task)
+                    task.add_done_callback(on_done)
+                position += 1
+
+            while tasks and not errors:
+                await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            if errors:
+                raise errors[0]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if checkpoint_file is not None:
+            save_progress()
+
+
 async def run_request(serving_engine_func: Callable,
                       request: BatchRequestInput) -> BatchRequestOutput:
     response = await serving_engine_func(request.body)
@@ -148,30 +403,47 @@ async def main(args):
         request_logger=request_logger,
     )
 
-    # Submit all requests in the file to the engine "concurrently".
-    response_futures: List[Awaitable[BatchRequestOutput]] = []
+    def get_serving_func(request: BatchRequestInput) -> Callable:
+        # Determine the type of request and run it.
+        if request.url == "/v1/chat/completions":
+            return openai_serving_chat.create_chat_completion
+        if request.url == "/v1/embeddings":
+            return openai_serving_embedding.create_embedding
+        raise ValueError("Only /v1/chat/completions and /v1/embeddings are"
+                         "supported in the batch endpoint.")
+
+    if args.stream:
+        await run_batch_streaming(
+            args.input_file,
+            args.output_file,
+            get_serving_func,
+            max_concurrent_requests=args.max_concurrent_requests,
+            checkpoint_file=args.checkpoint_file,
+            checkpoint_interval=args.checkpoint_interval,
+            sort_window=args.sort_by_prefix_window)
+        return
+
+    requests: List[BatchRequestInput] = []
     for request_json in (await read_file(args.input_file)).strip().split("\n"):
         # Skip empty lines.
         request_json = request_json.strip()
         if not request_json:
             continue
 
-        request = BatchRequestInput.model_validate_json(request_json)
+        requests.append(BatchRequestInput.model_validate_json(request_json))
 
-        # Determine the type of request and run it.
-        if request.url == "/v1/chat/completions":
-            response_futures.append(
-                run_request(openai_serving_chat.create_chat_completion,
-                            request))
-        elif request.url == "/v1/embeddings":
-            response_futures.append(
-                run_request(openai_serving_embedding.create_embedding,
-                            request))
-        else:
-            raise ValueError("Only /v1/chat/completions and /v1/embeddings are"
-                             "supported in the batch endpoint.")
-
-    responses = await asyncio.gather(*response_futures)
+    # Submit all requests in the file to the engine "concurrently", in the
+    # order in which they are added to the engine.
+    order = get_prefix_order(requests, args.sort_by_prefix_window)
+    response_futures: List[Awaitable[BatchRequestOutput]] = [
+        run_request(get_serving_func(requests[i]), requests[i]) for i in order
+    ]
+
+    sorted_responses = await asyncio.gather(*response_futures)
+    responses = [
+        response for _, response in sorted(zip(order, sorted_responses),
+                                           key=lambda item: item[0])
+    ]
 
     output_buffer = StringIO()
     for response in responses:
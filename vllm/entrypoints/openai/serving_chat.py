@@ -402,6 +402,8 @@ class OpenAIServingChat(OpenAIServing):
                     prompt_tokens=prompt_tokens,
                     completion_tokens=previous_num_tokens[i],
                     total_tokens=prompt_tokens + previous_num_tokens[i],
+                    prompt_tokens_details=self._get_prompt_tokens_details(
+                        [res]),
                 )
 
                 final_usage_chunk = ChatCompletionStreamResponse(
@@ -499,6 +501,7 @@ class OpenAIServingChat(OpenAIServing):
             prompt_tokens=num_prompt_tokens,
             completion_tokens=num_generated_tokens,
             total_tokens=num_prompt_tokens + num_generated_tokens,
+            prompt_tokens_details=self._get_prompt_tokens_details([final_res]),
         )
         response = ChatCompletionResponse(
             id=request_id,
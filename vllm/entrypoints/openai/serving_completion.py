@@ -245,9 +245,9 @@ class OpenAIServingCompletion(OpenAIServing):
                         # echo the prompt and first token
                         delta_text = res.prompt + output.text
                         delta_token_ids = (res.prompt_token_ids +
-                                           output.token_ids)
-                        out_logprobs = res.prompt_logprobs + (output.logprobs
-                                                              or [])
+                                           list(output.token_ids))
+                        out_logprobs = list(
+                            res.prompt_logprobs) + (output.logprobs or [])
                         has_echoed[i] = True
                     else:
                         # return just the delta
@@ -298,6 +298,8 @@ class OpenAIServingCompletion(OpenAIServing):
                                 prompt_tokens=prompt_tokens,
                                 completion_tokens=completion_tokens,
                                 total_tokens=prompt_tokens + completion_tokens,
+                                prompt_tokens_details=self.
+                                _get_prompt_tokens_details([res]),
                             )
                         if request.stream_options.continuous_usage_stats:
                             chunk.usage = usage
@@ -352,7 +354,7 @@ class OpenAIServingCompletion(OpenAIServing):
                     output_text = prompt_text
                 elif request.echo and request.max_tokens > 0:
                     token_ids = prompt_token_ids + list(output.token_ids)
-                    out_logprobs = (prompt_logprobs + output.logprobs
+                    out_logprobs = (list(prompt_logprobs) + output.logprobs
                                     if request.logprobs is not None else None)
                     output_text = prompt_text + output.text
                 else:
@@ -388,6 +390,8 @@ class OpenAIServingCompletion(OpenAIServing):
             prompt_tokens=num_prompt_tokens,
             completion_tokens=num_generated_tokens,
             total_tokens=num_prompt_tokens + num_generated_tokens,
+            prompt_tokens_details=self._get_prompt_tokens_details(
+                final_res_batch),
         )
 
         return CompletionResponse(
@@ -18,6 +18,7 @@ from vllm.entrypoints.openai.protocol import (ChatCompletionRequest,
                                               EmbeddingRequest, ErrorResponse,
                                               ModelCard, ModelList,
                                               ModelPermission,
+                                              PromptTokenUsageInfo,
                                               TokenizeChatRequest,
                                               TokenizeCompletionRequest,
                                               TokenizeRequest)
@@ -27,6 +28,7 @@ from vllm.logger import init_logger
 from vllm.lora.request import LoRARequest
 from vllm.model_executor.guided_decoding import (
     get_guided_decoding_logits_processor)
+from vllm.outputs import RequestOutput
 from vllm.pooling_params import PoolingParams
 from vllm.prompt_adapter.request import PromptAdapterRequest
 from vllm.sampling_params import LogitsProcessor, SamplingParams
@@ -392,6 +394,21 @@ class OpenAIServing:
             prompt_adapter_request=prompt_adapter_request,
         )
 
+    @staticmethod
+    def _get_prompt_tokens_details(
+            outputs: Iterable[RequestOutput]
+    ) -> Optional[PromptTokenUsageInfo]:
+        """The usage details of the prompts of `outputs`, or None if the
+        engine does not report the number of cached prompt tokens."""
+        num_cached_tokens = [
+            output.metrics.num_cached_tokens for output in outputs
+            if output.metrics is not None
+            and output.metrics.num_cached_tokens is not None
+        ]
+        if not num_cached_tokens:
+            return None
+        return PromptTokenUsageInfo(cached_tokens=sum(num_cached_tokens))
+
     @staticmethod
     def _get_decoded_token(logprob: Logprob,
                            token_id: int,
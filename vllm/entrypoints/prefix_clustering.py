@@ -0,0 +1,65 @@
+"""Ordering of offline requests so that those sharing a prompt prefix run
+together, while the KV cache blocks of the prefix are cached."""
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+
+class _TrieNode:
+    __slots__ = ("children", "request_indices")
+
+    def __init__(self) -> None:
+        # Insertion ordered, so that siblings keep the order of the requests.
+        self.children: Dict[Tuple[int, ...], "_TrieNode"] = {}
+        # The requests whose prompt ends at this node.
+        self.request_indices: List[int] = []
+
+
+def order_by_shared_prefix(
+    prompt_token_ids: Sequence[Sequence[int]],
+    chunk_size: int,
+    groups: Optional[Sequence[Hashable]] = None,
+) -> List[int]:
+    """Return the indices of the prompts in an order where prompts sharing a
+    prefix are adjacent.
+
+    The prompts are inserted in a trie whose edges are chunks of
+    `chunk_size` tokens, the granularity at which the prefix cache matches
+    prompts (its block size), and the order is a pre-order traversal of the
+    trie: the prompts ending at a node come before those extending it, and
+    siblings are visited in the order of their first prompt. Prompts that
+    share no prefix keep their relative order.
+
+    Args:
+        prompt_token_ids: The token IDs of the prompts.
+        chunk_size: The number of tokens per edge of the trie.
+        groups: A key per prompt, e.g. the LoRA ID. Prompts of different
+            groups never share cached blocks, and are ordered in separate
+            tries, visited in the order of their first prompt.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}.")
+    if groups is not None and len(groups) != len(prompt_token_ids):
+        raise ValueError("The lengths of prompt_token_ids and groups "
+                         "must be the same.")
+
+    roots: Dict[Hashable, _TrieNode] = {}
+    for i, token_ids in enumerate(prompt_token_ids):
+        group = groups[i] if groups is not None else None
+        node = roots.get(group)
+        if node is None:
+            node = roots[group] = _TrieNode()
+        for start in range(0, len(token_ids), chunk_size):
+            chunk = tuple(token_ids[start:start + chunk_size])
+            child = node.children.get(chunk)
+            if child is None:
+                child = node.children[chunk] = _TrieNode()
+            node = child
+        node.request_indices.append(i)
+
+    # Iterative, since the depth of the trie grows with the prompt length.
+    order: List[int] = []
+    stack = list(reversed(roots.values()))
+    while stack:
+        node = stack.pop()
+        order.extend(node.request_indices)
+        stack.extend(reversed(node.children.values()))
+    return order
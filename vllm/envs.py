@@ -44,6 +44,8 @@ if TYPE_CHECKING:
     VLLM_WORKER_MULTIPROC_METHOD: str = "fork"
     VLLM_ASSETS_CACHE: str = os.path.join(VLLM_CACHE_ROOT, "assets")
     VLLM_IMAGE_FETCH_TIMEOUT: int = 5
+    VLLM_MM_PREPROCESS_WORKERS: int = 2
+    VLLM_MM_INPUT_CACHE_SIZE_MB: int = 512
     VLLM_TARGET_DEVICE: str = "cuda"
     MAX_JOBS: Optional[str] = None
     NVCC_THREADS: Optional[str] = None
@@ -54,6 +56,8 @@ if TYPE_CHECKING:
     VERBOSE: bool = False
     VLLM_ALLOW_LONG_MAX_MODEL_LEN: bool = False
     VLLM_TEST_FORCE_FP8_MARLIN: bool = False
+    VLLM_STARTUP_PROFILE: bool = False
+    VLLM_STEP_TRACE_DIR: Optional[str] = None
 
 
 def get_default_cache_root():
@@ -253,7 +257,9 @@ environment_variables: Dict[str, Callable[[], Any]] = {
     "VLLM_ATTENTION_BACKEND":
     lambda: os.getenv("VLLM_ATTENTION_BACKEND", None),
 
-    # Pipeline stage partition strategy
+    # Pipeline stage partition strategy: the number of layers of each stage,
+    # e.g. "4,6,6,4", or "auto" to balance the profiled (or estimated) time
+    # of the stages
     "VLLM_PP_LAYER_PARTITION":
     lambda: os.getenv("VLLM_PP_LAYER_PARTITION", None),
 
@@ -321,6 +327,17 @@ environment_variables: Dict[str, Callable[[], Any]] = {
     "VLLM_IMAGE_FETCH_TIMEOUT":
     lambda: int(os.getenv("VLLM_IMAGE_FETCH_TIMEOUT", "5")),
 
+    # Number of processes which decode and preprocess multimodal data when
+    # requests are added to the engine. 0 preprocesses the data in threads
+    # of the frontend process instead.
+    "VLLM_MM_PREPROCESS_WORKERS":
+    lambda: int(os.getenv("VLLM_MM_PREPROCESS_WORKERS", "2")),
+
+    # Size in MiB of the cache of preprocessed multimodal inputs, which are
+    # keyed by the content hash of their data. 0 disables the cache.
+    "VLLM_MM_INPUT_CACHE_SIZE_MB":
+    lambda: int(os.getenv("VLLM_MM_INPUT_CACHE_SIZE_MB", "512")),
+
     # Path to the XLA persistent cache directory.
     # Only used for XLA devices such as TPUs.
     "VLLM_XLA_CACHE_PATH":
@@ -356,6 +373,19 @@ environment_variables: Dict[str, Callable[[], Any]] = {
     lambda:
     (os.environ.get("VLLM_TEST_FORCE_FP8_MARLIN", "0").strip().lower() in
      ("1", "true")),
+
+    # If set, vllm logs the time spent in each startup phase (imports, config
+    # resolution, tokenizer and weight loading, KV cache profiling and
+    # allocation, graph capture) once the engine is ready.
+    "VLLM_STARTUP_PROFILE":
+    lambda: (os.environ.get("VLLM_STARTUP_PROFILE", "0").strip().lower() in
+             ("1", "true")),
+
+    # Directory where the step traces recorded through the admin endpoints
+    # of the OpenAI API server are dumped. Defaults to the temporary
+    # directory.
+    "VLLM_STEP_TRACE_DIR":
+    lambda: os.getenv("VLLM_STEP_TRACE_DIR", None),
 }
 
 # end-env-vars-definition
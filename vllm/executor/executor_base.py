@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from typing import List, Optional, Set, Tuple
 
+import vllm.envs as envs
 from vllm.config import (CacheConfig, DeviceConfig, LoadConfig, LoRAConfig,
                          ModelConfig, MultiModalConfig, ObservabilityConfig,
                          ParallelConfig, PromptAdapterConfig, SchedulerConfig,
@@ -45,6 +46,14 @@ class ExecutorBase(ABC):
         self.speculative_config = speculative_config
         self.prompt_adapter_config = prompt_adapter_config
         self.observability_config = observability_config
+        if (envs.VLLM_PP_LAYER_PARTITION == "auto"
+                and parallel_config.pp_layer_partition is None):
+            # Resolve the partition once, in the driver, so that all workers
+            # (which are given the parallel config) agree on it.
+            from vllm.distributed.pp_layer_partition import (
+                resolve_pp_layer_partition)
+            parallel_config.pp_layer_partition = resolve_pp_layer_partition(
+                model_config, parallel_config, cache_config)
         self._init_executor()
 
     @abstractmethod
@@ -0,0 +1,285 @@
+"""An executor that runs no model, for measuring the CPU overheads of the
+engine (scheduling, block management, detokenization and output processing)
+in isolation, e.g. on machines without accelerators."""
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple, Type
+
+import numpy as np
+
+from vllm.executor.executor_base import ExecutorAsyncBase, ExecutorBase
+from vllm.logger import init_logger
+from vllm.lora.request import LoRARequest
+from vllm.prompt_adapter.request import PromptAdapterRequest
+from vllm.sequence import (CompletionSequenceGroupOutput, ExecuteModelRequest,
+                           Logprob, SamplerOutput, SequenceData,
+                           SequenceGroupMetadata, SequenceLogprobs,
+                           SequenceOutput)
+
+logger = init_logger(__name__)
+
+
+@dataclass
+class MockExecutorConfig:
+    """Configuration of the mock executor.
+
+    Args:
+        step_latency_s: The modeled latency of a step that schedules no
+            tokens, in seconds.
+        per_token_latency_s: The modeled latency added to a step per
+            scheduled token, in seconds.
+        token_mode: How the sampled tokens are chosen. "prompt" repeats the
+            prompt of the sequence (so that detokenization works on realistic
+            text), "random" samples uniformly from the vocabulary.
+        num_gpu_blocks: The number of KV cache blocks reported for the
+            device. None to fit 16 sequences of the maximum model length.
+        num_cpu_blocks: The number of KV cache blocks reported for swapping.
+        seed: The seed of the "random" token mode.
+    """
+    step_latency_s: float = 0.0
+    per_token_latency_s: float = 0.0
+    token_mode: str = "prompt"
+    num_gpu_blocks: Optional[int] = None
+    num_cpu_blocks: int = 0
+    seed: int = 0
+
+    def __post_init__(self):
+        if self.token_mode not in ("prompt", "random"):
+            raise ValueError(f"token_mode must be 'prompt' or 'random', got "
+                             f"{self.token_mode!r}.")
+        if self.step_latency_s < 0 or self.per_token_latency_s < 0:
+            raise ValueError("The modeled latencies must be non-negative.")
+
+
+class SyntheticSampler:
+    """Produces the sampler output of a step without logits.
+
+    The output has the same structure as that of
+    :class:`~vllm.model_executor.layers.sampler.Sampler`: one sample per
+    sequence of a decode, `best_of` samples of the single sequence of a
+    prompt, no samples for prompt chunks that are not sampled, and the
+    requested (prompt) logprobs, with made-up values.
+    """
+
+    def __init__(self,
+                 vocab_size: int,
+                 token_mode: str = "prompt",
+                 seed: int = 0) -> None:
+        self.vocab_size = vocab_size
+        self.token_mode = token_mode
+        self._rng = random.Random(seed)
+
+    def _next_token(self, seq_data: SequenceData, sample_idx: int) -> int:
+        if self.token_mode == "random":
+            return self._rng.randrange(self.vocab_size)
+        # Continue the prompt where the sequence is, shifted per sample so
+        # that the samples of a prompt differ.
+        prompt_token_ids = seq_data.get_prompt_token_ids()
+        position = seq_data.get_output_len() + sample_idx
+        return prompt_token_ids[position % len(prompt_token_ids)]
+
+    def _logprobs(self, token_id: int,
+                  num_logprobs: int) -> Dict[int, Logprob]:
+        # The sampled token first, as rank 1, then the top candidates.
+        logprobs = {token_id: Logprob(logprob=-0.1, rank=1)}
+        rank = 1
+        while len(logprobs) < num_logprobs + 1:
+            candidate = self._rng.randrange(self.vocab_size)
+            if candidate not in logprobs:
+                rank += 1
+                logprobs[candidate] = Logprob(logprob=-0.1 * rank, rank=rank)
+        return logprobs
+
+    def _prompt_logprobs(self, seq_data: SequenceData, chunk_size: int,
+                         do_sample: bool,
+                         num_logprobs: int) -> SequenceLogprobs:
+        # The logprobs of the prompt tokens following the ones of the chunk,
+        # except for the last token of the prompt, which is sampled.
+        start = seq_data.get_num_computed_tokens() + 1
+        num_positions = chunk_size - 1 if do_sample else chunk_size
+        token_ids = np.asarray(seq_data.get_prompt_token_ids()[start:start +
+                                                               num_positions],
+                               dtype=np.int64)
+        num_candidates = num_logprobs + 1
+        candidates: np.ndarray = np.empty((len(token_ids), num_candidates),
+                                          dtype=np.int64)
+        candidates[:, 0] = token_ids
+        candidates[:, 1:] = np.array([
+            self._rng.randrange(self.vocab_size)
+            for _ in range(len(token_ids) * num_logprobs)
+        ],
+                                     dtype=np.int64).reshape(
+                                         len(token_ids), num_logprobs)
+        ranks = np.tile(np.arange(1, num_candidates + 1), len(token_ids))
+        return SequenceLogprobs.from_columns(
+            candidates.reshape(-1),
+            -0.1 * ranks,
+            ranks,
+            np.full(len(token_ids), num_candidates),
+        )
+
+    def sample(
+            self, seq_group_metadata_list: List[SequenceGroupMetadata]
+    ) -> SamplerOutput:
+        outputs: List[CompletionSequenceGroupOutput] = []
+        for seq_group_metadata in seq_group_metadata_list:
+            sampling_params = seq_group_metadata.sampling_params
+            assert sampling_params is not None, (
+                "The mock executor does not support embedding models.")
+            do_sample = seq_group_metadata.do_sample
+            prompt_logprobs = None
+            if (seq_group_metadata.is_prompt
+                    and sampling_params.prompt_logprobs is not None):
+                (seq_data, ) = seq_group_metadata.seq_data.values()
+                prompt_logprobs = self._prompt_logprobs(
+                    seq_data, seq_group_metadata.token_chunk_size, do_sample,
+                    sampling_params.prompt_logprobs)
+
+            samples: List[SequenceOutput] = []
+            if do_sample:
+                num_logprobs = sampling_params.logprobs or 0
+                if seq_group_metadata.is_prompt:
+                    (seq_id, seq_data), = seq_group_metadata.seq_data.items()
+                    parents = [(seq_id, seq_data, i)
+                               for i in range(sampling_params.best_of)]
+                else:
+                    parents = [(seq_id, seq_data, 0) for seq_id, seq_data in
+                               seq_group_metadata.seq_data.items()]
+                for seq_id, seq_data, sample_idx in parents:
+                    token_id = self._next_token(seq_data, sample_idx)
+                    samples.append(
+                        SequenceOutput(seq_id, token_id,
+                                       self._logprobs(token_id, num_logprobs)))
+            outputs.append(
+                CompletionSequenceGroupOutput(samples, prompt_logprobs))
+        return SamplerOutput(outputs=outputs)
+
+
+class MockExecutor(ExecutorBase):
+    """Executes no model: each step sleeps for a modeled latency and returns
+    the output of a :class:`SyntheticSampler`.
+
+    The executor is selected by passing the class as
+    `distributed_executor_backend`. Use :meth:`with_config` for a class with
+    a non-default :class:`MockExecutorConfig`.
+    """
+
+    uses_ray: bool = False
+    mock_config: MockExecutorConfig = MockExecutorConfig()
+
+    @classmethod
+    def with_config(cls,
+                    mock_config: MockExecutorConfig) -> Type["MockExecutor"]:
+        """Return a subclass of this executor that uses `mock_config`."""
+        return type(cls.__name__, (cls, ), {"mock_config": mock_config})
+
+    def _init_executor(self) -> None:
+        assert self.speculative_config is None, (
+            "The mock executor does not support speculative decoding.")
+        self.sampler = SyntheticSampler(self.model_config.get_vocab_size(),
+                                        self.mock_config.token_mode,
+                                        self.mock_config.seed)
+        self._loras: Set[int] = set()
+        self._prompt_adapters: Set[int] = set()
+        # The CPU time spent in the executor itself, to tell it apart from
+        # that of the engine.
+        self.cpu_time_s = 0.0
+        self.num_steps = 0
+
+    def determine_num_available_blocks(self) -> Tuple[int, int]:
+        num_gpu_blocks = self.mock_config.num_gpu_blocks
+        if num_gpu_blocks is None:
+            block_size = self.cache_config.block_size
+            max_model_len = self.model_config.max_model_len
+            num_gpu_blocks = 16 * -(-max_model_len // block_size)
+        return num_gpu_blocks, self.mock_config.num_cpu_blocks
+
+    def initialize_cache(self, num_gpu_blocks: int,
+                         num_cpu_blocks: int) -> None:
+        logger.info("# GPU blocks: %d, # CPU blocks: %d", num_gpu_blocks,
+                    num_cpu_blocks)
+
+    def _step_latency(self, execute_model_req: ExecuteModelRequest) -> float:
+        num_tokens = sum(
+            seq_group_metadata.token_chunk_size if seq_group_metadata.
+            is_prompt else len(seq_group_metadata.seq_data) for
+            seq_group_metadata in execute_model_req.seq_group_metadata_list)
+        return (self.mock_config.step_latency_s +
+                self.mock_config.per_token_latency_s * num_tokens)
+
+    def _sample(self,
+                execute_model_req: ExecuteModelRequest) -> List[SamplerOutput]:
+        start = time.process_time()
+        output = [
+            self.sampler.sample(execute_model_req.seq_group_metadata_list)
+            for _ in range(execute_model_req.num_steps)
+        ]
+        self.cpu_time_s += time.process_time() - start
+        self.num_steps += execute_model_req.num_steps
+        return output
+
+    def execute_model(
+            self,
+            execute_model_req: ExecuteModelRequest) -> List[SamplerOutput]:
+        latency = self._step_latency(execute_model_req)
+        if latency > 0:
+            time.sleep(latency)
+        return self._sample(execute_model_req)
+
+    def add_lora(self, lora_request: LoRARequest) -> bool:
+        assert lora_request.lora_int_id > 0, "lora_id must be greater than 0."
+        self._loras.add(lora_request.lora_int_id)
+        return True
+
+    def remove_lora(self, lora_id: int) -> bool:
+        assert lora_id > 0, "lora_id must be greater than 0."
+        if lora_id not in self._loras:
+            return False
+        self._loras.remove(lora_id)
+        return True
+
+    def pin_lora(self, lora_id: int) -> bool:
+        assert lora_id > 0, "lora_id must be greater than 0."
+        return lora_id in self._loras
+
+    def list_loras(self) -> Set[int]:
+        return set(self._loras)
+
+    def add_prompt_adapter(
+            self, prompt_adapter_request: PromptAdapterRequest) -> bool:
+        assert prompt_adapter_request.prompt_adapter_id > 0, \
+            "prompt_adapter_id must be greater than 0."
+        self._prompt_adapters.add(prompt_adapter_request.prompt_adapter_id)
+        return True
+
+    def remove_prompt_adapter(self, prompt_adapter_id: int) -> bool:
+        assert prompt_adapter_id > 0, \
+            "prompt_adapter_id must be greater than 0."
+        if prompt_adapter_id not in self._prompt_adapters:
+            return False
+        self._prompt_adapters.remove(prompt_adapter_id)
+        return True
+
+    def pin_prompt_adapter(self, prompt_adapter_id: int) -> bool:
+        assert prompt_adapter_id > 0, \
+            "prompt_adapter_id must be greater than 0."
+        return prompt_adapter_id in self._prompt_adapters
+
+    def list_prompt_adapters(self) -> Set[int]:
+        return set(self._prompt_adapters)
+
+    def check_health(self) -> None:
+        return
+
+
+class MockExecutorAsync(MockExecutor, ExecutorAsyncBase):
+
+    async def execute_model_async(
+            self,
+            execute_model_req: ExecuteModelRequest) -> List[SamplerOutput]:
+        latency = self._step_latency(execute_model_req)
+        if latency > 0:
+            await asyncio.sleep(latency)
+        return self._sample(execute_model_req)
@@ -122,23 +122,34 @@ def _apply_logits_processors(
         if logits_processors:
             found_logits_processors = True
 
-            for seq_id, logits_row_idx in zip(seq_ids,
-                                              seq_group.sample_indices):
-                logits_row = logits[logits_row_idx]
-                past_tokens_ids = seq_group.seq_data[seq_id].output_token_ids
+            # A decode scoring several tokens per sequence has one sample per
+            # scored token; each only follows the output tokens before it.
+            samples_per_seq = len(seq_group.sample_indices) // len(seq_ids)
+            for j, seq_id in enumerate(seq_ids):
+                output_token_ids = seq_group.seq_data[seq_id].output_token_ids
                 prompt_tokens_ids = seq_group.seq_data[seq_id].prompt_token_ids
-
-                for logits_processor in logits_processors:
-                    parameters = inspect.signature(logits_processor).parameters
-                    if len(parameters) == 3:
-                        logits_row = logits_processor(prompt_tokens_ids,
-                                                      past_tokens_ids,
-                                                      logits_row)
-                    else:
-                        logits_row = logits_processor(past_tokens_ids,
-                                                      logits_row)
-
-                logits[logits_row_idx] = logits_row
+                for k in range(samples_per_seq):
+                    logits_row_idx = seq_group.sample_indices[j *
+                                                              samples_per_seq +
+                                                              k]
+                    logits_row = logits[logits_row_idx]
+                    num_later_tokens = samples_per_seq - 1 - k
+                    past_tokens_ids = (
+                        output_token_ids[:len(output_token_ids) -
+                                         num_later_tokens]
+                        if num_later_tokens else output_token_ids)
+
+                    for logits_processor in logits_processors:
+                        parameters = inspect.signature(
+                            logits_processor).parameters
+                        if len(parameters) == 3:
+                            logits_row = logits_processor(
+                                prompt_tokens_ids, past_tokens_ids, logits_row)
+                        else:
+                            logits_row = logits_processor(
+                                past_tokens_ids, logits_row)
+
+                    logits[logits_row_idx] = logits_row
 
         logits_processed += len(seq_group.sample_indices) + len(
             seq_group.prompt_logprob_indices)
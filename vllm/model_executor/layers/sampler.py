@@ -1,8 +1,10 @@
 """A layer that samples the next tokens from the model's outputs."""
 import itertools
+from array import array
 from math import inf
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import torch
 import torch.nn as nn
 
@@ -16,7 +18,7 @@ from vllm.model_executor.sampling_metadata import (SamplingMetadata,
                                                    SequenceGroupToSample)
 from vllm.sampling_params import SamplingType
 from vllm.sequence import (CompletionSequenceGroupOutput, Logprob,
-                           PromptLogprobs, SampleLogprobs, SamplerOutput,
+                           SampleLogprobs, SamplerOutput, SequenceLogprobs,
                            SequenceOutput)
 
 # (num_token_ids, num_parent_ids) per sequence group.
@@ -223,10 +225,16 @@ def _apply_min_tokens_penalty(
         token_ids_to_penalize = sampling_params.all_stop_token_ids
         if min_tokens > 0 and token_ids_to_penalize:
             seqs_to_penalize: List[int] = []
+            # A decode scoring several tokens per sequence has one sample per
+            # scored token; the earlier ones follow fewer output tokens.
+            samples_per_seq = len(sample_indices) // len(seq_ids)
             for j, seq_id in enumerate(seq_ids):
                 seq_data = seq_group.seq_data[seq_id]
-                if len(seq_data.output_token_ids_array) < min_tokens:
-                    seqs_to_penalize.append(j)
+                num_output_tokens = (seq_data.get_output_len() -
+                                     samples_per_seq + 1)
+                for k in range(samples_per_seq):
+                    if num_output_tokens + k < min_tokens:
+                        seqs_to_penalize.append(j * samples_per_seq + k)
 
             if seqs_to_penalize:
                 # convert to the index into logits
@@ -489,8 +497,10 @@ def _multinomial(
     else:
         sample_idx = 0
         for seq_group in seq_groups:
-            seq_ids = seq_group.seq_ids
-            next_sample_idx = sample_idx + len(seq_ids) * num_samples
+            # A decode scoring several tokens per sequence has one sample
+            # index per scored token.
+            next_sample_idx = (sample_idx +
+                               len(seq_group.sample_indices) * num_samples)
             q[sample_idx:next_sample_idx].exponential_(
                 generator=seq_group.generator)
             sample_idx = next_sample_idx
@@ -746,7 +756,7 @@ def _get_logprobs(
     logprobs: torch.Tensor,
     sampling_metadata: SamplingMetadata,
     sample_results: SampleResultType,
-) -> Tuple[List[Optional[PromptLogprobs]], List[SampleLogprobs]]:
+) -> Tuple[List[Optional[SequenceLogprobs]], List[SampleLogprobs]]:
     """Return sample lobprobs and prompt logprobs.
 
     The logic consists of 3 parts.
@@ -772,6 +782,7 @@ def _get_logprobs(
 
     Returns:
         A tuple of prompt and sample logprobs per sequence group in a batch.
+        The prompt logprobs are columnar, see :class:`SequenceLogprobs`.
     """
     # The index of query token to calculate logprobs. It includes both
     # prompt and sample logprob indices.
@@ -822,11 +833,13 @@ def _get_logprobs(
 
     if len(query_indices) == 0:
         empty_sampled_logprob: SampleLogprobs = []
-        empty_prompt_logprob: Optional[PromptLogprobs] = None
+        empty_prompt_logprob: Optional[SequenceLogprobs] = None
         return [empty_prompt_logprob], [empty_sampled_logprob]
 
     selected_logprobs, ranks = None, None
     top_logprobs, top_token_ids = None, None
+    # The logprobs are copied to the CPU once, and are only turned into
+    # Python objects for the sampled tokens. Prompt logprobs stay columnar.
 
     # If largest_num_logprobs == -1, i.e. no logprobs are requested, we can
     # skip the whole logprob calculation.
@@ -854,14 +867,14 @@ def _get_logprobs(
             top_logprobs, top_token_ids = torch.topk(logprobs,
                                                      largest_num_logprobs,
                                                      dim=-1)
-            top_logprobs = top_logprobs.to('cpu')
-            top_token_ids = top_token_ids.to('cpu')
+            top_logprobs = top_logprobs.to('cpu').numpy()
+            top_token_ids = top_token_ids.to('cpu').numpy()
 
-        selected_logprobs = selected_logprobs.to('cpu')
-        ranks = ranks.to('cpu')
+        selected_logprobs = selected_logprobs.to('cpu').numpy()
+        ranks = ranks.to('cpu').numpy()
 
     # Find prompt/sample logprobs.
-    prompt_logprobs_per_seq_group: List[Optional[PromptLogprobs]] = []
+    prompt_logprobs_per_seq_group: List[Optional[SequenceLogprobs]] = []
     sample_logprobs_per_seq_group: List[SampleLogprobs] = []
     top_logprob_idx = 0
     selected_logprobs_idx = 0
@@ -885,10 +898,10 @@ def _get_logprobs(
 
 def _get_prompt_logprob_if_needed(
     seq_group: SequenceGroupToSample,
-    selected_logprobs: torch.Tensor,
-    ranks: torch.Tensor,
-    top_token_ids: torch.Tensor,
-    top_logprobs: torch.Tensor,
+    selected_logprobs: Optional[np.ndarray],
+    ranks: Optional[np.ndarray],
+    top_token_ids: Optional[np.ndarray],
+    top_logprobs: Optional[np.ndarray],
     selected_logprobs_idx: int,
     top_logprob_idx: int,
 ):
@@ -897,59 +910,68 @@ def _get_prompt_logprob_if_needed(
     is_prompt = seq_group.is_prompt
 
     # Find prompt logprobs
-    prompt_logprobs: Optional[PromptLogprobs] = None
+    prompt_logprobs: Optional[SequenceLogprobs] = None
     if is_prompt and sampling_params.prompt_logprobs is not None:
-        prompt_logprobs = []
+        assert selected_logprobs is not None and ranks is not None
         num_logprobs = sampling_params.prompt_logprobs
         next_prompt_tokens = _get_next_prompt_tokens(seq_group)
-        # Pre-select indexes and create a list. It is faster than calling .item
-        # repetitively.
-        selected_logprob_items = selected_logprobs[
-            selected_logprobs_idx:selected_logprobs_idx +
-            len(next_prompt_tokens)].tolist()
-        rank_items = ranks[selected_logprobs_idx:selected_logprobs_idx +
-                           len(next_prompt_tokens)].tolist()
-
-        for idx, token_id in enumerate(next_prompt_tokens):
-            # Calculate the prompt logprob of the real prompt tokens.
-            # {token_id: (logprob, rank_from_vocab)}
-            prompt_logprobs_dict: Dict[int, Tuple[float, int]] = {
-                token_id: (selected_logprob_items[idx], rank_items[idx])
-            }
-
-            # Add top K prompt logprobs along with its rank.
-            if num_logprobs > 0:
-                top_ids = top_token_ids[
-                    top_logprob_idx, :num_logprobs].tolist()
-                top_probs = top_logprobs[
-                    top_logprob_idx, :num_logprobs].tolist()
-                # Top K is already sorted by rank, so we can use 1 ~
-                # num_logprobs + 1 for rank.
-                top_ranks = range(1, num_logprobs + 1)
-                prompt_logprobs_dict.update({
-                    top_id: (top_prob, rank)
-                    for top_id, top_prob, rank in zip(top_ids, top_probs,
-                                                      top_ranks)
-                })
-            prompt_logprobs.append({
-                token_id: Logprob(*logprob_and_rank)
-                for token_id, logprob_and_rank in prompt_logprobs_dict.items()
-            })
-            # + 1 to go to the next prompt token.
-            top_logprob_idx += 1
-
+        num_tokens = len(next_prompt_tokens)
+        if num_logprobs > 0:
+            assert top_token_ids is not None and top_logprobs is not None
+            top_ids = top_token_ids[top_logprob_idx:top_logprob_idx +
+                                    num_tokens, :num_logprobs]
+            top_probs = top_logprobs[top_logprob_idx:top_logprob_idx +
+                                     num_tokens, :num_logprobs]
+        else:
+            top_ids = np.empty((num_tokens, 0), dtype=np.int64)
+            top_probs = np.empty((num_tokens, 0), dtype=np.float32)
+        prompt_logprobs = _get_columnar_logprobs(
+            np.asarray(next_prompt_tokens, dtype=np.int64),
+            selected_logprobs[selected_logprobs_idx:selected_logprobs_idx +
+                              num_tokens],
+            ranks[selected_logprobs_idx:selected_logprobs_idx + num_tokens],
+            top_ids, top_probs)
+
+        # + 1 per prompt token to go to the next prompt token.
+        top_logprob_idx += num_tokens
         # + len(next_prompt_tokens) to go to the next prompt.
-        selected_logprobs_idx += len(next_prompt_tokens)
+        selected_logprobs_idx += num_tokens
     return prompt_logprobs, top_logprob_idx, selected_logprobs_idx
 
 
+def _get_columnar_logprobs(token_ids: np.ndarray, token_logprobs: np.ndarray,
+                           token_ranks: np.ndarray, top_token_ids: np.ndarray,
+                           top_logprobs: np.ndarray) -> SequenceLogprobs:
+    """Build the logprobs of a run of positions without a Python object per
+    candidate.
+
+    Each position has its token first, followed by the top tokens other
+    than it, in order. A token which is one of the top tokens takes its rank
+    among them, as when the top tokens update a `{token_id: Logprob}` dict.
+    """
+    num_positions, num_top = top_token_ids.shape
+    is_token = top_token_ids == token_ids[:, None]
+    if num_top > 0:
+        token_ranks = np.where(is_token.any(axis=1),
+                               is_token.argmax(axis=1) + 1, token_ranks)
+    top_ranks = np.broadcast_to(np.arange(1, num_top + 1),
+                                (num_positions, num_top))
+    keep = np.concatenate([np.ones((num_positions, 1), dtype=bool), ~is_token],
+                          axis=1)
+    return SequenceLogprobs.from_columns(
+        np.concatenate([token_ids[:, None], top_token_ids], axis=1)[keep],
+        np.concatenate([token_logprobs[:, None], top_logprobs], axis=1)[keep],
+        np.concatenate([token_ranks[:, None], top_ranks], axis=1)[keep],
+        keep.sum(axis=1))
+
+
 def _get_sampled_logprob_if_needed(
     seq_group: SequenceGroupToSample,
     sample_result: Tuple[List[int], List[int]],
-    selected_logprobs: torch.Tensor,
-    ranks: torch.Tensor,
-    top_token_ids: torch.Tensor,
-    top_logprobs: torch.Tensor,
+    selected_logprobs: Optional[np.ndarray],
+    ranks: Optional[np.ndarray],
+    top_token_ids: Optional[np.ndarray],
+    top_logprobs: Optional[np.ndarray],
     selected_logprobs_idx: int,
     top_logprob_idx: int,
 ):
@@ -967,6 +989,7 @@ def _get_sampled_logprob_if_needed(
                 # Use a dummy logprob
                 sampled_logprobs.append({next_token_id: Logprob(inf)})
         else:
+            assert selected_logprobs is not None and ranks is not None
             # Pre-select items from tensor. tolist() is faster than repetitive
             # `.item()` calls.
             selected_logprob_items = selected_logprobs[
@@ -982,6 +1005,8 @@ def _get_sampled_logprob_if_needed(
                     (selected_logprob_items[idx], rank_items[idx])
                 }
                 if num_logprobs is not None and num_logprobs > 0:
+                    assert (top_token_ids is not None
+                            and top_logprobs is not None)
                     # Get top K logprobs.
                     top_ids = top_token_ids[top_logprob_idx +
                                             parent_id, :num_logprobs].tolist()
@@ -1067,7 +1092,7 @@ def _modify_greedy_probs_inplace(logprobs: torch.Tensor, probs: torch.Tensor,
 def _build_sampler_output(
     sample_results: SampleResultType,
     sampling_metadata: SamplingMetadata,
-    prompt_logprobs: Optional[List[Optional[PromptLogprobs]]],
+    prompt_logprobs: Optional[List[Optional[SequenceLogprobs]]],
     sample_logprobs: Optional[List[SampleLogprobs]],
     on_device_tensors: Optional[Tuple[torch.Tensor, torch.Tensor,
                                       torch.Tensor]],
@@ -1118,7 +1143,7 @@ def _build_sampler_output(
     )
 
 
-def _get_next_prompt_tokens(seq_group: SequenceGroupToSample) -> List[int]:
+def _get_next_prompt_tokens(seq_group: SequenceGroupToSample) -> array:
     """Get a list of next prompt tokens to compute logprob from a
         given sequence group.
 
@@ -1141,11 +1166,12 @@ def _get_next_prompt_tokens(seq_group: SequenceGroupToSample) -> List[int]:
     assert len(seq_ids) == 1
     seq_data = seq_group.seq_data[seq_ids[0]]
     computed_len = seq_data.get_num_computed_tokens()
-    prompt_tokens = seq_data.prompt_token_ids
+    # The prompt tokens are at the start of the token IDs.
+    prompt_tokens = seq_data.get_token_ids_array()
     # +1 because we are looking for a next prompt token.
     next_token_index_start = computed_len + 1
     next_token_index_end = min(computed_len + query_len + 1,
-                               len(prompt_tokens))
+                               seq_data.get_prompt_len())
     next_prompt_tokens = prompt_tokens[
         next_token_index_start:next_token_index_end]
     return next_prompt_tokens
@@ -5,10 +5,12 @@ from torch import nn
 from vllm.config import (CacheConfig, DeviceConfig, LoadConfig, LoRAConfig,
                          ModelConfig, MultiModalConfig, ParallelConfig,
                          SchedulerConfig)
+from vllm.distributed.utils import set_pp_layer_partition
 from vllm.model_executor.model_loader.loader import (BaseModelLoader,
                                                      get_model_loader)
 from vllm.model_executor.model_loader.utils import (
     get_architecture_class_name, get_model_architecture)
+from vllm.startup_profile import startup_phase
 
 
 def get_model(*, model_config: ModelConfig, load_config: LoadConfig,
@@ -18,13 +20,15 @@ def get_model(*, model_config: ModelConfig, load_config: LoadConfig,
               multimodal_config: Optional[MultiModalConfig],
               cache_config: CacheConfig) -> nn.Module:
     loader = get_model_loader(load_config)
-    return loader.load_model(model_config=model_config,
-                             device_config=device_config,
-                             lora_config=lora_config,
-                             multimodal_config=multimodal_config,
-                             parallel_config=parallel_config,
-                             scheduler_config=scheduler_config,
-                             cache_config=cache_config)
+    with startup_phase("weight_load"), set_pp_layer_partition(
+            parallel_config.pp_layer_partition):
+        return loader.load_model(model_config=model_config,
+                                 device_config=device_config,
+                                 lora_config=lora_config,
+                                 multimodal_config=multimodal_config,
+                                 parallel_config=parallel_config,
+                                 scheduler_config=scheduler_config,
+                                 cache_config=cache_config)
 
 
 __all__ = [
@@ -33,9 +33,12 @@ from vllm.model_executor.model_loader.utils import (get_model_architecture,
 from vllm.model_executor.model_loader.weight_utils import (
     download_safetensors_index_file_from_hf, download_weights_from_hf,
     filter_duplicate_safetensors_files, filter_files_not_needed_for_inference,
-    get_gguf_extra_tensor_names, get_quant_config, gguf_quant_weights_iterator,
-    initialize_dummy_weights, np_cache_weights_iterator, pt_weights_iterator,
-    safetensors_weights_iterator)
+    get_gguf_extra_tensor_names, get_quant_config,
+    gguf_dequant_weights_iterator, gguf_quant_weights_iterator,
+    initialize_dummy_weights, mmap_cache_weights_iterator,
+    mmap_safetensors_file, multi_thread_pt_weights_iterator,
+    multi_thread_safetensors_weights_iterator, np_cache_weights_iterator,
+    pt_weights_iterator, safetensors_weights_iterator)
 from vllm.model_executor.models.interfaces import (has_inner_state,
                                                    supports_lora,
                                                    supports_vision)
@@ -88,6 +91,20 @@ def device_loading_context(module: torch.nn.Module,
 logger = init_logger(__name__)
 
 
+def _process_weights_after_loading(model: nn.Module,
+                                   target_device: torch.device) -> None:
+    for _, module in model.named_modules():
+        quant_method = getattr(module, "quant_method", None)
+        if quant_method is not None:
+            # When quant methods need to process weights after loading
+            # (for repacking, quantizing, etc), they expect parameters
+            # to be on the global target device. This scope is for the
+            # case where cpu offloading is used, where we will move the
+            # parameters onto device for processing and back off after.
+            with device_loading_context(module, target_device):
+                quant_method.process_weights_after_loading(module)
+
+
 def _get_quantization_config(
         model_config: ModelConfig,
         load_config: LoadConfig) -> Optional[QuantizationConfig]:
@@ -200,13 +217,37 @@ class BaseModelLoader(ABC):
 
 
 class DefaultModelLoader(BaseModelLoader):
-    """Model loader that can load different file types from disk."""
+    """Model loader that can load different file types from disk.
+
+    Supported `model_loader_extra_config` keys:
+        enable_multithread_load: Read checkpoint shards concurrently in a
+            thread pool. Safetensors shards are memory-mapped and yielded as
+            zero-copy views of the page cache.
+        num_threads: Number of reader threads used when
+            `enable_multithread_load` is set.
+    """
+
+    DEFAULT_NUM_THREADS = 8
 
     def __init__(self, load_config: LoadConfig):
         super().__init__(load_config)
-        if load_config.model_loader_extra_config:
-            raise ValueError(f"Model loader extra config is not supported for "
-                             f"load format {load_config.load_format}")
+        extra_config = ({} if load_config.model_loader_extra_config is None
+                        else load_config.model_loader_extra_config.copy())
+        self.enable_multithread_load = bool(
+            extra_config.pop("enable_multithread_load", False))
+        self.num_threads = int(
+            extra_config.pop("num_threads", self.DEFAULT_NUM_THREADS))
+        if extra_config:
+            raise ValueError(f"Unexpected extra config keys for load format "
+                             f"{load_config.load_format}: "
+                             f"{load_config.model_loader_extra_config.keys()}")
+        if self.num_threads < 1:
+            raise ValueError(
+                f"num_threads must be at least 1, got {self.num_threads}")
+        if load_config.load_format == LoadFormat.NPCACHE:
+            logger.warning("The npcache load format is deprecated and will be "
+                           "removed in a future release. Please use "
+                           "mmap_cache instead.")
 
     def _maybe_download_from_modelscope(
             self, model: str, revision: Optional[str]) -> Optional[str]:
@@ -255,6 +296,8 @@ class DefaultModelLoader(BaseModelLoader):
             allow_patterns = ["*.pt"]
         elif load_format == LoadFormat.NPCACHE:
             allow_patterns = ["*.bin"]
+        elif load_format == LoadFormat.MMAP_CACHE:
+            allow_patterns = ["*.safetensors", "*.bin"]
         else:
             raise ValueError(f"Unknown load_format: {load_format}")
 
@@ -315,10 +358,28 @@ class DefaultModelLoader(BaseModelLoader):
             weights_iterator = np_cache_weights_iterator(
                 model_name_or_path, self.load_config.download_dir, hf_folder,
                 hf_weights_files)
+        elif self.load_config.load_format == LoadFormat.MMAP_CACHE:
+            if use_safetensors:
+                source_iterator = safetensors_weights_iterator
+            else:
+                source_iterator = pt_weights_iterator
+            weights_iterator = mmap_cache_weights_iterator(
+                model_name_or_path, self.load_config.download_dir,
+                os.path.join(hf_folder, "mmap_cache"), hf_weights_files,
+                lambda: source_iterator(hf_weights_files))
         elif use_safetensors:
-            weights_iterator = safetensors_weights_iterator(hf_weights_files)
+            if self.enable_multithread_load:
+                weights_iterator = multi_thread_safetensors_weights_iterator(
+                    hf_weights_files, max_workers=self.num_threads)
+            else:
+                weights_iterator = safetensors_weights_iterator(
+                    hf_weights_files)
         else:
-            weights_iterator = pt_weights_iterator(hf_weights_files)
+            if self.enable_multithread_load:
+                weights_iterator = multi_thread_pt_weights_iterator(
+                    hf_weights_files, max_workers=self.num_threads)
+            else:
+                weights_iterator = pt_weights_iterator(hf_weights_files)
 
         if is_tpu():
             # In PyTorch XLA, we should call `xm.mark_step` frequently so that
@@ -333,6 +394,26 @@ class DefaultModelLoader(BaseModelLoader):
             weights_iterator = _xla_weights_iterator(weights_iterator)
         return weights_iterator
 
+    def _get_gguf_mmap_cache_iterator(
+        self, model_config: ModelConfig
+    ) -> Generator[Tuple[str, torch.Tensor], None, None]:
+        """Get an iterator over the dequantized weights of a GGUF file,
+        converted into an mmap cache next to the file."""
+        gguf_file = model_config.model
+        gguf_weights_map = GGUFModelLoader._get_gguf_weights_map(model_config)
+        hf_config = model_config.hf_config
+        num_heads = num_kv_heads = None
+        if hf_config.model_type in ("llama", "mistral"):
+            num_heads = hf_config.num_attention_heads
+            num_kv_heads = getattr(hf_config, "num_key_value_heads", num_heads)
+        cache_folder = os.path.join(
+            os.path.dirname(os.path.abspath(gguf_file)),
+            os.path.basename(gguf_file) + ".mmap_cache")
+        return mmap_cache_weights_iterator(
+            gguf_file, self.load_config.download_dir, cache_folder,
+            [gguf_file], lambda: gguf_dequant_weights_iterator(
+                gguf_file, gguf_weights_map, num_heads, num_kv_heads))
+
     def load_model(self, *, model_config: ModelConfig,
                    device_config: DeviceConfig,
                    lora_config: Optional[LoRAConfig],
@@ -341,29 +422,34 @@ class DefaultModelLoader(BaseModelLoader):
                    scheduler_config: SchedulerConfig,
                    cache_config: CacheConfig) -> nn.Module:
         target_device = torch.device(device_config.device)
+        is_gguf = (os.path.isfile(model_config.model)
+                   and model_config.model.endswith(".gguf"))
+        if is_gguf and self.load_config.load_format != LoadFormat.MMAP_CACHE:
+            raise ValueError("GGUF files can only be loaded with the gguf or "
+                             "mmap_cache load formats.")
+        if is_gguf and "lm_head.weight" in get_gguf_extra_tensor_names(
+                model_config.model,
+                GGUFModelLoader._get_gguf_weights_map(model_config)):
+            model_config.hf_config.update({"tie_word_embeddings": True})
+
         with set_default_torch_dtype(model_config.dtype):
             with target_device:
                 model = _initialize_model(model_config, self.load_config,
                                           lora_config, multimodal_config,
                                           cache_config, scheduler_config)
-            model.load_weights(
-                self._get_weights_iterator(model_config.model,
-                                           model_config.revision,
-                                           fall_back_to_pt=getattr(
-                                               model,
-                                               "fall_back_to_pt_during_load",
-                                               True)), )
-
-            for _, module in model.named_modules():
-                quant_method = getattr(module, "quant_method", None)
-                if quant_method is not None:
-                    # When quant methods need to process weights after loading
-                    # (for repacking, quantizing, etc), they expect parameters
-                    # to be on the global target device. This scope is for the
-                    # case where cpu offloading is used, where we will move the
-                    # parameters onto device for processing and back off after.
-                    with device_loading_context(module, target_device):
-                        quant_method.process_weights_after_loading(module)
+            if is_gguf:
+                weights_iterator = self._get_gguf_mmap_cache_iterator(
+                    model_config)
+            else:
+                weights_iterator = self._get_weights_iterator(
+                    model_config.model,
+                    model_config.revision,
+                    fall_back_to_pt=getattr(model,
+                                            "fall_back_to_pt_during_load",
+                                            True))
+            model.load_weights(weights_iterator)
+
+            _process_weights_after_loading(model, target_device)
         return model.eval()
 
 
@@ -510,9 +596,19 @@ class ShardedStateLoader(BaseModelLoader):
     enables a fast load path for large tensor-parallel models where each worker
     only needs to read its own shard rather than the entire checkpoint. See
     `examples/save_sharded_state.py` for creating a sharded checkpoint.
+
+    `save_model` also writes a per-rank index (see `INDEX_PATTERN`) that
+    describes the final, post-fusion and post-quantization layout of every
+    tensor, including the tensor and float attributes that the quantization
+    methods' `process_weights_after_loading` attach to their layers. When the
+    index is present, the shards are memory-mapped and the tensors are
+    assigned to the model as they are, without going through the model's
+    `load_weights`.
     """
 
     DEFAULT_PATTERN = "model-rank-{rank}-part-{part}.safetensors"
+    INDEX_PATTERN = "model-rank-{rank}.index.json"
+    INDEX_FORMAT_VERSION = 2
 
     def __init__(self, load_config: LoadConfig):
         super().__init__(load_config)
@@ -566,13 +662,118 @@ class ShardedStateLoader(BaseModelLoader):
             return model_name_or_path
         else:
             allow_patterns = ["*.safetensors"]
-            return download_weights_from_hf(
+            hf_folder = download_weights_from_hf(
                 model_name_or_path,
                 self.load_config.download_dir,
                 allow_patterns,
                 revision,
                 ignore_patterns=self.load_config.ignore_patterns,
             )
+            # The ready-to-run indices are optional.
+            download_weights_from_hf(
+                model_name_or_path,
+                self.load_config.download_dir,
+                [self.INDEX_PATTERN.format(rank="*")],
+                revision,
+                ignore_patterns=self.load_config.ignore_patterns,
+            )
+            return hf_folder
+
+    @staticmethod
+    def _load_indexed_state(model: nn.Module, local_model_path: str,
+                            index: Dict[str,
+                                        Any], device: torch.device) -> None:
+        """Assign the tensors described by a ready-to-run index to the model.
+
+        The quantization post-processing is run on the freshly initialized
+        model first, so that the layers get the final parameter layout and
+        the runtime state that is not part of the state dict (e.g. the
+        exllama state of GPTQ layers or the marlin workspace). The saved
+        tensors, which already have the post-processed layout, are assigned
+        afterwards; running the post-processing on them would repack them a
+        second time.
+
+        Tensors whose shape and dtype fit the current parameter are copied
+        into it (narrowing if LoRA padded the parameter), so tied parameters
+        and weight attributes are preserved. Other tensors replace the
+        parameter, buffer or attribute.
+        """
+        _process_weights_after_loading(model, device)
+
+        loaded: Dict[str, torch.Tensor] = {}
+        for filename in sorted(
+            {entry["file"]
+             for entry in index["tensors"].values()}):
+            loaded.update(
+                mmap_safetensors_file(os.path.join(local_model_path,
+                                                   filename)))
+
+        def _set_tensor(name: str, tensor: torch.Tensor,
+                        entry: Dict[str, Any]) -> torch.Tensor:
+            module_name, _, attr = name.rpartition(".")
+            module = model.get_submodule(module_name)
+            if entry["parameter"] and not isinstance(tensor, nn.Parameter):
+                tensor = nn.Parameter(tensor, requires_grad=False)
+            if (not entry["parameter"] and not entry["attribute"]
+                    and attr not in module._buffers):
+                module.register_buffer(attr, tensor)
+            else:
+                setattr(module, attr, tensor)
+            return tensor
+
+        state_dict = dict(model.state_dict(keep_vars=True))
+        assigned: Dict[str, torch.Tensor] = {}
+        for name, entry in index["tensors"].items():
+            tensor = loaded.pop(name)
+            shape = tuple(entry["shape"])
+            stride = tuple(entry["stride"])
+            current = state_dict.get(name)
+            if (current is not None and current.dtype == tensor.dtype
+                    and current.dim() == tensor.dim() and all(
+                        size <= param_size
+                        for size, param_size in zip(shape, current.shape))):
+                param_data = current.data
+                for dim, size in enumerate(shape):
+                    if size < param_data.shape[dim]:
+                        param_data = param_data.narrow(dim, 0, size)
+                param_data.copy_(tensor)
+                assigned[name] = current
+                continue
+            # Restore the exact layout produced by the post-processing, e.g.
+            # the transposed weights of fp8 linear layers.
+            data = torch.empty_strided(shape,
+                                       stride,
+                                       dtype=tensor.dtype,
+                                       device=device)
+            data.copy_(tensor)
+            assigned[name] = _set_tensor(name, data, entry)
+
+        for name, view in index["views"].items():
+            base = assigned[view["base"]]
+            shape = tuple(view["shape"])
+            stride = tuple(view["stride"])
+            if (view["offset"] == 0 and shape == tuple(base.shape)
+                    and stride == base.stride()):
+                # Tied tensors, e.g. lm_head and embed_tokens.
+                tensor = base
+            else:
+                tensor = base.data.as_strided(
+                    shape, stride,
+                    base.storage_offset() + view["offset"])
+            current = state_dict.get(name)
+            if current is not None and current.data_ptr() == tensor.data_ptr(
+            ) and current.shape == tensor.shape:
+                assigned[name] = current
+                continue
+            assigned[name] = _set_tensor(name, tensor, view)
+
+        for name, value in index["scalars"].items():
+            module_name, _, attr = name.rpartition(".")
+            setattr(model.get_submodule(module_name), attr, value)
+
+        missing = [name for name in state_dict if name not in assigned]
+        if missing:
+            raise ValueError(f"Missing keys {tuple(missing)} in loaded state!")
 
     def load_model(self, *, model_config: ModelConfig,
                    device_config: DeviceConfig,
@@ -583,7 +784,8 @@ class ShardedStateLoader(BaseModelLoader):
                    cache_config: CacheConfig) -> nn.Module:
         from safetensors.torch import safe_open
 
-        from vllm.distributed import get_tensor_model_parallel_rank
+        from vllm.distributed import (get_tensor_model_parallel_rank,
+                                      get_tensor_model_parallel_world_size)
 
         local_model_path = self._prepare_weights(model_config.model,
                                                  model_config.revision)
@@ -594,6 +796,31 @@ class ShardedStateLoader(BaseModelLoader):
                                           lora_config, multimodal_config,
                                           cache_config)
             rank = get_tensor_model_parallel_rank()
+            index_path = os.path.join(local_model_path,
+                                      self.INDEX_PATTERN.format(rank=rank))
+            index = None
+            if os.path.isfile(index_path):
+                with open(index_path) as f:
+                    index = json.load(f)
+                if (index["metadata"]["format_version"] !=
+                        self.INDEX_FORMAT_VERSION):
+                    logger.warning(
+                        "Ignoring %s: index format version %s is not "
+                        "supported, re-save the checkpoint to use it.",
+                        index_path, index["metadata"]["format_version"])
+                    index = None
+            if index is not None:
+                saved_tp_size = index["metadata"]["tensor_parallel_size"]
+                tp_size = get_tensor_model_parallel_world_size()
+                if saved_tp_size != tp_size:
+                    raise ValueError(
+                        f"The checkpoint in {local_model_path} was saved "
+                        f"with tensor_parallel_size={saved_tp_size}, but "
+                        f"the model is loaded with {tp_size}.")
+                self._load_indexed_state(model, local_model_path, index,
+                                         torch.device(device_config.device))
+                return model.eval()
+
             pattern = os.path.join(
                 local_model_path,
                 self.pattern.format(rank=rank, part="*"),
@@ -638,13 +865,45 @@ class ShardedStateLoader(BaseModelLoader):
     ) -> None:
         from safetensors.torch import save_file
 
-        from vllm.distributed import get_tensor_model_parallel_rank
+        from vllm.distributed import (get_tensor_model_parallel_rank,
+                                      get_tensor_model_parallel_world_size)
         if pattern is None:
             pattern = ShardedStateLoader.DEFAULT_PATTERN
         rank = get_tensor_model_parallel_rank()
         part_idx = 0
         total_size = 0
-        state_dict = ShardedStateLoader._filter_subtensors(model.state_dict())
+        full_state_dict = model.state_dict()
+        parameter_names = {
+            name
+            for name, _ in model.named_parameters(remove_duplicate=False)
+        }
+        # The quantization post-processing may attach plain tensors and
+        # floats to the layers, e.g. the marlin g_idx_sort_indices or the fp8
+        # kv-cache scales. They are needed to run the layers but are not part
+        # of the state dict.
+        attribute_names = set()
+        scalars: Dict[str, float] = {}
+        for module_name, module in model.named_modules():
+            if getattr(module, "quant_method", None) is None:
+                continue
+            prefix = f"{module_name}." if module_name else ""
+            for attr, value in vars(module).items():
+                if isinstance(value, torch.Tensor):
+                    full_state_dict[prefix + attr] = value.detach()
+                    attribute_names.add(prefix + attr)
+                elif isinstance(value, float):
+                    scalars[prefix + attr] = value
+        state_dict = ShardedStateLoader._filter_subtensors(full_state_dict)
+        index: Dict[str, Any] = {
+            "metadata": {
+                "format_version": ShardedStateLoader.INDEX_FORMAT_VERSION,
+                "rank": rank,
+                "tensor_parallel_size": get_tensor_model_parallel_world_size(),
+            },
+            "tensors": {},
+            "views": {},
+            "scalars": scalars,
+        }
         state_dict_part: Dict[str, torch.Tensor] = {}
         for key, tensor in state_dict.items():
             param_size = tensor.nelement() * tensor.element_size()
@@ -657,8 +916,18 @@ class ShardedStateLoader(BaseModelLoader):
                 part_idx += 1
                 total_size = 0
                 state_dict_part = {}
-            state_dict_part[key] = tensor
+            # safetensors only stores contiguous tensors; the original
+            # layout is recorded in the index and restored when loading.
+            state_dict_part[key] = tensor.contiguous()
             total_size += param_size
+            index["tensors"][key] = {
+                "file": pattern.format(rank=rank, part=part_idx),
+                "dtype": str(tensor.dtype).replace("torch.", ""),
+                "shape": list(tensor.shape),
+                "stride": list(tensor.stride()),
+                "parameter": key in parameter_names,
+                "attribute": key in attribute_names,
+            }
         if len(state_dict_part) > 0:
             filename = pattern.format(rank=rank, part=part_idx)
             save_file(
@@ -666,6 +935,37 @@ class ShardedStateLoader(BaseModelLoader):
                 os.path.join(path, filename),
             )
 
+        # Record the tensors that alias (part of) a saved tensor, such as tied
+        # embeddings, so that loading can recreate them as views.
+        def get_end_ptr(tensor: torch.Tensor) -> int:
+            last = sum((size - 1) * stride
+                       for size, stride in zip(tensor.shape, tensor.stride()))
+            return tensor.data_ptr() + (last + 1) * tensor.element_size()
+
+        for key, tensor in full_state_dict.items():
+            if key in state_dict or not tensor.numel():
+                continue
+            for base_key, base in state_dict.items():
+                if (base.device == tensor.device and base.dtype == tensor.dtype
+                        and base.untyped_storage().data_ptr()
+                        == tensor.untyped_storage().data_ptr()
+                        and base.data_ptr() <= tensor.data_ptr()
+                        and get_end_ptr(tensor) <= get_end_ptr(base)):
+                    index["views"][key] = {
+                        "base": base_key,
+                        "offset":
+                        tensor.storage_offset() - base.storage_offset(),
+                        "shape": list(tensor.shape),
+                        "stride": list(tensor.stride()),
+                        "parameter": key in parameter_names,
+                        "attribute": key in attribute_names,
+                    }
+                    break
+        index_path = os.path.join(
+            path, ShardedStateLoader.INDEX_PATTERN.format(rank=rank))
+        with open(index_path, "w") as f:
+            json.dump(index, f)
+
 
 class BitsAndBytesModelLoader(BaseModelLoader):
     """Model loader to load model weights with BitAndBytes quantization."""
@@ -989,7 +1289,8 @@ class GGUFModelLoader(BaseModelLoader):
         else:
             raise ValueError(f"{model_name_or_path} is not a file.")
 
-    def _get_gguf_weights_map(self, model_config: ModelConfig):
+    @staticmethod
+    def _get_gguf_weights_map(model_config: ModelConfig):
         """
         GGUF uses this naming convention for their tensors from HF checkpoint:
         `blk.N.BB.weight` and `blk.N.BB.bias`
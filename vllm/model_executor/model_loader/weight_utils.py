@@ -1,12 +1,18 @@
 """Utilities for downloading and initializing model weights."""
+import concurrent.futures
 import fnmatch
 import glob
 import hashlib
+import itertools
 import json
+import math
+import mmap
 import os
+import struct
 import tempfile
 from collections import defaultdict
-from typing import Any, Dict, Generator, Iterable, List, Optional, Tuple, Union
+from typing import (Any, Callable, Dict, Generator, Iterable, List, Optional,
+                    Tuple, Union)
 
 import filelock
 import gguf
@@ -340,6 +346,9 @@ def np_cache_weights_iterator(
     """Iterate over the weights in the model np files.
 
     Will dump the model weights to numpy files if they are not already dumped.
+
+    Deprecated in favor of `mmap_cache_weights_iterator`, which supports every
+    checkpoint format and does not copy the weights when loading them.
     """
     enable_tqdm = not torch.distributed.is_initialized(
     ) or torch.distributed.get_rank() == 0
@@ -378,6 +387,129 @@ def np_cache_weights_iterator(
         yield name, torch.from_numpy(param)
 
 
+# Version of the mmap_cache layout. Bump it when the layout changes so that
+# stale caches are rebuilt.
+_MMAP_CACHE_VERSION = 1
+# Every tensor in the mmap_cache blob starts at a multiple of this many bytes.
+_MMAP_CACHE_ALIGNMENT = 64
+_MMAP_CACHE_BLOB_NAME = "weights.bin"
+_MMAP_CACHE_INDEX_NAME = "index.json"
+
+
+def _get_weights_files_signature(
+        weights_files: List[str]) -> List[Dict[str, Any]]:
+    signature = []
+    for weights_file in sorted(weights_files):
+        stat = os.stat(weights_file)
+        signature.append({
+            "file": os.path.basename(weights_file),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+        })
+    return signature
+
+
+def _write_mmap_cache(
+    weights_iterator: Iterable[Tuple[str, torch.Tensor]],
+    cache_folder: str,
+    sources: List[Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Write all weights into one aligned blob plus a JSON index.
+
+    Both files are written under temporary names and renamed at the end, so
+    a crashed conversion never leaves a cache that looks complete.
+    """
+    blob_path = os.path.join(cache_folder, _MMAP_CACHE_BLOB_NAME)
+    index_path = os.path.join(cache_folder, _MMAP_CACHE_INDEX_NAME)
+    tensors: Dict[str, Dict[str, Any]] = {}
+    offset = 0
+    with open(blob_path + ".tmp", "wb") as f:
+        for name, param in weights_iterator:
+            data = param.detach().cpu().contiguous().reshape(-1).view(
+                torch.uint8).numpy()
+            padding = -offset % _MMAP_CACHE_ALIGNMENT
+            if padding:
+                f.write(b"\0" * padding)
+                offset += padding
+            f.write(memoryview(data))
+            tensors[name] = {
+                "dtype": str(param.dtype).replace("torch.", ""),
+                "shape": list(param.shape),
+                "offset": offset,
+            }
+            offset += data.nbytes
+    index = {
+        "version": _MMAP_CACHE_VERSION,
+        "alignment": _MMAP_CACHE_ALIGNMENT,
+        "sources": sources,
+        "tensors": tensors,
+    }
+    with open(index_path + ".tmp", "w") as f:
+        json.dump(index, f)
+    os.replace(blob_path + ".tmp", blob_path)
+    os.replace(index_path + ".tmp", index_path)
+    return index
+
+
+def _read_mmap_cache_index(cache_folder: str,
+                           sources: List[Dict[str, Any]]) -> Optional[Dict]:
+    """Return the index of a complete, up-to-date cache, or None."""
+    index_path = os.path.join(cache_folder, _MMAP_CACHE_INDEX_NAME)
+    if not os.path.exists(index_path):
+        return None
+    with open(index_path) as f:
+        index = json.load(f)
+    if (index.get("version") != _MMAP_CACHE_VERSION
+            or index.get("sources") != sources):
+        return None
+    return index
+
+
+def mmap_cache_weights_iterator(
+    model_name_or_path: str,
+    cache_dir: Optional[str],
+    cache_folder: str,
+    weights_files: List[str],
+    source_weights_iterator: Callable[[], Iterable[Tuple[str, torch.Tensor]]],
+) -> Generator[Tuple[str, torch.Tensor], None, None]:
+    """Iterate over the weights stored in an mmap_cache folder.
+
+    On the first load, the weights produced by `source_weights_iterator` are
+    converted into a single aligned blob with a JSON index. Later loads
+    memory-map the blob and yield zero-copy views of it. The cache is rebuilt
+    if any of `weights_files` changed since it was written.
+    """
+    os.makedirs(cache_folder, exist_ok=True)
+    sources = _get_weights_files_signature(weights_files)
+    # Use file lock to prevent multiple processes from
+    # converting the same model weights at the same time.
+    with get_lock(model_name_or_path, cache_dir):
+        index = _read_mmap_cache_index(cache_folder, sources)
+        if index is None:
+            logger.info("Converting the model weights to an mmap cache in %s",
+                        cache_folder)
+            index = _write_mmap_cache(source_weights_iterator(), cache_folder,
+                                      sources)
+
+    blob_path = os.path.join(cache_folder, _MMAP_CACHE_BLOB_NAME)
+    buffer = None
+    if os.path.getsize(blob_path) > 0:
+        with open(blob_path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    for name, entry in index["tensors"].items():
+        dtype = getattr(torch, entry["dtype"])
+        shape = entry["shape"]
+        numel = math.prod(shape)
+        if numel == 0:
+            yield name, torch.empty(shape, dtype=dtype)
+            continue
+        assert buffer is not None
+        yield name, torch.frombuffer(buffer,
+                                     dtype=dtype,
+                                     count=numel,
+                                     offset=entry["offset"]).view(shape)
+
+
 def safetensors_weights_iterator(
     hf_weights_files: List[str]
 ) -> Generator[Tuple[str, torch.Tensor], None, None]:
@@ -396,6 +528,164 @@ def safetensors_weights_iterator(
                 yield name, param
 
 
+# Mapping from the dtype strings in a safetensors header to torch dtypes.
+_SAFETENSORS_TO_TORCH_DTYPE = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+    "F8_E4M3": torch.float8_e4m3fn,
+    "F8_E5M2": torch.float8_e5m2,
+}
+
+# Chunk size used when reading a checkpoint file into the page cache.
+_PREFETCH_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def prefetch_weights_file(path: str,
+                          chunk_size: int = _PREFETCH_CHUNK_SIZE) -> int:
+    """Read a file sequentially so that its pages land in the page cache.
+
+    The reads release the GIL, so calling this from several threads reads
+    several checkpoint shards concurrently. Returns the number of bytes read.
+    """
+    buffer = bytearray(chunk_size)
+    num_bytes = 0
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            num_bytes += n
+    return num_bytes
+
+
+def mmap_safetensors_file(st_file: str) -> Dict[str, torch.Tensor]:
+    """Memory-map a safetensors file and return zero-copy views of its tensors.
+
+    The returned CPU tensors alias a private (copy-on-write) mapping of the
+    file, so no data is copied until the weight loaders copy them into the
+    model parameters. This lets a parameter whose dtype and layout already
+    match the checkpoint be filled with a single copy from the page cache.
+    """
+    with open(st_file, "rb") as f:
+        header_size, = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_size))
+        file_size = os.fstat(f.fileno()).st_size
+        buffer = (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+                  if file_size > 8 + header_size else None)
+    data_start = 8 + header_size
+
+    tensors: Dict[str, torch.Tensor] = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = _SAFETENSORS_TO_TORCH_DTYPE.get(info["dtype"])
+        if dtype is None:
+            raise ValueError(f"Unsupported safetensors dtype {info['dtype']} "
+                             f"for tensor {name} in {st_file}")
+        shape = info["shape"]
+        numel = math.prod(shape)
+        if numel == 0:
+            tensors[name] = torch.empty(shape, dtype=dtype)
+            continue
+        assert buffer is not None
+        begin, _ = info["data_offsets"]
+        # torch.frombuffer keeps a reference to the mapping, so it stays
+        # alive as long as any of the returned tensors does.
+        tensors[name] = torch.frombuffer(buffer,
+                                         dtype=dtype,
+                                         count=numel,
+                                         offset=data_start + begin).view(shape)
+    return tensors
+
+
+def _iterate_shards_concurrently(
+    load_file: Callable[[str], Dict[str, torch.Tensor]],
+    hf_weights_files: List[str],
+    max_workers: int,
+    desc: str,
+) -> Generator[Tuple[str, torch.Tensor], None, None]:
+    """Load shards with `load_file` on a thread pool and yield their weights
+    in completion order.
+
+    At most `max_workers` shards are in flight at any time, and a shard is
+    only referenced until its weights have been consumed, so the memory held
+    by the iterator stays bounded regardless of the number of shards.
+    """
+    enable_tqdm = not torch.distributed.is_initialized(
+    ) or torch.distributed.get_rank() == 0
+
+    files = iter(hf_weights_files)
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers) as executor, tqdm(
+                total=len(hf_weights_files),
+                desc=desc,
+                disable=not enable_tqdm,
+                bar_format=_BAR_FORMAT,
+            ) as pbar:
+        pending = {
+            executor.submit(load_file, file)
+            for file in itertools.islice(files, max_workers)
+        }
+        while pending:
+            done, pending = concurrent.futures.wait(
+                pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            future = done.pop()
+            pending |= done
+            # Refill the window before consuming the shard so that reading
+            # the next shard overlaps with loading this one into the model.
+            next_file = next(files, None)
+            if next_file is not None:
+                pending.add(executor.submit(load_file, next_file))
+            state_dict = future.result()
+            del future
+            yield from state_dict.items()
+            del state_dict
+            pbar.update(1)
+
+
+def multi_thread_safetensors_weights_iterator(
+    hf_weights_files: List[str],
+    max_workers: int = 4,
+) -> Generator[Tuple[str, torch.Tensor], None, None]:
+    """Iterate over the weights in the model safetensor files, reading
+    several shards concurrently.
+
+    Each worker thread reads a whole shard into the page cache and maps it
+    with `mmap_safetensors_file`. Shards are yielded in completion order.
+    """
+
+    def _load_file(st_file: str) -> Dict[str, torch.Tensor]:
+        prefetch_weights_file(st_file)
+        return mmap_safetensors_file(st_file)
+
+    yield from _iterate_shards_concurrently(
+        _load_file, hf_weights_files, max_workers,
+        "Multi-thread loading safetensors checkpoint shards")
+
+
+def multi_thread_pt_weights_iterator(
+    hf_weights_files: List[str],
+    max_workers: int = 4,
+) -> Generator[Tuple[str, torch.Tensor], None, None]:
+    """Iterate over the weights in the model bin/pt files, deserializing
+    several shards concurrently."""
+
+    def _load_file(bin_file: str) -> Dict[str, torch.Tensor]:
+        return torch.load(bin_file, map_location="cpu")
+
+    yield from _iterate_shards_concurrently(
+        _load_file, hf_weights_files, max_workers,
+        "Multi-thread loading pt checkpoint shards")
+
+
 def pt_weights_iterator(
     hf_weights_files: List[str]
 ) -> Generator[Tuple[str, torch.Tensor], None, None]:
@@ -456,6 +746,65 @@ def gguf_quant_weights_iterator(
             yield name, param
 
 
+def _reverse_permute_gguf_weight(weight: torch.Tensor,
+                                 num_heads: int) -> torch.Tensor:
+    """Undo the rotary permutation llama.cpp applies to q/k projections."""
+    dim = weight.shape[0] // num_heads // 2
+    permuted = weight.reshape(num_heads, dim, 2, *weight.shape[1:])
+    return permuted.transpose(1, 2).reshape(weight.shape)
+
+
+def _dequantize_gguf_tensor(tensor: Any) -> torch.Tensor:
+    weight_type = tensor.tensor_type
+    data = np.array(tensor.data)
+    if weight_type in (gguf.GGMLQuantizationType.F32,
+                       gguf.GGMLQuantizationType.F16):
+        return torch.from_numpy(data)
+    # Newer gguf releases can dequantize every quantization type.
+    dequantize = getattr(gguf.quants, "dequantize", None)
+    if dequantize is not None:
+        return torch.from_numpy(dequantize(data, weight_type))
+    if weight_type == gguf.GGMLQuantizationType.BF16:
+        return torch.from_numpy(data.view(np.int16)).view(torch.bfloat16)
+    if weight_type == gguf.GGMLQuantizationType.Q8_0:
+        # Each block holds a float16 scale followed by 32 int8 values.
+        blocks = data.reshape(-1, 34)
+        scales = blocks[:, :2].view(np.float16).astype(np.float32)
+        values = blocks[:, 2:].view(np.int8).astype(np.float32)
+        return torch.from_numpy(
+            (values * scales).reshape(*data.shape[:-1], -1))
+    raise NotImplementedError(
+        f"Dequantizing GGUF tensors of type {weight_type.name} requires a "
+        "newer version of the gguf package.")
+
+
+def gguf_dequant_weights_iterator(
+    gguf_file: str,
+    gguf_to_hf_name_map: Dict[str, str],
+    num_heads: Optional[int] = None,
+    num_kv_heads: Optional[int] = None,
+) -> Generator[Tuple[str, torch.Tensor], None, None]:
+    """
+    Iterate over the weights in a gguf file, dequantized to floating point
+    and in the layout of the Hugging Face checkpoint.
+
+    If `num_heads` is given, the q/k projections are un-permuted, as
+    llama.cpp permutes them for its rotary embedding implementation.
+    """
+    reader = gguf.GGUFReader(gguf_file)
+    for tensor in reader.tensors:
+        if tensor.name not in gguf_to_hf_name_map:
+            continue
+        name = gguf_to_hf_name_map[tensor.name]
+        param = _dequantize_gguf_tensor(tensor)
+        if num_heads is not None and name.endswith("q_proj.weight"):
+            param = _reverse_permute_gguf_weight(param, num_heads)
+        elif num_heads is not None and name.endswith("k_proj.weight"):
+            param = _reverse_permute_gguf_weight(param, num_kv_heads
+                                                 or num_heads)
+        yield name, param
+
+
 def kv_cache_scales_loader(
         filename: str, tp_rank: int, tp_size: int, num_hidden_layers: int,
         model_type: Optional[str]) -> Iterable[Tuple[int, float]]:
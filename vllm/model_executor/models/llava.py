@@ -3,6 +3,7 @@ from typing import Iterable, List, Literal, Optional, Tuple, TypedDict, Union
 
 import torch
 import torch.nn as nn
+from PIL import Image
 from transformers import CLIPVisionConfig, LlavaConfig, SiglipVisionConfig
 
 from vllm.attention import AttentionMetadata
@@ -13,7 +14,8 @@ from vllm.model_executor.layers.quantization.base_config import (
     QuantizationConfig)
 from vllm.model_executor.model_loader.weight_utils import default_weight_loader
 from vllm.model_executor.sampling_metadata import SamplingMetadata
-from vllm.multimodal import MULTIMODAL_REGISTRY
+from vllm.multimodal import MULTIMODAL_REGISTRY, BatchedTensors
+from vllm.multimodal.image import get_image_embeds_feature_size
 from vllm.sequence import IntermediateTensors, SamplerOutput
 
 from .clip import (CLIPVisionModel, dummy_image_for_clip,
@@ -23,8 +25,8 @@ from .interfaces import SupportsVision
 from .siglip import (SiglipVisionModel, dummy_image_for_siglip,
                      dummy_seq_data_for_siglip, get_max_siglip_image_tokens,
                      input_processor_for_siglip)
-from .utils import (filter_weights, init_vllm_registered_model,
-                    merge_vision_embeddings)
+from .utils import (filter_weights, get_vision_embeddings,
+                    init_vllm_registered_model, merge_vision_embeddings)
 
 
 # TODO(xwjiang): Run benchmark and decide if TP.
@@ -55,7 +57,17 @@ class LlavaImagePixelInputs(TypedDict):
     """Shape: `(batch_size, num_channels, height, width)`"""
 
 
-LlavaImageInputs = LlavaImagePixelInputs
+class LlavaImageEmbeddingInputs(TypedDict):
+    type: Literal["image_embeds"]
+    data: Union[torch.Tensor, List[torch.Tensor]]
+    """
+    Shape: `(batch_size, image_feature_size, hidden_size)`
+
+    `hidden_size` must match the hidden size of the language model backbone.
+    """
+
+
+LlavaImageInputs = Union[LlavaImagePixelInputs, LlavaImageEmbeddingInputs]
 
 
 def get_max_llava_image_tokens(ctx: InputContext):
@@ -119,7 +131,13 @@ def input_processor_for_llava(ctx: InputContext, llm_inputs: LLMInputs):
     hf_config = ctx.get_hf_config(LlavaConfig)
     vision_config = hf_config.vision_config
 
-    image_feature_size = get_max_llava_image_tokens(ctx)
+    image_data = multi_modal_data["image"]
+    if isinstance(image_data, Image.Image):
+        image_feature_size = get_max_llava_image_tokens(ctx)
+    elif isinstance(image_data, torch.Tensor):
+        image_feature_size = get_image_embeds_feature_size(ctx, image_data)
+    else:
+        raise TypeError(f"Invalid image type: {type(image_data)}")
 
     if isinstance(vision_config, CLIPVisionConfig):
         return input_processor_for_clip(
@@ -174,6 +192,9 @@ def _init_vision_tower(hf_config: LlavaConfig):
 @INPUT_REGISTRY.register_input_processor(input_processor_for_llava)
 class LlavaForConditionalGeneration(nn.Module, SupportsVision):
 
+    # Images may be passed as the outputs of the vision tower and projector.
+    supports_image_embeds = True
+
     def __init__(self,
                  config: LlavaConfig,
                  multimodal_config: MultiModalConfig,
@@ -184,7 +205,6 @@ class LlavaForConditionalGeneration(nn.Module, SupportsVision):
         self.config = config
         self.multimodal_config = multimodal_config
 
-        # TODO: Optionally initializes this for supporting embeddings.
         self.vision_tower = _init_vision_tower(config)
         self.multi_modal_projector = LlavaMultiModalProjector(
             vision_hidden_size=config.vision_config.hidden_size,
@@ -208,7 +228,7 @@ class LlavaForConditionalGeneration(nn.Module, SupportsVision):
         return data
 
     def _parse_and_validate_image_input(
-            self, **kwargs: object) -> Optional[LlavaImageInputs]:
+            self, **kwargs: object) -> Optional[LlavaImagePixelInputs]:
         pixel_values = kwargs.pop("pixel_values", None)
 
         if pixel_values is None:
@@ -256,12 +276,20 @@ class LlavaForConditionalGeneration(nn.Module, SupportsVision):
 
         return self._image_pixels_to_features(self.vision_tower, pixel_values)
 
-    def _process_image_input(self,
-                             image_input: LlavaImageInputs) -> torch.Tensor:
+    def _process_image_input(
+            self, image_input: LlavaImagePixelInputs) -> torch.Tensor:
         assert self.vision_tower is not None
         image_features = self._process_image_pixels(image_input)
         return self.multi_modal_projector(image_features)
 
+    def _embed_pixel_inputs(self,
+                            **kwargs: object) -> Optional[BatchedTensors]:
+        image_input = self._parse_and_validate_image_input(**kwargs)
+        if image_input is None:
+            return None
+
+        return self._process_image_input(image_input)
+
     def forward(
         self,
         input_ids: torch.Tensor,
@@ -302,14 +330,20 @@ class LlavaForConditionalGeneration(nn.Module, SupportsVision):
             input_ids: Flattened (concatenated) input_ids corresponding to a
                 batch.
             pixel_values: The pixels in each input image.
+            image_embeds: The embeddings of each input image, used instead of
+                its pixels.
         
         See also:
             :class:`LlavaImageInputs`
         """
-        image_input = self._parse_and_validate_image_input(**kwargs)
+        vision_embeddings = get_vision_embeddings(
+            kwargs,
+            pixel_input_keys=("pixel_values", ),
+            embed_pixel_inputs=self._embed_pixel_inputs,
+            embed_dim=self.config.text_config.hidden_size,
+        )
 
-        if image_input is not None:
-            vision_embeddings = self._process_image_input(image_input)
+        if vision_embeddings is not None:
             inputs_embeds = self.language_model.model.get_input_embeddings(
                 input_ids)
 
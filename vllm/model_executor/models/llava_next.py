@@ -17,7 +17,8 @@ from vllm.model_executor.layers.quantization.base_config import (
     QuantizationConfig)
 from vllm.model_executor.model_loader.weight_utils import default_weight_loader
 from vllm.model_executor.sampling_metadata import SamplingMetadata
-from vllm.multimodal import MULTIMODAL_REGISTRY
+from vllm.multimodal import MULTIMODAL_REGISTRY, BatchedTensors
+from vllm.multimodal.image import get_image_embeds_feature_size
 from vllm.sequence import IntermediateTensors, SamplerOutput
 
 from .clip import (CLIPVisionModel, dummy_image_for_clip,
@@ -28,8 +29,8 @@ from .llava import LlavaMultiModalProjector
 from .siglip import (SiglipVisionModel, dummy_image_for_siglip,
                      dummy_seq_data_for_siglip, get_siglip_image_feature_size,
                      get_siglip_patch_grid_length, input_processor_for_siglip)
-from .utils import (filter_weights, init_vllm_registered_model,
-                    merge_vision_embeddings)
+from .utils import (filter_weights, get_vision_embeddings,
+                    init_vllm_registered_model, merge_vision_embeddings)
 
 logger = init_logger(__name__)
 
@@ -60,7 +61,20 @@ class LlavaNextImagePixelInputs(TypedDict):
     """
 
 
-LlavaNextImageInputs = LlavaNextImagePixelInputs
+class LlavaNextImageEmbeddingInputs(TypedDict):
+    type: Literal["image_embeds"]
+    data: Union[torch.Tensor, List[torch.Tensor]]
+    """
+    Shape: `(batch_size, image_feature_size, hidden_size)`
+
+    `hidden_size` must match the hidden size of the language model backbone.
+    Note that `image_feature_size` may be different for each batch, in which
+    case the data is passed as a list instead of a batched tensor.
+    """
+
+
+LlavaNextImageInputs = Union[LlavaNextImagePixelInputs,
+                             LlavaNextImageEmbeddingInputs]
 
 
 # Based on: https://github.com/huggingface/text-generation-inference/blob/v2.2.0/server/text_generation_server/models/vlm_causal_lm.py#L79
@@ -208,7 +222,7 @@ def input_processor_for_llava_next(ctx: InputContext, llm_inputs: LLMInputs):
             input_width=width,
         )
     elif isinstance(image_data, torch.Tensor):
-        raise NotImplementedError("Embeddings input is not supported yet")
+        image_feature_size = get_image_embeds_feature_size(ctx, image_data)
     else:
         raise TypeError(f"Invalid image type: {type(image_data)}")
 
@@ -267,6 +281,10 @@ def _init_vision_tower(hf_config: LlavaNextConfig):
 @INPUT_REGISTRY.register_input_processor(input_processor_for_llava_next)
 class LlavaNextForConditionalGeneration(nn.Module, SupportsVision):
 
+    # Images may be passed as the outputs of the vision tower and projector,
+    # with the patch embeddings already merged.
+    supports_image_embeds = True
+
     def __init__(self,
                  config: LlavaNextConfig,
                  multimodal_config: MultiModalConfig,
@@ -277,7 +295,6 @@ class LlavaNextForConditionalGeneration(nn.Module, SupportsVision):
         self.config = config
         self.multimodal_config = multimodal_config
 
-        # TODO: Optionally initializes this for supporting embeddings.
         self.vision_tower = _init_vision_tower(config)
         self.multi_modal_projector = LlavaMultiModalProjector(
             vision_hidden_size=config.vision_config.hidden_size,
@@ -464,7 +481,7 @@ class LlavaNextForConditionalGeneration(nn.Module, SupportsVision):
 
     def _process_image_input(
         self,
-        image_input: LlavaNextImageInputs,
+        image_input: LlavaNextImagePixelInputs,
     ) -> Union[torch.Tensor, List[torch.Tensor]]:
         patch_embeddings = self._process_image_pixels(image_input)
 
@@ -483,6 +500,14 @@ class LlavaNextForConditionalGeneration(nn.Module, SupportsVision):
             for i, patch_features_batch in enumerate(patch_embeddings)
         ]
 
+    def _embed_pixel_inputs(self,
+                            **kwargs: object) -> Optional[BatchedTensors]:
+        image_input = self._parse_and_validate_image_input(**kwargs)
+        if image_input is None:
+            return None
+
+        return self._process_image_input(image_input)
+
     def forward(
         self,
         input_ids: torch.Tensor,
@@ -532,14 +557,20 @@ class LlavaNextForConditionalGeneration(nn.Module, SupportsVision):
                 batch.
             pixel_values: The pixels in each grid patch for each input image.
             image_sizes: The original `(height, width)` for each input image.
+            image_embeds: The embeddings of each input image, used instead of
+                its pixels.
         
         See also:
             :class:`LlavaNextImageInputs`
         """
-        image_input = self._parse_and_validate_image_input(**kwargs)
+        vision_embeddings = get_vision_embeddings(
+            kwargs,
+            pixel_input_keys=("pixel_values", "image_sizes"),
+            embed_pixel_inputs=self._embed_pixel_inputs,
+            embed_dim=self.config.text_config.hidden_size,
+        )
 
-        if image_input is not None:
-            vision_embeddings = self._process_image_input(image_input)
+        if vision_embeddings is not None:
             inputs_embeds = self.language_model.model.get_input_embeddings(
                 input_ids)
 
@@ -36,14 +36,15 @@ from vllm.model_executor.model_loader.weight_utils import default_weight_loader
 from vllm.model_executor.models.clip import CLIPVisionModel
 from vllm.model_executor.models.llama import LlamaModel
 from vllm.model_executor.sampling_metadata import SamplingMetadata
-from vllm.multimodal import MULTIMODAL_REGISTRY
-from vllm.multimodal.image import cached_get_tokenizer
+from vllm.multimodal import MULTIMODAL_REGISTRY, BatchedTensors
+from vllm.multimodal.image import (cached_get_tokenizer,
+                                   get_image_embeds_feature_size)
 from vllm.sequence import IntermediateTensors, SamplerOutput
 
 from .clip import (dummy_image_for_clip, dummy_seq_data_for_clip,
                    input_processor_for_clip)
 from .interfaces import SupportsVision
-from .utils import merge_vision_embeddings
+from .utils import get_vision_embeddings, merge_vision_embeddings
 
 logger = init_logger(__name__)
 
@@ -275,6 +276,21 @@ class Phi3VImagePixelInputs(TypedDict):
     """
 
 
+class Phi3VImageEmbeddingInputs(TypedDict):
+    type: Literal["image_embeds"]
+    data: Union[torch.Tensor, List[torch.Tensor]]
+    """
+    Shape: `(batch_size, image_feature_size, hidden_size)`
+
+    `hidden_size` must match the hidden size of the language model backbone.
+    Note that `image_feature_size` may be different for each batch, in which
+    case the data is passed as a list instead of a batched tensor.
+    """
+
+
+Phi3VImageInputs = Union[Phi3VImagePixelInputs, Phi3VImageEmbeddingInputs]
+
+
 # Based on https://huggingface.co/microsoft/Phi-3-vision-128k-instruct/blob/main/image_processing_phi3_v.py#L57
 def _calc_padded_size(*, width: int, height: int, padding_unit: int = 336):
     target_height = int(np.ceil(height / padding_unit) * padding_unit)
@@ -390,7 +406,7 @@ def input_processor_for_phi3v(ctx: InputContext, llm_inputs: LLMInputs):
                                                           input_width=w,
                                                           input_height=h)
     elif isinstance(image_data, torch.Tensor):
-        raise NotImplementedError("Embeddings input is not supported yet")
+        image_feature_size = get_image_embeds_feature_size(ctx, image_data)
     else:
         raise TypeError(f"Invalid image type: {type(image_data)}")
 
@@ -443,6 +459,10 @@ def input_processor_for_phi3v(ctx: InputContext, llm_inputs: LLMInputs):
 @INPUT_REGISTRY.register_input_processor(input_processor_for_phi3v)
 class Phi3VForCausalLM(nn.Module, SupportsVision):
 
+    # Images may be passed as the outputs of the image embedding module, with
+    # the HD transform already applied.
+    supports_image_embeds = True
+
     def __init__(self,
                  config: PretrainedConfig,
                  multimodal_config: MultiModalConfig,
@@ -456,7 +476,6 @@ class Phi3VForCausalLM(nn.Module, SupportsVision):
 
         self.model = LlamaModel(config, cache_config, quant_config)
 
-        # TODO: Optionally initializes this for supporting embeddings.
         self.vision_embed_tokens = Phi3HDImageEmbedding(config)
         self.lm_head = ParallelLMHead(config.vocab_size,
                                       config.hidden_size,
@@ -514,6 +533,15 @@ class Phi3VForCausalLM(nn.Module, SupportsVision):
             data=self._validate_pixel_values(pixel_values),
             image_sizes=self._validate_image_sizes(image_sizes))
 
+    def _embed_pixel_inputs(self,
+                            **kwargs: object) -> Optional[BatchedTensors]:
+        image_input = self._parse_and_validate_image_input(**kwargs)
+        if image_input is None:
+            return None
+
+        return self.vision_embed_tokens(image_input["data"],
+                                        image_input["image_sizes"])
+
     def forward(self,
                 input_ids: torch.Tensor,
                 positions: torch.Tensor,
@@ -521,11 +549,14 @@ class Phi3VForCausalLM(nn.Module, SupportsVision):
                 attn_metadata: AttentionMetadata,
                 intermediate_tensors: Optional[IntermediateTensors] = None,
                 **kwargs: object):
-        image_input = self._parse_and_validate_image_input(**kwargs)
+        vision_embeddings = get_vision_embeddings(
+            kwargs,
+            pixel_input_keys=("pixel_values", "image_sizes"),
+            embed_pixel_inputs=self._embed_pixel_inputs,
+            embed_dim=self.config.hidden_size,
+        )
 
-        if image_input is not None:
-            vision_embeddings = self.vision_embed_tokens(
-                image_input["data"], image_input["image_sizes"])
+        if vision_embeddings is not None:
             inputs_embeds = self.model.get_input_embeddings(input_ids)
             inputs_embeds = merge_vision_embeddings(input_ids, inputs_embeds,
                                                     vision_embeddings,
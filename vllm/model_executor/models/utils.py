@@ -1,4 +1,4 @@
-from typing import Dict, Iterable, List, Optional, Protocol, Tuple
+from typing import Callable, Dict, Iterable, List, Optional, Protocol, Tuple
 
 import torch
 import torch.nn as nn
@@ -78,7 +78,8 @@ def merge_vision_embeddings(input_ids: torch.Tensor,
                 f"Attempted to assign {expr} = {total_tokens} "
                 f"image tokens to {num_expected_tokens} placeholders")
 
-        inputs_embeds[mask] = vision_embeddings.view(total_tokens, embed_dim)
+        inputs_embeds[mask] = vision_embeddings.view(
+            total_tokens, embed_dim).to(inputs_embeds.dtype)
     else:
         size_per_batch = [t.shape[0] for t in vision_embeddings]
         total_tokens = sum(size_per_batch)
@@ -88,11 +89,77 @@ def merge_vision_embeddings(input_ids: torch.Tensor,
                 f"Attempted to assign {expr} = {total_tokens} "
                 f"image tokens to {num_expected_tokens} placeholders")
 
-        inputs_embeds[mask] = torch.cat(vision_embeddings)
+        inputs_embeds[mask] = torch.cat(vision_embeddings).to(
+            inputs_embeds.dtype)
 
     return inputs_embeds
 
 
+def _stack_if_possible(tensors: List[torch.Tensor]) -> BatchedTensors:
+    if all(t.shape == tensors[0].shape for t in tensors):
+        return torch.stack(tensors)
+
+    return tensors
+
+
+def get_vision_embeddings(
+    kwargs: Dict[str, object],
+    *,
+    pixel_input_keys: Tuple[str, ...],
+    embed_pixel_inputs: Callable[..., Optional[BatchedTensors]],
+    embed_dim: int,
+) -> Optional[BatchedTensors]:
+    """
+    Get the vision embeddings of the images in a batch, in order.
+
+    Each image is either given by pixel inputs (``pixel_input_keys``, e.g.
+    pixel values and image sizes), which ``embed_pixel_inputs`` passes through
+    the vision encoder and projector, or directly by its embeddings
+    (``image_embeds``), whose last dimension must be ``embed_dim``.
+
+    In a batch which mixes both, each input is a list with :code:`None` for
+    the images of the other kind (see
+    :meth:`~vllm.multimodal.MultiModalInputs.batch`).
+    """
+    image_embeds = kwargs.pop("image_embeds", None)
+    if image_embeds is None:
+        return embed_pixel_inputs(**kwargs)
+
+    if not isinstance(image_embeds, (torch.Tensor, list)):
+        raise ValueError("Incorrect type of image embeddings. "
+                         f"Got type: {type(image_embeds)}")
+
+    for embeddings in image_embeds:
+        if embeddings is not None and embeddings.shape[-1] != embed_dim:
+            raise ValueError(
+                "The expected shape of image embeddings in each batch element "
+                f"is ('image_feature_size', '{embed_dim}'). "
+                f"You supplied {tuple(embeddings.shape)}.")
+
+    pixel_inputs = {
+        key: kwargs.pop(key)
+        for key in pixel_input_keys if kwargs.get(key) is not None
+    }
+    if not pixel_inputs:
+        return image_embeds
+
+    pixel_indices = [
+        i for i, embeddings in enumerate(image_embeds) if embeddings is None
+    ]
+    pixel_embeddings = embed_pixel_inputs(
+        **{
+            key: _stack_if_possible([value[i] for i in pixel_indices])
+            for key, value in pixel_inputs.items()
+        })
+    assert pixel_embeddings is not None
+
+    vision_embeddings = list(image_embeds)
+    for i, embeddings in zip(pixel_indices, pixel_embeddings):
+        vision_embeddings[i] = embeddings
+
+    return vision_embeddings
+
+
 class LayerFn(Protocol):
 
     def __call__(
@@ -186,10 +253,11 @@ def make_layers(
     pipeline parallelism into account.
     """
     from vllm.distributed.parallel_state import get_pp_group
-    from vllm.distributed.utils import get_pp_indices
+    from vllm.distributed.utils import get_pp_indices, get_pp_layer_partition
     start_layer, end_layer = get_pp_indices(num_hidden_layers,
                                             get_pp_group().rank_in_group,
-                                            get_pp_group().world_size)
+                                            get_pp_group().world_size,
+                                            get_pp_layer_partition())
     modules = torch.nn.ModuleList(
         [PPMissingLayer() for _ in range(start_layer)] + [
             maybe_offload_to_cpu(layer_fn(prefix=f"{prefix}.{idx}"))
@@ -287,9 +287,11 @@ def _prepare_seq_groups(
                                   if do_sample else query_len)
             sample_len = num_prefill_sample if do_sample else 0
         else:
-            # Decode
+            # Decode. A decode scoring several tokens per sequence samples
+            # from each of them.
             prompt_logprob_len = 0
-            sample_len = len(seq_ids) if do_sample else 0
+            sample_len = (len(seq_ids) * seq_group_metadata.token_chunk_size
+                          if do_sample else 0)
 
             if sampling_params.seed is not None and generators is not None:
                 generator = generators.get(seq_group_metadata.request_id)
@@ -466,15 +468,17 @@ class SamplingTensors:
                 repetition_penalties += [1] * prefill_len
 
             if seq_group.do_sample:
+                # A decode scoring several tokens per sequence has more than
+                # one sample per sequence.
                 sample_lens = len(seq_group.sample_indices)
-                assert sample_lens == len(seq_ids)
-                temperatures += [temperature] * len(seq_ids)
-                top_ps += [top_p] * len(seq_ids)
-                top_ks += [top_k] * len(seq_ids)
-                min_ps += [min_p] * len(seq_ids)
-                presence_penalties += [p] * len(seq_ids)
-                frequency_penalties += [f] * len(seq_ids)
-                repetition_penalties += [r] * len(seq_ids)
+                assert sample_lens % len(seq_ids) == 0
+                temperatures += [temperature] * sample_lens
+                top_ps += [top_p] * sample_lens
+                top_ks += [top_k] * sample_lens
+                min_ps += [min_p] * sample_lens
+                presence_penalties += [p] * sample_lens
+                frequency_penalties += [f] * sample_lens
+                repetition_penalties += [r] * sample_lens
 
             if _USE_TRITON_SAMPLER:
                 if is_prompt:
@@ -509,10 +513,19 @@ class SamplingTensors:
                     output_tokens.extend(
                         array('l') for _ in range(prefill_len))
                 if seq_group.do_sample:
+                    samples_per_seq = (len(seq_group.sample_indices) //
+                                       len(seq_ids))
                     for seq_id in seq_ids:
                         seq_data = seq_group.seq_data[seq_id]
-                        prompt_tokens.append(seq_data.prompt_token_ids_array)
-                        output_tokens.append(seq_data.output_token_ids_array)
+                        output_token_ids = seq_data.output_token_ids_array
+                        # Each sample of a multi-token decode only sees the
+                        # output tokens before its own position.
+                        for j in range(samples_per_seq - 1, -1, -1):
+                            prompt_tokens.append(
+                                seq_data.prompt_token_ids_array)
+                            output_tokens.append(
+                                output_token_ids[:len(output_token_ids) -
+                                                 j] if j else output_token_ids)
 
         sampling_tensors = SamplingTensors.from_lists(
             temperatures, top_ps, top_ks, min_ps, presence_penalties,
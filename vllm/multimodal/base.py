@@ -61,8 +61,7 @@ class MultiModalInputs(_MultiModalInputsBase):
         """
         # may be list rather than tensors
         if isinstance(tensors[0], list):
-            return [[t for t in tensor[0]]
-                    for tensor in cast(List[List[torch.Tensor]], tensors)]
+            return [MultiModalInputs._unbatch(tensor) for tensor in tensors]
 
         tensors_ = cast(List[torch.Tensor], tensors)
 
@@ -70,10 +69,19 @@ class MultiModalInputs(_MultiModalInputsBase):
 
         for tensor in tensors_:
             if tensor.shape[1:] != unbatched_shape:
-                return [tensor.squeeze(0) for tensor in tensors_]
+                return [
+                    MultiModalInputs._unbatch(tensor) for tensor in tensors_
+                ]
 
         return torch.cat(tensors_, dim=0)
 
+    @staticmethod
+    def _unbatch(tensors: NestedTensors) -> NestedTensors:
+        if isinstance(tensors, list):
+            return [t for t in tensors[0]]
+
+        return cast(torch.Tensor, tensors).squeeze(0)
+
     @staticmethod
     def batch(inputs_list: List["MultiModalInputs"]) -> BatchedTensorInputs:
         """
@@ -84,19 +92,31 @@ class MultiModalInputs(_MultiModalInputsBase):
         share the same shape, the output value is a single batched tensor;
         otherwise, the output value is a list containing the original value
         from each input.
+
+        If the inputs do not share the same keys (e.g. a batch mixing images
+        given as pixel values and as embeddings), the output value of each key
+        is a list with one element per input, which is :code:`None` for the
+        inputs without that key.
         """
         if len(inputs_list) == 0:
             return {}
 
         keys = inputs_list[0].keys()
 
+        if any(inputs.keys() != keys for inputs in inputs_list):
+            all_keys = dict.fromkeys(k for inputs in inputs_list
+                                     for k in inputs)
+            return {
+                k: [
+                    MultiModalInputs._unbatch(inputs[k])
+                    if k in inputs else None for inputs in inputs_list
+                ]
+                for k in all_keys
+            }
+
         item_lists: Dict[str, List[NestedTensors]] = defaultdict(list)
 
         for inputs in inputs_list:
-            if inputs.keys() != keys:
-                msg = f"Inputs do not share the same keys ({keys})"
-                raise ValueError(msg)
-
             for k, v in inputs.items():
                 item_lists[k].append(v)
 
@@ -111,8 +131,9 @@ class MultiModalInputs(_MultiModalInputsBase):
         *,
         device: torch.types.Device,
     ) -> BatchedTensorInputs:
-        return json_map_leaves(lambda x: x.to(device, non_blocking=True),
-                               batched_inputs)
+        return json_map_leaves(
+            lambda x: None
+            if x is None else x.to(device, non_blocking=True), batched_inputs)
 
 
 class MultiModalDataBuiltins(TypedDict, total=False):
@@ -235,6 +256,11 @@ class MultiModalPlugin(ABC):
             - :ref:`input_processing_pipeline`
             - :ref:`enabling_multimodal_inputs`
         """
+        # Already mapped by the frontend, see
+        # :class:`~vllm.multimodal.preprocessor.MultiModalPreprocessor`.
+        if isinstance(data, MultiModalInputs):
+            return data
+
         # Avoid circular import
         from vllm.model_executor.model_loader import get_model_architecture
 
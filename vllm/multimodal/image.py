@@ -1,7 +1,8 @@
 from functools import lru_cache
-from typing import List, Optional, Tuple, TypeVar
+from typing import List, Optional, Tuple, Type, TypeVar
 
 import torch
+import torch.nn as nn
 from PIL import Image
 from transformers import PreTrainedTokenizerBase
 
@@ -19,6 +20,16 @@ logger = init_logger(__name__)
 cached_get_image_processor = lru_cache(get_image_processor)
 cached_get_tokenizer = lru_cache(get_tokenizer)
 
+
+@lru_cache
+def _cached_get_model_cls(model_config: ModelConfig) -> Type[nn.Module]:
+    # Avoid circular import
+    from vllm.model_executor.model_loader import get_model_architecture
+
+    model_cls, _ = get_model_architecture(model_config)
+    return model_cls
+
+
 # Utilities for image input processors
 _T = TypeVar("_T", str, int)
 
@@ -100,6 +111,42 @@ def repeat_and_pad_image_tokens(
     return new_prompt, new_token_ids
 
 
+def get_image_embeds_feature_size(ctx: InputContext,
+                                  image_embeds: torch.Tensor) -> int:
+    """
+    Validate the embeddings of an image which are passed instead of its pixels
+    and return their number of image tokens.
+
+    The embeddings replace the outputs of the vision encoder and projector of
+    the model, so their shape is ``(image_feature_size, hidden_size)`` (or
+    with a leading dimension of 1), where ``hidden_size`` is the hidden size
+    of the language model and ``image_feature_size`` is at most the maximum
+    number of image tokens of the model.
+    """
+    # Avoid circular import
+    from vllm.multimodal import MULTIMODAL_REGISTRY
+
+    model_config = ctx.model_config
+    hidden_size = model_config.get_hidden_size()
+    max_image_tokens = MULTIMODAL_REGISTRY.get_max_multimodal_tokens(
+        model_config)
+
+    shape = tuple(image_embeds.shape)
+    if len(shape) == 3 and shape[0] == 1:
+        shape = shape[1:]
+    if (len(shape) != 2 or shape[1] != hidden_size
+            or not 0 < shape[0] <= max_image_tokens):
+        raise ValueError(
+            "The expected shape of image embeddings is (image_feature_size, "
+            f"{hidden_size}) with image_feature_size at most "
+            f"{max_image_tokens}. You supplied {tuple(image_embeds.shape)}.")
+    if not image_embeds.is_floating_point():
+        raise ValueError("Image embeddings must be floating point, got "
+                         f"{image_embeds.dtype}.")
+
+    return shape[0]
+
+
 class ImagePlugin(MultiModalPlugin):
     """Plugin for image data."""
 
@@ -130,7 +177,18 @@ class ImagePlugin(MultiModalPlugin):
 
             return MultiModalInputs(batch_data)
         elif isinstance(data, torch.Tensor) or is_list_of(data, torch.Tensor):
-            raise NotImplementedError("Embeddings input is not supported yet")
+            model_cls = _cached_get_model_cls(model_config)
+            if not getattr(model_cls, "supports_image_embeds", False):
+                raise NotImplementedError(
+                    f"{model_cls.__name__} does not support image embeddings "
+                    "as input")
+
+            if isinstance(data, torch.Tensor):
+                image_embeds = data if data.dim() == 3 else data.unsqueeze(0)
+            else:
+                image_embeds = torch.stack(data)
+
+            return MultiModalInputs({"image_embeds": image_embeds})
 
         raise TypeError(f"Invalid image type: {type(data)}")
 
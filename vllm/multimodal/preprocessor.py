@@ -0,0 +1,190 @@
+"""Preprocessing of multi-modal data off the critical path of the engine.
+
+Images are decoded, and mapped to the inputs of the model (e.g. pixel values),
+by a pool of worker processes when a request is added, rather than by the
+model runner while it prepares a step. The mapped inputs are cached by the
+content hash of the data, so that data repeated across turns and requests is
+only processed once.
+"""
+import asyncio
+import hashlib
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import (Executor, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+from typing import Dict, Optional, Tuple
+
+import torch
+from PIL import Image
+
+import vllm.envs as envs
+from vllm.config import ModelConfig
+from vllm.utils import is_list_of
+
+from .base import MultiModalDataDict, MultiModalInputs
+
+_executor: Optional[Executor] = None
+
+
+def get_multimodal_executor() -> Executor:
+    """Return the pool which decodes and maps multi-modal data in this
+    process.
+
+    It has `VLLM_MM_PREPROCESS_WORKERS` worker processes, or is a thread pool
+    if that is 0.
+    """
+    global _executor
+    if _executor is None:
+        num_workers = envs.VLLM_MM_PREPROCESS_WORKERS
+        if num_workers > 0:
+            # The engine process may have initialized CUDA, which forked
+            # processes cannot use.
+            _executor = ProcessPoolExecutor(
+                max_workers=num_workers,
+                mp_context=multiprocessing.get_context("spawn"))
+        else:
+            _executor = ThreadPoolExecutor(
+                thread_name_prefix="vllm_mm_preprocess")
+    return _executor
+
+
+def hash_multimodal_data(data: object) -> Optional[bytes]:
+    """Return the content hash of an image or a list of images, or None for
+    data that is not cached."""
+    if isinstance(data, Image.Image):
+        images = [data]
+    elif is_list_of(data, Image.Image):
+        images = data
+    else:
+        return None
+
+    hasher = hashlib.blake2b(digest_size=16)
+    for image in images:
+        hasher.update(f"{image.mode}{image.size}".encode())
+        hasher.update(image.tobytes())
+    return hasher.digest()
+
+
+def _get_nbytes(value: object) -> int:
+    if isinstance(value, torch.Tensor):
+        return value.element_size() * value.numel()
+    if isinstance(value, (list, tuple)):
+        return sum(_get_nbytes(v) for v in value)
+    return 0
+
+
+class MultiModalInputsCache:
+    """An LRU cache of the model inputs mapped from multi-modal data, keyed by
+    modality and content hash and bounded by the size of their tensors."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.num_bytes = 0
+        self._entries: OrderedDict[Tuple[str, bytes],
+                                   Tuple[MultiModalInputs,
+                                         int]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Tuple[str, bytes]) -> Optional[MultiModalInputs]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: Tuple[str, bytes], inputs: MultiModalInputs) -> None:
+        nbytes = sum(_get_nbytes(value) for value in inputs.values())
+        if (self.max_bytes <= 0 or nbytes > self.max_bytes
+                or key in self._entries):
+            return
+        while self.num_bytes + nbytes > self.max_bytes:
+            _, (_, evicted_nbytes) = self._entries.popitem(last=False)
+            self.num_bytes -= evicted_nbytes
+        self._entries[key] = (inputs, nbytes)
+        self.num_bytes += nbytes
+
+
+def _map_input(model_config: ModelConfig, data_key: str,
+               data: object) -> MultiModalInputs:
+    # Avoid circular import
+    from vllm.multimodal import MULTIMODAL_REGISTRY
+
+    return MULTIMODAL_REGISTRY._get_plugin(data_key).map_input(
+        model_config, data)
+
+
+class MultiModalPreprocessor:
+    """Maps the multi-modal data of the requests of a model to the inputs of
+    the model, before they are added to the engine.
+
+    Each item of the data (e.g. the image of a request) is replaced by its
+    :class:`~vllm.multimodal.MultiModalInputs`, which the model runner passes
+    through as is.
+    """
+
+    def __init__(self, model_config: ModelConfig) -> None:
+        self.model_config = model_config
+        self.cache = MultiModalInputsCache(envs.VLLM_MM_INPUT_CACHE_SIZE_MB *
+                                           1024 * 1024)
+        self._can_map_in_subprocess: Dict[str, bool] = {}
+
+    def _map_in_subprocess(self, data_key: str) -> bool:
+        # The worker processes only know the models and plugins of vLLM,
+        # others are mapped in a thread of this process.
+        if data_key not in self._can_map_in_subprocess:
+            # Avoid circular import
+            from vllm.model_executor.model_loader import get_model_architecture
+            from vllm.multimodal import MULTIMODAL_REGISTRY
+
+            model_cls, _ = get_model_architecture(self.model_config)
+            plugin = MULTIMODAL_REGISTRY._get_plugin(data_key)
+            self._can_map_in_subprocess[data_key] = (
+                model_cls.__module__.startswith("vllm.")
+                and type(plugin).__module__.startswith("vllm."))
+        return self._can_map_in_subprocess[data_key]
+
+    def map_input(self, data: MultiModalDataDict) -> MultiModalDataDict:
+        """Map the data in this thread, using the cache."""
+        mapped_data: Dict[str, object] = {}
+        for data_key, value in data.items():
+            if isinstance(value, MultiModalInputs):
+                mapped_data[data_key] = value
+                continue
+            content_hash = hash_multimodal_data(value)
+            inputs = (None if content_hash is None else self.cache.get(
+                (data_key, content_hash)))
+            if inputs is None:
+                inputs = _map_input(self.model_config, data_key, value)
+                if content_hash is not None:
+                    self.cache.put((data_key, content_hash), inputs)
+            mapped_data[data_key] = inputs
+        return mapped_data
+
+    async def map_input_async(self,
+                              data: MultiModalDataDict) -> MultiModalDataDict:
+        """Map the data in the preprocessing pool, using the cache."""
+        loop = asyncio.get_running_loop()
+        mapped_data: Dict[str, object] = {}
+        for data_key, value in data.items():
+            if isinstance(value, MultiModalInputs):
+                mapped_data[data_key] = value
+                continue
+            content_hash = await loop.run_in_executor(None,
+                                                      hash_multimodal_data,
+                                                      value)
+            inputs = (None if content_hash is None else self.cache.get(
+                (data_key, content_hash)))
+            if inputs is None:
+                # Embeddings are not worth sending to another process.
+                executor = (get_multimodal_executor()
+                            if content_hash is not None
+                            and self._map_in_subprocess(data_key) else None)
+                inputs = await loop.run_in_executor(executor, _map_input,
+                                                    self.model_config,
+                                                    data_key, value)
+                if content_hash is not None:
+                    self.cache.put((data_key, content_hash), inputs)
+            mapped_data[data_key] = inputs
+        return mapped_data
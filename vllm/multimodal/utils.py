@@ -1,12 +1,16 @@
+import asyncio
 import base64
+import warnings
 from io import BytesIO
-from typing import Union
+from typing import Sequence, Union
 
+import torch
 from PIL import Image
 
 from vllm.connections import global_http_connection
 from vllm.envs import VLLM_IMAGE_FETCH_TIMEOUT
 from vllm.multimodal.base import MultiModalDataDict
+from vllm.multimodal.preprocessor import get_multimodal_executor
 
 
 def _load_image_from_bytes(b: bytes):
@@ -21,6 +25,16 @@ def _load_image_from_data_url(image_url: str):
     return load_image_from_base64(image_base64)
 
 
+def _load_and_convert_image(image_data: Union[bytes, str],
+                            image_mode: str) -> Image.Image:
+    # The raw bytes of a fetched image, or a data URL.
+    if isinstance(image_data, bytes):
+        image = _load_image_from_bytes(image_data)
+    else:
+        image = _load_image_from_data_url(image_data)
+    return image.convert(image_mode)
+
+
 def fetch_image(image_url: str, *, image_mode: str = "RGB") -> Image.Image:
     """
     Load a PIL image from a HTTP or base64 data URL.
@@ -52,15 +66,19 @@ async def async_fetch_image(image_url: str,
     if image_url.startswith('http'):
         image_raw = await global_http_connection.async_get_bytes(
             image_url, timeout=VLLM_IMAGE_FETCH_TIMEOUT)
-        image = _load_image_from_bytes(image_raw)
+        image_data: Union[bytes, str] = image_raw
 
     elif image_url.startswith('data:image'):
-        image = _load_image_from_data_url(image_url)
+        image_data = image_url
     else:
         raise ValueError("Invalid 'image_url': A valid 'image_url' must start "
                          "with either 'data:image' or 'http'.")
 
-    return image.convert(image_mode)
+    # Decode the image in the preprocessing pool rather than on the event
+    # loop of the server.
+    return await asyncio.get_running_loop().run_in_executor(
+        get_multimodal_executor(), _load_and_convert_image, image_data,
+        image_mode)
 
 
 async def async_get_and_parse_image(image_url: str) -> MultiModalDataDict:
@@ -90,6 +108,42 @@ def load_image_from_base64(image: Union[bytes, str]) -> Image.Image:
     return _load_image_from_bytes(base64.b64decode(image))
 
 
+def encode_image_embeds_base64(image_embeds: torch.Tensor) -> str:
+    """Encode image embeddings to base64 format, as float16 in C order."""
+    data = image_embeds.to(torch.float16).contiguous().numpy().tobytes()
+    return base64.b64encode(data).decode('utf-8')
+
+
+def load_image_embeds_from_base64(data: Union[bytes, str],
+                                  shape: Sequence[int]) -> torch.Tensor:
+    """
+    Load image embeddings of the given shape from base64 format, as float16
+    in C order.
+
+    The embeddings are not copied out of the decoded buffer.
+    """
+    buffer = base64.b64decode(data)
+    shape = tuple(shape)
+    num_elements = 1
+    for size in shape:
+        num_elements *= size
+    if len(buffer) != num_elements * 2:
+        raise ValueError(
+            f"Image embeddings of shape {shape} should be "
+            f"{num_elements * 2} bytes of float16, got {len(buffer)} bytes.")
+
+    with warnings.catch_warnings():
+        # The embeddings are only read, so the buffer may be immutable.
+        warnings.filterwarnings("ignore", message=".*not writable.*")
+        image_embeds = torch.frombuffer(buffer, dtype=torch.float16)
+    return image_embeds.view(shape)
+
+
+async def async_get_and_parse_image_embeds(
+        data: Union[bytes, str], shape: Sequence[int]) -> MultiModalDataDict:
+    return {"image": load_image_embeds_from_base64(data, shape)}
+
+
 def rescale_image_size(image: Image.Image,
                        size_factor: float,
                        transpose: int = -1) -> Image.Image:
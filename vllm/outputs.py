@@ -4,7 +4,7 @@ from typing import List, Optional, Tuple, Union
 
 from vllm.lora.request import LoRARequest
 from vllm.sequence import (PromptLogprobs, RequestMetrics, SampleLogprobs,
-                           SequenceGroup, SequenceStatus)
+                           SequenceGroup, SequenceLogprobs, SequenceStatus)
 
 
 @dataclass
@@ -91,7 +91,7 @@ class RequestOutput:
         request_id: str,
         prompt: Optional[str],
         prompt_token_ids: List[int],
-        prompt_logprobs: Optional[PromptLogprobs],
+        prompt_logprobs: Optional[Union[PromptLogprobs, SequenceLogprobs]],
         outputs: List[CompletionOutput],
         finished: bool,
         metrics: Optional[RequestMetrics] = None,
@@ -139,7 +139,7 @@ class RequestOutput:
             CompletionOutput(
                 seqs.index(seq),
                 seq.get_output_text_to_return(text_buffer_length),
-                seq.data._output_token_ids,  # type: ignore
+                seq.data.output_token_ids_array,  # type: ignore
                 seq.get_cumulative_logprob() if include_logprobs else None,
                 seq.output_logprobs if include_logprobs else None,
                 SequenceStatus.get_finished_reason(seq.status),
@@ -151,7 +151,8 @@ class RequestOutput:
         prompt_token_ids = seq_group.prompt_token_ids
         encoder_prompt = seq_group.encoder_prompt
         encoder_prompt_token_ids = seq_group.encoder_prompt_token_ids
-        prompt_logprobs = seq_group.prompt_logprobs
+        prompt_logprobs = (None if seq_group.prompt_logprobs is None else
+                           seq_group.prompt_logprobs.snapshot())
         finished = seq_group.is_finished()
         finished_time = time.time() if finished else None
         seq_group.set_finished_time(finished_time)
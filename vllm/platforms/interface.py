@@ -27,6 +27,15 @@ class Platform:
     def get_device_capability(device_id: int = 0) -> Tuple[int, int]:
         raise NotImplementedError
 
+    @staticmethod
+    def get_device_name(device_id: int = 0) -> str:
+        raise NotImplementedError
+
+    @staticmethod
+    def get_device_total_memory(device_id: int = 0) -> int:
+        """Get the total memory of a device in bytes."""
+        raise NotImplementedError
+
     @staticmethod
     def inference_mode():
         """A device-specific wrapper of `torch.inference_mode`.
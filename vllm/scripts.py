@@ -1,18 +1,20 @@
 # The CLI entrypoint to vLLM.
+# The subcommands import their dependencies lazily, so that e.g. `vllm chat`
+# does not import the engine and `vllm serve` does not import the OpenAI
+# client.
 import argparse
 import asyncio
 import os
 import signal
 import sys
-from typing import List, Optional
+from typing import TYPE_CHECKING, List, Optional
 
-from openai import OpenAI
-from openai.types.chat import ChatCompletionMessageParam
-
-from vllm.entrypoints.openai.api_server import run_server
-from vllm.entrypoints.openai.cli_args import make_arg_parser
+from vllm.startup_profile import startup_phase
 from vllm.utils import FlexibleArgumentParser
 
+if TYPE_CHECKING:
+    from openai import OpenAI
+
 
 def register_signal_handlers():
 
@@ -24,6 +26,9 @@ def register_signal_handlers():
 
 
 def serve(args: argparse.Namespace) -> None:
+    with startup_phase("import"):
+        from vllm.entrypoints.openai.api_server import run_server
+
     # EngineArgs expects the model name to be passed as --model.
     args.model = args.model_tag
 
@@ -31,6 +36,8 @@ def serve(args: argparse.Namespace) -> None:
 
 
 def interactive_cli(args: argparse.Namespace) -> None:
+    from openai import OpenAI
+
     register_signal_handlers()
 
     base_url = args.url
@@ -51,7 +58,7 @@ def interactive_cli(args: argparse.Namespace) -> None:
         chat(args.system_prompt, model_name, openai_client)
 
 
-def complete(model_name: str, client: OpenAI) -> None:
+def complete(model_name: str, client: "OpenAI") -> None:
     print("Please enter prompt to complete:")
     while True:
         input_prompt = input("> ")
@@ -63,7 +70,9 @@ def complete(model_name: str, client: OpenAI) -> None:
 
 
 def chat(system_prompt: Optional[str], model_name: str,
-         client: OpenAI) -> None:
+         client: "OpenAI") -> None:
+    from openai.types.chat import ChatCompletionMessageParam
+
     conversation: List[ChatCompletionMessageParam] = []
     if system_prompt is not None:
         conversation.append({"role": "system", "content": system_prompt})
@@ -118,7 +127,12 @@ def main():
     serve_parser.add_argument("model_tag",
                               type=str,
                               help="The model tag to serve")
-    serve_parser = make_arg_parser(serve_parser)
+    # The server arguments pull in the engine, so only add them when the
+    # serve subcommand is used.
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        with startup_phase("import"):
+            from vllm.entrypoints.openai.cli_args import make_arg_parser
+            serve_parser = make_arg_parser(serve_parser)
     serve_parser.set_defaults(dispatch_function=serve)
 
     complete_parser = subparsers.add_parser(
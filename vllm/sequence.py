@@ -5,9 +5,11 @@ from abc import ABC, abstractmethod
 from array import array
 from collections import defaultdict
 from dataclasses import dataclass, field
-from typing import (TYPE_CHECKING, Dict, List, Mapping, Optional, Set, Tuple,
-                    Union, cast)
+from typing import TYPE_CHECKING, Dict, Iterator, List, Mapping, Optional
+from typing import Sequence as GenericSequence
+from typing import Set, Tuple, Union, cast, overload
 
+import numpy as np
 import torch
 
 from vllm.inputs.parse import is_valid_encoder_decoder_llm_inputs
@@ -43,6 +45,216 @@ PromptLogprobs = List[Optional[Dict[int, Logprob]]]
 SampleLogprobs = List[Dict[int, Logprob]]
 
 
+class SequenceLogprobs(GenericSequence[Optional[Dict[int, Logprob]]]):
+    """The logprobs of the tokens of a sequence, stored column-wise.
+
+    The candidate tokens of every position are stored in flat arrays of token
+    IDs, logprobs and ranks. A position is materialized into a
+    `{token_id -> Logprob}` dictionary only when it is accessed, i.e. when
+    the logprobs are returned to the user. A position appended as None (such
+    as the first token of a prompt) is materialized as None.
+
+    A materialized position is kept, so that accessing it again returns the
+    same objects and changes made to them are not lost.
+    """
+
+    __slots__ = ("_offsets", "_token_ids", "_logprobs", "_ranks",
+                 "_decoded_tokens", "_num_positions", "_none_positions",
+                 "_materialized")
+
+    def __init__(self) -> None:
+        # The candidates of position i are at [_offsets[i], _offsets[i + 1]).
+        self._offsets = array('q', [0])
+        self._token_ids = array('q')
+        self._logprobs = array('d')
+        # -1 if the rank is unknown.
+        self._ranks = array('q')
+        self._decoded_tokens: List[Optional[str]] = []
+        self._num_positions = 0
+        # The positions appended as None rather than as a dict.
+        self._none_positions: Set[int] = set()
+        # Position -> the dict returned when the position was accessed.
+        self._materialized: Dict[int, Dict[int, Logprob]] = {}
+
+    @classmethod
+    def from_columns(cls, token_ids: np.ndarray, logprobs: np.ndarray,
+                     ranks: np.ndarray,
+                     num_candidates: np.ndarray) -> "SequenceLogprobs":
+        """Create the logprobs of `len(num_candidates)` positions from the
+        flat columns of their candidates, without creating Python objects
+        per candidate.
+
+        Args:
+            token_ids: The token IDs of the candidates of all positions.
+            logprobs: The logprobs of the candidates.
+            ranks: The ranks of the candidates, -1 if unknown.
+            num_candidates: The number of candidates of each position.
+        """
+        seq_logprobs = cls()
+        seq_logprobs._token_ids.frombytes(
+            np.ascontiguousarray(token_ids, dtype=np.int64).tobytes())
+        seq_logprobs._logprobs.frombytes(
+            np.ascontiguousarray(logprobs, dtype=np.float64).tobytes())
+        seq_logprobs._ranks.frombytes(
+            np.ascontiguousarray(ranks, dtype=np.int64).tobytes())
+        seq_logprobs._offsets.frombytes(
+            np.cumsum(num_candidates, dtype=np.int64).tobytes())
+        seq_logprobs._decoded_tokens = [None] * len(seq_logprobs._token_ids)
+        seq_logprobs._num_positions = len(num_candidates)
+        return seq_logprobs
+
+    def append(self, logprobs: Optional[Dict[int, Logprob]]) -> None:
+        """Append the candidates of the next position."""
+        for token_id, logprob in (logprobs or {}).items():
+            self._token_ids.append(token_id)
+            self._logprobs.append(logprob.logprob)
+            self._ranks.append(-1 if logprob.rank is None else logprob.rank)
+            self._decoded_tokens.append(logprob.decoded_token)
+        if logprobs is None:
+            self._none_positions.add(self._num_positions)
+        elif logprobs:
+            # The caller may still hold the Logprob objects.
+            self._materialized[self._num_positions] = logprobs
+        self._offsets.append(len(self._token_ids))
+        self._num_positions += 1
+
+    def extend(
+        self, logprobs: Union["SequenceLogprobs", PromptLogprobs,
+                              SampleLogprobs]
+    ) -> None:
+        """Append the candidates of the next positions."""
+        if not isinstance(logprobs, SequenceLogprobs):
+            for position_logprobs in logprobs:
+                self.append(position_logprobs)
+            return
+
+        num_positions = logprobs._num_positions
+        num_candidates = logprobs._offsets[num_positions]
+        base = len(self._token_ids)
+        for position, materialized in logprobs._materialized.items():
+            if position < num_positions:
+                self._materialized[self._num_positions +
+                                   position] = materialized
+        self._none_positions.update(self._num_positions + position
+                                    for position in logprobs._none_positions
+                                    if position < num_positions)
+        self._token_ids.extend(logprobs._token_ids[:num_candidates])
+        self._logprobs.extend(logprobs._logprobs[:num_candidates])
+        self._ranks.extend(logprobs._ranks[:num_candidates])
+        self._decoded_tokens.extend(logprobs._decoded_tokens[:num_candidates])
+        self._offsets.extend(
+            array('q', (base + offset
+                        for offset in logprobs._offsets[1:num_positions + 1])))
+        self._num_positions += num_positions
+
+    def get_candidates(
+            self, index: int) -> Optional[List[Tuple[int, Optional[str]]]]:
+        """Return the token IDs and decoded tokens of the candidates of a
+        position, without materializing it."""
+        start, end = self._get_range(index)
+        index %= self._num_positions
+        if index in self._none_positions:
+            return None
+        materialized = self._materialized.get(index)
+        if materialized is not None:
+            return [(token_id, logprob.decoded_token)
+                    for token_id, logprob in materialized.items()]
+        return list(
+            zip(self._token_ids[start:end], self._decoded_tokens[start:end]))
+
+    def set_decoded_tokens(self, index: int,
+                           decoded_tokens: Dict[int, str]) -> None:
+        """Set the decoded text of candidate tokens of a position.
+
+        Args:
+            index: The position.
+            decoded_tokens: The decoded text of each candidate token ID.
+        """
+        start, end = self._get_range(index)
+        index %= self._num_positions
+        num_set = 0
+        for i in range(start, end):
+            decoded_token = decoded_tokens.get(self._token_ids[i])
+            if decoded_token is not None:
+                self._decoded_tokens[i] = decoded_token
+                num_set += 1
+        if num_set != len(decoded_tokens):
+            raise KeyError(
+                set(decoded_tokens).difference(self._token_ids[start:end]))
+        materialized = self._materialized.get(index)
+        if materialized is not None:
+            for token_id, decoded_token in decoded_tokens.items():
+                materialized[token_id].decoded_token = decoded_token
+
+    def snapshot(self) -> "SequenceLogprobs":
+        """Return a read-only view of the positions appended so far.
+
+        The view shares the storage of this object, which is append-only, so
+        taking it is O(1).
+        """
+        view = SequenceLogprobs.__new__(SequenceLogprobs)
+        view._offsets = self._offsets
+        view._token_ids = self._token_ids
+        view._logprobs = self._logprobs
+        view._ranks = self._ranks
+        view._decoded_tokens = self._decoded_tokens
+        view._num_positions = self._num_positions
+        view._none_positions = self._none_positions
+        view._materialized = self._materialized
+        return view
+
+    def _get_range(self, index: int) -> Tuple[int, int]:
+        if index < 0:
+            index += self._num_positions
+        if not 0 <= index < self._num_positions:
+            raise IndexError("logprobs index out of range")
+        return self._offsets[index], self._offsets[index + 1]
+
+    def __len__(self) -> int:
+        return self._num_positions
+
+    @overload
+    def __getitem__(self, index: int) -> Optional[Dict[int, Logprob]]:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> PromptLogprobs:
+        ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [
+                self[i] for i in range(*index.indices(self._num_positions))
+            ]
+        start, end = self._get_range(index)
+        index %= self._num_positions
+        if index in self._none_positions:
+            return None
+        materialized = self._materialized.get(index)
+        if materialized is None:
+            materialized = {
+                self._token_ids[i]:
+                Logprob(self._logprobs[i],
+                        None if self._ranks[i] < 0 else self._ranks[i],
+                        self._decoded_tokens[i])
+                for i in range(start, end)
+            }
+            self._materialized[index] = materialized
+        return materialized
+
+    def __iter__(self) -> Iterator[Optional[Dict[int, Logprob]]]:
+        for i in range(self._num_positions):
+            yield self[i]
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, (SequenceLogprobs, list)):
+            return NotImplemented
+        return list(self) == list(other)
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
 class SequenceStatus(enum.IntEnum):
     """Status of a sequence."""
     WAITING = 0
@@ -99,6 +311,10 @@ class RequestMetrics:
         model_execute_time: The time spent in the model execute function. This
                             will include model forward, block/sync across
                             workers, cpu-gpu sync time and sampling time.
+        num_cached_tokens: The number of prompt tokens whose KV cache was
+                           reused from the prefix cache when the request was
+                           first scheduled. None if prefix caching is
+                           disabled.
     """
     arrival_time: float
     last_token_time: float
@@ -109,11 +325,16 @@ class RequestMetrics:
     scheduler_time: Optional[float] = None
     model_forward_time: Optional[float] = None
     model_execute_time: Optional[float] = None
+    num_cached_tokens: Optional[int] = None
 
 
 class SequenceData:
     """Data associated with a sequence.
 
+    The prompt and output token IDs are stored back to back in a single
+    growable array of machine integers, which is much smaller than lists or
+    tuples of Python ints for long sequences.
+
     Args:
         prompt_token_ids: The token IDs of the prompt.
         output_token_ids: The token IDs of the output. Set to an empty list if
@@ -125,70 +346,88 @@ class SequenceData:
         cumulative_logprob: The cumulative log probability of the output.
     """
 
+    __slots__ = ("_token_ids", "_prompt_len", "_prompt_token_ids_tuple",
+                 "cumulative_logprob", "_num_computed_tokens", "_stage")
+
     def __init__(
         self,
-        prompt_token_ids: List[int],
-        output_token_ids: Optional[List[int]] = None,
+        prompt_token_ids: GenericSequence[int],
+        output_token_ids: Optional[GenericSequence[int]] = None,
     ) -> None:
-        self._prompt_token_ids = array('l', prompt_token_ids)
-        self._prompt_token_ids_tuple: Tuple[int, ...] = tuple(prompt_token_ids)
-        self._output_token_ids = array(
-            'l', output_token_ids if output_token_ids is not None else [])
+        self._token_ids = array('l', prompt_token_ids)
+        self._prompt_len = len(self._token_ids)
+        # Built on first access, since the prompt does not change.
+        self._prompt_token_ids_tuple: Optional[Tuple[int, ...]] = None
+        if output_token_ids is not None:
+            self._token_ids.extend(output_token_ids)
 
         self.cumulative_logprob = 0.0
         # The number of tokens that are computed (that run against the model).
         self._num_computed_tokens = 0
         self._stage: SequenceStage = SequenceStage.PREFILL
 
-        self._update_cached_all_tokens()
-
-    def _update_cached_all_tokens(self):
-        self._cached_all_token_ids: List[int] = list(self._prompt_token_ids +
-                                                     self._output_token_ids)
-
     @property
     def prompt_token_ids(self) -> Tuple[int, ...]:
+        if self._prompt_token_ids_tuple is None:
+            self._prompt_token_ids_tuple = tuple(
+                self._token_ids[:self._prompt_len])
         return self._prompt_token_ids_tuple
 
     @prompt_token_ids.setter
     def prompt_token_ids(self, new_prompt_token_ids) -> None:
-        self._prompt_token_ids = array('l', new_prompt_token_ids)
-        self._prompt_token_ids_tuple = tuple(new_prompt_token_ids)
-        self._update_cached_all_tokens()
+        output_token_ids = self._token_ids[self._prompt_len:]
+        self._token_ids = array('l', new_prompt_token_ids)
+        self._prompt_len = len(self._token_ids)
+        self._prompt_token_ids_tuple = None
+        self._token_ids.extend(output_token_ids)
 
     @property
     def prompt_token_ids_array(self) -> array:
-        return self._prompt_token_ids
+        """A copy of the prompt token IDs."""
+        return self._token_ids[:self._prompt_len]
 
     @property
     def output_token_ids(self) -> Tuple[int, ...]:
-        return tuple(self._output_token_ids)
+        return tuple(self._token_ids[self._prompt_len:])
 
     @output_token_ids.setter
     def output_token_ids(self, new_output_token_ids) -> None:
-        self._output_token_ids = array('l', new_output_token_ids)
-        self._update_cached_all_tokens()
+        del self._token_ids[self._prompt_len:]
+        self._token_ids.extend(new_output_token_ids)
 
     @property
     def output_token_ids_array(self) -> array:
-        return self._output_token_ids
+        """A copy of the output token IDs."""
+        return self._token_ids[self._prompt_len:]
 
     def append_token_id(self, token_id: int, logprob: float) -> None:
-        self._output_token_ids.append(token_id)
-        self._cached_all_token_ids.append(token_id)
+        self._token_ids.append(token_id)
         self.cumulative_logprob += logprob
 
     def get_len(self) -> int:
-        return len(self._output_token_ids) + len(self._prompt_token_ids)
+        return len(self._token_ids)
 
     def get_prompt_len(self) -> int:
-        return len(self._prompt_token_ids)
+        return self._prompt_len
 
     def get_output_len(self) -> int:
-        return len(self._output_token_ids)
+        return len(self._token_ids) - self._prompt_len
 
     def get_token_ids(self) -> List[int]:
-        return self._cached_all_token_ids
+        """Return a list of the prompt and output token IDs.
+
+        The list is created on every call; use `get_token_ids_array` on hot
+        paths.
+        """
+        return self._token_ids.tolist()
+
+    def get_token_ids_array(self) -> array:
+        """Return the prompt and output token IDs without copying them.
+
+        This is the buffer of the sequence itself, which must not be modified
+        by the caller. Slicing it returns an `array`, not a list.
+        """
+        return self._token_ids
 
     def get_prefix_token_ids(
             self, num_tokens: int
@@ -196,10 +435,10 @@ class SequenceData:
         """Get prefix tokens, and make the return value hashable"""
         prompt_length = self.get_prompt_len()
         if num_tokens > prompt_length:
-            return (self._prompt_token_ids_tuple,
-                    tuple(self._output_token_ids[:num_tokens - prompt_length]))
+            return (self.prompt_token_ids,
+                    tuple(self._token_ids[prompt_length:num_tokens]))
         else:
-            return (self._prompt_token_ids_tuple[:num_tokens], None)
+            return (tuple(self._token_ids[:num_tokens]), None)
 
     def get_num_computed_tokens(self) -> int:
         """Return the number of prefill tokens that are already computed."""
@@ -230,9 +469,7 @@ class SequenceData:
         return self.get_len() - self.get_num_computed_tokens()
 
     def get_last_token_id(self) -> int:
-        if not self._output_token_ids:
-            return self._prompt_token_ids[-1]
-        return self._output_token_ids[-1]
+        return self._token_ids[-1]
 
     def get_prompt_token_ids(self) -> Tuple[int, ...]:
         return self.prompt_token_ids
@@ -246,8 +483,8 @@ class SequenceData:
 
     def __repr__(self) -> str:
         return (f"SequenceData("
-                f"prompt_token_ids={self._prompt_token_ids}, "
-                f"output_token_ids={self._output_token_ids}, "
+                f"prompt_token_ids={self.prompt_token_ids_array}, "
+                f"output_token_ids={self.output_token_ids_array}, "
                 f"cumulative_logprob={self.cumulative_logprob})")
 
 
@@ -277,6 +514,12 @@ class Sequence:
 
     """
 
+    __slots__ = ("seq_id", "inputs", "block_size", "eos_token_id",
+                 "lora_request", "prompt_adapter_request",
+                 "from_decoder_prompt", "_prompt", "_prompt_token_ids", "data",
+                 "output_logprobs", "output_text", "status", "stop_reason",
+                 "prefix_offset", "read_offset", "tokens", "_block_hashes")
+
     def __init__(
         self,
         seq_id: int,
@@ -336,6 +579,8 @@ class Sequence:
         self.read_offset = 0
         # Input + output tokens
         self.tokens: Optional[List[str]] = None
+        # Chained hashes of the full blocks, see hash_of_block.
+        self._block_hashes: List[int] = []
 
     @property
     def n_blocks(self) -> int:
@@ -393,14 +638,32 @@ class Sequence:
             self.output_text)
 
     def hash_of_block(self, logical_idx: int) -> int:
-        # TODO This can produce incorrect hash when block size > prompt size
+        """Return the hash of a logical block, chained with the hash of the
+        block before it (as in `PrefixCachingBlock`).
 
-        # Compute the number of tokens in the sequence
-        # TODO: The current hashing function is O(L^2). We should optimize
-        # this in the future.
-        num_tokens = self.num_hashed_tokens_of_block(logical_idx)
-        hashed_tokens = self.data.get_prefix_token_ids(num_tokens)
-        return hash((hashed_tokens, self.lora_int_id))
+        The hashes of full blocks are cached, so hashing every block of a
+        sequence takes O(L) instead of O(L^2). A block which is not full yet
+        is hashed but not cached; it is hashed again once it is full.
+        """
+        block_hashes = self._block_hashes
+        if logical_idx < len(block_hashes):
+            return block_hashes[logical_idx]
+
+        token_ids = self.data.get_token_ids_array()
+        block_size = self.block_size
+        extra_keys = (self.lora_int_id, )
+        block_hash = block_hashes[-1] if block_hashes else None
+        for idx in range(len(block_hashes), logical_idx + 1):
+            start = idx * block_size
+            block_token_ids = tuple(token_ids[start:start + block_size])
+            block_hash = hash((block_hash, block_token_ids, extra_keys))
+            if len(block_token_ids) < block_size:
+                # The blocks past the end of the sequence would hash the
+                # same tokens.
+                return block_hash
+            block_hashes.append(block_hash)
+        assert block_hash is not None
+        return block_hash
 
     def num_hashed_tokens_of_block(self, logical_idx: int):
         return logical_idx * self.block_size + self.block_size
@@ -430,6 +693,9 @@ class Sequence:
     def get_token_ids(self) -> List[int]:
         return self.data.get_token_ids()
 
+    def get_token_ids_array(self) -> array:
+        return self.data.get_token_ids_array()
+
     def get_prompt_token_ids(self) -> Tuple[int, ...]:
         return self.data.get_prompt_token_ids()
 
@@ -465,7 +731,8 @@ class Sequence:
         return SequenceStatus.is_finished(self.status)
 
     def fork(self, new_seq_id: int) -> "Sequence":
-        new_seq = copy.deepcopy(self)
+        # The inputs are never modified, so they are shared with the fork.
+        new_seq = copy.deepcopy(self, memo={id(self.inputs): self.inputs})
         new_seq.seq_id = new_seq_id
         return new_seq
 
@@ -533,7 +800,7 @@ class SequenceGroup:
                                       first_token_time=None,
                                       time_in_queue=None)
         self.lora_request = lora_request
-        self.prompt_logprobs: Optional[PromptLogprobs] = None
+        self.prompt_logprobs: Optional[SequenceLogprobs] = None
         self.embeddings = embeddings
         self.pooling_params = pooling_params
         self.prompt_adapter_request = prompt_adapter_request
@@ -618,6 +885,11 @@ class SequenceGroup:
             self.metrics.first_scheduled_time = time
             self.metrics.time_in_queue = time - self.metrics.arrival_time
 
+    def maybe_set_num_cached_tokens(self, num_cached_tokens: int) -> None:
+        """Sets the number of cached prompt tokens of the first prefill."""
+        if self.metrics.num_cached_tokens is None:
+            self.metrics.num_cached_tokens = num_cached_tokens
+
     def set_finished_time(self, time: Optional[float]) -> None:
         """Sets the finished time for Request level timings."""
         self.metrics.finished_time = time
@@ -756,6 +1028,9 @@ class SequenceGroupMetadata:
         lora_request: LoRA request.
         computed_block_nums: The block numbers that are already computed,
             used in prefix caching.
+        num_computed_partial_tokens: The number of leading tokens of the block
+            after computed_block_nums that are already computed, used in
+            prefix caching.
         multi_modal_data: Multi modal data.
         encoder_seq_data: Optional sequence data for encoder prompt
                           (SequenceGroup.encoder_seq). Should be None 
@@ -781,6 +1056,7 @@ class SequenceGroupMetadata:
         token_chunk_size: Optional[int] = None,
         lora_request: Optional[LoRARequest] = None,
         computed_block_nums: Optional[List[int]] = None,
+        num_computed_partial_tokens: int = 0,
         multi_modal_data: Optional["MultiModalDataDict"] = None,
         encoder_seq_data: Optional[SequenceData] = None,
         cross_block_table: Optional[List[int]] = None,
@@ -795,6 +1071,7 @@ class SequenceGroupMetadata:
         self.lora_request = lora_request
         self.prompt_adapter_request = prompt_adapter_request
         self.computed_block_nums = computed_block_nums
+        self.num_computed_partial_tokens = num_computed_partial_tokens
         self.multi_modal_data = multi_modal_data
         self.encoder_seq_data = encoder_seq_data
         self.cross_block_table = cross_block_table
@@ -888,7 +1165,7 @@ class CompletionSequenceGroupOutput(SequenceGroupOutput):
     def __init__(
         self,
         samples: List[SequenceOutput],
-        prompt_logprobs: Optional[PromptLogprobs],
+        prompt_logprobs: Optional[Union[PromptLogprobs, SequenceLogprobs]],
     ) -> None:
         self.samples = samples
         # Prompt logprob for each prompt query token.
@@ -0,0 +1,308 @@
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from vllm.sequence import SequenceGroupMetadata
+
+# Per-token acceptance rate assumed before anything has been observed.
+DEFAULT_ACCEPTANCE_PRIOR = 0.7
+
+# Weight (in accepted + rejected tokens) of the prior of a new estimate.
+_PRIOR_WEIGHT = 4.0
+
+# Acceptance estimates are clamped to this range so that the expected number
+# of tokens stays finite and every sequence keeps a chance of speculating.
+_MIN_ACCEPTANCE_RATE = 0.01
+_MAX_ACCEPTANCE_RATE = 0.99
+
+# Until this many speculative steps have been timed, every sequence gets the
+# full proposal length.
+_NUM_WARMUP_STEPS = 4
+
+# Fraction of the average cost of a scored token assumed to be marginal while
+# the cost model cannot tell the fixed cost and the marginal cost apart.
+_DEFAULT_MARGINAL_COST_FRACTION = 0.5
+
+_MAX_SOLVER_ITERATIONS = 5
+
+
+class _AcceptanceEstimate:
+    """Exponentially decayed estimate of the per-token acceptance rate.
+
+    The number of accepted tokens of a proposal of length k is a geometric
+    sample truncated at k. The estimate is the number of accepted tokens over
+    the number of accepted tokens plus rejections.
+    """
+
+    __slots__ = ("accepted", "trials")
+
+    def __init__(self, prior: float):
+        self.accepted = prior * _PRIOR_WEIGHT
+        self.trials = _PRIOR_WEIGHT
+
+    @property
+    def rate(self) -> float:
+        return min(max(self.accepted / self.trials, _MIN_ACCEPTANCE_RATE),
+                   _MAX_ACCEPTANCE_RATE)
+
+    def update(self, num_accepted: int, proposal_len: int,
+               decay: float) -> None:
+        num_rejected = 1 if num_accepted < proposal_len else 0
+        self.accepted = self.accepted * decay + num_accepted
+        self.trials = self.trials * decay + num_accepted + num_rejected
+
+    def relax(self, target: float, decay: float) -> None:
+        """Move the estimate towards `target` without an observation."""
+        weight = (1 - decay) * _PRIOR_WEIGHT
+        self.accepted = self.accepted * decay + target * weight
+        self.trials = self.trials * decay + weight
+
+
+class _StepCostModel:
+    """Online fit of the measured step time of speculative decoding.
+
+    Scoring (and verification) time is modeled as `fixed + per_token * x`,
+    where x is the number of tokens scored by the target model, using an
+    exponentially weighted least squares fit. Drafting is modeled as a fixed
+    time per proposal step.
+    """
+
+    def __init__(self, decay: float):
+        self._decay = decay
+        self._weight = 0.0
+        self._sum_x = 0.0
+        self._sum_y = 0.0
+        self._sum_xx = 0.0
+        self._sum_xy = 0.0
+        self._draft_weight = 0.0
+        self._sum_draft_ms = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self._weight > 0 and self._draft_weight > 0
+
+    def observe(self, draft_time_per_step_ms: float, num_scored_tokens: int,
+                scoring_time_ms: float) -> None:
+        decay = self._decay
+        self._draft_weight = self._draft_weight * decay + 1
+        self._sum_draft_ms = (self._sum_draft_ms * decay +
+                              draft_time_per_step_ms)
+        if num_scored_tokens <= 0:
+            return
+        x, y = float(num_scored_tokens), scoring_time_ms
+        self._weight = self._weight * decay + 1
+        self._sum_x = self._sum_x * decay + x
+        self._sum_y = self._sum_y * decay + y
+        self._sum_xx = self._sum_xx * decay + x * x
+        self._sum_xy = self._sum_xy * decay + x * y
+
+    @property
+    def draft_time_per_step_ms(self) -> float:
+        return self._sum_draft_ms / self._draft_weight
+
+    def scoring_cost(self) -> Tuple[float, float]:
+        """Return the fixed cost and the cost per scored token, in ms."""
+        mean_x = self._sum_x / self._weight
+        mean_y = self._sum_y / self._weight
+        var_x = self._sum_xx / self._weight - mean_x * mean_x
+        average_cost = mean_y / mean_x
+        if var_x > 1e-3 * mean_x * mean_x:
+            cov_xy = self._sum_xy / self._weight - mean_x * mean_y
+            per_token = min(max(cov_xy / var_x, 0.0), average_cost)
+        else:
+            # All observations have (almost) the same number of tokens.
+            per_token = average_cost * _DEFAULT_MARGINAL_COST_FRACTION
+        return mean_y - per_token * mean_x, per_token
+
+
+def expected_num_tokens(acceptance_rate: float, proposal_len: int) -> float:
+    """Expected number of tokens emitted for a proposal of length k, including
+    the bonus or recovered token: sum_{i=0..k} rate^i."""
+    if acceptance_rate >= 1.0:
+        return proposal_len + 1.0
+    return (1 - acceptance_rate**(proposal_len + 1)) / (1 - acceptance_rate)
+
+
+class AdaptiveProposalLenController:
+    """Picks the proposal length of each sequence for every decode step.
+
+    Acceptance is tracked per sequence and per request class (greedy or
+    random sampling), from the number of tokens each sequence accepted in
+    verification. New sequences start from the estimate of their class.
+
+    Given the acceptance estimates and a fitted cost model of a step, the
+    controller maximizes the expected number of emitted tokens per unit of
+    time of the whole batch. The j-th draft token of a sequence with
+    acceptance rate a is emitted with probability a^j and costs one more
+    scored token, so for a target throughput λ it is worth scoring iff
+    a^j > λ * per_token_cost. The best λ is found with a few Dinkelbach
+    iterations, which also accounts for the batch size through the step cost.
+
+    Args:
+        max_proposal_len: The scheduled number of speculative tokens.
+        proposer_keeps_state: Whether the proposer must see every decode step
+            to stay consistent (e.g. it has a KV cache). If it does, the draft
+            always runs and only the number of scored tokens is adapted;
+            otherwise steps where no sequence should speculate skip drafting.
+        decay: Decay of the exponentially weighted estimates per observation.
+    """
+
+    def __init__(self,
+                 max_proposal_len: int,
+                 proposer_keeps_state: bool = True,
+                 decay: float = 0.9):
+        self._max_proposal_len = max_proposal_len
+        self._proposer_keeps_state = proposer_keeps_state
+        self._decay = decay
+        self._cost_model = _StepCostModel(decay)
+        self._num_observed_steps = 0
+        self._seq_acceptance: Dict[int, _AcceptanceEstimate] = {}
+        self._class_acceptance: Dict[str, _AcceptanceEstimate] = {}
+
+    @property
+    def proposer_keeps_state(self) -> bool:
+        return self._proposer_keeps_state
+
+    @staticmethod
+    def _request_class(seq_group_metadata: SequenceGroupMetadata) -> str:
+        sampling_params = seq_group_metadata.sampling_params
+        if sampling_params is not None and sampling_params.temperature == 0:
+            return "greedy"
+        return "random"
+
+    def _get_class_estimate(self, request_class: str) -> _AcceptanceEstimate:
+        estimate = self._class_acceptance.get(request_class)
+        if estimate is None:
+            estimate = _AcceptanceEstimate(DEFAULT_ACCEPTANCE_PRIOR)
+            self._class_acceptance[request_class] = estimate
+        return estimate
+
+    def _get_acceptance_rates(
+            self, seq_group_metadata_list: List[SequenceGroupMetadata]
+    ) -> List[float]:
+        rates: List[float] = []
+        for seq_group_metadata in seq_group_metadata_list:
+            seq_id = next(iter(seq_group_metadata.seq_data))
+            estimate = self._seq_acceptance.get(seq_id)
+            if estimate is None:
+                estimate = self._get_class_estimate(
+                    self._request_class(seq_group_metadata))
+            rates.append(estimate.rate)
+        return rates
+
+    def get_proposal_lens(
+            self,
+            seq_group_metadata_list: List[SequenceGroupMetadata]) -> List[int]:
+        """Return the proposal length of each sequence for the next step.
+
+        A length of zero means the sequence is not speculated on. If every
+        length is zero and the proposer does not keep state, the caller may
+        run the step without speculation.
+        """
+        k = self._max_proposal_len
+        batch_size = len(seq_group_metadata_list)
+        if (self._num_observed_steps < _NUM_WARMUP_STEPS
+                or not self._cost_model.ready):
+            return [k] * batch_size
+
+        rates = self._get_acceptance_rates(seq_group_metadata_list)
+        fixed_cost, per_token_cost = self._cost_model.scoring_cost()
+        draft_cost = k * self._cost_model.draft_time_per_step_ms
+
+        # Throughput of a step without speculative tokens.
+        no_spec_time = fixed_cost + per_token_cost * batch_size
+        if self._proposer_keeps_state:
+            no_spec_time += draft_cost
+        best_throughput = batch_size / max(no_spec_time, 1e-6)
+        best_lens = [0] * batch_size
+
+        throughput = best_throughput
+        for _ in range(_MAX_SOLVER_ITERATIONS):
+            threshold = throughput * per_token_cost
+            lens = [
+                self._best_proposal_len(rate, threshold, k) for rate in rates
+            ]
+            num_spec_tokens = sum(lens)
+            if num_spec_tokens == 0:
+                break
+            num_tokens = sum(
+                expected_num_tokens(rate, proposal_len)
+                for rate, proposal_len in zip(rates, lens))
+            step_time = (draft_cost + fixed_cost + per_token_cost *
+                         (batch_size + num_spec_tokens))
+            new_throughput = num_tokens / max(step_time, 1e-6)
+            if new_throughput <= throughput * (1 + 1e-6):
+                break
+            throughput = best_throughput = new_throughput
+            best_lens = lens
+
+        # Sequences which are not speculated on get no new observation; pull
+        # their estimate towards their class so that they are retried.
+        for seq_group_metadata, proposal_len in zip(seq_group_metadata_list,
+                                                    best_lens):
+            if proposal_len:
+                continue
+            seq_id = next(iter(seq_group_metadata.seq_data))
+            estimate = self._seq_acceptance.get(seq_id)
+            if estimate is not None:
+                class_estimate = self._get_class_estimate(
+                    self._request_class(seq_group_metadata))
+                estimate.relax(class_estimate.rate, self._decay)
+
+        return best_lens
+
+    @staticmethod
+    def _best_proposal_len(acceptance_rate: float, threshold: float,
+                           max_proposal_len: int) -> int:
+        """The number of draft tokens j >= 1 with rate^j > threshold."""
+        if threshold <= 0:
+            return max_proposal_len
+        if threshold >= 1:
+            return 0
+        bound = math.log(threshold) / math.log(acceptance_rate)
+        return min(max(math.ceil(bound) - 1, 0), max_proposal_len)
+
+    def observe(
+        self,
+        seq_group_metadata_list: List[SequenceGroupMetadata],
+        proposal_lens: List[int],
+        num_accepted_tokens: List[int],
+        draft_time_per_step_ms: float,
+        scoring_time_ms: float,
+    ) -> None:
+        """Update the estimates with the result of a speculative step.
+
+        Args:
+            seq_group_metadata_list: The sequences of the step.
+            proposal_lens: The number of scored draft tokens of each sequence.
+            num_accepted_tokens: The number of draft tokens accepted for each
+                sequence.
+            draft_time_per_step_ms: The drafting time per proposal step.
+            scoring_time_ms: The time spent scoring and verifying proposals.
+        """
+        self._num_observed_steps += 1
+        num_scored_tokens = len(proposal_lens) + sum(proposal_lens)
+        self._cost_model.observe(draft_time_per_step_ms, num_scored_tokens,
+                                 scoring_time_ms)
+
+        for seq_group_metadata, proposal_len, num_accepted in zip(
+                seq_group_metadata_list, proposal_lens, num_accepted_tokens):
+            if proposal_len == 0:
+                continue
+            num_accepted = min(num_accepted, proposal_len)
+            class_estimate = self._get_class_estimate(
+                self._request_class(seq_group_metadata))
+            seq_id = next(iter(seq_group_metadata.seq_data))
+            estimate = self._seq_acceptance.get(seq_id)
+            if estimate is None:
+                estimate = _AcceptanceEstimate(class_estimate.rate)
+                self._seq_acceptance[seq_id] = estimate
+            estimate.update(num_accepted, proposal_len, self._decay)
+            class_estimate.update(num_accepted, proposal_len, self._decay)
+
+    def free_seqs(self, seq_ids: Iterable[int]) -> None:
+        for seq_id in seq_ids:
+            self._seq_acceptance.pop(seq_id, None)
+
+    def get_acceptance_rate(self, seq_id: int) -> Optional[float]:
+        estimate = self._seq_acceptance.get(seq_id)
+        return None if estimate is None else estimate.rate
@@ -67,10 +67,12 @@ class BatchExpansionTop1Scorer(SpeculativeScorer):
         proposal_lens_list = proposals.proposal_lens.tolist()
         proposal_token_ids_list = proposals.proposal_token_ids.tolist()
 
-        # Filter the list to ignore -1 proposals.
+        # Drop the sequences without proposal and the padding of proposals
+        # shorter than k.
         proposal_token_ids_list_without_skips = [
-            proposals for proposals in proposal_token_ids_list
-            if -1 not in proposals
+            proposals[:proposal_len] for proposals, proposal_len in zip(
+                proposal_token_ids_list, proposal_lens_list)
+            if proposal_len > 0
         ]
 
         (spec_indices, non_spec_indices, target_seq_group_metadata_list,
@@ -93,7 +95,7 @@ class BatchExpansionTop1Scorer(SpeculativeScorer):
             num_scoring_tokens=num_scoring_tokens,
             non_spec_indices=non_spec_indices,
             spec_indices=spec_indices,
-            k=execute_model_req.num_lookahead_slots,
+            proposal_lens_list=proposal_lens_list,
         )
 
         return SpeculativeScores(
@@ -114,10 +116,8 @@ class BatchExpansionTop1Scorer(SpeculativeScorer):
         query token.
         """
 
-        # vLLM currently only supports proposal lens equal to zero or the batch
-        # proposal len. This adds some complexity (splitting the batch into spec
-        # and non spec sequences) and should be removed in the future. It can be
-        # done by supporting per-sequence proposal lens.
+        # Sequences with a zero proposal len are scored as regular decodes.
+        # Speculative sequences are expanded to proposal len + 1 continuations.
         spec_seqs, spec_indices = split_batch_by_proposal_len(
             seq_group_metadata_list,
             proposal_lens_list,
@@ -143,36 +143,25 @@ class BatchExpansionTop1Scorer(SpeculativeScorer):
                 num_scoring_tokens)
 
     def _contract_batch(
-            self, contracted_bs: int, target_sampler_output: SamplerOutput,
-            proposals: SpeculativeProposals, num_scoring_tokens: int,
-            non_spec_indices: List[int], spec_indices: List[int],
-            k: int) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        self, contracted_bs: int, target_sampler_output: SamplerOutput,
+        proposals: SpeculativeProposals, num_scoring_tokens: int,
+        non_spec_indices: List[int], spec_indices: List[int],
+        proposal_lens_list: List[int]
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
         """Contract the expanded batch back into its original size.
         This maps the scores of speculative tokens back to their original
         sequences.
 
         contracted_bs is the original batch size, and the batch size that the
-        target_sampler_output will be contracted to.
+        target_sampler_output will be contracted to. A sequence with a proposal
+        of length l gets its l + 1 scores in the first l + 1 positions.
         """
         (target_token_ids, target_probs, target_logprobs,
          non_spec_target_token_ids, non_spec_target_probs,
          non_spec_target_logprobs) = self._split_scoring_output(
              target_sampler_output, num_scoring_tokens)
 
-        # Map distinct sequences used to score each token
-        # of shape [batch_size * k + 1] back to [batch_size, k + 1].
-        expanded_batch_size, k = proposals.proposal_token_ids.shape
-
-        # The number of tokens in the expanded batch used for speculation is
-        # equal to the total expanded batch size minus the number of samples for
-        # non-speculative sequences.
-        non_spec_expanded_bs, _ = non_spec_target_token_ids.shape
-        spec_expanded_bs = expanded_batch_size - non_spec_expanded_bs
-
-        target_token_ids = target_token_ids.reshape(spec_expanded_bs, k + 1)
-        target_probs = target_probs.reshape(*target_token_ids.shape,
-                                            self._vocab_size)
-        target_logprobs = target_logprobs.reshape(target_probs.shape)
+        _, k = proposals.proposal_token_ids.shape
 
         all_tokens = target_token_ids.new_full(size=(contracted_bs, k + 1),
                                                fill_value=-1)
@@ -185,10 +174,39 @@ class BatchExpansionTop1Scorer(SpeculativeScorer):
             all_probs[non_spec_indices, :1, :] = non_spec_target_probs
             all_logprobs[non_spec_indices, :1, :] = non_spec_target_logprobs
 
-        if spec_indices:
+        if not spec_indices:
+            return all_tokens, all_probs, all_logprobs
+
+        spec_proposal_lens = [proposal_lens_list[i] for i in spec_indices]
+        if all(proposal_len == k for proposal_len in spec_proposal_lens):
+            # Map distinct sequences used to score each token
+            # of shape [num_spec_seqs * (k + 1)] back to
+            # [num_spec_seqs, k + 1].
+            target_token_ids = target_token_ids.reshape(
+                len(spec_indices), k + 1)
+            target_probs = target_probs.reshape(*target_token_ids.shape,
+                                                self._vocab_size)
+            target_logprobs = target_logprobs.reshape(target_probs.shape)
+
             all_tokens[spec_indices] = target_token_ids
             all_probs[spec_indices] = target_probs
             all_logprobs[spec_indices] = target_logprobs
+        else:
+            # Proposal lengths differ between sequences; scatter each scored
+            # token to its (sequence, position).
+            rows = [
+                seq_index for seq_index, proposal_len in zip(
+                    spec_indices, spec_proposal_lens)
+                for _ in range(proposal_len + 1)
+            ]
+            cols = [
+                position for proposal_len in spec_proposal_lens
+                for position in range(proposal_len + 1)
+            ]
+            all_tokens[rows, cols] = target_token_ids.flatten()
+            all_probs[rows, cols] = target_probs.reshape(-1, self._vocab_size)
+            all_logprobs[rows,
+                         cols] = target_logprobs.reshape(-1, self._vocab_size)
 
         return all_tokens, all_probs, all_logprobs
 
@@ -293,7 +311,7 @@ class BatchExpansionTop1Scorer(SpeculativeScorer):
                 input sequence.
         """
         seq_data = seq_group_metadata.seq_data[seq_id]
-        prompt_token_ids = seq_data.get_prompt_token_ids()
+        prompt_token_ids = seq_data.prompt_token_ids_array
         new_output_token_ids = [*seq_data.get_output_token_ids(), *token_ids]
 
         new_seq_data_dict = {
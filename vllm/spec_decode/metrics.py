@@ -1,6 +1,6 @@
 import time
 from dataclasses import dataclass
-from typing import Callable, Optional
+from typing import Callable, List, Optional
 
 import torch
 
@@ -42,6 +42,14 @@ class SpecDecodeWorkerMetrics:
     # The number of speculative tokens per sequence.
     num_spec_tokens: int
 
+    # The average number of draft tokens scored per sequence and decode step.
+    # This is lower than num_spec_tokens when proposals are shortened or
+    # skipped, e.g. by the adaptive proposal length controller.
+    mean_proposal_len: float = float("nan")
+
+    # The fraction of sequences per decode step which were speculated on.
+    spec_seq_fraction: float = float("nan")
+
 
 Timer = Callable[[], float]
 
@@ -72,6 +80,14 @@ class AsyncMetricsCollector:
             0, dtype=torch.long, device="cpu", pin_memory=pin_memory)
         self._aggregate_num_draft_tokens = 0
 
+        # Proposal lengths of the decode steps, counted on CPU.
+        self._num_proposal_seqs = 0
+        self._num_spec_seqs = 0
+        self._num_proposal_tokens = 0
+        self._aggregate_num_proposal_seqs = 0
+        self._aggregate_num_spec_seqs = 0
+        self._aggregate_num_proposal_tokens = 0
+
         self._rejsample_metrics_collect_interval_s = collect_interval_s
         self._last_metrics_collect_time = self._timer()
 
@@ -79,6 +95,16 @@ class AsyncMetricsCollector:
         self._rank = rank
         self._copy_stream = torch.cuda.Stream()
 
+    def record_proposal_lens(self, proposal_lens: List[int]) -> None:
+        """Record the number of draft tokens scored for each sequence of a
+        decode step.
+        """
+        self._num_proposal_seqs += len(proposal_lens)
+        for proposal_len in proposal_lens:
+            if proposal_len > 0:
+                self._num_spec_seqs += 1
+                self._num_proposal_tokens += proposal_len
+
     def maybe_collect_rejsample_metrics(
             self, k: int) -> Optional[SpecDecodeWorkerMetrics]:
 
@@ -126,6 +152,9 @@ class AsyncMetricsCollector:
             # required.
             self._aggregate_num_draft_tokens = (
                 self.spec_decode_sampler.num_draft_tokens)
+            self._aggregate_num_proposal_seqs = self._num_proposal_seqs
+            self._aggregate_num_spec_seqs = self._num_spec_seqs
+            self._aggregate_num_proposal_tokens = self._num_proposal_tokens
 
         aggregate_metrics_ready = torch.cuda.Event()
         aggregate_metrics_ready.record(self._copy_stream)
@@ -153,8 +182,24 @@ class AsyncMetricsCollector:
         emitted_tokens = self._aggregate_num_emitted_tokens.item()
         draft_tokens = self._aggregate_num_draft_tokens
 
-        max_num_emitted_tokens = self.get_max_num_emitted_tokens(
-            draft_tokens, k)
+        num_proposal_seqs = self._aggregate_num_proposal_seqs
+        num_spec_seqs = self._aggregate_num_spec_seqs
+
+        if num_spec_seqs > 0:
+            # Proposal lengths may differ between sequences, so count the
+            # speculated sequences instead of deriving them from k.
+            max_num_emitted_tokens = draft_tokens + num_spec_seqs
+        else:
+            max_num_emitted_tokens = self.get_max_num_emitted_tokens(
+                draft_tokens, k)
+
+        if num_proposal_seqs > 0:
+            mean_proposal_len = (self._aggregate_num_proposal_tokens /
+                                 num_proposal_seqs)
+            spec_seq_fraction = num_spec_seqs / num_proposal_seqs
+        else:
+            mean_proposal_len = float("nan")
+            spec_seq_fraction = float("nan")
 
         if draft_tokens > 0:
             draft_acceptance_rate = accepted_tokens / draft_tokens
@@ -173,6 +218,8 @@ class AsyncMetricsCollector:
             accepted_tokens=accepted_tokens,
             draft_tokens=draft_tokens,
             emitted_tokens=emitted_tokens,
+            mean_proposal_len=mean_proposal_len,
+            spec_seq_fraction=spec_seq_fraction,
         )
 
     @staticmethod
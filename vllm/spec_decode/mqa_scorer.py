@@ -0,0 +1,189 @@
+from typing import Iterator, List
+
+from vllm.sampling_params import SamplingParams
+from vllm.sequence import (ExecuteModelRequest, SequenceData,
+                           SequenceGroupMetadata, get_all_seq_ids)
+from vllm.spec_decode.batch_expansion import (DEFAULT_SIMPLE_SAMPLING_PARAMS,
+                                              BatchExpansionTop1Scorer)
+from vllm.spec_decode.interfaces import SpeculativeProposals, SpeculativeScores
+from vllm.spec_decode.util import nvtx_range, split_batch_by_proposal_len
+
+TargetSeqId = int
+TokenId = int
+
+
+class MQAScorer(BatchExpansionTop1Scorer):
+    """Implements a speculative scorer that scores the proposal tokens of each
+    sequence with a single multi-token query against its KV cache.
+
+    A sequence with a proposal of length l is scored as one decode of l + 1
+    tokens (its last token followed by the proposal tokens). Their KV is
+    written to the lookahead slots of the sequence and the target model
+    samples from each of the l + 1 positions. Unlike batch expansion, the
+    number of SequenceGroupMetadata in the scoring batch does not depend on
+    the proposal length.
+
+    The sampling parameters follow batch expansion: only the bonus token is
+    sampled with the parameters (and seeded generator) of the sequence, the
+    proposal positions of a non-greedy sequence use
+    DEFAULT_SIMPLE_SAMPLING_PARAMS. Such a sequence is therefore scored by
+    two SequenceGroupMetadata, a query of l tokens followed by a query of the
+    bonus token, so that seeded generators advance exactly as with batch
+    expansion. A greedy sequence is scored by a single one.
+
+    Speculative sequences come first in the scoring batch, followed by the
+    sequences without a proposal, so that the scores are laid out as with
+    batch expansion and are contracted the same way.
+
+    It requires an attention backend that supports decodes with more than one
+    query token (currently flash-attn).
+    """
+
+    @nvtx_range("MQAScorer.score_proposals")
+    def score_proposals(
+        self,
+        execute_model_req: ExecuteModelRequest,
+        proposals: SpeculativeProposals,
+    ) -> SpeculativeScores:
+        """Score the proposed tokens via the scorer model.
+
+        Args:
+            execute_model_req: The execution request.
+            proposals: The speculative proposals to score.
+        Returns:
+            SpeculativeScores: The scores of each speculative token, along with
+                which sequences were ignored during scoring.
+        """
+        seq_group_metadata_list = execute_model_req.seq_group_metadata_list
+
+        # The model input is prepared on CPU, so this is the only copy of the
+        # proposals needed to score them.
+        proposal_lens_list = proposals.proposal_lens.tolist()
+        proposal_token_ids_list = proposals.proposal_token_ids.tolist()
+
+        spec_seqs, spec_indices = split_batch_by_proposal_len(
+            seq_group_metadata_list,
+            proposal_lens_list,
+            select_proposal_len_zero=False)
+        non_spec_seqs, non_spec_indices = split_batch_by_proposal_len(
+            seq_group_metadata_list,
+            proposal_lens_list,
+            select_proposal_len_zero=True)
+
+        target_seq_ids_iter = self._create_target_seq_id_iterator(
+            seq_ids=get_all_seq_ids(seq_group_metadata_list))
+        target_seq_group_metadata_list: List[SequenceGroupMetadata] = []
+        num_scoring_tokens = 0
+        for index, seq_group_metadata in zip(spec_indices, spec_seqs):
+            proposal_len = proposal_lens_list[index]
+            target_seq_group_metadata_list.extend(
+                self._create_mqa_seq_group_metadata(
+                    seq_group_metadata,
+                    proposal_token_ids_list[index][:proposal_len],
+                    target_seq_ids_iter))
+            num_scoring_tokens += proposal_len + 1
+        target_seq_group_metadata_list.extend(non_spec_seqs)
+
+        target_sampler_output = self._scorer_worker.execute_model(
+            execute_model_req=execute_model_req.clone(
+                seq_group_metadata_list=target_seq_group_metadata_list))
+        assert len(target_sampler_output) == 1, "expected single-step output"
+        target_sampler_output = target_sampler_output[0]
+
+        all_tokens, all_probs, spec_logprobs = self._contract_batch(
+            contracted_bs=len(seq_group_metadata_list),
+            target_sampler_output=target_sampler_output,
+            proposals=proposals,
+            num_scoring_tokens=num_scoring_tokens,
+            non_spec_indices=non_spec_indices,
+            spec_indices=spec_indices,
+            proposal_lens_list=proposal_lens_list,
+        )
+
+        return SpeculativeScores(
+            probs=all_probs,
+            token_ids=all_tokens,
+            logprobs=spec_logprobs,
+            hidden_states=target_sampler_output.hidden_states,
+        )
+
+    def _create_mqa_seq_group_metadata(
+        self,
+        seq_group_metadata: SequenceGroupMetadata,
+        proposal_token_ids: List[TokenId],
+        target_seq_ids_iter: Iterator[TargetSeqId],
+    ) -> List[SequenceGroupMetadata]:
+        """Create the SequenceGroupMetadata which score the last token of the
+        input sequence and its proposal tokens.
+
+        As in batch expansion, only the bonus token is sampled with the
+        sampling parameters of the sequence. We don't replace the sampling
+        parameters in the greedy case because they also control whether the
+        probs get modified in the sampler, so a greedy sequence is scored in
+        a single query.
+        """
+        sampling_params = seq_group_metadata.sampling_params
+        if not sampling_params.temperature:
+            return [
+                self._create_multi_token_seq_group_metadata(
+                    seq_group_metadata,
+                    next(target_seq_ids_iter),
+                    proposal_token_ids,
+                    token_chunk_size=len(proposal_token_ids) + 1,
+                    sampling_params=sampling_params)
+            ]
+        return [
+            self._create_multi_token_seq_group_metadata(
+                seq_group_metadata,
+                next(target_seq_ids_iter),
+                proposal_token_ids[:-1],
+                token_chunk_size=len(proposal_token_ids),
+                sampling_params=DEFAULT_SIMPLE_SAMPLING_PARAMS),
+            self._create_multi_token_seq_group_metadata(
+                seq_group_metadata,
+                next(target_seq_ids_iter),
+                proposal_token_ids,
+                token_chunk_size=1,
+                sampling_params=sampling_params),
+        ]
+
+    @staticmethod
+    def _create_multi_token_seq_group_metadata(
+        seq_group_metadata: SequenceGroupMetadata,
+        target_seq_id: TargetSeqId,
+        token_ids: List[TokenId],
+        token_chunk_size: int,
+        sampling_params: SamplingParams,
+    ) -> SequenceGroupMetadata:
+        """Create the SequenceGroupMetadata which appends token_ids to the
+        input sequence and scores its last token_chunk_size tokens in one
+        query.
+        """
+        assert not seq_group_metadata.is_prompt, ("Speculating on "
+                                                  "prompts not yet supported")
+        assert len(seq_group_metadata.seq_data) == 1, (
+            "Beam search "
+            "not supported in speculative decoding")
+        seq_id, seq_data = next(iter(seq_group_metadata.seq_data.items()))
+
+        target_seq_data = SequenceData(
+            prompt_token_ids=seq_data.prompt_token_ids_array,
+            output_token_ids=[*seq_data.get_output_token_ids(), *token_ids],
+        )
+        # Only the query is computed. The KV of the input sequence is cached
+        # except for its last token, and the KV of the proposal tokens before
+        # the query is written by the preceding query of the same batch.
+        target_seq_data.update_num_computed_tokens(target_seq_data.get_len() -
+                                                   token_chunk_size)
+
+        return SequenceGroupMetadata(
+            request_id=seq_group_metadata.request_id,
+            is_prompt=False,
+            seq_data={target_seq_id: target_seq_data},
+            sampling_params=sampling_params,
+            block_tables={
+                target_seq_id: seq_group_metadata.block_tables[seq_id],
+            },
+            lora_request=None,
+            token_chunk_size=token_chunk_size,
+        )
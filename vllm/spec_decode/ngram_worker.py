@@ -1,11 +1,14 @@
 import weakref
-from typing import List, Optional, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
+import numpy as np
 import torch
 
-from vllm.sequence import ExecuteModelRequest, SamplerOutput
+from vllm.sequence import ExecuteModelRequest, SamplerOutput, SequenceData
 from vllm.spec_decode.interfaces import SpeculativeProposals
 from vllm.spec_decode.proposer_worker_base import NonLLMProposerWorkerBase
+from vllm.spec_decode.suffix_automaton import (RecentOutputIndex,
+                                               SequenceSuffixIndex)
 from vllm.spec_decode.top1_proposer import Top1Proposer
 
 
@@ -66,9 +69,11 @@ class NGramWorker(NonLLMProposerWorkerBase):
                 execute_model_req.seq_group_metadata_list):
             seq_data = next(iter(seq_group_metadata.seq_data.values()))
 
-            input_ids = torch.as_tensor(seq_data.get_token_ids(),
-                                        dtype=torch.long,
-                                        device=self.device)
+            # Copy the token IDs from the buffer of the sequence, instead of
+            # converting them to a list of ints first.
+            token_ids = np.array(seq_data.get_token_ids_array(),
+                                 dtype=np.int64)
+            input_ids = torch.as_tensor(token_ids, device=self.device)
             input_length = seq_data.get_len()
 
             for ngram_size in range(
@@ -166,3 +171,154 @@ class NGramWorker(NonLLMProposerWorkerBase):
                 execute_model_req.seq_group_metadata_list):
             raise NotImplementedError(
                 "NGramWorker does not support beam search.")
+
+
+class SuffixAutomatonNGramWorker(NGramWorker):
+    """NGramWorker which drafts from incrementally maintained suffix automata
+    instead of searching the whole history of every sequence every step.
+
+    The draft of a sequence continues the longest suffix of the sequence
+    which occurs earlier in it, however long (ngram_prompt_lookup_min is the
+    shortest match used). If corpus_size is positive, the outputs of recently
+    finished sequences, up to corpus_size tokens, are searched as well, and
+    the longer of the two matches is used. Indexing the new tokens of a
+    sequence and drafting take time linear in the number of new and draft
+    tokens rather than in the length of the sequence.
+    """
+
+    # Sequences which have not been seen for this many steps are assumed to
+    # be finished. Finished requests are normally reported by the scheduler,
+    # but the proposer is not called while speculation is disabled.
+    _MAX_IDLE_STEPS = 256
+
+    def __init__(self, *args, corpus_size: int = 0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._corpus: Optional[RecentOutputIndex] = (
+            RecentOutputIndex(corpus_size) if corpus_size > 0 else None)
+        self._seq_indices: Dict[int, SequenceSuffixIndex] = {}
+        self._request_seq_ids: Dict[str, List[int]] = {}
+        self._step = 0
+
+    def execute_model(
+        self,
+        execute_model_req: Optional[ExecuteModelRequest] = None
+    ) -> List[SamplerOutput]:
+        if execute_model_req is not None:
+            self._free_finished_requests(execute_model_req)
+        return super().execute_model(execute_model_req)
+
+    def get_spec_proposals(
+        self,
+        execute_model_req: ExecuteModelRequest,
+        seq_ids_with_bonus_token_in_last_step: Set[int],
+    ) -> SpeculativeProposals:
+        self._free_finished_requests(execute_model_req)
+        return super().get_spec_proposals(
+            execute_model_req, seq_ids_with_bonus_token_in_last_step)
+
+    def sampler_output(
+        self,
+        execute_model_req: ExecuteModelRequest,
+        sample_len: int,
+        # Unused parameter. NGramWorker does not use the KV Cache and
+        # therefore does not need this parameter.
+        seq_ids_with_bonus_token_in_last_step: Set[int],
+    ) -> Tuple[Optional[List[Optional[SamplerOutput]]], bool]:
+        """Draft sample_len tokens for each sequence with a long enough match.
+        Drafts shorter than sample_len are padded with -1, so that their
+        proposal len only covers the drafted tokens.
+        """
+        self._raise_if_unsupported(execute_model_req)
+        self._step += 1
+
+        drafts: List[Optional[List[int]]] = []
+        for seq_group_metadata in execute_model_req.seq_group_metadata_list:
+            seq_id, seq_data = next(iter(seq_group_metadata.seq_data.items()))
+            index = self._get_seq_index(seq_group_metadata.request_id, seq_id,
+                                        seq_data)
+            index.update(seq_data.get_token_ids_array(), self._corpus)
+            draft = index.propose(self._corpus, self.ngram_prompt_lookup_min,
+                                  sample_len)
+            if draft is not None and len(draft) < sample_len:
+                draft = draft + [-1] * (sample_len - len(draft))
+            drafts.append(draft)
+
+        if self._step % self._MAX_IDLE_STEPS == 0:
+            self._free_idle_seqs()
+
+        spec_drafts = [draft for draft in drafts if draft is not None]
+        if not spec_drafts:
+            return None, False
+
+        # Move all drafts to the device at once.
+        token_ids = torch.tensor(spec_drafts,
+                                 dtype=torch.long,
+                                 device=self.device)
+        token_probs = torch.nn.functional.one_hot(
+            token_ids.clamp(min=0),
+            num_classes=self.vocab_size).to(torch.float32)
+        token_probs.masked_fill_((token_ids == -1).unsqueeze(-1), 0)
+
+        outputs: List[Optional[SamplerOutput]] = []
+        spec_idx = 0
+        for draft in drafts:
+            if draft is None:
+                outputs.append(None)
+                continue
+            outputs.append(
+                SamplerOutput(
+                    outputs=None,
+                    sampled_token_probs=token_probs[spec_idx],
+                    logprobs=torch.zeros((sample_len, self.vocab_size),
+                                         dtype=torch.float32,
+                                         device=self.device),
+                    sampled_token_ids=token_ids[spec_idx],
+                ))
+            spec_idx += 1
+
+        return outputs, False
+
+    def _get_seq_index(self, request_id: str, seq_id: int,
+                       seq_data: SequenceData) -> SequenceSuffixIndex:
+        index = self._seq_indices.get(seq_id)
+        if index is None or len(index.automaton) > seq_data.get_len():
+            # New sequence, or one whose tokens were rolled back.
+            index = SequenceSuffixIndex(seq_data.get_prompt_len())
+            self._seq_indices[seq_id] = index
+            seq_ids = self._request_seq_ids.setdefault(request_id, [])
+            if seq_id not in seq_ids:
+                seq_ids.append(seq_id)
+        index.last_step = self._step
+        return index
+
+    def _free_finished_requests(
+            self, execute_model_req: ExecuteModelRequest) -> None:
+        for request_id in execute_model_req.finished_requests_ids:
+            for seq_id in self._request_seq_ids.pop(request_id, ()):
+                self._free_seq(seq_id)
+
+    def _free_idle_seqs(self) -> None:
+        min_step = self._step - self._MAX_IDLE_STEPS
+        idle_seq_ids = {
+            seq_id
+            for seq_id, index in self._seq_indices.items()
+            if index.last_step < min_step
+        }
+        if not idle_seq_ids:
+            return
+        for seq_id in idle_seq_ids:
+            self._free_seq(seq_id)
+        for request_id, seq_ids in list(self._request_seq_ids.items()):
+            seq_ids[:] = [
+                seq_id for seq_id in seq_ids if seq_id not in idle_seq_ids
+            ]
+            if not seq_ids:
+                del self._request_seq_ids[request_id]
+
+    def _free_seq(self, seq_id: int) -> None:
+        """Drop the index of a finished sequence, keeping what it generated
+        in the shared index of recent outputs."""
+        index = self._seq_indices.pop(seq_id, None)
+        if index is None or self._corpus is None:
+            return
+        self._corpus.add(index.automaton.token_ids[index.num_prompt_tokens:])
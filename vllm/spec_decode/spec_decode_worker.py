@@ -15,6 +15,8 @@ from vllm.model_executor.layers.typical_acceptance_sampler import (
 from vllm.sequence import (CompletionSequenceGroupOutput, ExecuteModelRequest,
                            HiddenStates, SamplerOutput, SequenceGroupMetadata,
                            get_all_seq_ids, get_all_seq_ids_and_request_ids)
+from vllm.spec_decode.adaptive_proposal_len import (
+    AdaptiveProposalLenController)
 from vllm.spec_decode.batch_expansion import BatchExpansionTop1Scorer
 from vllm.spec_decode.draft_model_runner import TP1DraftModelRunner
 from vllm.spec_decode.interfaces import (SpeculativeProposals,
@@ -22,8 +24,10 @@ from vllm.spec_decode.interfaces import (SpeculativeProposals,
 from vllm.spec_decode.medusa_worker import MedusaWorker
 from vllm.spec_decode.metrics import AsyncMetricsCollector
 from vllm.spec_decode.mlp_speculator_worker import MLPSpeculatorWorker
+from vllm.spec_decode.mqa_scorer import MQAScorer
 from vllm.spec_decode.multi_step_worker import MultiStepWorker
-from vllm.spec_decode.ngram_worker import NGramWorker
+from vllm.spec_decode.ngram_worker import (NGramWorker,
+                                           SuffixAutomatonNGramWorker)
 from vllm.spec_decode.proposer_worker_base import ProposerWorkerBase
 from vllm.spec_decode.smaller_tp_proposer_worker import SmallerTpProposerWorker
 from vllm.spec_decode.target_model_runner import TargetModelRunner
@@ -60,6 +64,8 @@ def create_spec_worker(*args, **kwargs) -> "SpecDecodeWorker":
         parallel_config=speculative_config.draft_parallel_config,
         ngram_prompt_lookup_max=speculative_config.ngram_prompt_lookup_max,
         ngram_prompt_lookup_min=speculative_config.ngram_prompt_lookup_min,
+        ngram_index=speculative_config.ngram_index,
+        ngram_corpus_size=speculative_config.ngram_corpus_size,
         # TODO allow draft-model specific load config.
         #load_config=load_config,
     )
@@ -77,6 +83,9 @@ def create_spec_worker(*args, **kwargs) -> "SpecDecodeWorker":
         typical_acceptance_sampler_posterior_alpha,
         disable_logprobs=speculative_config.disable_logprobs,
         disable_log_stats=speculative_config.disable_log_stats,
+        adaptive_proposal_len=speculative_config.adaptive_proposal_len,
+        num_speculative_tokens=speculative_config.num_speculative_tokens,
+        disable_mqa_scorer=speculative_config.disable_mqa_scorer,
     )
 
     return spec_decode_worker
@@ -99,12 +108,14 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         welcome!).
     * Only top-1 proposal and scoring are implemented. Tree-attention is left as
         future work.
-    * All sequences in a batch must have the same proposal length, or zero. This
-        can be improved by having per-sequence speculation in the future.
-    * The scoring forward pass is done without an MQA kernel, which is
-        suboptimal especially as the batch size, proposal length, and sequence
-        lengths grow. Contributions to add a MQA scoring are welcome once
-        correctness tests pass.
+    * The proposer always drafts the same number of tokens for all sequences.
+        Per-sequence proposal lengths (see AdaptiveProposalLenController) are
+        applied by truncating proposals before scoring.
+    * With the flash-attn backend, the proposals of each sequence are scored
+        with one multi-token query (MQAScorer). Other backends and sliding
+        window models fall back to batch expansion, which is suboptimal
+        especially as the batch size, proposal length, and sequence lengths
+        grow.
         More info here https://docs.google.com/document/d/1T-JaS2T1NRfdP51qzqpyakoCXxSXTtORppiwaj5asxA/edit.
     """
 
@@ -119,6 +130,9 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         typical_acceptance_sampler_posterior_alpha: float,
         disable_logprobs: bool,
         disable_log_stats: bool,
+        adaptive_proposal_len: bool = False,
+        num_speculative_tokens: Optional[int] = None,
+        disable_mqa_scorer: bool = False,
     ) -> "SpecDecodeWorker":
 
         allow_zero_draft_token_step = True
@@ -126,8 +140,14 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
             draft_worker_kwargs.pop("ngram_prompt_lookup_max"))
         ngram_prompt_lookup_min = (
             draft_worker_kwargs.pop("ngram_prompt_lookup_min"))
+        ngram_index = draft_worker_kwargs.pop("ngram_index", "lookup")
+        ngram_corpus_size = draft_worker_kwargs.pop("ngram_corpus_size", 0)
         if ngram_prompt_lookup_max > 0:
-            proposer_worker = NGramWorker(**draft_worker_kwargs)
+            if ngram_index == "suffix_automaton":
+                proposer_worker = SuffixAutomatonNGramWorker(
+                    corpus_size=ngram_corpus_size, **draft_worker_kwargs)
+            else:
+                proposer_worker = NGramWorker(**draft_worker_kwargs)
             proposer_worker.set_ngram_window_size(ngram_prompt_lookup_min,
                                                   ngram_prompt_lookup_max)
         else:
@@ -170,6 +190,18 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         logger.info("Configuring SpecDecodeWorker with sampler=%s",
                     type(spec_decode_sampler))
 
+        proposal_len_controller: Optional[AdaptiveProposalLenController] = None
+        if adaptive_proposal_len:
+            assert num_speculative_tokens is not None
+            # Draft models keep a KV cache which must see every step, while
+            # n-gram lookup and the hidden-state based proposers are stateless.
+            proposer_keeps_state = not isinstance(
+                proposer_worker,
+                (NGramWorker, MedusaWorker, MLPSpeculatorWorker))
+            proposal_len_controller = AdaptiveProposalLenController(
+                num_speculative_tokens,
+                proposer_keeps_state=proposer_keeps_state)
+
         return SpecDecodeWorker(
             proposer_worker,
             scorer_worker,
@@ -177,7 +209,9 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
             disable_log_stats=disable_log_stats,
             disable_by_batch_size=disable_by_batch_size,
             spec_decode_sampler=spec_decode_sampler,
-            allow_zero_draft_token_step=allow_zero_draft_token_step)
+            allow_zero_draft_token_step=allow_zero_draft_token_step,
+            proposal_len_controller=proposal_len_controller,
+            disable_mqa_scorer=disable_mqa_scorer)
 
     def __init__(
         self,
@@ -189,6 +223,9 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         metrics_collector: Optional[AsyncMetricsCollector] = None,
         disable_by_batch_size: Optional[int] = None,
         allow_zero_draft_token_step: Optional[bool] = True,
+        proposal_len_controller: Optional[
+            AdaptiveProposalLenController] = None,
+        disable_mqa_scorer: bool = False,
     ):
         """
         Create a SpecDecodeWorker.
@@ -217,6 +254,12 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
             allow_zero_draft_token_step: whether to allow a step where the draft
                 model generates no draft token; should disallow when the tp of
                 draft model is larger than 1 (TODO: #5814)
+            proposal_len_controller: If set, picks the proposal length of
+                each sequence every step instead of always scoring
+                num_lookahead_slots draft tokens.
+            disable_mqa_scorer: If set to True, always score proposals with
+                batch expansion, even if the scorer's attention backend
+                supports multi-token decode queries.
         """
         self.proposer_worker = proposer_worker
         self.scorer_worker = scorer_worker
@@ -226,6 +269,7 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         self.disable_by_batch_size = disable_by_batch_size or float("inf")
         self.spec_decode_sampler = spec_decode_sampler
         self._allow_zero_draft_token_step = allow_zero_draft_token_step
+        self._proposal_len_controller = proposal_len_controller
         self._metrics = AsyncMetricsCollector(
             self.spec_decode_sampler
         ) if metrics_collector is None else metrics_collector
@@ -248,6 +292,7 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         self.previous_hidden_states: Optional[HiddenStates] = None
         self._disable_logprobs = disable_logprobs
         self._disable_log_stats = disable_log_stats
+        self._disable_mqa_scorer = disable_mqa_scorer
 
     def init_device(self) -> None:
         """Initialize both scorer and proposer models.
@@ -264,16 +309,39 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         self._metrics.init_gpu_tensors(self.rank)
         self.spec_decode_sampler.init_gpu_tensors(self.rank)
 
-        self.scorer = BatchExpansionTop1Scorer(
-            scorer_worker=self.scorer_worker,
-            device=self.device,
-            vocab_size=self._vocab_size)
+        if self._can_use_mqa_scorer():
+            self.scorer = MQAScorer(scorer_worker=self.scorer_worker,
+                                    device=self.device,
+                                    vocab_size=self._vocab_size)
+        else:
+            self.scorer = BatchExpansionTop1Scorer(
+                scorer_worker=self.scorer_worker,
+                device=self.device,
+                vocab_size=self._vocab_size)
+        logger.info("Configuring SpecDecodeWorker with scorer=%s",
+                    type(self.scorer).__name__)
 
         self._configure_model_sampler_for_spec_decode()
 
     def load_model(self, *args, **kwargs):
         pass
 
+    def _can_use_mqa_scorer(self) -> bool:
+        """Whether proposals can be scored with one multi-token query per
+        sequence. This needs an attention backend which attends from several
+        decode tokens to the paged KV cache; sliding windows are not handled
+        by it.
+        """
+        if self._disable_mqa_scorer:
+            return False
+        scorer_runner = getattr(self.scorer_worker, "model_runner", None)
+        if scorer_runner is None:
+            return False
+        attn_backend = getattr(scorer_runner, "attn_backend", None)
+        if attn_backend is None or attn_backend.get_name() != "flash-attn":
+            return False
+        return scorer_runner.model_config.get_sliding_window() is None
+
     def _configure_model_sampler_for_spec_decode(self):
         """Configure model sampler to emit GPU tensors. This allows spec decode
         to keep data on device without transferring to CPU and serializing,
@@ -355,6 +423,18 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
             execute_model_req)
         num_lookahead_slots = execute_model_req.num_lookahead_slots
 
+        proposal_lens: Optional[List[int]] = None
+        if (self._proposal_len_controller is not None
+                and num_lookahead_slots > 0 and not disable_all_speculation
+                and execute_model_req.seq_group_metadata_list):
+            proposal_lens = self._proposal_len_controller.get_proposal_lens(
+                execute_model_req.seq_group_metadata_list)
+            if (not any(proposal_lens) and
+                    not self._proposal_len_controller.proposer_keeps_state):
+                # Speculation does not pay off for any sequence in this
+                # step, and the proposer does not need to see it.
+                num_lookahead_slots = 0
+
         # Broadcast how many lookahead slots are scheduled for this step, and
         # whether all speculation is disabled, to all non-driver workers.
 
@@ -387,7 +467,8 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
             return self._run_no_spec(execute_model_req,
                                      skip_proposer=disable_all_speculation)
         return self._run_speculative_decoding_step(execute_model_req,
-                                                   num_lookahead_slots)
+                                                   num_lookahead_slots,
+                                                   proposal_lens)
 
     @torch.inference_mode()
     def start_worker_execution_loop(self) -> None:
@@ -520,12 +601,17 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
 
     @nvtx_range("spec_decode_worker._run_speculative_decoding_step")
     def _run_speculative_decoding_step(
-            self, execute_model_req: ExecuteModelRequest,
-            num_lookahead_slots: int) -> List[SamplerOutput]:
+        self,
+        execute_model_req: ExecuteModelRequest,
+        num_lookahead_slots: int,
+        proposal_lens: Optional[List[int]] = None,
+    ) -> List[SamplerOutput]:
         """Execute a single step of speculative decoding.
 
         This invokes the proposer worker to get k speculative tokens for each
         sequence, then scores each speculative token using the scoring worker.
+        If proposal_lens is given, the proposal of each sequence is truncated
+        to its length before scoring.
 
         Returns a list of SamplerOutput, each containing a single token per
         sequence.
@@ -546,6 +632,9 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
             raise RuntimeError("Cannot handle cases where distributed draft "
                                "workers generate no tokens")
 
+        if proposal_lens is not None:
+            proposals = self._truncate_proposals(proposals, proposal_lens)
+
         with Timer() as scoring_timer:
             proposal_scores = self.scorer.score_proposals(
                 execute_model_req,
@@ -561,13 +650,51 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
                        scoring_timer.elapsed_time_ms,
                        verification_timer.elapsed_time_ms)
 
-        return self._create_output_sampler_list(
+        scored_proposal_lens = proposals.proposal_lens.tolist()
+        self._metrics.record_proposal_lens(scored_proposal_lens)
+
+        sampler_output_list = self._create_output_sampler_list(
             execute_model_req.seq_group_metadata_list,
             accepted_token_ids,
             target_logprobs=target_logprobs,
             k=execute_model_req.num_lookahead_slots,
             stage_times=stage_times)
 
+        if self._proposal_len_controller is not None:
+            # The number of emitted tokens is the number of accepted draft
+            # tokens plus one recovered or bonus token.
+            num_accepted_tokens = ((accepted_token_ids != -1).sum(dim=1) -
+                                   1).tolist()
+            self._proposal_len_controller.observe(
+                execute_model_req.seq_group_metadata_list,
+                scored_proposal_lens,
+                num_accepted_tokens,
+                draft_time_per_step_ms=stage_times[0],
+                scoring_time_ms=stage_times[1] + stage_times[2])
+
+        return sampler_output_list
+
+    @staticmethod
+    def _truncate_proposals(proposals: SpeculativeProposals,
+                            proposal_lens: List[int]) -> SpeculativeProposals:
+        """Shorten each proposal to at most its entry in proposal_lens. The
+        dropped draft tokens are replaced by -1 and are not scored.
+        """
+        proposal_token_ids = proposals.proposal_token_ids
+        max_proposal_lens = torch.tensor(proposal_lens,
+                                         dtype=torch.long,
+                                         device=proposal_token_ids.device)
+        new_proposal_lens = torch.minimum(proposals.proposal_lens,
+                                          max_proposal_lens)
+        positions = torch.arange(proposal_token_ids.shape[1],
+                                 device=proposal_token_ids.device)
+        proposal_token_ids = proposal_token_ids.masked_fill(
+            positions[None, :] >= new_proposal_lens[:, None], -1)
+        return SpeculativeProposals(proposal_token_ids=proposal_token_ids,
+                                    proposal_probs=proposals.proposal_probs,
+                                    proposal_lens=new_proposal_lens,
+                                    no_proposals=proposals.no_proposals)
+
     @nvtx_range("spec_decode_worker._verify_tokens")
     def _verify_tokens(
         self,
@@ -584,10 +711,9 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         """
         proposal_lens_list = proposals.proposal_lens.tolist()
 
-        # vLLM currently only supports proposal lens equal to zero or the batch
-        # proposal len. This adds some complexity (splitting the batch into spec
-        # and non spec sequences) and should be removed in the future. It can be
-        # done by supporting per-sequence proposal lens.
+        # Sequences with a zero proposal len are verified as regular decodes.
+        # The others are verified in one call of the sampler per distinct
+        # proposal len.
         _, spec_indices = split_batch_by_proposal_len(
             seq_group_metadata_list,
             proposal_lens_list,
@@ -596,34 +722,102 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
             seq_group_metadata_list,
             proposal_lens_list,
             select_proposal_len_zero=True)
-        original_indices = spec_indices + non_spec_indices
-
-        # Get probabilities of target model, excluding bonus token.
-        proposal_verifier_probs = proposal_scores.probs[spec_indices, :-1]
+        spec_indices_by_len: Dict[int, List[int]] = defaultdict(list)
+        for index in spec_indices:
+            spec_indices_by_len[proposal_lens_list[index]].append(index)
+
+        original_indices: List[int] = []
+        accepted_token_ids_list: List[torch.Tensor] = []
+        for proposal_len, indices in spec_indices_by_len.items():
+            accepted_token_ids = self._run_spec_decode_sampler(
+                seq_group_metadata_list, proposal_scores, proposals, indices,
+                proposal_len)
+            if proposal_len < max_proposal_len:
+                accepted_token_ids = torch.nn.functional.pad(
+                    accepted_token_ids, (0, max_proposal_len - proposal_len),
+                    value=-1)
+            accepted_token_ids_list.append(accepted_token_ids)
+            original_indices.extend(indices)
 
         # Get non-speculative sampled tokens from target model.
         non_spec_token_ids = proposal_scores.token_ids[non_spec_indices]
 
+        # Append output tokens from non-speculative sequences to
+        # the accepted token ids tensor.
+        non_spec_token_ids = non_spec_token_ids.expand(-1, max_proposal_len +
+                                                       1).clone()
+        non_spec_token_ids[:, 1:] = -1
+        accepted_token_ids_list.append(non_spec_token_ids)
+        original_indices.extend(non_spec_indices)
+        accepted_token_ids = torch.cat(accepted_token_ids_list)
+        logprobs = proposal_scores.logprobs
+        # Rearrange so that results are in the order of the original seq group
+        # metadata.
+        accepted_token_ids[original_indices] = accepted_token_ids.clone()
+
+        hidden_states = proposal_scores.hidden_states
+        if hidden_states is not None:
+            # The scorer returns one hidden state per scored token, first
+            # proposal len + 1 of them for each speculative sequence and then
+            # one for each non-speculative sequence. Keep the one of the last
+            # emitted token of each sequence.
+            first_rows: List[int] = [0] * len(seq_group_metadata_list)
+            num_rows = 0
+            for index in spec_indices:
+                first_rows[index] = num_rows
+                num_rows += proposal_lens_list[index] + 1
+            for index in non_spec_indices:
+                first_rows[index] = num_rows
+                num_rows += 1
+            num_emitted_tokens = (accepted_token_ids != -1).sum(dim=1)
+            last_rows = torch.tensor(
+                first_rows, dtype=torch.long,
+                device=hidden_states.device) + num_emitted_tokens - 1
+            hidden_states = hidden_states[last_rows]  # b x d
+            # Store hidden states from target model for subsequent decode step
+            self.previous_hidden_states = HiddenStates(seq_group_metadata_list,
+                                                       hidden_states)
+
+        return accepted_token_ids, logprobs
+
+    def _run_spec_decode_sampler(
+        self,
+        seq_group_metadata_list: List[SequenceGroupMetadata],
+        proposal_scores: SpeculativeScores,
+        proposals: SpeculativeProposals,
+        indices: List[int],
+        proposal_len: int,
+    ) -> torch.Tensor:
+        """Verify the proposals of the sequences at `indices`, which all have
+        the given proposal len. Returns the accepted token ids, shaped
+        [len(indices), proposal_len + 1].
+        """
+        # Get probabilities of target model, excluding bonus token.
+        proposal_verifier_probs = proposal_scores.probs[indices, :proposal_len]
+
         # Get bonus tokens from target model.
-        bonus_token_ids = proposal_scores.token_ids[spec_indices, -1:]
+        bonus_token_ids = proposal_scores.token_ids[indices,
+                                                    proposal_len:proposal_len +
+                                                    1]
 
         # Get probabilities according to proposal method.
-        proposal_probs = proposals.proposal_probs[spec_indices]
+        proposal_probs = proposals.proposal_probs[indices, :proposal_len]
 
         # Get proposed tokens.
-        proposal_token_ids = proposals.proposal_token_ids[spec_indices]
+        proposal_token_ids = proposals.proposal_token_ids[
+            indices, :proposal_len]
 
         # Sampler arguments
         sampler_extra_kwargs: Dict[str, Any] = {}
         if self.generators and isinstance(self.spec_decode_sampler,
                                           SpecDecodeStochasticBaseSampler):
             sampler_extra_kwargs["seeded_seqs"] = {
-                idx: self.generators[sgm.request_id]
-                for idx, sgm in enumerate(seq_group_metadata_list)
-                if sgm.sampling_params.seed is not None
+                idx: self.generators[seq_group_metadata_list[index].request_id]
+                for idx, index in enumerate(indices) if
+                seq_group_metadata_list[index].sampling_params.seed is not None
             }
 
-        accepted_token_ids = self.spec_decode_sampler(
+        return self.spec_decode_sampler(
             target_probs=proposal_verifier_probs,
             bonus_token_ids=bonus_token_ids,
             draft_probs=proposal_probs,
@@ -631,34 +825,6 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
             **sampler_extra_kwargs,
         )
 
-        # Append output tokens from non-speculative sequences to
-        # the accepted token ids tensor.
-        non_spec_token_ids = non_spec_token_ids.expand(-1, max_proposal_len +
-                                                       1).clone()
-        non_spec_token_ids[:, 1:] = -1
-        accepted_token_ids = torch.cat(
-            [accepted_token_ids, non_spec_token_ids])
-        logprobs = proposal_scores.logprobs
-        # Rearrange so that results are in the order of the original seq group
-        # metadata.
-        accepted_token_ids[original_indices] = accepted_token_ids.clone()
-
-        hidden_states = proposal_scores.hidden_states
-        if hidden_states is not None:
-            # Contract hidden states based on accepted tokens
-            hs_size = hidden_states.shape[1]
-            hidden_states = hidden_states.reshape(-1, max_proposal_len + 1,
-                                                  hs_size)
-            accepted_index = accepted_token_ids + 1  # Convert -1 to 0
-            accepted_index = accepted_index.count_nonzero(dim=1).add_(-1)
-            index = accepted_index[:, None, None].expand(-1, 1, hs_size)
-            hidden_states = hidden_states.gather(1, index).squeeze(1)  # b x d
-            # Store hidden states from target model for subsequent decode step
-            self.previous_hidden_states = HiddenStates(seq_group_metadata_list,
-                                                       hidden_states)
-
-        return accepted_token_ids, logprobs
-
     def _create_output_sampler_list(
         self,
         seq_group_metadata_list: List[SequenceGroupMetadata],
@@ -877,6 +1043,9 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         for finished_request in execute_model_req.finished_requests_ids:
             for seq_id in self._request_id_seq_id_mapping[finished_request]:
                 self._seq_with_bonus_token_in_last_step.discard(seq_id)
+            if self._proposal_len_controller is not None:
+                self._proposal_len_controller.free_seqs(
+                    self._request_id_seq_id_mapping[finished_request])
             del self._request_id_seq_id_mapping[finished_request]
 
     def _track_sequences_with_bonus_tokens(
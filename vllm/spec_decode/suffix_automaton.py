@@ -0,0 +1,215 @@
+"""Suffix automata over token ids, used to draft tokens for n-gram
+speculation without searching the whole history every step."""
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# The root state, i.e. the empty string.
+_ROOT = 0
+
+
+class SuffixAutomaton:
+    """The suffix automaton of a token sequence, extended one token at a time.
+
+    Every substring of the sequence is a path from the root. A state stands
+    for the substrings which end at the same set of positions; besides its
+    transitions, it stores the length of the longest of these substrings, its
+    suffix link and the end position of its first occurrence. Appending a
+    token takes amortized constant time, and so does advancing a match by one
+    token.
+    """
+
+    def __init__(self) -> None:
+        self.token_ids: List[int] = []
+        self._next: List[Dict[int, int]] = [{}]
+        self._link: List[int] = [-1]
+        self._length: List[int] = [0]
+        self._first_end: List[int] = [-1]
+        # The state of the whole sequence.
+        self._last = _ROOT
+
+    def __len__(self) -> int:
+        return len(self.token_ids)
+
+    @property
+    def num_states(self) -> int:
+        return len(self._length)
+
+    def extend(self, token_ids: Iterable[int]) -> None:
+        for token_id in token_ids:
+            self._append(token_id)
+
+    def _append(self, token_id: int) -> None:
+        next_, link, length = self._next, self._link, self._length
+        pos = len(self.token_ids)
+        self.token_ids.append(token_id)
+
+        cur = len(length)
+        next_.append({})
+        link.append(_ROOT)
+        length.append(length[self._last] + 1)
+        self._first_end.append(pos)
+
+        p = self._last
+        while p != -1 and token_id not in next_[p]:
+            next_[p][token_id] = cur
+            p = link[p]
+        if p != -1:
+            q = next_[p][token_id]
+            if length[p] + 1 == length[q]:
+                link[cur] = q
+            else:
+                clone = len(length)
+                next_.append(dict(next_[q]))
+                link.append(link[q])
+                length.append(length[p] + 1)
+                self._first_end.append(self._first_end[q])
+                while p != -1 and next_[p].get(token_id) == q:
+                    next_[p][token_id] = clone
+                    p = link[p]
+                link[q] = clone
+                link[cur] = clone
+        self._last = cur
+
+    def longest_repeated_suffix(self) -> Tuple[int, int]:
+        """Return the length of the longest suffix of the sequence which also
+        occurs earlier in it, and the position right after the end of its
+        first occurrence (where a draft continues from).
+        """
+        state = self._link[self._last]
+        if state <= _ROOT:
+            return 0, 0
+        return self._length[state], self._first_end[state] + 1
+
+    def advance(self, state: int, match_len: int,
+                token_id: int) -> Tuple[int, int]:
+        """Extend the match `(state, match_len)` of a suffix of some other
+        sequence by `token_id`. Returns the state and length of the longest
+        suffix of the extended sequence which is a substring of this one.
+        """
+        next_, link, length = self._next, self._link, self._length
+        while state != _ROOT and token_id not in next_[state]:
+            state = link[state]
+            match_len = length[state]
+        next_state = next_[state].get(token_id)
+        if next_state is None:
+            return _ROOT, 0
+        return next_state, match_len + 1
+
+    def continuation_start(self, state: int) -> int:
+        """The position right after the end of the first occurrence of the
+        substrings of `state`."""
+        return self._first_end[state] + 1
+
+
+class RecentOutputIndex:
+    """A size-bounded suffix automaton over the outputs of recently finished
+    sequences, shared by all running sequences.
+
+    Outputs are separated by a distinct negative token so that matches and
+    drafts never span two outputs. When the index grows beyond `max_tokens`,
+    it is rebuilt from the most recent outputs which fit in half of it. Every
+    change bumps `generation`, which invalidates the matches of the running
+    sequences.
+    """
+
+    def __init__(self, max_tokens: int):
+        self.max_tokens = max_tokens
+        self.generation = 0
+        self.automaton = SuffixAutomaton()
+        self._outputs: Deque[List[int]] = deque()
+        self._num_outputs_added = 0
+
+    def add(self, token_ids: List[int]) -> None:
+        if not token_ids:
+            return
+        # Keep room for the separator.
+        token_ids = token_ids[-max(self.max_tokens - 1, 1):]
+        if len(self.automaton) + len(token_ids) + 1 > self.max_tokens:
+            num_tokens = len(token_ids) + 1
+            kept: Deque[List[int]] = deque()
+            for output in reversed(self._outputs):
+                if num_tokens + len(output) + 1 > self.max_tokens // 2:
+                    break
+                kept.appendleft(output)
+                num_tokens += len(output) + 1
+            self._outputs = kept
+            self.automaton = SuffixAutomaton()
+            for output in self._outputs:
+                self._extend(output)
+        self._outputs.append(token_ids)
+        self._extend(token_ids)
+        self.generation += 1
+
+    def _extend(self, token_ids: List[int]) -> None:
+        self._num_outputs_added += 1
+        self.automaton.extend(token_ids)
+        self.automaton.extend((-self._num_outputs_added, ))
+
+
+class SequenceSuffixIndex:
+    """Incrementally maintained draft index of one sequence.
+
+    It holds the suffix automaton of the sequence's tokens and, if a shared
+    index of recent outputs is used, the longest suffix of the sequence
+    found in it.
+    """
+
+    __slots__ = ("automaton", "num_prompt_tokens", "corpus_state",
+                 "corpus_match_len", "corpus_generation", "last_step")
+
+    # When the shared index changes, the match of a sequence in it is
+    # recomputed from this many of its last tokens.
+    CORPUS_REMATCH_WINDOW = 64
+
+    def __init__(self, num_prompt_tokens: int) -> None:
+        self.automaton = SuffixAutomaton()
+        self.num_prompt_tokens = num_prompt_tokens
+        self.corpus_state = _ROOT
+        self.corpus_match_len = 0
+        self.corpus_generation = -1
+        self.last_step = 0
+
+    def update(self, token_ids: Sequence[int],
+               corpus: Optional[RecentOutputIndex]) -> None:
+        """Index the tokens of `token_ids` (all tokens of the sequence) which
+        were appended since the last update. Only those tokens are copied."""
+        num_indexed = len(self.automaton)
+        new_token_ids = token_ids[num_indexed:]
+        self.automaton.extend(new_token_ids)
+        if corpus is None:
+            return
+        if self.corpus_generation != corpus.generation:
+            self.corpus_generation = corpus.generation
+            self.corpus_state, self.corpus_match_len = _ROOT, 0
+            new_token_ids = token_ids[-self.CORPUS_REMATCH_WINDOW:]
+        corpus_automaton = corpus.automaton
+        state, match_len = self.corpus_state, self.corpus_match_len
+        for token_id in new_token_ids:
+            state, match_len = corpus_automaton.advance(
+                state, match_len, token_id)
+        self.corpus_state, self.corpus_match_len = state, match_len
+
+    def propose(self, corpus: Optional[RecentOutputIndex], min_match_len: int,
+                num_tokens: int) -> Optional[List[int]]:
+        """Return up to `num_tokens` draft tokens following the longest match
+        of a suffix of the sequence, either earlier in the sequence or in the
+        recent outputs, or None if no match is at least `min_match_len` long.
+        """
+        draft: Optional[List[int]] = None
+        match_len, start = self.automaton.longest_repeated_suffix()
+        if match_len >= max(min_match_len, 1):
+            draft = self.automaton.token_ids[start:start + num_tokens]
+
+        if (corpus is not None and self.corpus_generation == corpus.generation
+                and self.corpus_match_len >= max(min_match_len, 1)
+                and (draft is None or self.corpus_match_len > match_len)):
+            start = corpus.automaton.continuation_start(self.corpus_state)
+            corpus_draft = corpus.automaton.token_ids[start:start + num_tokens]
+            # Stop at the end of the matched output.
+            for i, token_id in enumerate(corpus_draft):
+                if token_id < 0:
+                    corpus_draft = corpus_draft[:i]
+                    break
+            if corpus_draft:
+                draft = corpus_draft
+        return draft
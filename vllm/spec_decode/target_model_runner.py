@@ -66,6 +66,11 @@ class TargetModelRunner(ModelRunner):
         # CPU output. We directly serialize the GPU sampled_token_id tensors
         # as needed. If log probabilities is enabled then synchronize all the
         # sampling related tensors which includes the logprobs tensors.
+        # Multi-token decodes (MQA scoring) sample several tokens per sequence,
+        # which only the GPU tensors represent.
         model_input.sampling_metadata.skip_sampler_cpu_output = (
-            self.disable_logprobs)
+            self.disable_logprobs
+            or any(not seq_group_metadata.is_prompt
+                   and seq_group_metadata.token_chunk_size > 1
+                   for seq_group_metadata in seq_group_metadata_list))
         return model_input
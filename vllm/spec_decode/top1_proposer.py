@@ -22,9 +22,10 @@ class Top1Proposer(SpeculativeProposer):
     "non-spec sequences". Essentially they skip the draft model and go through
     normal decoding in the target model.
 
-    Currently, only proposal_lens of 0 and k are supported, where k is a global
-    batch proposal length. In the future vLLM should support per-sequence
-    proposal lengths.
+    The proposer worker drafts k tokens per sequence, where k is a global
+    batch proposal length. A worker may draft fewer tokens for a sequence by
+    padding its draft with -1, in which case the proposal len of the sequence
+    only covers the drafted tokens.
     """
 
     def __init__(
@@ -267,6 +268,8 @@ class Top1Proposer(SpeculativeProposer):
         proposal_lens_tensor = torch.zeros(batch_size,
                                            dtype=torch.long,
                                            device=self._device)
-        proposal_lens_tensor[nonzero_proposal_len_indices] = proposal_len
+        # Drafts shorter than proposal_len are padded with -1.
+        proposal_lens_tensor[nonzero_proposal_len_indices] = (
+            proposal_tokens[nonzero_proposal_len_indices] != -1).sum(dim=-1)
 
         return proposal_tokens, proposal_probs, proposal_lens_tensor
@@ -0,0 +1,78 @@
+"""Per-phase timing of the engine startup.
+
+Enabled with `VLLM_STARTUP_PROFILE=1`. The phases are recorded in the process
+that creates the engine (which also hosts the driver worker) and are logged
+once the engine is ready. Phases may nest; the time of a nested phase is
+reported under its own name and excluded from the enclosing phase.
+
+This module is imported by `vllm/__init__.py`, so it must stay cheap to
+import.
+"""
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Generator, List
+
+import vllm.envs as envs
+from vllm.logger import init_logger
+
+logger = init_logger(__name__)
+
+# Exclusive time spent in each phase, in the order the phases first ran.
+_phase_times: Dict[str, float] = {}
+
+
+@dataclass
+class _ActivePhase:
+    name: str
+    start_time: float
+    # Time spent in the phases nested in this one.
+    nested_time: float = 0.0
+
+
+# Phases which are running, innermost last.
+_active_phases: List[_ActivePhase] = []
+
+
+def is_startup_profile_enabled() -> bool:
+    return envs.VLLM_STARTUP_PROFILE
+
+
+@contextmanager
+def startup_phase(name: str) -> Generator[None, None, None]:
+    """Attribute the time spent in this block to the startup phase `name`."""
+    if not envs.VLLM_STARTUP_PROFILE:
+        yield
+        return
+    phase = _ActivePhase(name, time.perf_counter())
+    _active_phases.append(phase)
+    try:
+        yield
+    finally:
+        _active_phases.pop()
+        elapsed = time.perf_counter() - phase.start_time
+        if _active_phases:
+            _active_phases[-1].nested_time += elapsed
+        _phase_times[name] = (_phase_times.get(name, 0.0) + elapsed -
+                              phase.nested_time)
+
+
+def get_startup_profile() -> Dict[str, float]:
+    """Return the exclusive time in seconds spent in each phase so far."""
+    return dict(_phase_times)
+
+
+def log_startup_profile() -> None:
+    """Log the recorded phases and the time since the process started."""
+    if not envs.VLLM_STARTUP_PROFILE:
+        return
+    import psutil
+    since_start = time.time() - psutil.Process().create_time()
+    lines = [
+        f"{name:<24}{seconds:>10.3f} s"
+        for name, seconds in _phase_times.items()
+    ]
+    other = since_start - sum(_phase_times.values())
+    lines.append(f"{'other':<24}{other:>10.3f} s")
+    lines.append(f"{'since process start':<24}{since_start:>10.3f} s")
+    logger.info("Startup profile:\n%s", "\n".join(lines))
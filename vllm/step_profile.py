@@ -0,0 +1,129 @@
+"""Per-phase timing of the engine steps.
+
+The phases of a step (scheduling, input preparation, metadata broadcast,
+forward, sampling, detokenization, stop checking and output creation) are
+recorded in the process that runs the engine, which also hosts the driver
+worker. The engine's stat loggers export the time of each phase per step as
+Prometheus histograms.
+
+A rolling Chrome trace of the phases (for chrome://tracing or Perfetto) can
+be recorded on top of this. It is started and dumped at runtime, e.g. through
+the `/admin/step_trace` endpoints of the OpenAI API server, and keeps only the
+most recent events.
+
+Times are host wall-clock times. Kernels run asynchronously, so the GPU time
+of a step is attributed to the first phase that waits for it (usually
+sampling).
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import vllm.envs as envs
+from vllm.logger import init_logger
+
+logger = init_logger(__name__)
+
+# The time of the whole step, the phases below are part of it.
+STEP = "step"
+SCHEDULE = "schedule"
+PREPARE_INPUT = "prepare_input"
+BROADCAST = "broadcast"
+FORWARD = "forward"
+SAMPLE = "sample"
+DETOKENIZE = "detokenize"
+STOP_CHECK = "stop_check"
+CREATE_OUTPUTS = "create_outputs"
+
+DEFAULT_MAX_TRACE_EVENTS = 100_000
+
+_enabled = False
+# Time spent in each phase since the last call to pop_step_phase_times.
+_phase_times: Dict[str, float] = {}
+# The most recent trace events, if a trace is being recorded.
+_trace_events: Optional[Deque[Dict[str, Any]]] = None
+
+
+def enable_step_profile() -> None:
+    """Start recording the phase times of the steps in this process."""
+    global _enabled
+    _enabled = True
+
+
+def is_step_profile_enabled() -> bool:
+    return _enabled
+
+
+def record_step_phase(name: str, start: float) -> None:
+    """Attribute the time since `start` (a `time.perf_counter()` value) to the
+    step phase `name`.
+
+    A phase may be recorded several times in a step (e.g. once per sequence),
+    its times add up.
+    """
+    if not _enabled:
+        return
+    end = time.perf_counter()
+    _phase_times[name] = _phase_times.get(name, 0.0) + end - start
+    if _trace_events is not None:
+        _trace_events.append({
+            "name": name,
+            "ph": "X",
+            "ts": start * 1e6,
+            "dur": (end - start) * 1e6,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+        })
+
+
+def pop_step_phase_times() -> Dict[str, float]:
+    """Return the time in seconds spent in each phase since the last call."""
+    global _phase_times
+    phase_times, _phase_times = _phase_times, {}
+    return phase_times
+
+
+def is_step_trace_active() -> bool:
+    return _trace_events is not None
+
+
+def start_step_trace(max_events: int = DEFAULT_MAX_TRACE_EVENTS) -> None:
+    """Start recording the `max_events` most recent phases as trace events.
+
+    Restarting a running trace drops the events recorded so far.
+    """
+    global _trace_events
+    if not _enabled:
+        raise RuntimeError("The step profile is not enabled in this process. "
+                           "It requires stats logging to be enabled.")
+    _trace_events = deque(maxlen=max_events)
+    logger.info("Started recording a step trace of at most %d events.",
+                max_events)
+
+
+def stop_step_trace(path: Optional[str] = None) -> str:
+    """Stop recording the trace and dump it in the Chrome trace format.
+
+    The trace is written to `path`, or to a new file in `VLLM_STEP_TRACE_DIR`
+    (the temporary directory by default). Returns the path of the file.
+    """
+    global _trace_events
+    if _trace_events is None:
+        raise RuntimeError("No step trace is being recorded.")
+    trace_events, _trace_events = list(_trace_events), None
+
+    if path is None:
+        trace_dir = envs.VLLM_STEP_TRACE_DIR or tempfile.gettempdir()
+        os.makedirs(trace_dir, exist_ok=True)
+        path = os.path.join(
+            trace_dir,
+            f"vllm_step_trace_{os.getpid()}_{int(time.time())}.json")
+    with open(path, "w") as f:
+        json.dump({"traceEvents": trace_events}, f)
+    logger.info("Dumped a step trace of %d events to %s.", len(trace_events),
+                path)
+    return path
@@ -1,8 +1,11 @@
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, List, Optional
+from typing import Sequence as GenericSequence
+from typing import Tuple, Union
 
 from transformers import PreTrainedTokenizer, PreTrainedTokenizerFast
 
-from vllm.sequence import Logprob, SamplingParams, Sequence, SequenceGroup
+from vllm.sequence import (PromptLogprobs, SamplingParams, Sequence,
+                           SequenceGroup, SequenceLogprobs)
 from vllm.transformers_utils.tokenizer_group.base_tokenizer_group import (
     BaseTokenizerGroup)
 
@@ -22,14 +25,15 @@ class Detokenizer:
         return self.tokenizer_group.get_lora_tokenizer(sequence.lora_request)
 
     def decode_prompt_logprobs_inplace(self, seq_group: SequenceGroup,
-                                       prompt_logprobs: List[Optional[Dict[
-                                           int, Logprob]]],
+                                       prompt_logprobs: Union[
+                                           PromptLogprobs, SequenceLogprobs],
                                        position_offset: int) -> None:
         """Decodes the logprobs for the prompt of a sequence group.
 
         Args:
             seq_group: The sequence group to decode.
-            prompt_logprobs: The logprobs to decode.
+            prompt_logprobs: The logprobs to decode, either dicts of
+                :class:`Logprob` or columnar.
             position_offset: Offset of the first index of the logprobs 
                 relative to the start of the sequence (for chunked prefill).
         
@@ -42,8 +46,8 @@ class Detokenizer:
         # We can pick any sequence for the prompt.
         seq = seq_group.get_seqs()[0]
         # Only prompt, without the generated token.
-        all_token_ids = seq.get_token_ids()
-        prompt_token_ids = all_token_ids[:-1]
+        all_token_ids = seq.get_token_ids_array()
+        prompt_token_ids = all_token_ids[:-1].tolist()
         tokenizer = self.get_tokenizer_for_seq(seq)
         prefix_offset = 0
         read_offset = 0
@@ -52,18 +56,19 @@ class Detokenizer:
         next_iter_tokens: List[str] = []
         prev_tokens = None
 
-        for token_position_in_logprob, prompt_logprobs_for_token in enumerate(
-                prompt_logprobs):
+        for token_position_in_logprob in range(len(prompt_logprobs)):
 
             # Absolute token position equals the index in the logprobs
             # list plus the offset of the entire logprobs list relative
             # to the start of the sequence.
             token_position = token_position_in_logprob + position_offset
-            if not prompt_logprobs_for_token:
+            candidates = _get_prompt_candidates(prompt_logprobs,
+                                                token_position_in_logprob)
+            if not candidates:
                 continue
-            for token_id, sample_logprob in prompt_logprobs_for_token.items():
-                if (sample_logprob.decoded_token is None
-                        and token_id != INVALID_TOKEN_ID):
+            decoded_tokens: Dict[int, str] = {}
+            for token_id, decoded_token in candidates:
+                if decoded_token is None and token_id != INVALID_TOKEN_ID:
                     prompt_token_ids_with_token = (
                         prompt_token_ids[:token_position] + [token_id])
                     (new_tokens, new_text, new_prefix_offset,
@@ -78,7 +83,7 @@ class Detokenizer:
                          spaces_between_special_tokens,
                      )
 
-                    sample_logprob.decoded_token = new_text
+                    decoded_tokens[token_id] = new_text
 
                     # Use the offsets & prev tokens corresponding to
                     # real tokens to ensure detokenization is consistent
@@ -88,6 +93,11 @@ class Detokenizer:
                         next_iter_read_offset = new_read_offset
                         next_iter_tokens = new_tokens
 
+            if decoded_tokens:
+                _set_prompt_decoded_tokens(prompt_logprobs,
+                                           token_position_in_logprob,
+                                           decoded_tokens)
+
             # Advance to the next token position.
             prefix_offset = next_iter_prefix_offset
             read_offset = next_iter_read_offset
@@ -107,7 +117,7 @@ class Detokenizer:
         Returns:
             The number of characters added to the output text.
         """
-        all_input_ids = seq.get_token_ids()
+        all_input_ids = seq.get_token_ids_array()
         token_id_generated_this_iteration = all_input_ids[-1]
         tokenizer = self.get_tokenizer_for_seq(seq)
 
@@ -136,7 +146,7 @@ class Detokenizer:
         # Decode logprobs
         logprobs = seq.output_logprobs[-1]
         if logprobs:
-            previous_tokens = all_input_ids[:-1]
+            previous_tokens = list(all_input_ids[:-1])
             for token_id, sample_logprob in logprobs.items():
                 # If the token was generated this iteration,
                 # use the provided text.
@@ -167,6 +177,33 @@ class Detokenizer:
         return len(new_decoded_token_text)
 
 
+def _get_prompt_candidates(
+        prompt_logprobs: Union[PromptLogprobs, SequenceLogprobs],
+        index: int) -> Optional[List[Tuple[int, Optional[str]]]]:
+    """Return the token IDs and decoded tokens of the candidates of a prompt
+    position, without materializing columnar logprobs."""
+    if isinstance(prompt_logprobs, SequenceLogprobs):
+        return prompt_logprobs.get_candidates(index)
+    logprobs = prompt_logprobs[index]
+    if logprobs is None:
+        return None
+    return [(token_id, logprob.decoded_token)
+            for token_id, logprob in logprobs.items()]
+
+
+def _set_prompt_decoded_tokens(prompt_logprobs: Union[PromptLogprobs,
+                                                      SequenceLogprobs],
+                               index: int, decoded_tokens: Dict[int,
+                                                                str]) -> None:
+    if isinstance(prompt_logprobs, SequenceLogprobs):
+        prompt_logprobs.set_decoded_tokens(index, decoded_tokens)
+        return
+    logprobs = prompt_logprobs[index]
+    assert logprobs is not None
+    for token_id, decoded_token in decoded_tokens.items():
+        logprobs[token_id].decoded_token = decoded_token
+
+
 def _replace_none_with_empty(tokens: List[Optional[str]]):
     for i, token in enumerate(tokens):
         if token is None:
@@ -214,7 +251,7 @@ INITIAL_INCREMENTAL_DETOKENIZATION_OFFSET = 5
 
 def convert_prompt_ids_to_tokens(
     tokenizer: Union[PreTrainedTokenizer, PreTrainedTokenizerFast],
-    prompt_ids: List[int],
+    prompt_ids: GenericSequence[int],
     skip_special_tokens: bool = False,
 ) -> Tuple[List[str], int, int]:
     """Converts the prompt ids to tokens and returns the tokens and offsets
@@ -241,7 +278,7 @@ def convert_prompt_ids_to_tokens(
 # under Apache 2.0 license
 def detokenize_incrementally(
     tokenizer: Union[PreTrainedTokenizer, PreTrainedTokenizerFast],
-    all_input_ids: List[int],
+    all_input_ids: GenericSequence[int],
     prev_tokens: Optional[List[str]],
     prefix_offset: int,
     read_offset: int,
@@ -1,8 +1,7 @@
 import warnings
 
 try:
-    import vllm.commit_id
-    __commit__ = vllm.commit_id.__commit__
+    from vllm.commit_id import __commit__
 except Exception as e:
     warnings.warn(f"Failed to read commit hash:\n{e}",
                   RuntimeWarning,
@@ -1,6 +1,9 @@
+import time
+from array import array
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Type, Union
 
+import numpy as np
 import torch
 from torch import nn
 
@@ -15,6 +18,7 @@ from vllm.multimodal import (MULTIMODAL_REGISTRY, BatchedTensorInputs,
                              MultiModalInputs)
 from vllm.sequence import (IntermediateTensors, SamplerOutput,
                            SequenceGroupMetadata)
+from vllm.step_profile import FORWARD, SAMPLE, record_step_phase
 from vllm.utils import make_tensor_with_pad
 from vllm.worker.model_runner_base import (
     ModelRunnerBase, ModelRunnerInputBase,
@@ -68,6 +72,162 @@ class CPUModelInput(ModelRunnerInputBase):
         return cls(**tensor_dict)
 
 
+class CPUInputTensorBuilder:
+    """
+    Builds the token, position and slot mapping tensors of the CPU model
+    runner with vectorized NumPy arithmetic instead of per-token Python loops.
+
+    The tensors are views of buffers which are allocated for the largest batch
+    so far and reused across steps. This is safe since the runner is done with
+    the inputs of a step before it prepares the next one.
+    """
+
+    def __init__(self, block_size: int, sliding_window: Optional[int]):
+        self.block_size = block_size
+        self.sliding_window = sliding_window
+        self._input_tokens: np.ndarray = np.empty(0, dtype=np.int64)
+        self._input_positions: np.ndarray = np.empty(0, dtype=np.int64)
+        self._slot_mapping: np.ndarray = np.empty(0, dtype=np.int64)
+
+    def _reserve(self, num_tokens: int) -> None:
+        if num_tokens <= len(self._input_tokens):
+            return
+        capacity = max(num_tokens, 2 * len(self._input_tokens))
+        self._input_tokens = np.empty(capacity, dtype=np.int64)
+        self._input_positions = np.empty(capacity, dtype=np.int64)
+        self._slot_mapping = np.empty(capacity, dtype=np.int64)
+
+    def _as_tensors(
+            self, num_tokens: int
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        return (torch.from_numpy(self._input_tokens[:num_tokens]),
+                torch.from_numpy(self._input_positions[:num_tokens]),
+                torch.from_numpy(self._slot_mapping[:num_tokens]))
+
+    def build_prompt(
+        self,
+        seq_group_metadata_list: List[SequenceGroupMetadata],
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, List[int]]:
+        """Return the input tokens, positions and slot mapping of a batch of
+        prompts, and the lengths of the prompts."""
+        seq_lens: List[int] = []
+        computed_lens: List[int] = []
+        token_ids_list: List[array] = []
+        block_tables: List[List[int]] = []
+
+        for seq_group_metadata in seq_group_metadata_list:
+            assert seq_group_metadata.is_prompt
+            seq_ids = list(seq_group_metadata.seq_data.keys())
+            assert len(seq_ids) == 1
+            seq_id = seq_ids[0]
+
+            seq_data = seq_group_metadata.seq_data[seq_id]
+            token_ids_list.append(seq_data.get_token_ids_array())
+            computed_lens.append(seq_data.get_num_computed_tokens())
+            seq_lens.append(len(token_ids_list[-1]))
+            block_tables.append(
+                seq_group_metadata.block_tables[seq_id])  # type: ignore
+
+        seq_lens_array = np.array(seq_lens, dtype=np.int64)
+        computed_lens_array = np.array(computed_lens, dtype=np.int64)
+        query_lens = seq_lens_array - computed_lens_array
+        num_tokens = int(query_lens.sum())
+        self._reserve(num_tokens)
+
+        input_tokens = self._input_tokens[:num_tokens]
+        start = 0
+        for token_ids, computed_len, query_len in zip(token_ids_list,
+                                                      computed_lens,
+                                                      query_lens.tolist()):
+            input_tokens[start:start + query_len] = token_ids[computed_len:]
+            start += query_len
+
+        # Token position ids
+        # NOTE(woosuk): Here we assume that the first token in the prompt
+        # is always the first token in the sequence.
+        query_starts = np.cumsum(query_lens) - query_lens
+        positions = self._input_positions[:num_tokens]
+        np.subtract(np.arange(num_tokens),
+                    np.repeat(query_starts - computed_lens_array, query_lens),
+                    out=positions)
+
+        # Look up the block of each token in the concatenated block tables.
+        block_table_lens = np.array([len(t) for t in block_tables],
+                                    dtype=np.int64)
+        block_table_starts = np.cumsum(block_table_lens) - block_table_lens
+        flat_block_tables = np.fromiter((block_number
+                                         for block_table in block_tables
+                                         for block_number in block_table),
+                                        dtype=np.int64,
+                                        count=int(block_table_lens.sum()))
+        block_numbers = flat_block_tables[
+            np.repeat(block_table_starts, query_lens) +
+            positions // self.block_size]
+        slot_mapping = self._slot_mapping[:num_tokens]
+        np.add(block_numbers * self.block_size,
+               positions % self.block_size,
+               out=slot_mapping)
+
+        # Mask the [0, start_idx) tokens of the prompt with _PAD_SLOT_ID,
+        # where start_idx is max(0, seq_len - sliding_window).
+        # For example, if the prompt len is 10, sliding window is 8, and
+        # block size is 4, the first two tokens are masked and the slot
+        # mapping will be [-1, -1, 2, 3, 4, 5, 6, 7, 0, 1].
+        if self.sliding_window is not None:
+            start_idxs = np.maximum(seq_lens_array - self.sliding_window, 0)
+            slot_mapping[positions < np.repeat(start_idxs, query_lens)] = (
+                _PAD_SLOT_ID)
+
+        return (*self._as_tensors(num_tokens), seq_lens)
+
+    def build_decode(
+        self,
+        seq_group_metadata_list: List[SequenceGroupMetadata],
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, List[int],
+               List[List[int]]]:
+        """Return the input tokens, positions and slot mapping of a batch of
+        decodes, and the lengths and block tables of the sequences."""
+        last_token_ids: List[int] = []
+        seq_lens: List[int] = []
+        last_block_numbers: List[int] = []
+        block_tables: List[List[int]] = []
+
+        for seq_group_metadata in seq_group_metadata_list:
+            assert not seq_group_metadata.is_prompt
+            assert seq_group_metadata.token_chunk_size == 1
+
+            for seq_id, seq_data in seq_group_metadata.seq_data.items():
+                last_token_ids.append(seq_data.get_last_token_id())
+                seq_len = seq_data.get_len()
+                seq_lens.append(seq_len)
+
+                block_table = seq_group_metadata.block_tables[seq_id]
+                last_block_numbers.append(block_table[(seq_len - 1) //
+                                                      self.block_size])
+                if self.sliding_window is not None:
+                    sliding_window_blocks = (self.sliding_window //
+                                             self.block_size)
+                    block_table = block_table[-sliding_window_blocks:]
+                block_tables.append(block_table)
+
+        num_tokens = len(last_token_ids)
+        self._reserve(num_tokens)
+
+        self._input_tokens[:num_tokens] = last_token_ids
+        positions = self._input_positions[:num_tokens]
+        np.subtract(np.array(seq_lens, dtype=np.int64), 1, out=positions)
+        np.add(np.array(last_block_numbers, dtype=np.int64) * self.block_size,
+               positions % self.block_size,
+               out=self._slot_mapping[:num_tokens])
+
+        if self.sliding_window is not None:
+            seq_lens = [
+                min(seq_len, self.sliding_window) for seq_len in seq_lens
+            ]
+
+        return (*self._as_tensors(num_tokens), seq_lens, block_tables)
+
+
 class CPUModelRunner(ModelRunnerBase[CPUModelInput]):
 
     def __init__(
@@ -114,6 +274,9 @@ class CPUModelRunner(ModelRunnerBase[CPUModelInput]):
             self.block_size,
         )
 
+        self.input_tensor_builder = CPUInputTensorBuilder(
+            self.block_size, self.sliding_window)
+
         # Multi-modal data support
         self.multi_modal_input_mapper = MULTIMODAL_REGISTRY \
             .create_input_mapper(self.model_config)
@@ -137,70 +300,17 @@ class CPUModelRunner(ModelRunnerBase[CPUModelInput]):
     ) -> Tuple[torch.Tensor, torch.Tensor, AttentionMetadata, List[int],
                BatchedTensorInputs]:
         assert len(seq_group_metadata_list) > 0
-        input_tokens: List[int] = []
-        input_positions: List[int] = []
-        slot_mapping: List[int] = []
-        seq_lens: List[int] = []
-        multi_modal_inputs_list: List[MultiModalInputs] = []
+        (input_tokens, input_positions, slot_mapping, seq_lens
+         ) = self.input_tensor_builder.build_prompt(seq_group_metadata_list)
+        num_prompt_tokens = len(input_tokens)
 
+        multi_modal_inputs_list: List[MultiModalInputs] = []
         for seq_group_metadata in seq_group_metadata_list:
-            assert seq_group_metadata.is_prompt
-            seq_ids = list(seq_group_metadata.seq_data.keys())
-            assert len(seq_ids) == 1
-            seq_id = seq_ids[0]
-
-            seq_data = seq_group_metadata.seq_data[seq_id]
-            prompt_tokens = seq_data.get_token_ids()
-            computed_len = seq_data.get_num_computed_tokens()
-            seq_len = len(prompt_tokens)
-
-            seq_lens.append(seq_len)  # Prompt token num
-            input_tokens.extend(prompt_tokens)  # Token ids
-
-            # Token position ids
-            # NOTE(woosuk): Here we assume that the first token in the prompt
-            # is always the first token in the sequence.
-            input_positions.extend(list(range(computed_len, seq_len)))
-
             mm_data = seq_group_metadata.multi_modal_data
             if mm_data:
                 mm_kwargs = self.multi_modal_input_mapper(mm_data)
                 multi_modal_inputs_list.append(mm_kwargs)
 
-            # Compute the slot mapping.
-            block_table = seq_group_metadata.block_tables[seq_id]
-            # Mask the [0, start_idx) tokens of the prompt with _PAD_SLOT_ID,
-            # where start_idx is max(0, seq_len - sliding_window).
-            # For example, if the prompt len is 10, sliding window is 8, and
-            # block size is 4, the first two tokens are masked and the slot
-            # mapping will be [-1, -1, 2, 3, 4, 5, 6, 7, 0, 1].
-            start_idx = 0
-            if self.sliding_window is not None:
-                start_idx = max(0, seq_len - self.sliding_window)
-
-            for i in range(computed_len, seq_len):
-                if i < start_idx:
-                    slot_mapping.append(_PAD_SLOT_ID)
-                    continue
-
-                block_number = block_table[i //
-                                           self.block_size]  # type: ignore
-                block_offset = i % self.block_size  # type: ignore
-                slot = block_number * self.block_size + block_offset
-                slot_mapping.append(slot)
-
-        num_prompt_tokens = len(input_tokens)
-
-        input_tokens = torch.tensor(input_tokens,
-                                    dtype=torch.long,
-                                    device=self.device)  # type: ignore
-        input_positions = torch.tensor(input_positions,
-                                       dtype=torch.long,
-                                       device=self.device)  # type: ignore
-        slot_mapping = torch.tensor(slot_mapping,
-                                    dtype=torch.long,
-                                    device=self.device)  # type: ignore
-
         attn_metadata = self.attn_backend.make_metadata(
             is_prompt=True,
             seq_lens=seq_lens,
@@ -223,54 +333,11 @@ class CPUModelRunner(ModelRunnerBase[CPUModelInput]):
         seq_group_metadata_list: List[SequenceGroupMetadata],
     ) -> Tuple[torch.Tensor, torch.Tensor, AttentionMetadata]:
         assert len(seq_group_metadata_list) > 0
-        input_tokens: List[int] = []
-        input_positions: List[int] = []
-        slot_mapping: List[int] = []
-        seq_lens: List[int] = []
-        block_tables: List[List[int]] = []
-
-        for seq_group_metadata in seq_group_metadata_list:
-            assert not seq_group_metadata.is_prompt
-            assert seq_group_metadata.token_chunk_size == 1
-
-            seq_ids = list(seq_group_metadata.seq_data.keys())
-
-            for seq_id in seq_ids:
-                seq_data = seq_group_metadata.seq_data[seq_id]
-                generation_token = seq_data.get_last_token_id()
-                input_tokens.append(generation_token)
-
-                seq_len = seq_data.get_len()
-                position = seq_len - 1
-                input_positions.append(position)
-
-                seq_len = seq_len if self.sliding_window is None else min(
-                    seq_len, self.sliding_window)
-                seq_lens.append(seq_len)
-
-                block_table = seq_group_metadata.block_tables[seq_id]
-                block_number = block_table[position // self.block_size]
-                block_offset = position % self.block_size
-                slot = block_number * self.block_size + block_offset
-                slot_mapping.append(slot)
-
-                if self.sliding_window is not None:
-                    sliding_window_blocks = (self.sliding_window //
-                                             self.block_size)
-                    block_table = block_table[-sliding_window_blocks:]
-                block_tables.append(block_table)
+        (input_tokens, input_positions, slot_mapping, seq_lens, block_tables
+         ) = self.input_tensor_builder.build_decode(seq_group_metadata_list)
 
         max_decode_seq_len = max(seq_lens)
 
-        input_tokens = torch.tensor(input_tokens,
-                                    dtype=torch.long,
-                                    device=self.device)
-        input_positions = torch.tensor(input_positions,
-                                       dtype=torch.long,
-                                       device=self.device)
-        slot_mapping = torch.tensor(slot_mapping,
-                                    dtype=torch.long,
-                                    device=self.device)
         seq_lens_tensor = torch.tensor(seq_lens,
                                        dtype=torch.int,
                                        device=self.device)
@@ -371,19 +438,23 @@ class CPUModelRunner(ModelRunnerBase[CPUModelInput]):
                                          device=self.device),
         }
 
+        forward_start = time.perf_counter()
         hidden_states = model_executable(**execute_model_kwargs)
 
         # Compute the logits.
         logits = self.model.compute_logits(hidden_states,
                                            model_input.sampling_metadata)
+        record_step_phase(FORWARD, forward_start)
 
         # Only perform sampling in the driver worker.
         if not self.is_driver_worker:
             return []
 
         # Sample the next token.
+        sample_start = time.perf_counter()
         output = self.model.sample(
             logits=logits,
             sampling_metadata=model_input.sampling_metadata,
         )
+        record_step_phase(SAMPLE, sample_start)
         return [output]
@@ -377,7 +377,8 @@ class EncoderDecoderModelRunner(GPUModelRunnerBase[EncoderDecoderModelInput]):
             for seq_group_metadata in seq_group_metadata_list:
                 # Build seq lens
                 seq_len = seq_group_metadata.encoder_seq_data.get_len()
-                token_ids = seq_group_metadata.encoder_seq_data.get_token_ids()
+                token_ids = (
+                    seq_group_metadata.encoder_seq_data.get_token_ids_array())
                 encoder_seq_lens.append(seq_len)
 
                 # Build slot mapping
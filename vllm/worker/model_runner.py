@@ -31,6 +31,7 @@ from vllm.config import (CacheConfig, DeviceConfig, LoadConfig, LoRAConfig,
                          ParallelConfig, PromptAdapterConfig, SchedulerConfig)
 from vllm.distributed import get_pp_group
 from vllm.distributed.parallel_state import graph_capture
+from vllm.distributed.pp_layer_partition import profile_stage_costs
 from vllm.inputs import INPUT_REGISTRY
 from vllm.logger import init_logger
 from vllm.lora.layers import LoRAMapping
@@ -51,6 +52,8 @@ from vllm.prompt_adapter.worker_manager import (
 from vllm.sampling_params import SamplingParams
 from vllm.sequence import (IntermediateTensors, SamplerOutput,
                            SequenceGroupMetadata)
+from vllm.startup_profile import startup_phase
+from vllm.step_profile import FORWARD, SAMPLE, record_step_phase
 from vllm.utils import (CudaMemoryProfiler, PyObjectCache, async_tensor_h2d,
                         flatten_2d_lists, get_kv_cache_torch_dtype, is_hip,
                         is_pin_memory_available)
@@ -463,14 +466,18 @@ class ModelInputForGPUBuilder(ModelRunnerInputBuilderBase[ModelInputForGPU]):
             # get_num_computed_tokens is incorrect for spec decoding.
             # So, we should have a special logic here.
             # TODO(sang): Fix it.
-            context_len = seq_len - 1
+            # A decode computes its last token, or its last token_chunk_size
+            # tokens when speculative tokens are scored in a single query.
+            context_len = seq_len - token_chunk_size
         seq_len = min(seq_len, context_len + token_chunk_size)
 
         # Compute tokens.
         if inter_data.is_prompt:
-            tokens = seq_data.get_token_ids()
+            tokens = seq_data.get_token_ids_array()
             if context_len != 0 or seq_len < len(tokens):
                 tokens = tokens[context_len:seq_len]
+        elif token_chunk_size > 1:
+            tokens = seq_data.get_token_ids_array()[context_len:seq_len]
         else:
             # Optimization. get_token_ids requires the entire copy of
             # tokens.
@@ -480,10 +487,10 @@ class ModelInputForGPUBuilder(ModelRunnerInputBuilderBase[ModelInputForGPU]):
         inter_data.orig_seq_lens[seq_idx] = seq_len
         inter_data.context_lens[seq_idx] = context_len
 
-        if isinstance(tokens, list):
-            inter_data.input_tokens[seq_idx].extend(tokens)
-        else:
+        if isinstance(tokens, int):
             inter_data.input_tokens[seq_idx].append(tokens)
+        else:
+            inter_data.input_tokens[seq_idx].extend(tokens)
 
         if (seq_len - context_len) == 1:
             inter_data.input_positions[seq_idx].append(seq_len - 1)
@@ -491,8 +498,7 @@ class ModelInputForGPUBuilder(ModelRunnerInputBuilderBase[ModelInputForGPU]):
             inter_data.input_positions[seq_idx].extend(
                 range(context_len, seq_len))
 
-        inter_data.query_lens[
-            seq_idx] = seq_len - context_len if inter_data.is_prompt else 1
+        inter_data.query_lens[seq_idx] = seq_len - context_len
 
     def _compute_for_prefix_cache_hit(
             self, inter_data: InterDataForSeqGroup, seq_idx: int,
@@ -502,11 +508,13 @@ class ModelInputForGPUBuilder(ModelRunnerInputBuilderBase[ModelInputForGPU]):
         remaining blocks.
         """
         computed_block_nums = inter_data.computed_block_nums
+        num_computed_partial_tokens = (
+            seq_group_metadata.num_computed_partial_tokens)
 
         # Note that prefix caching does not support sliding window.
-        prefix_cache_hit = (computed_block_nums is not None
-                            and len(computed_block_nums) > 0
-                            and self.sliding_window is None
+        prefix_cache_hit = ((
+            (computed_block_nums is not None and len(computed_block_nums) > 0)
+            or num_computed_partial_tokens > 0) and self.sliding_window is None
                             and inter_data.is_prompt)
         inter_data.prefix_cache_hit = prefix_cache_hit
         if self.chunked_prefill_enabled and prefix_cache_hit:
@@ -519,6 +527,15 @@ class ModelInputForGPUBuilder(ModelRunnerInputBuilderBase[ModelInputForGPU]):
         if prefix_cache_hit:
             assert computed_block_nums is not None
             context_len = len(computed_block_nums) * self.block_size
+            if num_computed_partial_tokens > 0:
+                # The leading tokens of the next block were copied from the
+                # cache, so that block is part of the context too.
+                block_table = seq_group_metadata.block_tables[
+                    inter_data.seq_ids[seq_idx]]
+                inter_data.computed_block_nums = computed_block_nums + [
+                    block_table[len(computed_block_nums)]
+                ]
+                context_len += num_computed_partial_tokens
             inter_data.input_tokens[seq_idx] = inter_data.input_tokens[
                 seq_idx][context_len:]
             inter_data.input_positions[seq_idx] = inter_data.input_positions[
@@ -570,9 +587,9 @@ class ModelInputForGPUBuilder(ModelRunnerInputBuilderBase[ModelInputForGPU]):
         inter_data.lora_index_mapping.append([lora_id] * query_len)
         inter_data.lora_prompt_mapping.append(
             [lora_id] *
-            (query_len if seq_group_metadata.sampling_params
-             and seq_group_metadata.sampling_params.prompt_logprobs is not None
-             else 1))
+            (query_len if not inter_data.is_prompt or
+             (seq_group_metadata.sampling_params and seq_group_metadata.
+              sampling_params.prompt_logprobs is not None) else 1))
 
     def _compute_prompt_adapter_input(
             self, inter_data: InterDataForSeqGroup,
@@ -621,6 +638,9 @@ class ModelInputForGPUBuilder(ModelRunnerInputBuilderBase[ModelInputForGPU]):
         if is_prompt:
             assert n_seqs == 1
             self.decode_only = False
+        elif seq_group_metadata.token_chunk_size > 1:
+            # Multi-token decodes (speculative scoring) are not captured.
+            self.decode_only = False
 
         inter_data = self.init_cached_inter_data(
             request_id=seq_group_metadata.request_id,
@@ -1108,6 +1128,15 @@ class GPUModelRunnerBase(ModelRunnerBase[TModelInputForGPU]):
                 device=self.device)
         self.execute_model(model_input, kv_caches, intermediate_tensors)
         torch.cuda.synchronize()
+
+        if (envs.VLLM_PP_LAYER_PARTITION == "auto"
+                and self.parallel_config.pipeline_parallel_size > 1):
+            # Profile the layers of this stage to balance the partition, in a
+            # second run, once kernels have been compiled by the first.
+            with profile_stage_costs(self.model, self.model_config,
+                                     self.parallel_config):
+                self.execute_model(model_input, kv_caches,
+                                   intermediate_tensors)
         return
 
     def remove_all_loras(self):
@@ -1176,6 +1205,7 @@ class GPUModelRunnerBase(ModelRunnerBase[TModelInputForGPU]):
         return self.prompt_adapter_manager.list_adapters()
 
     @torch.inference_mode()
+    @startup_phase("graph_capture")
     def capture_model(self, kv_caches: List[List[torch.Tensor]]) -> None:
         """Cuda graph capture a model.
 
@@ -1535,6 +1565,7 @@ class ModelRunner(GPUModelRunnerBase[ModelInputForGPUWithSamplingMetadata]):
             model_forward_end = torch.cuda.Event(enable_timing=True)
             model_forward_start.record()
 
+        forward_start = time.perf_counter()
         hidden_or_intermediate_states = model_executable(
             input_ids=model_input.input_tokens,
             positions=model_input.input_positions,
@@ -1551,19 +1582,23 @@ class ModelRunner(GPUModelRunnerBase[ModelInputForGPUWithSamplingMetadata]):
 
         # Compute the logits in the last pipeline stage.
         if not get_pp_group().is_last_rank:
+            record_step_phase(FORWARD, forward_start)
             return hidden_or_intermediate_states
 
         logits = self.model.compute_logits(hidden_or_intermediate_states,
                                            model_input.sampling_metadata)
+        record_step_phase(FORWARD, forward_start)
 
         if not self.is_driver_worker:
             return []
 
         # Sample the next token.
+        sample_start = time.perf_counter()
         output: SamplerOutput = self.model.sample(
             logits=logits,
             sampling_metadata=model_input.sampling_metadata,
         )
+        record_step_phase(SAMPLE, sample_start)
         if (self.observability_config is not None
                 and self.observability_config.collect_model_forward_time
                 and output is not None):
@@ -155,7 +155,8 @@ class OpenVINOModelRunner:
                     computed_len + seq_group_metadata.token_chunk_size,
                 )
                 if is_prompt:
-                    tokens = seq_data.get_token_ids()[computed_len:seq_len]
+                    tokens = seq_data.get_token_ids_array(
+                    )[computed_len:seq_len].tolist()
                 else:
                     # Optimization. get_token_ids requires the entire copy of
                     # tokens.
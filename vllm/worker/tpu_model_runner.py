@@ -273,7 +273,7 @@ class TPUModelRunner(ModelRunnerBase[ModelInputForTPU]):
 
             seq_data = seq_group_metadata.seq_data[seq_id]
             # Could include output tokens when a request is preempted.
-            prompt_tokens = seq_data.get_token_ids()
+            prompt_tokens = seq_data.get_token_ids_array()
             prompt_len = len(prompt_tokens)
             prompt_lens.append(prompt_len)
 
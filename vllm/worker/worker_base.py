@@ -14,6 +14,7 @@ from vllm.lora.request import LoRARequest
 from vllm.platforms import current_platform
 from vllm.sequence import (ExecuteModelRequest, IntermediateTensors,
                            SamplerOutput)
+from vllm.step_profile import BROADCAST, PREPARE_INPUT, record_step_phase
 from vllm.utils import (enable_trace_function_call_for_thread,
                         update_environment_variables)
 from vllm.worker.model_runner_base import ModelRunnerBase, ModelRunnerInputBase
@@ -242,13 +243,16 @@ class LocalOrDistributedWorkerBase(WorkerBase):
                     execute_model_req.virtual_engine,
                     execute_model_req.finished_requests_ids))
             num_steps = execute_model_req.num_steps
+            record_step_phase(PREPARE_INPUT, start_time)
 
             if self.do_metadata_broadcast:
+                broadcast_start = time.perf_counter()
                 broadcast_data = worker_input.as_broadcastable_tensor_dict()
                 broadcast_data.update(
                     model_input.as_broadcastable_tensor_dict())
                 broadcast_data["num_steps"] = num_steps
                 broadcast_tensor_dict(broadcast_data, src=0)
+                record_step_phase(BROADCAST, broadcast_start)
         else:
             assert self.do_metadata_broadcast
             broadcast_data = broadcast_tensor_dict(src=0)
@@ -423,7 +423,7 @@ class XPUModelRunner(ModelRunnerBase[ModelInputForXPU]):
             seq_id = seq_ids[0]
 
             seq_data = seq_group_metadata.seq_data[seq_id]
-            prompt_tokens = seq_data.get_token_ids()
+            prompt_tokens = seq_data.get_token_ids_array()
             computed_len = seq_data.get_num_computed_tokens()
             seq_len = len(prompt_tokens)
 